@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCT多分辨率模式基准测试
+
+在样例图片和不同宽度的合成OCT图片上，对比全分辨率模式与各多分辨率档位：
+- 特征提取耗时（预处理相同，不计入）及最慢的霍夫圆检测节点耗时
+- 主要特征相对全分辨率结果的差异
+
+用法: python benchmark_oct_pyramid.py [--widths 1024 2048] [--profiles accurate balanced fast]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from benchmark_tool_executor import make_oct_image
+from src.tools.oct_analysis import OCTAnalyzer
+from src.tools.oct_pyramid import PROFILES
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pictures')
+SAMPLE_IMAGES = ["glaucoma_classification_1.png", "E.png"]
+
+# (名称, 取值函数)
+FEATURES = [
+    ("layers", lambda f: f['retinal_layers']['layer_count']),
+    ("cup_disc", lambda f: f['optic_nerve']['cup_disc_ratio']),
+    ("cup_area", lambda f: f['optic_nerve']['cup_area']),
+    ("cup_depth", lambda f: f['optic_nerve']['cup_depth']),
+    ("microaneurysms", lambda f: f['vessels']['microaneurysms']),
+    ("abnormalities", lambda f: len(f['abnormalities'])),
+]
+
+
+def run(profile, image):
+    analyzer = OCTAnalyzer(profile)
+    start = time.perf_counter()
+    features = analyzer._analyze_oct_features(image)
+    elapsed = (time.perf_counter() - start) * 1000
+    circles = sum(ms for name, ms in analyzer.feature_timings.items() if name.startswith('hough_circles.'))
+    return elapsed, circles, {name: get(features) for name, get in FEATURES}
+
+
+def fmt_delta(value, reference):
+    delta = value - reference
+    if isinstance(value, int) and isinstance(reference, int):
+        return f"{delta:+d}"
+    return f"{delta:+.3g}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCT多分辨率模式基准测试")
+    parser.add_argument("--widths", type=int, nargs="*", default=[1024, 2048], help="合成图片宽度（高度为宽度的一半）")
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES), help="对比的多分辨率档位")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(SAMPLE_DIR, name) for name in SAMPLE_IMAGES
+                 if os.path.exists(os.path.join(SAMPLE_DIR, name))]
+        for width in args.widths:
+            path = os.path.join(tmp, f"synthetic_{width}.png")
+            make_oct_image(path, size=(width // 2, width), seed=width)
+            paths.append(path)
+
+        preprocess = OCTAnalyzer("full")._preprocess_oct_image
+        for path in paths:
+            image = preprocess(cv2.imread(path))
+            print(f"\n{os.path.basename(path)} {image.shape[1]}x{image.shape[0]}")
+            print(f"  {'档位':<9}{'特征耗时':>10}{'霍夫圆':>10}{'加速':>7}  特征差异（相对full）")
+
+            full_ms, full_circles, reference = run("full", image)
+            print(f"  {'full':<9}{full_ms:>8.0f}ms{full_circles:>8.0f}ms{'1.0x':>7}  "
+                  + "  ".join(f"{name}={value:.3g}" for name, value in reference.items()))
+            for profile in args.profiles:
+                elapsed, circles, values = run(profile, image)
+                deltas = "  ".join(f"{name}{fmt_delta(values[name], reference[name])}" for name in reference)
+                print(f"  {profile:<9}{elapsed:>8.0f}ms{circles:>8.0f}ms{full_ms / elapsed:>6.1f}x  {deltas}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工具执行策略基准测试
+
+混合负载：若干OCT分析（CPU密集）与大量模拟网络请求（IO）并发执行，对比
+- inline：旧行为，所有工具直接在事件循环中执行
+- policy：按执行策略分派，CPU工具进入常驻进程池
+
+输出总耗时、吞吐量，以及IO任务的延迟分布（CPU任务阻塞事件循环时IO延迟会明显上升）。
+
+用法: python benchmark_tool_executor.py [--oct 4] [--io 200] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.tool_executor import ToolExecutor
+from src.tools.oct_analysis import OCTAnalysisTool
+
+
+def make_oct_image(path, size=(384, 512), seed=0):
+    """生成带层状结构和噪声的合成OCT图片"""
+    rng = np.random.default_rng(seed)
+    h, w = size
+    image = np.zeros((h, w), np.uint8)
+    for i, y in enumerate(range(h // 4, 3 * h // 4, 24)):
+        offset = (20 * np.sin(np.linspace(0, 3 * np.pi, w) + i)).astype(int)
+        for x in range(0, w, 2):
+            cv2.circle(image, (x, y + offset[x]), 4, 120 + 12 * i, -1)
+    image = cv2.add(image, rng.integers(0, 60, size=(h, w), dtype=np.uint8))
+    cv2.imwrite(path, cv2.cvtColor(image, cv2.COLOR_GRAY2BGR))
+
+
+async def io_tool(delay=0.02):
+    """模拟一次网络请求"""
+    await asyncio.sleep(delay)
+    return "ok"
+
+
+async def timed_io(latencies, issued_at):
+    await io_tool()
+    latencies.append(time.perf_counter() - issued_at)
+
+
+async def run_mixed(mode, tool, executor, image_paths, n_io):
+    latencies = []
+
+    async def run_oct(path):
+        if mode == "inline":
+            return await tool.execute(image_path=path)
+        return await executor.run(tool, {"image_path": path})
+
+    async def io_stream():
+        # IO请求按固定间隔到达；延迟从计划到达时刻算起，事件循环被阻塞的时间也计入
+        tasks = []
+        first = time.perf_counter()
+        for i in range(n_io):
+            issued_at = first + i * 0.005
+            await asyncio.sleep(max(0.0, issued_at - time.perf_counter()))
+            tasks.append(asyncio.ensure_future(timed_io(latencies, issued_at)))
+        await asyncio.gather(*tasks)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(io_stream(), *(run_oct(p) for p in image_paths))
+    elapsed = time.perf_counter() - start
+    assert all("OCT图片分析完成" in r for r in results[1:]), results[1:]
+    return elapsed, latencies
+
+
+def report(mode, elapsed, latencies, n_tasks):
+    ordered = sorted(latencies)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    print(f"{mode:>7}: 总耗时 {elapsed:6.2f}s  吞吐 {n_tasks / elapsed:7.1f} 任务/s  "
+          f"IO延迟 p50 {statistics.median(ordered) * 1000:7.1f}ms  "
+          f"p95 {p95 * 1000:7.1f}ms  max {ordered[-1] * 1000:7.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="工具执行策略基准测试")
+    parser.add_argument("--oct", type=int, default=4, help="OCT分析任务数")
+    parser.add_argument("--io", type=int, default=200, help="IO任务数")
+    parser.add_argument("--workers", type=int, default=None, help="进程池大小")
+    args = parser.parse_args()
+
+    tool = OCTAnalysisTool()
+    executor = ToolExecutor(max_workers=args.workers)
+    executor.register(tool)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_paths = []
+        for i in range(args.oct):
+            path = os.path.join(tmp, f"oct_{i}.png")
+            make_oct_image(path, seed=i)
+            image_paths.append(path)
+
+        # 预热进程池，排除进程启动与工具初始化时间
+        await asyncio.gather(*(executor.run(tool, {"image_path": image_paths[0]})
+                               for _ in range(executor.max_workers)))
+
+        print(f"混合负载: {args.oct} 个OCT分析 + {args.io} 个IO请求, 进程池 {executor.max_workers} 个进程")
+        for mode in ("inline", "policy"):
+            elapsed, latencies = await run_mixed(mode, tool, executor, image_paths, args.io)
+            report(mode, elapsed, latencies, args.oct + args.io)
+
+    # 含预热调用；policy模式下OCT分析应全部按cpu策略分派
+    print("执行器分派次数: " + ", ".join(f"{policy} {count}" for policy, count in executor.calls.items()))
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,9 +7,12 @@
 import sys
 from PyQt6.QtWidgets import QApplication
 from src.ui.main_window import MainWindow
+from src.tools.ollama_client import ollama_client
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    # 后台预加载对话模型，首次对话无需等待模型加载
+    ollama_client.preload()
     win = MainWindow()
     win.show()
     sys.exit(app.exec()) 
\ No newline at end of file
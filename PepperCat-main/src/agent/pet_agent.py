@@ -77,10 +77,14 @@ class PetAgent:
                 "break": {"last": 0, "interval": 3600},  # 休息提醒
                 "productivity": {"last": 0, "interval": 7200},  # 效率提醒
                 "health": {"last": 0, "interval": 5400},  # 健康提醒
-                "social": {"last": 0, "interval": 9000}  # 社交提醒
+                "social": {"last": 0, "interval": 9000},  # 社交提醒
+                "eyes": {"last": 0, "interval": 1200}  # 用眼疲劳提醒
             }
         }
         
+        # 眼睛状态监测（src.tools.eye_monitor.EyeMonitorFeed，由主窗口的“用眼监测”开关接入）
+        self.eye_monitor = None
+        
         # 活动监控
         self.current_window_title = ""
         self.last_clipboard_content = ""
@@ -461,6 +465,10 @@ class PetAgent:
                 "reason": "、".join(mood_indicators)
             })
     
+    def attach_eye_monitor(self, monitor) -> None:
+        """接入眼睛状态监测（需提供 is_fatigued()），用于用眼疲劳提醒；传入None取消"""
+        self.eye_monitor = monitor
+    
     def check_reminders(self) -> str:
         """检查是否需要主动提醒"""
         current_time = time.time()
@@ -473,6 +481,14 @@ class PetAgent:
         current_activity = self._categorize_activity(self.current_window_title)
         insights = self.get_user_insights()
         
+        # 用眼疲劳提醒（眼睛状态监测判定疲劳时）
+        if self.eye_monitor is not None and \
+                current_time - self.reminder_system["reminder_types"]["eyes"]["last"] > self.reminder_system["reminder_types"]["eyes"]["interval"]:
+            if self.eye_monitor.is_fatigued():
+                self.reminder_system["reminder_types"]["eyes"]["last"] = current_time
+                self.reminder_system["last_reminder"] = current_time
+                return f"眼睛有点累了，眨眨眼，看看20英尺外的地方休息20秒吧~"
+        
         # 休息提醒
         if current_time - self.reminder_system["reminder_types"]["break"]["last"] > self.reminder_system["reminder_types"]["break"]["interval"]:
             if current_activity in ["办公", "编程"] and current_hour >= 10:
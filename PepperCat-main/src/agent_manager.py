@@ -2,6 +2,7 @@ import asyncio
 import re
 import json
 from .tool_registry import ToolRegistry
+from .tool_executor import GUI, tool_executor
 from .tools.ollama_client import ask_ollama
 
 class AgentManager:
@@ -17,12 +18,14 @@ class AgentManager:
         from .openmanus_agent.visualize_tool import VisualizeTool
         
         self.tool_registry.register("web_search", web_search)
-        self.tool_registry.register("pet_say", pet_say)
+        self.tool_registry.register("pet_say", pet_say, policy=GUI)
         self.tool_registry.register("eye_games", EyeGamesTool())
         self.tool_registry.register("image_analysis", ImageAnalysisTool())
         self.tool_registry.register("oct_analysis", OCTAnalysisTool())
         self.tool_registry.register("vision_test", VisionTestTool())
         self.tool_registry.register("visualize", VisualizeTool())
+        # 提前启动CPU工具进程池，首次图片分析无需等待进程启动和模型加载
+        tool_executor.warm_up()
 
     def parse_command(self, user_input):
         prompt = (
@@ -0,0 +1,23 @@
+"""
+桌宠端的全局LLM请求调度器
+
+桌宠内所有访问大模型的入口（tools.ollama_client.ask_ollama、
+openmanus_agent.llm_ollama.OllamaChatCompletion）在发请求前通过同一个调度器排队。
+调度器的实现（优先级、按后端限流、single-flight、指标）与主项目共用
+openmanus_core/llm_scheduler.py；桌宠端不读取config.toml，限流在本模块中配置。
+"""
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from openmanus_core.llm_scheduler import BackendLimits, LLMScheduler, Priority, backend_for_url  # noqa: E402,F401
+
+# 本地Ollama一次只处理一个生成请求，避免模型在多个提示间抖动
+BACKEND_LIMITS = {"ollama": BackendLimits(max_concurrency=1)}
+
+# 全局调度器实例
+scheduler = LLMScheduler(BACKEND_LIMITS)
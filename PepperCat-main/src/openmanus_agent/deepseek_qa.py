@@ -1,6 +1,7 @@
 from typing import ClassVar, Dict, Any
 from src.openmanus_agent.tool_base import BaseTool
-from src.tools.ollama_client import ask_ollama
+from src.llm_scheduler import Priority
+from src.tools.ollama_client import ollama_client
 
 class DeepseekQATool(BaseTool):
     name: str = "deepseekqa"
@@ -13,6 +14,10 @@ class DeepseekQATool(BaseTool):
         },
         "required": ["data", "question"]
     }
-    async def execute(self, data: str, question: str) -> str:
+    async def execute(self, data: str, question: str, on_token=None) -> str:
         prompt = f"请根据以下数据进行分析：\n{data}\n\n分析要求：{question}"
-        return ask_ollama(prompt) 
\ No newline at end of file
+        # 数据分析报告属于后台任务，让位于交互式对话；on_token用于把回复逐字推送到界面
+        try:
+            return await ollama_client.generate(prompt, on_token=on_token, priority=Priority.BACKGROUND) or "[无回复]"
+        except Exception as e:
+            return f"[Ollama错误] {e}" 
\ No newline at end of file
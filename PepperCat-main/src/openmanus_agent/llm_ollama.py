@@ -1,10 +1,11 @@
-import requests
+from src.llm_scheduler import Priority
+from src.tools.ollama_client import ollama_client
 
 class OllamaChatCompletion:
     def __init__(self, model="deepseek-llm"):
         self.model = model
 
-    async def ask_tool(self, messages, system_msgs=None, tools=None, tool_choice=None):
+    async def ask_tool(self, messages, system_msgs=None, tools=None, tool_choice=None, priority=Priority.INTERACTIVE, on_token=None):
         # 拼接 prompt
         prompt = ""
         if system_msgs:
@@ -12,16 +13,11 @@ class OllamaChatCompletion:
                 prompt += msg.content + "\n"
         for msg in messages:
             prompt += msg.content + "\n"
-        url = "http://localhost:11434/api/generate"
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": False
-        }
-        response = requests.post(url, json=payload, timeout=60)
+        # 异步流式请求，不阻塞调用方的事件循环
+        content = await ollama_client.generate(prompt, model=self.model, on_token=on_token, priority=priority)
         # 这里需适配 OpenManus 的 response 结构
         class DummyResponse:
             def __init__(self, content):
                 self.content = content
                 self.tool_calls = []
-        return DummyResponse(response.json().get("response", "[无回复]")) 
\ No newline at end of file
+        return DummyResponse(content or "[无回复]")
@@ -1,11 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, ClassVar, Dict, Optional
 from pydantic import BaseModel, Field
 
 class BaseTool(ABC, BaseModel):
     name: str
     description: str
     parameters: Optional[dict] = None
+    # 执行策略：io（在事件循环中执行）/ cpu（进程池）/ gui（调用线程），见 src/tool_executor.py
+    execution_policy: ClassVar[str] = "io"
     
     class Config:
         arbitrary_types_allowed = True
@@ -32,7 +34,8 @@ class BaseTool(ABC, BaseModel):
         raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
     
     async def __call__(self, **kwargs) -> Any:
-        return await self.execute(**kwargs)
+        from src.tool_executor import tool_executor
+        return await tool_executor.run(self, kwargs)
     
     @abstractmethod
     async def execute(self, **kwargs) -> Any:
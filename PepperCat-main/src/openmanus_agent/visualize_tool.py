@@ -13,7 +13,7 @@ import numpy as np
 import os
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Union, ClassVar
 import asyncio
 
 # 设置中文字体
@@ -576,6 +576,7 @@ class VisualizeTool(BaseTool):
     
     name: str = "visualize"
     description: str = "创建数据可视化图表，支持折线图、柱状图、散点图、直方图、箱线图、热力图等多种图表类型"
+    execution_policy: ClassVar[str] = "cpu"
     
     parameters: Dict[str, Any] = {
         "type": "object",
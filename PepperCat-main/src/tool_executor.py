@@ -0,0 +1,201 @@
+"""
+工具执行策略
+
+每个工具通过 execution_policy 声明自己的执行方式：
+
+- io：异步工具直接在事件循环中await；同步函数放到线程池，避免阻塞事件循环
+- cpu：OpenCV/MediaPipe/matplotlib等计算密集型工具，分派到常驻进程池。
+  工作进程启动时预先导入OpenCV并创建已登记的工具实例，模型和分类器在每个进程中只加载一次
+- gui：会打开窗口的工具（眼部游戏、视力检测），必须在调用线程中直接执行
+
+ToolRegistry.run_tool 和 BaseTool.__call__ 都经过这里分派。
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import functools
+import importlib
+import inspect
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Set
+
+IO = "io"
+CPU = "cpu"
+GUI = "gui"
+POLICIES = (IO, CPU, GUI)
+
+
+def policy_of(tool: Any) -> str:
+    """工具声明的执行策略（未声明视为io）"""
+    policy = getattr(tool, "execution_policy", IO)
+    return policy if policy in POLICIES else IO
+
+
+def _entry(tool: Any) -> Callable[..., Any]:
+    # BaseTool实例调用execute，避免经__call__再次分派
+    return tool.execute if hasattr(tool, "execute") else tool
+
+
+def _tool_path(tool: Any) -> Optional[str]:
+    """工具类的导入路径；普通函数返回None（直接按函数pickle）"""
+    if not hasattr(tool, "execute"):
+        return None
+    cls = type(tool)
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _call_sync(fn: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+    """在当前线程同步执行，协程结果用一个临时事件循环跑完"""
+    result = fn(**kwargs)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return result
+
+
+# ----------------------------------------------------------------------
+# 工作进程
+# ----------------------------------------------------------------------
+
+_worker_tools: Dict[str, Any] = {}
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _worker_tool(path: str) -> Any:
+    tool = _worker_tools.get(path)
+    if tool is None:
+        module_name, qualname = path.split(":", 1)
+        obj: Any = importlib.import_module(module_name)
+        for part in qualname.split("."):
+            obj = getattr(obj, part)
+        tool = _worker_tools[path] = obj()
+    return tool
+
+
+def _init_worker(preload: tuple) -> None:
+    global _worker_loop
+    import cv2
+
+    # 并行度由进程数提供，每个进程内OpenCV单线程，避免线程过度订阅
+    cv2.setNumThreads(1)
+    _worker_loop = asyncio.new_event_loop()
+    for path in preload:
+        try:
+            _worker_tool(path)
+        except Exception as e:
+            print(f"[工具进程] 预加载 {path} 失败: {e}")
+
+
+def _run_in_worker(path: Optional[str], fn: Optional[Callable[..., Any]], kwargs: Dict[str, Any]) -> Any:
+    if path is not None:
+        fn = _worker_tool(path).execute
+    result = fn(**kwargs)
+    if inspect.isawaitable(result):
+        result = _worker_loop.run_until_complete(result)
+    return result
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+# ----------------------------------------------------------------------
+# 分派
+# ----------------------------------------------------------------------
+
+class ToolExecutor:
+    """按工具执行策略分派调用"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._preload: Set[str] = set()
+        self._lock = threading.Lock()
+        self.calls = {policy: 0 for policy in POLICIES}   # 按策略统计的调用次数（基准测试中输出）
+
+    def register(self, tool: Any) -> None:
+        """登记CPU工具类，新启动的工作进程会预先创建它的实例"""
+        path = _tool_path(tool)
+        if path is not None:
+            with self._lock:
+                self._preload.add(path)
+
+    def _get_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(tuple(sorted(self._preload)),),
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: concurrent.futures.ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, pool: concurrent.futures.ProcessPoolExecutor, tool: Any, kwargs: Dict[str, Any]) -> concurrent.futures.Future:
+        path = _tool_path(tool)
+        # 工具类实例在工作进程中按导入路径重建，普通函数直接pickle
+        return pool.submit(_run_in_worker, path, None if path else tool, kwargs)
+
+    def warm_up(self) -> None:
+        """提前启动全部工作进程（不等待），首个CPU任务无需承担进程启动和模型加载"""
+        pool = self._get_pool()
+        for _ in range(self.max_workers):
+            pool.submit(_worker_ready)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, tool: Any, kwargs: Dict[str, Any], policy: Optional[str] = None) -> Any:
+        """在事件循环中执行工具调用；policy为空时使用工具自身声明的策略"""
+        policy = policy or policy_of(tool)
+        self.calls[policy] += 1
+        fn = _entry(tool)
+        loop = asyncio.get_running_loop()
+
+        if policy == CPU:
+            self.register(tool)
+            pool = self._get_pool()
+            try:
+                return await asyncio.wrap_future(self._submit(pool, tool, kwargs))
+            except BrokenProcessPool:
+                # 工作进程崩溃：丢弃进程池（下次重建），本次退回线程执行
+                self._discard_pool(pool)
+            return await loop.run_in_executor(None, _call_sync, fn, kwargs)
+
+        if policy == GUI:
+            result = fn(**kwargs)
+            return await result if inspect.isawaitable(result) else result
+
+        if inspect.iscoroutinefunction(fn):
+            return await fn(**kwargs)
+        result = await loop.run_in_executor(None, functools.partial(fn, **kwargs))
+        return await result if inspect.isawaitable(result) else result
+
+    def run_sync(self, tool: Any, kwargs: Dict[str, Any], policy: Optional[str] = None) -> Any:
+        """在非异步环境中执行工具调用（阻塞调用线程）"""
+        policy = policy or policy_of(tool)
+        self.calls[policy] += 1
+        fn = _entry(tool)
+        if policy == CPU:
+            self.register(tool)
+            pool = self._get_pool()
+            try:
+                return self._submit(pool, tool, kwargs).result()
+            except BrokenProcessPool:
+                self._discard_pool(pool)
+        return _call_sync(fn, kwargs)
+
+
+# 全局执行器实例
+tool_executor = ToolExecutor()
+atexit.register(tool_executor.shutdown)
@@ -1,23 +1,26 @@
 import asyncio
 from typing import Any, Dict
 
+from .tool_executor import CPU, policy_of, tool_executor
+
 class ToolRegistry:
     def __init__(self):
         self.tools = {}
+        self.policies = {}
 
-    def register(self, name, func):
+    def register(self, name, func, policy=None):
+        # policy: io / cpu / gui，不指定时使用工具自身声明的execution_policy
         self.tools[name] = func
+        self.policies[name] = policy or policy_of(func)
+        if self.policies[name] == CPU:
+            tool_executor.register(func)
 
     async def run_tool(self, name, **kwargs):
         if name in self.tools:
             tool = self.tools[name]
             try:
-                # 检查是否是异步函数
-                if asyncio.iscoroutinefunction(tool):
-                    result = await tool(**kwargs)
-                else:
-                    result = tool(**kwargs)
-                return result
+                # 按执行策略分派：CPU密集型工具进入进程池，不阻塞事件循环
+                return await tool_executor.run(tool, kwargs, self.policies[name])
             except Exception as e:
                 return f"工具 {name} 执行失败: {str(e)}"
         return f"工具 {name} 未注册"
@@ -27,7 +30,7 @@ class ToolRegistry:
         if name in self.tools:
             tool = self.tools[name]
             try:
-                return tool(**kwargs)
+                return tool_executor.run_sync(tool, kwargs, self.policies[name])
             except Exception as e:
                 return f"工具 {name} 执行失败: {str(e)}"
         return f"工具 {name} 未注册" 
\ No newline at end of file
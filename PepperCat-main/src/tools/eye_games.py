@@ -3,7 +3,7 @@ from tkinter import ttk, messagebox
 import random
 import time
 import threading
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, ClassVar
 from src.openmanus_agent.tool_base import BaseTool
 
 class EyeGameWindow:
@@ -422,6 +422,7 @@ class EyeGamesTool(BaseTool):
     
     name: str = "eye_games"
     description: str = "启动眼部健康训练游戏，包括记忆训练、专注力训练和反应速度训练"
+    execution_policy: ClassVar[str] = "gui"
     game_windows: Dict[str, Any] = {}
     
     parameters: Dict[str, Any] = {
@@ -0,0 +1,72 @@
+"""
+桌宠的后台用眼监测
+
+EyeMonitorFeed 订阅共享摄像头（项目根目录 camera_broker.CameraStream），在后台线程中把每帧的
+面部关键点交给 eye_state.EyeStateMonitor；通过 PetAgent.attach_eye_monitor 接入后，
+桌宠在 PERCLOS 过高或眨眼过少时提醒休息。摄像头和检测模型由代理打开，与视力检测等模块共用。
+"""
+
+import os
+import sys
+import threading
+from typing import Dict, Optional
+
+# camera_broker.py 和 eye_state.py 位于项目根目录（PepperCat-main 的上一级）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from eye_state import EyeStateMonitor
+
+
+class EyeMonitorFeed:
+    """由摄像头逐帧更新的眼睛状态监测，提供 PetAgent 需要的 is_fatigued()"""
+
+    def __init__(self, stream=None, monitor: Optional[EyeStateMonitor] = None):
+        self.stream = stream
+        self.monitor = monitor or EyeStateMonitor()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "EyeMonitorFeed":
+        if self.running:
+            return self
+        if self.stream is None:
+            from camera_broker import CameraStream
+            self.stream = CameraStream()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="eye-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            snapshot = self.stream.read(timeout=0.5)
+            if snapshot is None:
+                if not self.stream.isOpened():
+                    break
+                continue
+            if snapshot.face is not None:
+                with self._lock:
+                    self.monitor.update_face(snapshot.captured_at, snapshot.face)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self.stream is not None:
+            self.stream.close()
+
+    def is_fatigued(self) -> bool:
+        with self._lock:
+            return self.monitor.is_fatigued()
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            return self.monitor.metrics()
@@ -3,15 +3,23 @@
 """
 增强的图像分析工具
 支持眼部图片AI分析、疾病检测、健康评估等功能
+
+EyeImageAnalyzer 创建时加载MediaPipe面部网格和Haar级联分类器，开销远大于单张图片的分析。
+EyeAnalyzerPool 保存一组预热的分析器实例，每个实例同一时刻只借给一个线程使用；
+ImageAnalysisTool 和批量接口 analyze_images 都通过进程内共享的池取用分析器。
 """
 
 import cv2
 import numpy as np
 import os
 import json
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Iterator, Optional, List, Sequence, Tuple, ClassVar
 from pathlib import Path
 import asyncio
 
@@ -35,10 +43,30 @@ except ImportError:
     print("警告: MediaPipe未安装，将使用OpenCV进行面部检测")
 
 from src.openmanus_agent.tool_base import BaseTool
+from src.tools.image_loader import load_bgr
+
+# 面部网格中左眼、右眼的关键点下标
+LEFT_EYE_INDICES = np.arange(362, 387)
+RIGHT_EYE_INDICES = np.arange(33, 58)
+
+# 共享分析器池的实例数
+ANALYZER_POOL_SIZE = int(os.environ.get("EYE_ANALYZER_POOL_SIZE", min(4, os.cpu_count() or 1)))
+
+
+def landmarks_to_array(landmarks, width: int, height: int) -> np.ndarray:
+    """把一张脸的全部关键点转换为 (N, 2) 的像素坐标数组（与逐点 int() 截断一致）"""
+    points = np.array([(p.x, p.y) for p in landmarks.landmark], dtype=np.float64)
+    points *= (width, height)
+    return points.astype(np.int32)
+
 
 class EyeImageAnalyzer:
     """眼部图像分析器"""
     
+    # 预处理后的最大宽度；加载时按此宽度缩小解码（JPEG）
+    MAX_WIDTH = 800
+    LOAD_TARGET_SIZE = (MAX_WIDTH, 0)
+    
     def __init__(self):
         self.face_mesh = None
         self.eye_cascade = None
@@ -63,7 +91,9 @@ class EyeImageAnalyzer:
         try:
             # 初始化MediaPipe面部网格
             if MEDIAPIPE_AVAILABLE:
+                # 池中的实例会轮流处理互不相关的图片，使用静态图片模式，不沿用上一张图片的跟踪结果
                 self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+                    static_image_mode=True,
                     max_num_faces=1,
                     refine_landmarks=True,
                     min_detection_confidence=0.5,
@@ -88,10 +118,21 @@ class EyeImageAnalyzer:
                 return {"error": f"图像文件不存在: {image_path}"}
             
             # 读取图像
-            image = cv2.imread(image_path)
+            image = load_bgr(image_path, self.LOAD_TARGET_SIZE)
             if image is None:
                 return {"error": f"无法读取图像: {image_path}"}
             
+            result = self.analyze_array(image)
+            if "error" in result:
+                return result
+            return {"status": "success", "image_path": image_path, **result}
+            
+        except Exception as e:
+            return {"error": f"图像分析失败: {str(e)}"}
+    
+    def analyze_array(self, image: np.ndarray) -> Dict[str, Any]:
+        """分析已解码的BGR图像"""
+        try:
             # 预处理图像
             processed_image = self._preprocess_image(image)
             
@@ -114,7 +155,6 @@ class EyeImageAnalyzer:
             
             return {
                 "status": "success",
-                "image_path": image_path,
                 "analysis_results": analysis_results,
                 "overall_health": overall_health,
                 "report": report,
@@ -128,8 +168,8 @@ class EyeImageAnalyzer:
         """预处理图像"""
         # 调整图像大小
         height, width = image.shape[:2]
-        if width > 800:
-            scale = 800 / width
+        if width > self.MAX_WIDTH:
+            scale = self.MAX_WIDTH / width
             new_width = int(width * scale)
             new_height = int(height * scale)
             image = cv2.resize(image, (new_width, new_height))
@@ -147,7 +187,6 @@ class EyeImageAnalyzer:
     def _detect_eye_regions(self, image: np.ndarray) -> List[np.ndarray]:
         """检测眼部区域"""
         eye_regions = []
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
         # 使用MediaPipe检测眼部关键点
         if self.face_mesh:
@@ -155,32 +194,18 @@ class EyeImageAnalyzer:
             results = self.face_mesh.process(rgb_image)
             
             if results.multi_face_landmarks:
-                landmarks = results.multi_face_landmarks[0]
                 height, width = image.shape[:2]
+                points = landmarks_to_array(results.multi_face_landmarks[0], width, height)
                 
-                # 左眼关键点 (362-386)
-                left_eye_points = []
-                for i in range(362, 387):
-                    point = landmarks.landmark[i]
-                    x, y = int(point.x * width), int(point.y * height)
-                    left_eye_points.append([x, y])
-                
-                # 右眼关键点 (33-57)
-                right_eye_points = []
-                for i in range(33, 58):
-                    point = landmarks.landmark[i]
-                    x, y = int(point.x * width), int(point.y * height)
-                    right_eye_points.append([x, y])
-                
-                # 提取眼部区域
-                for eye_points in [left_eye_points, right_eye_points]:
-                    if len(eye_points) > 0:
-                        eye_region = self._extract_eye_region(image, eye_points)
-                        if eye_region is not None:
-                            eye_regions.append(eye_region)
+                # 左眼关键点 (362-386)、右眼关键点 (33-57)
+                for eye_points in (points[LEFT_EYE_INDICES], points[RIGHT_EYE_INDICES]):
+                    eye_region = self._extract_eye_region(image, eye_points)
+                    if eye_region is not None:
+                        eye_regions.append(eye_region)
         
         # 如果MediaPipe失败，使用OpenCV级联分类器
         if not eye_regions and self.eye_cascade:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
             eyes = self.eye_cascade.detectMultiScale(gray, 1.1, 5)
             for (x, y, w, h) in eyes:
                 eye_region = image[y:y+h, x:x+w]
@@ -188,12 +213,11 @@ class EyeImageAnalyzer:
         
         return eye_regions
     
-    def _extract_eye_region(self, image: np.ndarray, eye_points: List[List[int]]) -> Optional[np.ndarray]:
+    def _extract_eye_region(self, image: np.ndarray, eye_points: np.ndarray) -> Optional[np.ndarray]:
         """提取眼部区域"""
         try:
             # 计算边界框
-            points = np.array(eye_points, dtype=np.int32)
-            x, y, w, h = cv2.boundingRect(points)
+            x, y, w, h = cv2.boundingRect(np.ascontiguousarray(eye_points, dtype=np.int32))
             
             # 扩展边界框
             margin = 10
@@ -426,11 +450,100 @@ class EyeImageAnalyzer:
             self.face_mesh.close()
 
 
+class EyeAnalyzerPool:
+    """预热的 EyeImageAnalyzer 实例池（线程安全）
+
+    实例按需创建，最多 size 个；acquire() 借出一个实例独占使用，归还后复用。
+    MediaPipe和OpenCV推理时释放GIL，多个线程可以同时使用不同的实例。
+    """
+    
+    def __init__(self, size: int = ANALYZER_POOL_SIZE, warm: int = 1):
+        self.size = max(1, size)
+        self._idle: "queue.LifoQueue[EyeImageAnalyzer]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        for _ in range(min(warm, self.size)):
+            self._idle.put(self._create())
+    
+    def _create(self) -> EyeImageAnalyzer:
+        with self._lock:
+            self._created += 1
+        return self._construct()
+    
+    def _construct(self) -> EyeImageAnalyzer:
+        """新建实例（名额已占用）；构造失败时归还名额，否则池会永久少一个实例、最终 acquire 一直等待"""
+        try:
+            return EyeImageAnalyzer()
+        except BaseException:
+            with self._lock:
+                self._created -= 1
+            raise
+    
+    @contextmanager
+    def acquire(self) -> Iterator[EyeImageAnalyzer]:
+        """借出一个分析器；池中没有空闲实例且未达上限时新建，否则等待归还"""
+        try:
+            analyzer = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            analyzer = self._construct() if can_create else self._idle.get()
+        try:
+            yield analyzer
+        finally:
+            self._idle.put(analyzer)
+    
+    def analyze_image(self, image_path: str) -> Dict[str, Any]:
+        with self.acquire() as analyzer:
+            return analyzer.analyze_image(image_path)
+    
+    def analyze_images(self, image_paths: Sequence[str], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """批量分析，结果顺序与输入一致；并发数不超过池大小"""
+        workers = min(max_workers or self.size, self.size, len(image_paths))
+        if workers <= 1:
+            with self.acquire() as analyzer:
+                return [analyzer.analyze_image(path) for path in image_paths]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.analyze_image, image_paths))
+    
+    def close(self) -> None:
+        """关闭空闲实例（借出中的实例归还后仍可使用）"""
+        while True:
+            try:
+                analyzer = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            analyzer.cleanup()
+            with self._lock:
+                self._created -= 1
+
+
+_shared_pool: Optional[EyeAnalyzerPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_analyzer_pool() -> EyeAnalyzerPool:
+    """进程内共享的分析器池（首次调用时创建并预热一个实例）"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = EyeAnalyzerPool()
+        return _shared_pool
+
+
+def analyze_images(image_paths: Sequence[str], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """用共享分析器池批量分析眼部图片"""
+    return get_analyzer_pool().analyze_images(image_paths, max_workers)
+
+
 class ImageAnalysisTool(BaseTool):
     """图像分析工具"""
     
     name: str = "image_analysis"
     description: str = "分析眼部图片，检测眼部健康状况，包括红肿、疲劳、对称性等指标"
+    execution_policy: ClassVar[str] = "cpu"
     
     parameters: Dict[str, Any] = {
         "type": "object",
@@ -443,10 +556,6 @@ class ImageAnalysisTool(BaseTool):
         "required": ["image_path"]
     }
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.analyzer = EyeImageAnalyzer()
-    
     async def execute(self, image_path: str, **kwargs) -> str:
         """执行图像分析"""
         try:
@@ -454,8 +563,9 @@ class ImageAnalysisTool(BaseTool):
             if not os.path.exists(image_path):
                 return f"错误: 图片文件不存在 - {image_path}"
             
-            # 分析图像
-            result = self.analyzer.analyze_image(image_path)
+            # 分析图像（分析器池在实际执行的进程中首次使用时才创建：工具在主进程中构造，
+            # 按 execution_policy 在工具执行进程中运行，主进程不需要预热FaceMesh）
+            result = get_analyzer_pool().analyze_image(image_path)
             
             if "error" in result:
                 return f"分析失败: {result['error']}"
@@ -471,9 +581,8 @@ class ImageAnalysisTool(BaseTool):
             return f"图像分析出错: {str(e)}"
     
     def cleanup(self):
-        """清理资源"""
-        if hasattr(self, 'analyzer') and self.analyzer:
-            self.analyzer.cleanup()
+        """清理资源（分析器池由进程内所有工具实例共享，不在此关闭）"""
+        pass
 
 
 # 测试函数
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享的图片加载层
+
+各分析器只需要远小于原图的分辨率（CNN分类 224x224，眼部分析宽度 800），
+而手机拍摄的JPEG动辄2000万像素，完整解码需要数百毫秒和约60MB内存。
+加载时：
+
+1. 先只读文件头取得尺寸，像素数超过 MAX_IMAGE_PIXELS 时拒绝（防止解压炸弹）
+2. 调用方给出目标尺寸提示 target_size=(最小宽, 最小高)，0表示该方向不限制；
+   JPEG在DCT域按 1/2、1/4、1/8 缩小解码（cv2.IMREAD_REDUCED_* / PIL draft），
+   缩小后的宽高仍不小于目标尺寸，调用方原有的缩放步骤不变
+3. 其他格式（PNG、BMP、TIFF等）不支持解码时缩小，按原样完整解码
+
+缩小倍数的选取规则与 PIL Image.draft 一致。
+"""
+
+import os
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# 允许加载的最大像素数，可通过环境变量调整
+MAX_IMAGE_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", 50_000_000))
+
+# 支持DCT域缩小解码的格式
+DRAFT_FORMATS = {"JPEG", "MPO"}
+
+_REDUCED_COLOR = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+_REDUCED_GRAYSCALE = {2: cv2.IMREAD_REDUCED_GRAYSCALE_2, 4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+                      8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+
+TargetSize = Optional[Tuple[int, int]]
+
+
+class ImageTooLargeError(ValueError):
+    """图片像素数超过 MAX_IMAGE_PIXELS"""
+
+
+def probe_image(image_path: str) -> Tuple[Optional[str], Tuple[int, int]]:
+    """只读文件头，返回 (格式, (宽, 高))；PIL无法识别的格式返回 (None, (0, 0))"""
+    try:
+        with Image.open(image_path) as image:
+            return image.format, image.size
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(f"图片像素数过大: {image_path}") from e
+    except (OSError, SyntaxError):
+        return None, (0, 0)
+
+
+def _check_pixels(image_path: str, size: Tuple[int, int], max_pixels: int) -> None:
+    if size[0] * size[1] > max_pixels:
+        raise ImageTooLargeError(
+            f"图片像素数过大: {image_path} ({size[0]}x{size[1]}，上限 {max_pixels} 像素)"
+        )
+
+
+def reduction_factor(size: Tuple[int, int], target_size: TargetSize) -> int:
+    """缩小解码倍数（1/2/4/8）：缩小后的宽高仍不小于目标尺寸"""
+    if not target_size:
+        return 1
+    width, height = size
+    target_width, target_height = target_size
+    scale = min(width // target_width if target_width else 8, height // target_height if target_height else 8)
+    for factor in (8, 4, 2):
+        if scale >= factor:
+            return factor
+    return 1
+
+
+def load_bgr(image_path: str, target_size: TargetSize = None, grayscale: bool = False,
+             max_pixels: int = MAX_IMAGE_PIXELS) -> Optional[np.ndarray]:
+    """以OpenCV数组加载图片（BGR或灰度）；与 cv2.imread 一样，无法解码时返回None"""
+    fmt, size = probe_image(image_path)
+    _check_pixels(image_path, size, max_pixels)
+    factor = reduction_factor(size, target_size) if fmt in DRAFT_FORMATS else 1
+    if factor > 1:
+        flags = (_REDUCED_GRAYSCALE if grayscale else _REDUCED_COLOR)[factor]
+    else:
+        flags = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    return cv2.imread(image_path, flags)
+
+
+def load_pil(image_path: str, target_size: TargetSize = None, mode: str = "RGB",
+             max_pixels: int = MAX_IMAGE_PIXELS) -> Image.Image:
+    """以PIL图像加载图片并转换为mode；JPEG按目标尺寸缩小解码"""
+    try:
+        image = Image.open(image_path)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(f"图片像素数过大: {image_path}") from e
+    with image:
+        _check_pixels(image_path, image.size, max_pixels)
+        if image.format in DRAFT_FORMATS and target_size:
+            factor = reduction_factor(image.size, target_size)
+            if factor > 1:
+                image.draft(mode, (image.size[0] // factor, image.size[1] // factor))
+        return image.convert(mode)
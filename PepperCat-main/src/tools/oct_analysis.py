@@ -9,8 +9,9 @@ import cv2
 import numpy as np
 import os
 import json
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, ClassVar, Callable
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 
@@ -26,12 +27,122 @@ except ImportError:
     print("警告: PyTorch未安装，将使用传统图像分析方法")
 
 from src.openmanus_agent.tool_base import BaseTool
+from src.tools.image_loader import load_bgr
+from src.tools.oct_pyramid import PyramidProfile, coarse_to_fine_circles, get_profile
+from src.tools.oct_regions import RegionStats
+
+# 多分辨率档位（full / accurate / balanced / fast），未指定时使用全分辨率检测
+DEFAULT_PYRAMID_PROFILE = os.environ.get("OCT_PYRAMID_PROFILE", "full")
+
+
+class OCTFeatureGraph:
+    """单张OCT图像的中间结果依赖图
+
+    边缘、阈值掩码、轮廓、霍夫检测等中间结果都是图中的节点，首次访问时计算并缓存，
+    同一图像上的所有特征函数共享同一份结果。timings记录每个节点的独占耗时（毫秒，不含其依赖节点）。
+    设置profile时霍夫圆检测节点在图像金字塔上由粗到精计算（见oct_pyramid）。
+    """
+
+    def __init__(self, image: np.ndarray, profile: Optional[PyramidProfile] = None):
+        self.image = image
+        self.profile = profile
+        self.timings: Dict[str, float] = {}
+        self._values: Dict[str, Any] = {}
+        self._child_time: List[float] = []
+
+    def compute(self, name: str, fn: Callable[[], Any]) -> Any:
+        """取节点值；未计算过时调用fn()计算、缓存并计时"""
+        if name in self._values:
+            return self._values[name]
+        self._child_time.append(0.0)
+        start = time.perf_counter()
+        try:
+            value = fn()
+        finally:
+            elapsed = time.perf_counter() - start
+            child = self._child_time.pop()
+            if self._child_time:
+                self._child_time[-1] += elapsed
+        self.timings[name] = round((elapsed - child) * 1000, 3)
+        self._values[name] = value
+        return value
+
+    # 基础节点
+
+    def region(self, name: str, rows: slice, cols: slice) -> np.ndarray:
+        """图像子区域（视图，不复制）"""
+        return self.compute(f"region.{name}", lambda: self.image[rows, cols])
+
+    def edges(self) -> np.ndarray:
+        return self.compute("edges", lambda: cv2.Canny(self.image, 50, 150))
+
+    def bright_mask(self) -> np.ndarray:
+        return self.compute(
+            "threshold.bright",
+            lambda: cv2.threshold(self.image, 200, 255, cv2.THRESH_BINARY)[1],
+        )
+
+    def dark_mask(self) -> np.ndarray:
+        return self.compute(
+            "threshold.dark",
+            lambda: cv2.threshold(self.image, 50, 255, cv2.THRESH_BINARY_INV)[1],
+        )
+
+    def contours(self, mask: str) -> Tuple[np.ndarray, ...]:
+        """外轮廓；mask为bright / dark / edges"""
+        source = {"bright": self.bright_mask, "dark": self.dark_mask, "edges": self.edges}[mask]
+        return self.compute(
+            f"contours.{mask}",
+            lambda: cv2.findContours(source(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0],
+        )
+
+    def region_stats(self, mask: str) -> RegionStats:
+        """外轮廓的外接矩形、面积和周长（向量化计算）"""
+        return self.compute(f"region_stats.{mask}", lambda: RegionStats.from_contours(self.contours(mask)))
+
+    def hough_lines(self) -> Optional[np.ndarray]:
+        width = self.image.shape[1]
+        return self.compute(
+            "hough_lines",
+            lambda: cv2.HoughLinesP(self.edges(), 1, np.pi/180, threshold=50,
+                                    minLineLength=width//4, maxLineGap=10),
+        )
+
+    def hough_circles(self, name: str, image: np.ndarray, min_dist: float, param1: float, param2: float,
+                      min_radius: int, max_radius: int, largest: bool = False) -> Optional[np.ndarray]:
+        """霍夫圆检测（HOUGH_GRADIENT, dp=1）；largest表示调用方只使用最大的圆"""
+        if self.profile is not None:
+            return self.compute(
+                f"hough_circles.{name}",
+                lambda: coarse_to_fine_circles(image, self.profile, min_dist, param1, param2,
+                                               min_radius, max_radius, largest=largest),
+            )
+        return self.compute(
+            f"hough_circles.{name}",
+            lambda: cv2.HoughCircles(image, cv2.HOUGH_GRADIENT, 1, min_dist, param1=param1, param2=param2,
+                                     minRadius=min_radius, maxRadius=max_radius),
+        )
+
+    def opening(self) -> np.ndarray:
+        def _open():
+            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+            return cv2.morphologyEx(self.image, cv2.MORPH_OPEN, kernel)
+        return self.compute("morph_open", _open)
+
 
 class OCTAnalyzer:
-    """OCT图片分析器"""
+    """OCT图片分析器
+
+    profile为多分辨率档位名称（full / accurate / balanced / fast），默认取环境变量OCT_PYRAMID_PROFILE
+    """
+    
+    # 加载时的目标尺寸提示：OCT特征的阈值以原图像素为单位，按原分辨率解码
+    LOAD_TARGET_SIZE = None
     
-    def __init__(self):
+    def __init__(self, profile: Optional[str] = None):
         self.analysis_results = {}
+        self.feature_timings: Dict[str, float] = {}
+        self.profile = get_profile(DEFAULT_PYRAMID_PROFILE if profile is None else profile)
         
         # OCT疾病特征库
         self.disease_features = {
@@ -70,34 +181,38 @@ class OCTAnalyzer:
                 return {"error": f"OCT图片文件不存在: {image_path}"}
             
             # 读取图像
-            image = cv2.imread(image_path)
+            image = load_bgr(image_path, self.LOAD_TARGET_SIZE)
             if image is None:
                 return {"error": f"无法读取OCT图片: {image_path}"}
             
-            # 预处理图像
-            processed_image = self._preprocess_oct_image(image)
-            
-            # 分析OCT特征
-            oct_features = self._analyze_oct_features(processed_image)
-            
-            # 疾病检测
-            disease_analysis = self._detect_diseases(oct_features)
-            
-            # 生成报告
-            report = self._generate_oct_report(disease_analysis, oct_features)
-            
-            return {
-                "status": "success",
-                "image_path": image_path,
-                "oct_features": oct_features,
-                "disease_analysis": disease_analysis,
-                "report": report,
-                "timestamp": datetime.now().isoformat()
-            }
+            return {"status": "success", "image_path": image_path, **self.analyze_oct_array(image)}
             
         except Exception as e:
             return {"error": f"OCT分析失败: {str(e)}"}
     
+    def analyze_oct_array(self, image: np.ndarray, with_report: bool = True) -> Dict[str, Any]:
+        """分析内存中的OCT图像（BGR或灰度数组，如体数据中的一张B-scan）"""
+        # 预处理图像
+        processed_image = self._preprocess_oct_image(image)
+        
+        # 分析OCT特征
+        oct_features = self._analyze_oct_features(processed_image)
+        
+        # 疾病检测
+        disease_analysis = self._detect_diseases(oct_features)
+        
+        result = {
+            "status": "success",
+            "oct_features": oct_features,
+            "disease_analysis": disease_analysis,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        # 生成报告
+        if with_report:
+            result["report"] = self._generate_oct_report(disease_analysis, oct_features)
+        return result
+    
     def _preprocess_oct_image(self, image: np.ndarray) -> np.ndarray:
         """预处理OCT图像"""
         # 转换为灰度图
@@ -126,37 +241,42 @@ class OCTAnalyzer:
             'abnormalities': []
         }
         
+        # 各特征函数共享同一张图的中间结果（边缘、阈值、轮廓等只计算一次）
+        graph = OCTFeatureGraph(image, self.profile)
         try:
             # 1. 视网膜层分析
-            features['retinal_layers'] = self._analyze_retinal_layers(image)
+            features['retinal_layers'] = graph.compute(
+                'feature.retinal_layers', lambda: self._analyze_retinal_layers(image, graph))
             
             # 2. 视神经分析
-            features['optic_nerve'] = self._analyze_optic_nerve(image)
+            features['optic_nerve'] = graph.compute(
+                'feature.optic_nerve', lambda: self._analyze_optic_nerve(image, graph))
             
             # 3. 黄斑区分析
-            features['macula'] = self._analyze_macula(image)
+            features['macula'] = graph.compute(
+                'feature.macula', lambda: self._analyze_macula(image, graph))
             
             # 4. 血管分析
-            features['vessels'] = self._analyze_vessels(image)
+            features['vessels'] = graph.compute(
+                'feature.vessels', lambda: self._analyze_vessels(image, graph))
             
             # 5. 异常检测
-            features['abnormalities'] = self._detect_abnormalities(image)
+            features['abnormalities'] = graph.compute(
+                'feature.abnormalities', lambda: self._detect_abnormalities(image, graph))
             
         except Exception as e:
             print(f"特征分析出错: {e}")
         
+        # 每个节点的独占耗时（毫秒），用于定位慢的检测步骤
+        self.feature_timings = graph.timings
         return features
     
-    def _analyze_retinal_layers(self, image: np.ndarray) -> Dict[str, Any]:
+    def _analyze_retinal_layers(self, image: np.ndarray, graph: Optional[OCTFeatureGraph] = None) -> Dict[str, Any]:
         """分析视网膜层"""
-        height, width = image.shape
+        graph = graph or OCTFeatureGraph(image, self.profile)
         
-        # 使用边缘检测识别视网膜层
-        edges = cv2.Canny(image, 50, 150)
-        
-        # 霍夫线变换检测水平线（视网膜层边界）
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, 
-                               minLineLength=width//4, maxLineGap=10)
+        # 在边缘图上做霍夫线变换检测水平线（视网膜层边界）
+        lines = graph.hough_lines()
         
         layer_info = {
             'layer_count': 0,
@@ -168,8 +288,8 @@ class OCTAnalyzer:
         if lines is not None:
             # 过滤水平线
             horizontal_lines = []
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
+            # OpenCV 4返回(N,1,4)，OpenCV 5返回(N,4)
+            for x1, y1, x2, y2 in lines.reshape(-1, 4):
                 if abs(y2 - y1) < 10:  # 水平线
                     horizontal_lines.append((y1, y2))
             
@@ -184,18 +304,17 @@ class OCTAnalyzer:
         
         return layer_info
     
-    def _analyze_optic_nerve(self, image: np.ndarray) -> Dict[str, Any]:
+    def _analyze_optic_nerve(self, image: np.ndarray, graph: Optional[OCTFeatureGraph] = None) -> Dict[str, Any]:
         """分析视神经"""
+        graph = graph or OCTFeatureGraph(image, self.profile)
         height, width = image.shape
         
         # 在图像中心区域寻找视神经
-        center_region = image[height//4:3*height//4, width//4:3*width//4]
+        center_region = graph.region('center', slice(height//4, 3*height//4), slice(width//4, 3*width//4))
         
         # 使用圆形检测寻找视神经杯
-        circles = cv2.HoughCircles(
-            center_region, cv2.HOUGH_GRADIENT, 1, 20,
-            param1=50, param2=30, minRadius=10, maxRadius=100
-        )
+        circles = graph.hough_circles('optic_cup', center_region, 20,
+                                      param1=50, param2=30, min_radius=10, max_radius=100, largest=True)
         
         optic_nerve_info = {
             'cup_disc_ratio': 0.0,
@@ -217,12 +336,13 @@ class OCTAnalyzer:
         
         return optic_nerve_info
     
-    def _analyze_macula(self, image: np.ndarray) -> Dict[str, Any]:
+    def _analyze_macula(self, image: np.ndarray, graph: Optional[OCTFeatureGraph] = None) -> Dict[str, Any]:
         """分析黄斑区"""
+        graph = graph or OCTFeatureGraph(image, self.profile)
         height, width = image.shape
         
         # 黄斑区通常在图像中心
-        macula_region = image[height//3:2*height//3, width//3:2*width//3]
+        macula_region = graph.region('macula', slice(height//3, 2*height//3), slice(width//3, 2*width//3))
         
         macula_info = {
             'fovea_depth': 0.0,
@@ -235,18 +355,19 @@ class OCTAnalyzer:
         macula_info['macular_thickness'] = np.mean(macula_region)
         
         # 检测玻璃膜疣（drusen）
-        macula_info['drusen_count'] = self._count_drusen(macula_region)
+        macula_info['drusen_count'] = graph.compute(
+            'blobs.drusen', lambda: self._count_drusen(macula_region))
         
         # 检测地图样萎缩
         macula_info['geographic_atrophy'] = self._detect_geographic_atrophy(macula_region)
         
         return macula_info
     
-    def _analyze_vessels(self, image: np.ndarray) -> Dict[str, Any]:
+    def _analyze_vessels(self, image: np.ndarray, graph: Optional[OCTFeatureGraph] = None) -> Dict[str, Any]:
         """分析血管"""
+        graph = graph or OCTFeatureGraph(image, self.profile)
         # 使用形态学操作检测血管
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-        vessels = cv2.morphologyEx(image, cv2.MORPH_OPEN, kernel)
+        vessels = graph.opening()
         
         vessel_info = {
             'vessel_density': 0.0,
@@ -261,19 +382,20 @@ class OCTAnalyzer:
         vessel_info['vessel_density'] = vessel_pixels / total_pixels
         
         # 检测微血管瘤
-        vessel_info['microaneurysms'] = self._count_microaneurysms(image)
+        vessel_info['microaneurysms'] = self._count_microaneurysms(image, graph)
         
-        # 检测出血
-        vessel_info['hemorrhages'] = self._count_hemorrhages(image)
+        # 检测出血（与异常检测共用暗区结果）
+        vessel_info['hemorrhages'] = self._count_hemorrhages(image, graph)
         
         return vessel_info
     
-    def _detect_abnormalities(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    def _detect_abnormalities(self, image: np.ndarray, graph: Optional[OCTFeatureGraph] = None) -> List[Dict[str, Any]]:
         """检测异常"""
+        graph = graph or OCTFeatureGraph(image, self.profile)
         abnormalities = []
         
         # 检测异常亮区（可能是渗出）
-        bright_regions = self._detect_bright_regions(image)
+        bright_regions = self._detect_bright_regions(image, graph)
         for region in bright_regions:
             abnormalities.append({
                 'type': 'exudate',
@@ -283,7 +405,7 @@ class OCTAnalyzer:
             })
         
         # 检测异常暗区（可能是出血）
-        dark_regions = self._detect_dark_regions(image)
+        dark_regions = self._detect_dark_regions(image, graph)
         for region in dark_regions:
             abnormalities.append({
                 'type': 'hemorrhage',
@@ -293,7 +415,7 @@ class OCTAnalyzer:
             })
         
         # 检测不规则区域
-        irregular_regions = self._detect_irregular_regions(image)
+        irregular_regions = self._detect_irregular_regions(image, graph)
         for region in irregular_regions:
             abnormalities.append({
                 'type': 'irregular_structure',
@@ -479,82 +601,58 @@ class OCTAnalyzer:
         dark_ratio = dark_pixels / total_pixels
         return dark_ratio > 0.3
     
-    def _count_microaneurysms(self, image: np.ndarray) -> int:
+    def _count_microaneurysms(self, image: np.ndarray, graph: Optional[OCTFeatureGraph] = None) -> int:
         """计算微血管瘤数量"""
+        graph = graph or OCTFeatureGraph(image, self.profile)
         # 使用圆形检测
-        circles = cv2.HoughCircles(
-            image, cv2.HOUGH_GRADIENT, 1, 10,
-            param1=30, param2=20, minRadius=2, maxRadius=8
-        )
+        circles = graph.hough_circles('microaneurysms', image, 10,
+                                      param1=30, param2=20, min_radius=2, max_radius=8)
         return len(circles[0]) if circles is not None else 0
     
-    def _count_hemorrhages(self, image: np.ndarray) -> int:
+    def _count_hemorrhages(self, image: np.ndarray, graph: Optional[OCTFeatureGraph] = None) -> int:
         """计算出血点数量"""
         # 检测暗色圆形区域
-        dark_regions = self._detect_dark_regions(image)
+        dark_regions = self._detect_dark_regions(image, graph)
         return len([r for r in dark_regions if r['size'] < 50])
     
-    def _detect_bright_regions(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    def _detect_bright_regions(self, image: np.ndarray, graph: Optional[OCTFeatureGraph] = None) -> List[Dict[str, Any]]:
         """检测亮区（渗出）"""
-        # 阈值检测
-        _, binary = cv2.threshold(image, 200, 255, cv2.THRESH_BINARY)
-        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        regions = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > 20:
-                x, y, w, h = cv2.boundingRect(contour)
-                regions.append({
-                    'location': (x, y),
-                    'size': area,
-                    'confidence': min(area / 100.0, 1.0)
-                })
-        
-        return regions
-    
-    def _detect_dark_regions(self, image: np.ndarray) -> List[Dict[str, Any]]:
+        graph = graph or OCTFeatureGraph(image, self.profile)
+        return graph.compute('regions.bright', lambda: self._bright_regions(graph))
+    
+    def _bright_regions(self, graph: OCTFeatureGraph) -> List[Dict[str, Any]]:
+        # 阈值检测后按轮廓面积向量化筛选
+        stats = graph.region_stats('bright')
+        keep = stats.area > 20
+        return stats.to_regions(keep, np.minimum(stats.area[keep] / 100.0, 1.0))
+    
+    def _detect_dark_regions(self, image: np.ndarray, graph: Optional[OCTFeatureGraph] = None) -> List[Dict[str, Any]]:
         """检测暗区（出血）"""
-        # 阈值检测
-        _, binary = cv2.threshold(image, 50, 255, cv2.THRESH_BINARY_INV)
-        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        regions = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > 10:
-                x, y, w, h = cv2.boundingRect(contour)
-                regions.append({
-                    'location': (x, y),
-                    'size': area,
-                    'confidence': min(area / 50.0, 1.0)
-                })
-        
-        return regions
-    
-    def _detect_irregular_regions(self, image: np.ndarray) -> List[Dict[str, Any]]:
+        graph = graph or OCTFeatureGraph(image, self.profile)
+        return graph.compute('regions.dark', lambda: self._dark_regions(graph))
+    
+    def _dark_regions(self, graph: OCTFeatureGraph) -> List[Dict[str, Any]]:
+        # 阈值检测后按轮廓面积向量化筛选
+        stats = graph.region_stats('dark')
+        keep = stats.area > 10
+        return stats.to_regions(keep, np.minimum(stats.area[keep] / 50.0, 1.0))
+    
+    def _detect_irregular_regions(self, image: np.ndarray, graph: Optional[OCTFeatureGraph] = None) -> List[Dict[str, Any]]:
         """检测不规则区域"""
-        # 使用边缘检测
-        edges = cv2.Canny(image, 50, 150)
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        regions = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > 30:
-                # 计算不规则度
-                perimeter = cv2.arcLength(contour, True)
-                irregularity = perimeter * perimeter / (4 * np.pi * area)
-                
-                if irregularity > 2.0:  # 不规则形状
-                    x, y, w, h = cv2.boundingRect(contour)
-                    regions.append({
-                        'location': (x, y),
-                        'size': area,
-                        'confidence': min(irregularity / 5.0, 1.0)
-                    })
-        
-        return regions
+        graph = graph or OCTFeatureGraph(image, self.profile)
+        return graph.compute('regions.irregular', lambda: self._irregular_regions(graph))
+    
+    def _irregular_regions(self, graph: OCTFeatureGraph) -> List[Dict[str, Any]]:
+        # 使用边缘检测（与视网膜层分析共用边缘图）
+        stats = graph.region_stats('edges')
+        
+        # 计算不规则度（面积不足的区域不参与计算）
+        irregularity = np.zeros(len(stats))
+        large = stats.area > 30
+        irregularity[large] = stats.perimeter[large] ** 2 / (4 * np.pi * stats.area[large])
+        
+        keep = large & (irregularity > 2.0)  # 不规则形状
+        return stats.to_regions(keep, np.minimum(irregularity[keep] / 5.0, 1.0))
 
 
 class OCTAnalysisTool(BaseTool):
@@ -562,6 +660,7 @@ class OCTAnalysisTool(BaseTool):
     
     name: str = "oct_analysis"
     description: str = "分析OCT（光学相干断层扫描）图片，检测青光眼、黄斑变性、糖尿病视网膜病变等眼部疾病"
+    execution_policy: ClassVar[str] = "cpu"
     
     parameters: Dict[str, Any] = {
         "type": "object",
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCT多分辨率（由粗到精）检测
+
+霍夫圆检测的耗时随图像尺寸和半径范围快速增长，大尺寸OCT导出图在全分辨率上
+做 HoughCircles 需要数秒到数十秒。多分辨率模式下：
+
+1. 用 pyrDown 构建图像金字塔，在最粗一层上以缩放后的参数运行 HoughCircles 得到候选
+2. 逐层向精细层细化，每层在上一层结果附近的小范围内搜索圆心和半径，
+   以该层Canny边缘在圆周上的覆盖率为评分；全分辨率上覆盖率不足的候选丢弃
+
+精度保护：
+- 自动减少金字塔层数：最粗层短边不小于 min_coarse_side，最小半径在最粗层上不小于
+  min_coarse_radius 像素（过小的目标在粗层上无法分辨）；为0层时直接全分辨率检测
+- 粗层候选过多（细化比全分辨率检测更慢）时直接全分辨率检测
+- 所有候选都未通过全分辨率验证时，按档位决定是否退回全分辨率检测
+
+返回值与 cv2.HoughCircles 的格式相同，调用方无需区分模式。
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+@dataclass(frozen=True)
+class PyramidProfile:
+    """多分辨率检测的速度/精度档位"""
+    name: str
+    levels: int                  # 金字塔层数，粗层尺寸为原图的 1/2**levels
+    search: int                  # 每层细化时圆心和半径的搜索范围（该层像素）
+    min_support: float           # 全分辨率圆周上边缘覆盖率下限
+    top_k: int                   # 只关心最大圆时细化的候选数
+    max_candidates: int          # 粗层候选超过该数量时直接全分辨率检测
+    min_coarse_radius: float     # 最小半径在最粗层上的像素数下限
+    fallback_full: bool          # 全部候选未通过验证时是否退回全分辨率检测
+    min_coarse_side: int = 64
+
+
+PROFILES: Dict[str, PyramidProfile] = {
+    "accurate": PyramidProfile("accurate", levels=1, search=2, min_support=0.25, top_k=8,
+                               max_candidates=400, min_coarse_radius=3, fallback_full=True),
+    "balanced": PyramidProfile("balanced", levels=2, search=2, min_support=0.25, top_k=5,
+                               max_candidates=300, min_coarse_radius=2, fallback_full=True),
+    "fast": PyramidProfile("fast", levels=3, search=1, min_support=0.2, top_k=3,
+                           max_candidates=200, min_coarse_radius=1, fallback_full=False),
+}
+
+
+def get_profile(name: Optional[str]) -> Optional[PyramidProfile]:
+    """按名称取档位；None、空字符串或"full"表示全分辨率模式"""
+    if not name or name == "full":
+        return None
+    if name not in PROFILES:
+        raise ValueError(f"未知的多分辨率档位: {name}（可选: full, {', '.join(PROFILES)}）")
+    return PROFILES[name]
+
+
+def build_pyramid(image: np.ndarray, levels: int, min_side: int = 1) -> List[np.ndarray]:
+    """高斯金字塔，第0层为原图；最粗层短边不小于min_side"""
+    pyramid = [image]
+    while len(pyramid) <= levels and min(pyramid[-1].shape[:2]) // 2 >= min_side:
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+def _circle_edges(image: np.ndarray, param1: float) -> np.ndarray:
+    # 与 HOUGH_GRADIENT 内部一致的Canny阈值；膨胀一个像素容忍圆周取整误差
+    edges = cv2.Canny(image, max(1, param1 / 2), param1)
+    return cv2.dilate(edges, np.ones((3, 3), np.uint8)) > 0
+
+
+def _refine_circle(edges: np.ndarray, x: float, y: float, r: float, search: int,
+                   min_radius: float, max_radius: float) -> Tuple[float, float, float, float]:
+    """在(x, y, r)附近±search范围内找圆周边缘覆盖率最高的圆，返回(x, y, r, 覆盖率)"""
+    offsets = np.arange(-search, search + 1)
+    dx, dy, dr = (a.ravel() for a in np.meshgrid(offsets, offsets, offsets, indexing="ij"))
+    radii = np.clip(r + dr, max(min_radius, 1), max(max_radius, 1))
+
+    samples = max(16, int(2 * np.pi * (r + search)))
+    theta = np.linspace(0, 2 * np.pi, samples, endpoint=False)
+    px = np.rint(x + dx[:, None] + radii[:, None] * np.cos(theta)).astype(np.intp)
+    py = np.rint(y + dy[:, None] + radii[:, None] * np.sin(theta)).astype(np.intp)
+
+    height, width = edges.shape
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    hits = edges[np.clip(py, 0, height - 1), np.clip(px, 0, width - 1)] & inside
+    # 圆周大部分在图像外的候选不可信
+    counted = np.maximum(inside.sum(axis=1), 1)
+    score = np.where(inside.mean(axis=1) >= 0.5, hits.sum(axis=1) / counted, 0.0)
+
+    best = int(np.argmax(score))
+    return x + dx[best], y + dy[best], float(radii[best]), float(score[best])
+
+
+def _suppress(circles: List[Tuple[float, float, float]], min_dist: float) -> List[Tuple[float, float, float]]:
+    """按顺序保留与已保留圆心距离不小于min_dist的圆（与HoughCircles的minDist一致）"""
+    kept: List[Tuple[float, float, float]] = []
+    for circle in circles:
+        if all((circle[0] - k[0]) ** 2 + (circle[1] - k[1]) ** 2 >= min_dist ** 2 for k in kept):
+            kept.append(circle)
+    return kept
+
+
+def coarse_to_fine_circles(image: np.ndarray, profile: PyramidProfile, min_dist: float,
+                           param1: float, param2: float, min_radius: int, max_radius: int,
+                           largest: bool = False) -> Optional[np.ndarray]:
+    """由粗到精的霍夫圆检测；largest=True时只细化半径最大的top_k个候选（调用方只取最大圆）"""
+    def full_resolution():
+        return cv2.HoughCircles(image, cv2.HOUGH_GRADIENT, 1, min_dist, param1=param1, param2=param2,
+                                minRadius=min_radius, maxRadius=max_radius)
+
+    levels = profile.levels
+    while levels and min_radius / 2 ** levels < profile.min_coarse_radius:
+        levels -= 1
+    pyramid = build_pyramid(image, levels, profile.min_coarse_side)
+    levels = len(pyramid) - 1
+    if levels == 0:
+        return full_resolution()
+
+    scale = 2 ** levels
+    coarse_min = max(1, int(round(min_radius / scale)))
+    coarse = cv2.HoughCircles(pyramid[-1], cv2.HOUGH_GRADIENT, 1, max(1.0, min_dist / scale),
+                              param1=param1, param2=max(5.0, param2 / scale),
+                              minRadius=coarse_min, maxRadius=max(coarse_min + 1, int(round(max_radius / scale))))
+    if coarse is None:
+        return full_resolution() if profile.fallback_full else None
+
+    candidates = coarse.reshape(-1, 3)
+    if largest:
+        candidates = candidates[np.argsort(-candidates[:, 2], kind="stable")[:profile.top_k]]
+    elif len(candidates) > profile.max_candidates:
+        return full_resolution()
+
+    edges = [_circle_edges(level, param1) for level in pyramid]
+    refined = []
+    for x, y, r in candidates:
+        score = 0.0
+        # 逐层细化：坐标和半径放大一倍后在该层附近搜索
+        for level in range(levels, -1, -1):
+            factor = 2 ** level
+            x, y, r, score = _refine_circle(edges[level], x, y, r, profile.search,
+                                            min_radius / factor, max_radius / factor)
+            if level:
+                x, y, r = 2 * x, 2 * y, 2 * r
+        if score >= profile.min_support:
+            refined.append((float(x), float(y), float(r)))
+
+    refined = _suppress(refined, min_dist)
+    if not refined:
+        return full_resolution() if profile.fallback_full else None
+    return np.array([refined], dtype=np.float32)
@@ -1,14 +1,197 @@
-import requests
-
-def ask_ollama(prompt, model="deepseek-llm"):
-    url = "http://localhost:11434/api/generate"
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False
-    }
+"""
+Ollama异步客户端
+
+- 基于aiohttp，全进程共享一个会话（连接复用），运行在独立的后台事件循环线程中，
+  PyQt线程、各对话窗口自建的事件循环都可以安全调用
+- 流式读取 /api/generate 的NDJSON输出，逐个token回调，界面可边生成边显示
+- 每次请求携带keep_alive，避免两次宠物交互之间模型被Ollama卸载；启动时可预加载模型
+- 等待中的调用被取消时，后台请求一并取消，连接立即释放
+
+环境变量 OLLAMA_KEEP_ALIVE 可覆盖默认的模型驻留时长（与Ollama服务端同名变量含义一致）。
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import threading
+from typing import Callable, Optional
+
+import aiohttp
+
+from src.llm_scheduler import Priority, scheduler
+
+OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_URL = f"{OLLAMA_BASE_URL}/api/generate"
+DEFAULT_MODEL = "deepseek-llm"
+DEFAULT_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+TokenCallback = Callable[[str], None]
+
+
+class OllamaError(Exception):
+    """Ollama返回错误或状态码异常"""
+
+
+class OllamaClient:
+    """共享会话的Ollama流式客户端"""
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_BASE_URL,
+        model: str = DEFAULT_MODEL,
+        keep_alive: str = DEFAULT_KEEP_ALIVE,
+        timeout: float = 120,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 后台事件循环与共享会话
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="ollama-client", daemon=True
+                ).start()
+                self._loop = loop
+            return self._loop
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # 只在后台循环中创建和使用，无需加锁
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=5)
+            )
+        return self._session
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """把协程提交到后台循环执行；返回的Future可以cancel()"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    # ------------------------------------------------------------------
+    # 请求
+    # ------------------------------------------------------------------
+
+    async def _stream(self, payload: dict, on_token: Optional[TokenCallback]) -> str:
+        session = await self._get_session()
+        parts = []
+        async with session.post(f"{self.base_url}/api/generate", json=payload) as response:
+            if response.status != 200:
+                detail = await response.text()
+                raise OllamaError(f"HTTP {response.status}: {detail[:200]}")
+            # 流式输出每行一个JSON对象
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise OllamaError(chunk["error"])
+                token = chunk.get("response", "")
+                if token:
+                    parts.append(token)
+                    if on_token is not None:
+                        on_token(token)
+                if chunk.get("done"):
+                    break
+        return "".join(parts)
+
+    async def _generate(
+        self,
+        prompt: str,
+        model: Optional[str],
+        on_token: Optional[TokenCallback],
+        priority: Priority,
+    ) -> str:
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+        }
+        # 带回调的流式请求各自需要token，不参与single-flight合并
+        dedup_key = None if on_token is not None else scheduler.make_key(payload)
+        return await scheduler.run_async(
+            "ollama",
+            self._stream,
+            payload,
+            on_token,
+            priority=priority,
+            dedup_key=dedup_key,
+        )
+
+    async def generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        on_token: Optional[TokenCallback] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> str:
+        """异步生成完整回复，可在任意事件循环中await；取消await会取消后台请求
+
+        on_token在后台循环线程中被调用，界面代码应通过信号转发到主线程。
+        """
+        future = self.submit(self._generate(prompt, model, on_token, priority))
+        return await asyncio.wrap_future(future)
+
+    def generate_sync(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        on_token: Optional[TokenCallback] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> str:
+        """同步生成（阻塞调用线程，不阻塞任何事件循环）"""
+        return self.submit(self._generate(prompt, model, on_token, priority)).result()
+
+    async def _preload(self, model: str) -> None:
+        session = await self._get_session()
+        # 不带prompt的generate请求只加载模型并刷新keep_alive
+        payload = {"model": model, "keep_alive": self.keep_alive}
+        async with session.post(f"{self.base_url}/api/generate", json=payload) as response:
+            if response.status != 200:
+                detail = await response.text()
+                raise OllamaError(f"HTTP {response.status}: {detail[:200]}")
+            await response.read()
+
+    def preload(self, model: Optional[str] = None) -> concurrent.futures.Future:
+        """后台预加载模型，不等待结果；失败只打印日志"""
+        future = self.submit(self._preload(model or self.model))
+
+        def _report(f: concurrent.futures.Future) -> None:
+            if not f.cancelled() and f.exception() is not None:
+                print(f"[Ollama预加载失败] {f.exception()}")
+
+        future.add_done_callback(_report)
+        return future
+
+    def close(self) -> None:
+        """关闭共享会话并停止后台循环"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None or loop.is_closed():
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(timeout=5)
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+
+
+# 全局客户端实例
+ollama_client = OllamaClient()
+
+
+def ask_ollama(prompt, model=DEFAULT_MODEL, priority=Priority.INTERACTIVE):
     try:
-        response = requests.post(url, json=payload, timeout=60)
-        return response.json().get("response", "[无回复]")
+        # 经全局调度器排队：交互请求优先，相同的在途提示只发送一次
+        return ollama_client.generate_sync(prompt, model=model, priority=priority) or "[无回复]"
     except Exception as e:
-        return f"[Ollama错误] {e}" 
\ No newline at end of file
+        return f"[Ollama错误] {e}"
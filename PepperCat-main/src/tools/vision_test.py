@@ -1,23 +1,29 @@
 import cv2
 import numpy as np
-import mediapipe as mp
+import sys
 import time
 import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, ClassVar
 from src.openmanus_agent.tool_base import BaseTool
 import os
 import asyncio
 
+# 共享摄像头代理 camera_broker.py 和关键点几何 landmark_geometry.py 位于项目根目录（PepperCat-main 的上一级）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from landmark_geometry import OUTER_EYE_CORNERS, as_points, interocular_distance, segment_direction
+from optotype_atlas import OptotypeAtlas, rotate
+
 class VisionTestWindow:
     """视力检测窗口"""
     
     def __init__(self):
         self.window = None
-        self.cap = None
-        self.face_mesh = None
-        self.hands = None
+        self.camera = None
         self.testing = False
         self.result = None
         
@@ -29,6 +35,9 @@ class VisionTestWindow:
         self.distance = 60
         self.test_start_time = None
         
+        # E字视标的各大小、方向变体由图集缓存，每帧只做切片混合
+        self.atlas = OptotypeAtlas({'E': self.create_e_image()}, border_value=0)
+        
         # 视力标准对照表
         self.VISION_STANDARD = {
             0.1: 4.0, 0.15: 4.2, 0.2: 4.4,
@@ -108,24 +117,11 @@ class VisionTestWindow:
         self.init_camera()
     
     def init_camera(self):
-        """初始化摄像头和检测模型"""
+        """订阅共享摄像头（摄像头和检测模型由代理统一打开，与其他视力模块共用）"""
         try:
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
-                raise RuntimeError("无法打开摄像头")
+            from camera_broker import CameraStream
             
-            # 设置摄像头参数
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            
-            # 初始化MediaPipe
-            self.face_mesh = mp.solutions.face_mesh.FaceMesh(
-                max_num_faces=1, refine_landmarks=True,
-                min_detection_confidence=0.5, min_tracking_confidence=0.5
-            )
-            self.hands = mp.solutions.hands.Hands(
-                min_detection_confidence=0.5, min_tracking_confidence=0.5
-            )
+            self.camera = CameraStream()
             
             self.status_label.config(text="摄像头已就绪，点击开始检测")
             
@@ -134,7 +130,7 @@ class VisionTestWindow:
     
     def start_test(self):
         """开始视力检测"""
-        if not self.cap or not self.cap.isOpened():
+        if not self.camera or not self.camera.isOpened():
             messagebox.showerror("错误", "摄像头未就绪")
             return
         
@@ -167,28 +163,19 @@ class VisionTestWindow:
         display_duration = 2.0  # E字显示时长
         
         while self.testing and self.total_count < 10:
-            ret, frame = self.cap.read()
-            if not ret:
+            snapshot = self.camera.read()
+            if snapshot is None:
                 continue
-            
-            # 处理帧
-            frame = cv2.flip(frame, 1)
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            frame = snapshot.frame  # 代理发布的帧已镜像翻转
             
             # 检测面部距离
-            face_results = self.face_mesh.process(rgb_frame)
-            if face_results.multi_face_landmarks:
-                self.distance = self.calculate_face_distance(
-                    face_results.multi_face_landmarks[0]
-                )
+            if snapshot.face is not None:
+                self.distance = self.calculate_face_distance(snapshot.face)
             
             # 检测手势
             hand_direction = None
-            hand_results = self.hands.process(rgb_frame)
-            if hand_results.multi_hand_landmarks:
-                hand_direction = self.detect_hand_direction(
-                    hand_results.multi_hand_landmarks[0]
-                )
+            if snapshot.hand is not None:
+                hand_direction = self.detect_hand_direction(snapshot.hand)
             
             # 更新显示
             self.update_display(frame)
@@ -211,43 +198,16 @@ class VisionTestWindow:
     
     def calculate_face_distance(self, landmarks):
         """计算面部距离"""
-        # 使用面部关键点计算距离
-        nose = landmarks.landmark[1]  # 鼻尖
-        left_eye = landmarks.landmark[33]  # 左眼
-        right_eye = landmarks.landmark[263]  # 右眼
-        
-        # 计算眼间距
-        eye_distance = np.sqrt(
-            (left_eye.x - right_eye.x)**2 + 
-            (left_eye.y - right_eye.y)**2
-        )
+        # 两眼外角的归一化间距
+        eye_distance = float(interocular_distance(as_points(landmarks), OUTER_EYE_CORNERS))
         
         # 根据眼间距估算距离（经验公式）
         distance = 60 / eye_distance if eye_distance > 0 else 60
         return max(30, min(100, distance))  # 限制在30-100cm范围内
     
     def detect_hand_direction(self, landmarks):
-        """检测手势方向"""
-        # 获取食指关键点
-        index_tip = landmarks.landmark[8]  # 食指尖
-        index_pip = landmarks.landmark[6]  # 食指第二关节
-        middle_tip = landmarks.landmark[12]  # 中指尖
-        
-        # 计算食指方向
-        dx = index_tip.x - index_pip.x
-        dy = index_tip.y - index_pip.y
-        
-        # 判断方向
-        if abs(dx) > abs(dy):
-            if dx > 0:
-                return 0  # 右
-            else:
-                return 180  # 左
-        else:
-            if dy > 0:
-                return 90  # 下
-            else:
-                return 270  # 上
+        """检测手势方向（食指第二关节→指尖）：0右 90下 180左 270上"""
+        return segment_direction(as_points(landmarks))
     
     def process_response(self, detected_direction):
         """处理手势响应"""
@@ -276,30 +236,8 @@ class VisionTestWindow:
     
     def update_display(self, frame):
         """更新显示内容"""
-        # 生成E字图像
-        e_image = self.create_e_image()
-        
-        # 调整大小
-        height, width = e_image.shape[:2]
-        new_width = int(width * self.current_size)
-        new_height = int(height * self.current_size)
-        resized_e = cv2.resize(e_image, (new_width, new_height))
-        
-        # 旋转E字
-        rotated_e = self.rotate_image(resized_e, self.current_direction)
-        
-        # 合并到画面中央
-        h, w = frame.shape[:2]
-        e_h, e_w = rotated_e.shape[:2]
-        x_offset = (w - e_w) // 2
-        y_offset = (h - e_h) // 2
-        
-        # 确保不越界
-        if x_offset >= 0 and y_offset >= 0:
-            for c in range(3):
-                frame[y_offset:y_offset+e_h, x_offset:x_offset+e_w, c] = \
-                    rotated_e[:, :, c] * (rotated_e[:, :, 3]/255.0) + \
-                    frame[y_offset:y_offset+e_h, x_offset:x_offset+e_w, c] * (1.0 - rotated_e[:, :, 3]/255.0)
+        # 从图集取出当前大小和方向的E字，混合到画面中央
+        self.atlas.draw(frame, 'E', self.current_size, self.current_direction)
         
         # 添加信息叠加
         info_lines = [
@@ -354,15 +292,7 @@ class VisionTestWindow:
     
     def rotate_image(self, image, angle):
         """旋转图像"""
-        height, width = image.shape[:2]
-        center = (width // 2, height // 2)
-        
-        # 获取旋转矩阵
-        rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
-        
-        # 执行旋转
-        rotated = cv2.warpAffine(image, rotation_matrix, (width, height))
-        return rotated
+        return rotate(image, angle, border_value=0)
     
     def calculate_vision_level(self):
         """计算视力水平"""
@@ -426,12 +356,8 @@ class VisionTestWindow:
     def close_window(self):
         """关闭窗口"""
         self.testing = False
-        if self.cap:
-            self.cap.release()
-        if self.face_mesh:
-            self.face_mesh.close()
-        if self.hands:
-            self.hands.close()
+        if self.camera:
+            self.camera.close()
         if self.window:
             self.window.destroy()
 
@@ -441,6 +367,7 @@ class VisionTestTool(BaseTool):
     
     name: str = "vision_test"
     description: str = "进行基础视力检测，使用E字表测试视力水平"
+    execution_policy: ClassVar[str] = "gui"
     test_window: Optional[VisionTestWindow] = None
     
     parameters: Dict[str, Any] = {
@@ -35,6 +35,7 @@ class MainWindow(QMainWindow):
         self.upgrade_machine_visible = False
         self.follow_mouse_enabled = False  # 跟随鼠标开关
         self.follow_target_pos = None      # 跟随目标点
+        self.eye_feed = None               # 用眼监测（开启后由摄像头逐帧更新）
         self.init_ui()
         self.setup_timers()
         # 跟随鼠标定时器
@@ -451,6 +452,7 @@ class MainWindow(QMainWindow):
             ("升级", self.open_upgrade_machine),
             ("⚔️ 对战模式", self.open_battle_dialog),
             ("🐾 跟随鼠标" + ("（已开启）" if self.follow_mouse_enabled else ""), toggle_follow_mouse),
+            ("👁️ 用眼监测" + ("（已开启）" if self.eye_feed is not None else ""), self.toggle_eye_monitor),
             ("🤖 智能命令", lambda: AICommandDialog(self).exec()),
             ("❌ 退出", lambda: QApplication.instance().quit() if QApplication.instance() is not None else None)
         ]
@@ -658,6 +660,29 @@ class MainWindow(QMainWindow):
         else:
             print("桌宠已停止跟随鼠标") 
 
+    def toggle_eye_monitor(self):
+        """开启/关闭用眼监测：开启时订阅摄像头，疲劳时由桌宠提醒休息"""
+        if self.eye_feed is not None:
+            self.pet_agent.attach_eye_monitor(None)
+            self.eye_feed.stop()
+            self.eye_feed = None
+            print("用眼监测已关闭")
+            return
+        from src.tools.eye_monitor import EyeMonitorFeed
+        try:
+            self.eye_feed = EyeMonitorFeed().start()
+        except Exception as e:
+            print(f"用眼监测启动失败: {e}")
+            return
+        self.pet_agent.attach_eye_monitor(self.eye_feed)
+        print("用眼监测已开启")
+
+    def closeEvent(self, event):
+        if self.eye_feed is not None:
+            self.eye_feed.stop()
+            self.eye_feed = None
+        super().closeEvent(event)
+
     def open_eye_games(self):
         """健康游戏入口"""
         tool = EyeGamesTool()
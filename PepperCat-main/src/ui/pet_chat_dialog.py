@@ -15,10 +15,14 @@ import base64
 
 class PetChatDialog(QDialog):
     message_ready = pyqtSignal(str, str)  # sender, text
+    token_ready = pyqtSignal(str)  # 流式回复的增量文本
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self._closed = False  # 标志对象是否已关闭
+        self._loop = None  # 当前对话任务所在的事件循环（关闭窗口时用于取消）
+        self._task = None
+        self._stream_start = None  # 流式预览文本在聊天区中的起始位置
         self.history = []  # 多轮对话历史，元素为("user", msg)或("pet", msg)
         self.setWindowTitle("智能命令 · 桌宠对话")
         self.setFixedSize(520, 540)
@@ -63,9 +67,14 @@ class PetChatDialog(QDialog):
         self.input_line.returnPressed.connect(self.on_send)
         self.history = []  # 用于多轮对话上下文
         self.message_ready.connect(self.append_message)
+        self.token_ready.connect(self.append_token)
 
     def closeEvent(self, event):
         self._closed = True
+        # 取消进行中的对话任务，后台Ollama请求随之取消
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(task.cancel)
         super().closeEvent(event)
 
     def on_send(self):
@@ -74,6 +83,7 @@ class PetChatDialog(QDialog):
         user_text = self.input_line.text().strip()
         if not user_text:
             return
+        self._stream_start = None
         self.append_message("user", user_text)
         self.history.append(("user", user_text))  # 记录历史
         self.input_line.clear()
@@ -99,7 +109,15 @@ class PetChatDialog(QDialog):
         prompt = self.build_multiturn_prompt(user_text)
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(self._call_mcp(prompt))
+        self._loop = loop
+        self._task = loop.create_task(self._call_mcp(prompt))
+        try:
+            result = loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            return
+        finally:
+            self._loop = self._task = None
+            loop.close()
         if self._closed:
             return
         self.message_ready.emit("pet", result)
@@ -143,7 +161,11 @@ class PetChatDialog(QDialog):
                 for k, v in args.items():
                     if isinstance(v, str) and '(上一步结果' in v:
                         args[k] = last_result or ''
-                result = await tool.execute(**args)
+                if tool_name in ("deepseekqa", "deepseek_qa"):
+                    # 分析回复边生成边显示
+                    result = await tool(**args, on_token=self.token_ready.emit)
+                else:
+                    result = await tool(**args)
                 if self._closed:
                     return ""
                 self.message_ready.emit("pet", f"✅ [{tool_name}] 结果：<br>{result}")
@@ -153,7 +175,7 @@ class PetChatDialog(QDialog):
                     data_for_summary = args.get("data", "")
                     summary_tool = agent.available_tools.tool_map.get("deepseekqa")
                     if summary_tool and data_for_summary:
-                        summary = await summary_tool.execute(data=data_for_summary, question="请用一句话总结这组数据")
+                        summary = await summary_tool(data=data_for_summary, question="请用一句话总结这组数据", on_token=self.token_ready.emit)
                         if self._closed:
                             return ""
                         self.message_ready.emit("pet", f"🧠 总结：<br>{summary}")
@@ -223,6 +245,28 @@ class PetChatDialog(QDialog):
                 steps.append({'tool': tool, 'args': args})
         return steps
 
+    def append_token(self, token):
+        # 流式预览：先以纯文本追加，完整回复到达后替换为气泡
+        if self._closed:
+            return
+        cursor = self.chat_area.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        if self._stream_start is None:
+            cursor.insertBlock()
+            self._stream_start = cursor.position()
+        cursor.insertText(token)
+        self.chat_area.setTextCursor(cursor)
+        self.chat_area.ensureCursorVisible()
+
+    def _clear_stream_preview(self):
+        if self._stream_start is None:
+            return
+        cursor = self.chat_area.textCursor()
+        cursor.setPosition(self._stream_start)
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self._stream_start = None
+
     def append_message(self, sender, text):
         # 检查是否为base64图片
         if sender == "pet" and isinstance(text, str) and text.strip().startswith("data:image/png;base64,"):
@@ -239,6 +283,7 @@ class PetChatDialog(QDialog):
             if text.strip().startswith("🧠 总结：") or text.strip().startswith("✅ [deepseekqa]") or text.strip().startswith("✅ [deepseek_qa]"):
                 # 去掉多余前缀
                 summary_text = re.sub(r"^✅ \\[deepseekqa\\] 结果：<br>|^✅ \\[deepseek_qa\\] 结果：<br>", "", text.strip())
+                self._clear_stream_preview()
                 html = f'<div style="text-align:left; margin:18px 40px 18px 0;"><span style="display:inline-block; background:#fffde7; color:#795548; border-radius:16px; padding:12px 20px; max-width:70%; font-size:16px;">{summary_text}</span></div>'
                 self.chat_area.moveCursor(QTextCursor.MoveOperation.End)
                 self.chat_area.insertHtml(html)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享摄像头代理测试（项目根目录 camera_broker.py）
+
+- LandmarkRing：写入后读出一致，只返回比 after_seq 新的帧，正在写入或已被覆盖的槽位被拒绝
+- CameraStream：多个订阅共用一个代理，全部关闭并空闲 BROKER_IDLE_SECONDS 后代理关闭，
+  空闲期间重新订阅会取消关闭；用合成画面（camera_replay.SyntheticSource）代替摄像头
+- 帧源结束后订阅方读到 ended
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# camera_broker.py / camera_replay.py 位于项目根目录（PepperCat-main 的上一级）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import camera_broker
+from camera_broker import (
+    FACE_POINTS, HAND_POINTS, CameraBroker, CameraStream, LandmarkRing, install_broker, shutdown_broker,
+)
+from camera_replay import ScriptedFaceMesh, ScriptedHands, SyntheticSource
+
+
+def _frame(value, height=48, width=64):
+    return np.full((height, width, 3), value, np.uint8)
+
+
+def _ring(slots=4):
+    # name=None：匿名共享内存，不与正在运行的代理冲突
+    return LandmarkRing.create(None, 48, 64, slots=slots)
+
+
+def test_ring_write_read():
+    ring = _ring()
+    try:
+        assert ring.read() is None
+        face = np.random.default_rng(0).random((FACE_POINTS, 3), np.float32)
+        hand = np.ones((HAND_POINTS, 3), np.float32)
+        ring.write(0, 1.5, _frame(7), face, [hand])
+        snapshot = ring.read()
+        assert snapshot.seq == 0 and snapshot.captured_at == 1.5
+        assert (snapshot.frame == 7).all()
+        np.testing.assert_array_equal(snapshot.face, face)
+        assert len(snapshot.hands) == 1 and (snapshot.hand == 1).all()
+        # 已读过的序号不再返回
+        assert ring.read(after_seq=0) is None
+
+        # 覆盖一圈后读到的是最新一帧，没有面部时 face 为 None
+        for seq in range(1, 7):
+            ring.write(seq, float(seq), _frame(seq), None, [])
+        snapshot = ring.read(after_seq=0)
+        assert snapshot.seq == 6 and (snapshot.frame == 6).all()
+        assert snapshot.face is None and snapshot.hands == []
+    finally:
+        ring.close()
+
+
+def test_ring_rejects_torn_slot():
+    ring = _ring(slots=4)
+    try:
+        ring.write(0, 0.0, _frame(1), None, [])
+        # 写入方正在改写这个槽位（write 先把槽位序号置为 -1）
+        ring._ring[0]['seq'] = -1
+        assert ring.read() is None
+
+        # 槽位已被下一圈的帧覆盖，而发布的序号还是旧的
+        ring.write(4, 4.0, _frame(4), None, [])
+        ring.header[camera_broker._H_WRITE_SEQ] = 0
+        assert ring.read() is None
+
+        ring.header[camera_broker._H_WRITE_SEQ] = 4
+        assert ring.read().seq == 4
+    finally:
+        ring.close()
+
+
+def _start_broker(frames=100000, fps=60):
+    broker = CameraBroker(name=None, source=SyntheticSource(frames, fps=fps),
+                          face_mesh=ScriptedFaceMesh(), hands=ScriptedHands()).start()
+    install_broker(broker)
+    return broker
+
+
+def test_stream_refcount_idle_shutdown():
+    idle = camera_broker.BROKER_IDLE_SECONDS
+    camera_broker.BROKER_IDLE_SECONDS = 0.2
+    broker = _start_broker()
+    try:
+        first, second = CameraStream(name=None), CameraStream(name=None)
+        assert camera_broker._broker_refs == 2
+        assert first.read(timeout=2.0) is not None and second.read(timeout=2.0) is not None
+
+        first.close()
+        assert camera_broker._broker_refs == 1
+        time.sleep(0.4)
+        assert camera_broker._broker is broker and broker.running
+
+        # 最后一个订阅关闭后进入空闲计时；计时内重新订阅则继续使用同一个代理
+        second.close()
+        assert camera_broker._broker_refs == 0 and camera_broker._idle_timer is not None
+        first.open()
+        assert camera_broker._idle_timer is None and first.read(timeout=2.0) is not None
+        time.sleep(0.4)
+        assert camera_broker._broker is broker and broker.running
+
+        first.close()
+        deadline = time.time() + 2.0
+        # shutdown_broker 先清空 _broker 再关闭代理
+        while (camera_broker._broker is not None or broker.ring is not None) and time.time() < deadline:
+            time.sleep(0.01)
+        assert camera_broker._broker is None
+        assert not broker.running and broker.ring is None
+    finally:
+        camera_broker.BROKER_IDLE_SECONDS = idle
+        shutdown_broker()
+
+
+def test_stream_ended_when_source_finishes():
+    _start_broker(frames=30, fps=None)
+    try:
+        stream = CameraStream(name=None)
+        frames = 0
+        deadline = time.time() + 5.0
+        while time.time() < deadline:
+            snapshot = stream.read(timeout=0.5)
+            if snapshot is None:
+                if not stream.isOpened():
+                    break
+                continue
+            frames += 1
+        assert stream.ended and not stream.isOpened()
+        assert 0 < frames <= 30
+        assert stream.read() is None
+        stream.close()
+    finally:
+        shutdown_broker()
+
+
+if __name__ == "__main__":
+    for test in (test_ring_write_read, test_ring_rejects_torn_slot, test_stream_refcount_idle_shutdown,
+                 test_stream_ended_when_source_finishes):
+        test()
+        print(f"✅ {test.__name__}")
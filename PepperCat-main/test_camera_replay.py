@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+摄像头回放测试（项目根目录 camera_replay.py）
+
+不需要摄像头、显示器和MediaPipe：合成画面（SyntheticSource）加按脚本返回关键点的
+ScriptedFaceMesh/ScriptedHands，无窗口运行视力检测和训练游戏场景，检查帧数和得分，
+以及视力检测每次呈现视标只计一次回答、没有回答时不换视标。
+"""
+
+import dataclasses
+import json
+import os
+import shutil
+import sys
+
+# camera_replay.py 位于项目根目录（PepperCat-main 的上一级）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from camera_replay import SYNTHETIC_FPS, ScriptedFaceMesh, ScriptedHands, SyntheticSource, default_script, run_scenario
+from staircase import VISION_STANDARD
+from vision_test import VisionTester
+
+
+def _run(scenario, frames, fps=None, script=default_script, **kwargs):
+    # 视力检测按相对路径读取 pictures/E.png，缺少 pictures/test_images 时在其中生成默认视标
+    cwd = os.getcwd()
+    generated = os.path.join(PROJECT_ROOT, 'pictures', 'test_images')
+    existed = os.path.exists(generated)
+    os.chdir(PROJECT_ROOT)
+    try:
+        return run_scenario(scenario, SyntheticSource(frames, script, fps=fps), ScriptedFaceMesh(script),
+                            ScriptedHands(script), **kwargs)
+    finally:
+        os.chdir(cwd)
+        if not existed:
+            shutil.rmtree(generated, ignore_errors=True)
+
+
+def test_vision_test_scenario():
+    # 60fps回放5秒：手势每2秒换一个方向，E字至少呈现两次
+    report = _run('vision_test', 300, fps=60)
+    assert report['frames'] == 300
+    assert report['displayed_frames'].get('Vision Test', 0) > 0
+    scores = report['scores']
+    assert scores['final_vision'] in VISION_STANDARD.values()
+    assert 1 <= scores['total_count'] <= 3
+    assert 0 <= scores['correct_count'] <= scores['total_count']
+    assert report['stages']['capture']['count'] > 0
+    json.dumps(report, default=str)
+
+
+def test_vision_test_waits_for_answer():
+    # 前3秒画面中没有手：E字显示满2秒后也不能在无人回答时更换
+    def script(index):
+        state = default_script(index)
+        return state if index >= 3 * SYNTHETIC_FPS else dataclasses.replace(state, hand_direction=None)
+
+    presentations = []
+    update = VisionTester._update_e_parameters
+
+    def counting_update(self):
+        presentations.append(self.total_count)
+        update(self)
+
+    VisionTester._update_e_parameters = counting_update
+    try:
+        report = _run('vision_test', int(4.5 * SYNTHETIC_FPS), fps=SYNTHETIC_FPS, script=script)
+    finally:
+        VisionTester._update_e_parameters = update
+    total = report['scores']['total_count']
+    assert total >= 1
+    # 每次换视标前都恰好记录了一次回答
+    assert presentations == list(range(1, total + 1))
+
+
+def test_game_scenario():
+    report = _run('reaction_speed', 120, duration=1.0)
+    assert report['frames'] == 120
+    scores = report['scores']
+    assert scores['game_type'] == 'reaction_speed'
+    assert scores['hits'] + scores['misses'] > 0
+    assert 0.0 <= scores['accuracy'] <= 1.0
+    # 合成人脸有纹理，模型运行之间的帧由光流推算
+    assert report['tracking']['face']['model_runs'] > 0 and report['tracking']['face']['tracked_frames'] > 0
+
+
+def test_unknown_scenario():
+    try:
+        run_scenario('no_such_scenario', SyntheticSource(10))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知场景应抛出ValueError")
+
+
+if __name__ == "__main__":
+    for test in (test_vision_test_scenario, test_vision_test_waits_for_answer, test_game_scenario,
+                 test_unknown_scenario):
+        test()
+        print(f"✅ {test.__name__}")
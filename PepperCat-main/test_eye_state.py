@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+在线眨眼与眼疲劳检测测试（项目根目录 eye_state.py）
+
+用合成的开合度序列检查：
+- 眨眼按真实时长计数，长时间闭眼单独计数，阈值附近的抖动不重复计数
+- PERCLOS 与闭眼时间占比一致，帧率高于 MAX_FPS 时时间窗仍然完整
+- 眨眼过少时监测满一个时间窗后判为疲劳
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# eye_state.py 位于项目根目录（PepperCat-main 的上一级）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eye_state import MAX_FPS, EyeStateMonitor, RunningStats
+
+OPEN, CLOSED = 0.3, 0.05
+
+
+def _trace(seconds, fps, closures):
+    """(时间戳, 开合度)；closures 为 [(开始秒, 时长秒)]"""
+    times = np.arange(int(seconds * fps)) / fps
+    openness = np.full(len(times), OPEN)
+    for start, duration in closures:
+        openness[(times >= start) & (times < start + duration)] = CLOSED
+    return times, openness
+
+
+def _feed(monitor, times, openness):
+    return sum(monitor.update(float(t), float(o)) for t, o in zip(times, openness))
+
+
+def test_blink_counting():
+    blinks = [(2.0 + 3.0 * i, 0.15) for i in range(10)]
+    times, openness = _trace(40.0, 30, blinks + [(35.0, 1.0)])
+    monitor = EyeStateMonitor()
+    assert _feed(monitor, times, openness) == 10
+    assert monitor.blink_count == 10
+    assert monitor.long_closures == 1
+    assert not monitor.closed
+
+
+def test_hysteresis_ignores_jitter():
+    times, openness = _trace(10.0, 30, [(5.0, 0.2)])
+    # 睁眼时在闭眼阈值（基线的0.7）上方抖动，不应计为眨眼
+    jitter = (times > 1.0) & (times < 4.0)
+    openness[jitter] = np.where(np.arange(jitter.sum()) % 2, OPEN * 0.75, OPEN)
+    monitor = EyeStateMonitor()
+    _feed(monitor, times, openness)
+    assert monitor.blink_count == 1
+
+
+def test_perclos_full_window_above_max_fps():
+    fps = MAX_FPS * 2
+    window = 10.0
+    # 最后一个时间窗内闭眼 2 秒（每次0.4秒，不算眨眼）
+    closures = [(32.0 + 2.0 * i, 0.4) for i in range(5)]
+    times, openness = _trace(42.0, fps, closures)
+    monitor = EyeStateMonitor(window_seconds=window)
+    _feed(monitor, times, openness)
+    recent, _ = monitor.recent()
+    assert recent[-1] - recent[0] >= window - 2.0 / fps
+    assert abs(monitor.perclos() - 0.2) < 0.01, monitor.perclos()
+
+
+def test_fatigue_when_few_blinks():
+    times, openness = _trace(70.0, 30, [(10.0, 0.15)])
+    monitor = EyeStateMonitor()
+    _feed(monitor, times[times < 30.0], openness[times < 30.0])
+    assert not monitor.is_fatigued()  # 不满一个时间窗
+    _feed(monitor, times[times >= 30.0], openness[times >= 30.0])
+    assert monitor.is_fatigued()
+
+    times, openness = _trace(70.0, 30, [(1.0 + 4.0 * i, 0.15) for i in range(17)])
+    monitor = EyeStateMonitor()
+    _feed(monitor, times, openness)
+    assert not monitor.is_fatigued()
+
+
+def test_running_stats_matches_numpy():
+    values = np.random.default_rng(0).random(1000)
+    stats = RunningStats()
+    for v in values:
+        stats.update(float(v))
+    assert abs(stats.mean - values.mean()) < 1e-12
+    assert abs(stats.variance - values.var()) < 1e-12
+
+
+if __name__ == "__main__":
+    for test in (test_blink_counting, test_hysteresis_ignores_jitter, test_perclos_full_window_above_max_fps,
+                 test_fatigue_when_few_blinks, test_running_stats_matches_numpy):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+眼部图像分析器池测试
+
+- landmarks_to_array 与原逐点 int() 转换结果一致
+- 分析器池：实例复用、数量不超过上限、并发借出互不共享
+- 批量 analyze_images 结果顺序与输入一致
+- 构造 ImageAnalysisTool 不创建共享分析器池（在执行进程中首次分析时才创建）
+"""
+
+import os
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.tools.image_analysis import (
+    LEFT_EYE_INDICES, RIGHT_EYE_INDICES, EyeAnalyzerPool, landmarks_to_array,
+)
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pictures')
+
+
+def fake_landmarks(count=478, seed=0):
+    rng = np.random.default_rng(seed)
+    # 包含图像范围外的坐标（负数截断方向需与 int() 一致）
+    coords = rng.uniform(-0.1, 1.1, (count, 2))
+    return types.SimpleNamespace(landmark=[types.SimpleNamespace(x=x, y=y) for x, y in coords])
+
+
+def test_landmarks_match_loop():
+    landmarks = fake_landmarks()
+    width, height = 640, 480
+    points = landmarks_to_array(landmarks, width, height)
+    for indices, span in ((LEFT_EYE_INDICES, range(362, 387)), (RIGHT_EYE_INDICES, range(33, 58))):
+        expected = [[int(landmarks.landmark[i].x * width), int(landmarks.landmark[i].y * height)] for i in span]
+        assert np.array_equal(points[indices], np.array(expected))
+
+
+def test_pool_reuses_and_caps_instances():
+    pool = EyeAnalyzerPool(size=2, warm=1)
+    with pool.acquire() as first:
+        pass
+    with pool.acquire() as second:
+        assert second is first
+
+    seen = []
+
+    def borrow():
+        with pool.acquire() as analyzer:
+            seen.append(analyzer)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=borrow) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert pool._created == 2
+    assert len({id(a) for a in seen}) <= 2
+    pool.close()
+    assert pool._created == 0
+
+
+def test_failed_construction_releases_slot():
+    import src.tools.image_analysis as image_analysis
+
+    pool = EyeAnalyzerPool(size=1, warm=0)
+    original = image_analysis.EyeImageAnalyzer
+
+    def broken():
+        raise RuntimeError("模型加载失败")
+
+    image_analysis.EyeImageAnalyzer = broken
+    try:
+        for _ in range(3):
+            try:
+                with pool.acquire():
+                    pass
+            except RuntimeError:
+                pass
+            assert pool._created == 0
+    finally:
+        image_analysis.EyeImageAnalyzer = original
+    with pool.acquire() as analyzer:
+        assert isinstance(analyzer, original)
+    assert pool._created == 1
+
+
+def test_analyze_images_order():
+    paths = [os.path.join(SAMPLE_DIR, name) for name in ("E.png", "glaucoma_classification_1.png")]
+    paths = [p for p in paths if os.path.exists(p)] + ["missing.png"]
+    pool = EyeAnalyzerPool(size=2)
+    results = pool.analyze_images(paths)
+    assert len(results) == len(paths)
+    assert "missing.png" in results[-1]["error"]
+    for path, result in zip(paths, results):
+        if result.get("status") == "success":
+            assert result["image_path"] == path
+
+
+def test_tool_construction_is_lazy():
+    import src.tools.image_analysis as image_analysis
+
+    original = image_analysis._shared_pool
+    image_analysis._shared_pool = None
+    try:
+        image_analysis.ImageAnalysisTool()
+        assert image_analysis._shared_pool is None
+    finally:
+        image_analysis._shared_pool = original
+
+
+if __name__ == "__main__":
+    for test in (test_landmarks_match_loop, test_pool_reuses_and_caps_instances,
+                 test_failed_construction_releases_slot, test_analyze_images_order, test_tool_construction_is_lazy):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享图片加载层测试
+
+- JPEG按目标尺寸缩小解码，缩小后不小于目标尺寸；PNG按原尺寸解码
+- 超过像素上限的图片被拒绝，无法解码的文件与 cv2.imread 一样返回None
+- 大图解码耗时对比（完整解码 vs 缩小解码）
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.tools.image_loader import ImageTooLargeError, load_bgr, load_pil, reduction_factor
+
+
+def make_photo(path, size=(3000, 4000)):
+    rng = np.random.default_rng(0)
+    height, width = size
+    small = rng.integers(0, 255, (height // 16, width // 16, 3), dtype=np.uint8)
+    cv2.imwrite(path, cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC))
+
+
+def test_reduction_factor():
+    assert reduction_factor((4000, 3000), None) == 1
+    assert reduction_factor((4000, 3000), (224, 224)) == 8
+    assert reduction_factor((4000, 3000), (800, 0)) == 4
+    assert reduction_factor((1000, 700), (800, 0)) == 1
+    assert reduction_factor((500, 500), (224, 224)) == 2
+
+
+def test_jpeg_reduced_not_below_target():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "photo.jpg")
+        make_photo(path)
+        image = load_bgr(path, (800, 0))
+        assert image.shape == (750, 1000, 3)
+        gray = load_bgr(path, (800, 0), grayscale=True)
+        assert gray.shape == (750, 1000)
+        pil = load_pil(path, (224, 224))
+        assert pil.mode == "RGB" and pil.size == (500, 375)
+        # 无目标尺寸时与 cv2.imread 完全一致
+        assert np.array_equal(load_bgr(path), cv2.imread(path))
+
+
+def test_png_full_resolution():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scan.png")
+        make_photo(path, (600, 900))
+        assert np.array_equal(load_bgr(path, (224, 224)), cv2.imread(path))
+        assert load_pil(path, (224, 224)).size == (900, 600)
+
+
+def test_pixel_limit_and_unreadable():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "large.png")
+        cv2.imwrite(path, np.zeros((300, 400), np.uint8))
+        for load in (load_bgr, load_pil):
+            try:
+                load(path, max_pixels=100_000)
+                assert False, "应拒绝超过像素上限的图片"
+            except ImageTooLargeError:
+                pass
+        broken = os.path.join(tmp, "broken.jpg")
+        with open(broken, "wb") as f:
+            f.write(b"not an image")
+        assert load_bgr(broken) is None
+
+
+def benchmark():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "photo.jpg")
+        make_photo(path, (3672, 5472))
+        for name, load in (("cv2.imread 完整解码", lambda: cv2.imread(path)),
+                           ("load_bgr 宽度800", lambda: load_bgr(path, (800, 0))),
+                           ("load_pil 224x224", lambda: load_pil(path, (224, 224)))):
+            start = time.perf_counter()
+            for _ in range(3):
+                load()
+            print(f"20MP JPEG {name}: {(time.perf_counter() - start) / 3 * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    for test in (test_reduction_factor, test_jpeg_reduced_not_below_target, test_png_full_resolution,
+                 test_pixel_limit_and_unreadable):
+        test()
+        print(f"✅ {test.__name__}")
+    benchmark()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键点几何测试（项目根目录 landmark_geometry.py）
+
+- eye_aspect_ratio：睁眼/闭眼的纵横比，与逐点公式一致
+- estimate_distance_cm：针孔模型，眼间距减半时距离加倍
+- quantize_direction / pointing_direction：四个方向的量化，手指未伸直时返回None
+  （包括指向左方、角度在 ±180° 两侧的情形）
+- 多帧堆叠的 (T, N, 3) 与逐帧计算结果一致
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+
+# landmark_geometry.py 位于项目根目录（PepperCat-main 的上一级）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from landmark_geometry import (
+    AVERAGE_FACE_WIDTH, EAR_POINTS, FOCAL_LENGTH, INDEX_TIP, INTEROCULAR, MIDDLE_TIP, WRIST,
+    eye_aspect_ratio, eye_centers, estimate_distance_cm, finger_angles, pointing_direction, quantize_direction,
+)
+
+FACE_POINTS, HAND_POINTS = 478, 21
+
+
+def _face(openness=1.0, eye_gap=0.1, seed=0):
+    """两只眼按 EAR_POINTS 摆放：眼宽0.04，上下眼睑间距 0.012*openness"""
+    face = np.random.default_rng(seed).random((FACE_POINTS, 3)).astype(np.float32) * 0.01 + 0.5
+    for i, cx in enumerate((0.5 - eye_gap / 2, 0.5 + eye_gap / 2)):
+        p1, p2, p3, p4, p5, p6 = EAR_POINTS[i]
+        half_height = 0.006 * openness
+        face[p1, :2] = (cx - 0.02, 0.4)
+        face[p4, :2] = (cx + 0.02, 0.4)
+        face[p2, :2] = (cx - 0.007, 0.4 - half_height)
+        face[p3, :2] = (cx + 0.007, 0.4 - half_height)
+        face[p6, :2] = (cx - 0.007, 0.4 + half_height)
+        face[p5, :2] = (cx + 0.007, 0.4 + half_height)
+    a, b = INTEROCULAR
+    face[a, :2] = (0.5 - eye_gap / 2, 0.39)
+    face[b, :2] = (0.5 + eye_gap / 2, 0.39)
+    return face
+
+
+def _hand(angle, spread=0.0, length=0.2):
+    """腕在画面中央，食指/中指指尖分别朝 angle 和 angle+spread（度，图像坐标）"""
+    hand = np.full((HAND_POINTS, 3), 0.5, np.float32)
+    for tip, a in ((INDEX_TIP, angle), (MIDDLE_TIP, angle + spread)):
+        hand[tip, :2] = (0.5 + length * math.cos(math.radians(a)), 0.5 + length * math.sin(math.radians(a)))
+    hand[WRIST, :2] = (0.5, 0.5)
+    return hand
+
+
+def test_eye_aspect_ratio():
+    ear = eye_aspect_ratio(_face(1.0))
+    assert ear.shape == (2,)
+    # (2 * 0.012) / (2 * 0.04)
+    np.testing.assert_allclose(ear, 0.3, rtol=1e-4)
+    np.testing.assert_allclose(eye_aspect_ratio(_face(0.2)), 0.06, rtol=1e-3)
+    closed = _face(0.0)
+    assert (eye_aspect_ratio(closed) < 1e-6).all()
+    # 两个眼角重合时不除以0
+    closed[EAR_POINTS[:, 3], :2] = closed[EAR_POINTS[:, 0], :2]
+    assert np.isfinite(eye_aspect_ratio(closed)).all()
+
+
+def test_estimate_distance_cm():
+    width = 640
+    distance = float(estimate_distance_cm(_face(eye_gap=0.1), width))
+    assert math.isclose(distance, AVERAGE_FACE_WIDTH * FOCAL_LENGTH / (0.1 * width) * 100, rel_tol=1e-4)
+    assert math.isclose(float(estimate_distance_cm(_face(eye_gap=0.05), width)), 2 * distance, rel_tol=1e-4)
+
+
+def test_quantize_direction():
+    cases = {0: 0, 44: 0, 46: 90, 90: 90, 134: 90, 136: 180, 180: 180, -180: 180, -136: 180,
+             -134: 270, -90: 270, -46: 270, -44: 0, 270: 270, 359: 0}
+    for angle, expected in cases.items():
+        assert quantize_direction(angle) == expected, (angle, quantize_direction(angle))
+
+
+def test_pointing_direction():
+    for angle, expected in ((0, 0), (90, 90), (180, 180), (-90, 270), (30, 0), (-120, 270)):
+        assert pointing_direction(_hand(angle)) == expected
+        assert pointing_direction(_hand(angle, spread=10), straight_tolerance=20) == expected
+    # 手指张开（食指与中指夹角过大）
+    assert pointing_direction(_hand(0, spread=40), straight_tolerance=20) is None
+    assert pointing_direction(_hand(0, spread=40)) == 0
+    # 指向左方：两个指尖的角度分别为 175° 和 -175°，夹角只有10°
+    assert pointing_direction(_hand(175, spread=10), straight_tolerance=20) == 180
+
+
+def test_batched_frames():
+    faces = np.stack([_face(openness, seed=i) for i, openness in enumerate((1.0, 0.5, 0.0))])
+    hands = np.stack([_hand(angle) for angle in (0, 90, 180)])
+    assert eye_aspect_ratio(faces).shape == (3, 2)
+    np.testing.assert_allclose(eye_aspect_ratio(faces), [eye_aspect_ratio(f) for f in faces], rtol=1e-6)
+    np.testing.assert_allclose(estimate_distance_cm(faces, 640), [estimate_distance_cm(f, 640) for f in faces],
+                               rtol=1e-6)
+    assert eye_centers(faces).shape == (3, 2, 2)
+    angles = finger_angles(hands)
+    assert angles.shape == (3, 2)
+    assert [quantize_direction(a) for a in angles[:, 0]] == [0, 90, 180]
+
+
+if __name__ == "__main__":
+    for test in (test_eye_aspect_ratio, test_estimate_distance_cm, test_quantize_direction, test_pointing_direction,
+                 test_batched_frames):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键点推理服务测试（项目根目录 landmark_service.py）
+
+- pack_result / unpack_result：各面部模式、多只手、无人脸（视线为NaN）的往返
+- 调度：用假的 model_factory（每帧固定耗时、检测不到任何东西）代替 MediaPipe，
+  两个会话连续发帧，检查每个会话同时最多一帧在推理、排队中被替换的旧帧计入 dropped、
+  最新一帧总会被处理
+- start_in_thread：端口被占用时在调用方抛出
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import time
+import types
+from collections import Counter
+
+import cv2
+import numpy as np
+from aiohttp import ClientSession, WSMsgType, web
+
+# landmark_service.py 位于项目根目录（PepperCat-main 的上一级）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from landmark_service import (
+    FACE_POINTS, FRAME_ID, GAZE_POINTS, HAND_POINTS, STATUS_DECODE_ERROR, STATUS_OK, LandmarkService,
+    pack_result, start_in_thread, unpack_result,
+)
+
+INFERENCE_SECONDS = 0.05
+FRAMES_PER_SESSION = 12
+
+
+class _SlowModel:
+    """假的 FaceMesh/Hands：每帧耗时 INFERENCE_SECONDS，什么也检测不到"""
+
+    def process(self, rgb):
+        time.sleep(INFERENCE_SECONDS)
+        return types.SimpleNamespace(multi_face_landmarks=None, multi_hand_landmarks=None)
+
+
+def _slow_models():
+    return _SlowModel(), _SlowModel()
+
+
+class _CountingService(LandmarkService):
+    """记录每个会话同时在推理的帧数"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = Counter()
+        self.max_in_flight = 0
+
+    async def _run_batch(self, batch):
+        for session, _ in batch:
+            self.in_flight[session.id] += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight[session.id])
+        try:
+            await super()._run_batch(batch)
+        finally:
+            for session, _ in batch:
+                self.in_flight[session.id] -= 1
+
+
+def test_pack_unpack_round_trip():
+    rng = np.random.default_rng(0)
+    face = rng.random((FACE_POINTS, 3)).astype(np.float32)
+    hands = [rng.random((HAND_POINTS, 3)).astype(np.float32) for _ in range(2)]
+
+    result = unpack_result(pack_result(7, face, hands, 'full', inference_ms=12.5))
+    assert result['frame_id'] == 7 and result['status'] == STATUS_OK
+    assert result['face'].shape == (FACE_POINTS, 2) and result['hands'].shape == (2, HAND_POINTS, 2)
+    # float16 传输，误差在 1e-3 以内
+    np.testing.assert_allclose(result['face'], face[:, :2], atol=1e-3)
+    np.testing.assert_allclose(result['hands'], np.stack(hands)[:, :, :2], atol=1e-3)
+    assert abs(result['inference_ms'] - 12.5) < 1e-3
+    assert np.isfinite(result['gaze']).all()
+
+    gaze = unpack_result(pack_result(8, face, hands[:1], 'gaze'))
+    np.testing.assert_allclose(gaze['face'], face[GAZE_POINTS, :2], atol=1e-3)
+    assert gaze['hands'].shape == (1, HAND_POINTS, 2)
+    assert gaze['gaze'] == result['gaze']
+
+    none = unpack_result(pack_result(9, face, [], 'none'))
+    assert none['face'].shape == (0, 2) and none['hands'].shape == (0, HAND_POINTS, 2)
+
+    missing = unpack_result(pack_result(2 ** 32 - 1, None, [], 'gaze', STATUS_DECODE_ERROR))
+    assert missing['frame_id'] == 2 ** 32 - 1 and missing['status'] == STATUS_DECODE_ERROR
+    assert np.isnan(missing['gaze']).all() and missing['face'].shape == (0, 2)
+
+
+async def _play(port, image):
+    """连续发 FRAMES_PER_SESSION 帧，收到最后一帧的结果后查询会话统计"""
+    async with ClientSession() as http:
+        async with http.ws_connect(f"http://127.0.0.1:{port}/ws/landmarks") as ws:
+            for frame_id in range(FRAMES_PER_SESSION):
+                await ws.send_bytes(FRAME_ID.pack(frame_id) + image)
+                await asyncio.sleep(0.005)
+            frame_ids = []
+            while not frame_ids or frame_ids[-1] != FRAMES_PER_SESSION - 1:
+                msg = await ws.receive(timeout=60)
+                assert msg.type == WSMsgType.BINARY, msg
+                frame_ids.append(unpack_result(msg.data)['frame_id'])
+            await ws.send_json({'stats': True})
+            return frame_ids, await ws.receive_json(timeout=5)
+
+
+def test_dispatcher_drops_stale_frames():
+    image = cv2.imencode('.jpg', np.full((48, 64, 3), 128, np.uint8))[1].tobytes()
+
+    async def scenario():
+        service = _CountingService(workers=2, model_factory=_slow_models)
+        runner = web.AppRunner(service.app())
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        port = runner.addresses[0][1]
+        try:
+            return service, await asyncio.gather(_play(port, image), _play(port, image))
+        finally:
+            await runner.cleanup()
+
+    service, sessions = asyncio.run(scenario())
+    assert service.max_in_flight == 1
+    for frame_ids, stats in sessions:
+        # 结果按帧号递增返回，最后一帧总会被处理
+        assert frame_ids == sorted(set(frame_ids)) and frame_ids[-1] == FRAMES_PER_SESSION - 1
+        assert stats['received'] == FRAMES_PER_SESSION
+        assert stats['processed'] == len(frame_ids)
+        assert stats['processed'] + stats['dropped'] == FRAMES_PER_SESSION
+        assert stats['dropped'] > 0
+    status = service.status()
+    assert status['dropped'] == sum(stats['dropped'] for _, stats in sessions)
+    assert status['processed'] == sum(stats['processed'] for _, stats in sessions)
+
+
+def test_start_in_thread_reports_bind_failure():
+    with socket.socket() as busy:
+        busy.bind(('127.0.0.1', 0))
+        busy.listen()
+        try:
+            start_in_thread('127.0.0.1', busy.getsockname()[1], workers=1, model_factory=_slow_models)
+        except OSError:
+            pass
+        else:
+            raise AssertionError("端口被占用时应抛出OSError")
+
+
+if __name__ == "__main__":
+    for test in (test_pack_unpack_round_trip, test_dispatcher_drops_stale_frames,
+                 test_start_in_thread_reports_bind_failure):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键点跟踪测试（项目根目录 landmark_tracking.py）
+
+用有纹理的合成序列（模糊噪声图逐帧做已知的平移、旋转、缩放）和按真值返回关键点的假模型检查：
+- 人脸（相似变换）和手（逐点）光流推算的关键点与真值的误差在亚像素以内，模型只在关键帧运行
+- 没有纹理的帧上跟丢：当前帧改为运行模型，之后 LOSS_COOLDOWN_FRAMES 帧每帧都运行模型，
+  冷却结束后恢复光流推算
+- 关键点中心移出画面视为跟丢
+"""
+
+import os
+import sys
+import types
+
+import cv2
+import numpy as np
+
+# landmark_tracking.py 位于项目根目录（PepperCat-main 的上一级）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from camera_broker import FACE_POINTS, HAND_POINTS, LandmarkView
+from landmark_tracking import LOSS_COOLDOWN_FRAMES, TrackedModel
+
+WIDTH, HEIGHT = 640, 480
+_texture = cv2.GaussianBlur(np.random.default_rng(0).integers(0, 256, (HEIGHT, WIDTH)).astype(np.uint8), (0, 0), 2.0)
+TEXTURE = np.dstack([cv2.normalize(_texture, None, 0, 255, cv2.NORM_MINMAX)] * 3)
+
+
+class TruthModel:
+    """假的 FaceMesh/Hands：返回测试设置的真值关键点（像素坐标）"""
+
+    def __init__(self, attr, count):
+        self.attr = attr
+        self.count = count
+        self.truth = None
+
+    def process(self, rgb):
+        if self.truth is None:
+            return types.SimpleNamespace(**{self.attr: None})
+        points = np.zeros((self.count, 3), np.float32)
+        points[:, :2] = self.truth / (WIDTH, HEIGHT)
+        return types.SimpleNamespace(**{self.attr: [LandmarkView(points)]})
+
+    def close(self):
+        pass
+
+
+def _cloud(count, radius):
+    """画面中央半径 radius 像素内均匀分布的点"""
+    angles = np.arange(count) * 2.399963
+    radii = np.sqrt((np.arange(count) + 0.5) / count) * radius
+    return np.stack([WIDTH / 2 + np.cos(angles) * radii, HEIGHT / 2 + np.sin(angles) * radii], axis=1)
+
+
+def _motion(i, rotation=0.4, scale=0.004, shift=(1.3, -0.7)):
+    """第 i 帧相对第0帧的变换：每帧旋转 rotation 度、缩放 scale、平移 shift 像素（非整数）"""
+    M = cv2.getRotationMatrix2D((WIDTH / 2, HEIGHT / 2), rotation * i, 1 + scale * i)
+    M[:, 2] += np.multiply(shift, i)
+    return M
+
+
+def _sequence(tracker, model, points, frames, **motion):
+    """逐帧送入跟踪器，返回光流推算帧上关键点与真值的误差（像素）"""
+    errors = []
+    for i in range(frames):
+        M = _motion(i, **motion)
+        frame = cv2.warpAffine(TEXTURE, M, (WIDTH, HEIGHT), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
+        model.truth = points @ M[:, :2].T + M[:, 2]
+        tracked_before = tracker.tracked_frames
+        result = tracker.process(frame)
+        if tracker.tracked_frames > tracked_before:
+            (view,) = getattr(result, model.attr)
+            errors.append(np.linalg.norm(view.points[:, :2] * (WIDTH, HEIGHT) - model.truth, axis=1))
+    return np.array(errors)
+
+
+def test_face_flow_accuracy():
+    model = TruthModel('multi_face_landmarks', FACE_POINTS)
+    tracker = TrackedModel(model, 'face', interval=3)
+    errors = _sequence(tracker, model, _cloud(FACE_POINTS, 120), 30)
+    assert tracker.report() == {'interval': 3, 'model_runs': 10, 'tracked_frames': 20, 'losses': 0,
+                                'model_ratio': 0.333}
+    assert errors.mean() < 0.1, errors.mean()
+    assert errors.max() < 0.5, errors.max()
+
+
+def test_hand_flow_accuracy():
+    model = TruthModel('multi_hand_landmarks', HAND_POINTS)
+    tracker = TrackedModel(model, 'hands', interval=2)
+    errors = _sequence(tracker, model, _cloud(HAND_POINTS, 80), 20, rotation=0.0, scale=0.0, shift=(2.4, 1.1))
+    assert tracker.tracked_frames == 10 and tracker.losses == 0
+    assert errors.mean() < 0.1, errors.mean()
+    assert errors.max() < 0.5, errors.max()
+
+
+def test_loss_and_cooldown():
+    model = TruthModel('multi_face_landmarks', FACE_POINTS)
+    model.truth = _cloud(FACE_POINTS, 120)
+    tracker = TrackedModel(model, 'face', interval=3)
+    blank = np.full((HEIGHT, WIDTH, 3), 128, np.uint8)
+
+    tracker.process(TEXTURE)
+    # 没有纹理：光流失败，当前帧改为运行模型
+    result = tracker.process(blank)
+    assert tracker.losses == 1 and tracker.model_runs == 2 and tracker.tracked_frames == 0
+    assert result.multi_face_landmarks
+    # 冷却期间每帧都运行模型，即使画面恢复了纹理
+    for _ in range(LOSS_COOLDOWN_FRAMES):
+        tracker.process(TEXTURE)
+    assert tracker.model_runs == 2 + LOSS_COOLDOWN_FRAMES and tracker.tracked_frames == 0
+    # 冷却结束后恢复隔帧运行
+    for _ in range(3):
+        tracker.process(TEXTURE)
+    assert tracker.tracked_frames == 2 and tracker.losses == 1
+
+
+def test_points_leaving_frame():
+    model = TruthModel('multi_hand_landmarks', HAND_POINTS)
+    # 其余点都能跟上，一个远在画面外的点跟踪失败后按中位位移移动，关键点中心落在画面外
+    model.truth = _cloud(HAND_POINTS, 60)
+    model.truth[0] = (-30 * WIDTH, HEIGHT / 2)
+    tracker = TrackedModel(model, 'hands', interval=3)
+    tracker.process(TEXTURE)
+    tracker.process(TEXTURE)
+    assert tracker.losses == 1 and tracker.tracked_frames == 0 and tracker.model_runs == 2
+
+
+def test_empty_keyframe_and_interval_one():
+    model = TruthModel('multi_hand_landmarks', HAND_POINTS)
+    tracker = TrackedModel(model, 'hands', interval=3)
+    # 关键帧没有检测到手，其余帧直接返回空结果
+    assert tracker.process(TEXTURE).multi_hand_landmarks is None
+    assert tracker.process(TEXTURE).multi_hand_landmarks is None
+    assert tracker.model_runs == 1 and tracker.tracked_frames == 1
+
+    every_frame = TrackedModel(model, 'hands', interval=1)
+    for _ in range(3):
+        every_frame.process(TEXTURE)
+    assert every_frame.model_runs == 3 and every_frame.tracked_frames == 0
+
+    try:
+        TrackedModel(model, 'eyes', 2)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知的模型类型应抛出ValueError")
+
+
+if __name__ == "__main__":
+    for test in (test_face_flow_accuracy, test_hand_flow_accuracy, test_loss_and_cooldown, test_points_leaving_frame,
+                 test_empty_keyframe_and_interval_one):
+        test()
+        print(f"✅ {test.__name__}")
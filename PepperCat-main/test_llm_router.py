@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多后端LLM路由测试（openmanus_core/llm_router.py）
+
+用本地假的 OpenAI 兼容服务（aiohttp，每个后端一个端口）检查：
+- LLMRequestError.from_status 的错误分类
+- CircuitBreaker：连续失败后打开，冷却后半开，探测失败重新打开，成功后关闭
+- LLMRouter.chat_completion：首选后端超过对冲延迟时向下一个后端对冲、先返回者胜出；
+  5xx/429 立即换后端；其他4xx 直接失败；全部失败或全部熔断时抛出不可重试的错误
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+
+# openmanus_core 位于项目根目录（PepperCat-main 的上一级）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openmanus_core.config import LLMSettings
+from openmanus_core.exceptions import LLMRequestError
+from openmanus_core.llm_router import CircuitBreaker, LLMBackend, LLMRouter
+
+REQUEST = {"model": "test", "messages": [{"role": "user", "content": "hi"}], "stream": False}
+
+
+class FakeServer:
+    """假的 chat/completions 后端：按 status/delay 回复，记录调用次数"""
+
+    def __init__(self, name, status=200, delay=0.0):
+        self.name = name
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+        self._runner = None
+        self.port = None
+
+    async def _handle(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.Response(status=self.status, text="bad")
+        return web.json_response({
+            "choices": [{"message": {"role": "assistant", "content": self.name}}],
+            "usage": {"completion_tokens": 1},
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    def backend(self, failure_threshold=3, cooldown=30.0):
+        settings = LLMSettings(model=self.name, base_url=f"http://127.0.0.1:{self.port}/v1", api_key="test",
+                               api_type="openai", api_version="")
+        return LLMBackend(settings, failure_threshold, cooldown)
+
+
+async def _route(servers, hedge=True, hedge_delay=5.0):
+    """启动假后端，返回 (路由器, 后端列表)；调用方负责停止服务"""
+    for server in servers:
+        await server.start()
+    backends = [server.backend() for server in servers]
+    router = LLMRouter(backends, hedge=hedge, hedge_min_delay=hedge_delay, hedge_default_delay=hedge_delay)
+    return router, backends
+
+
+def _run(servers, scenario, **kwargs):
+    async def main():
+        router, backends = await _route(servers, **kwargs)
+        try:
+            return await scenario(router, backends)
+        finally:
+            for server in servers:
+                await server.stop()
+
+    return asyncio.run(main())
+
+
+def _content(response):
+    return response["choices"][0]["message"]["content"]
+
+
+def test_from_status():
+    for status in (408, 429, 500, 503):
+        e = LLMRequestError.from_status(status)
+        assert e.status == status and e.retryable and e.backend_fault
+    e = LLMRequestError.from_status(401)
+    assert not e.retryable and e.backend_fault
+    e = LLMRequestError.from_status(400, "bad request")
+    assert not e.retryable and not e.backend_fault
+    assert "bad request" in str(e)
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN and breaker.allow()
+    # 半开时的探测失败直接重新打开
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_primary_answers_without_hedge():
+    primary, secondary = FakeServer("primary"), FakeServer("secondary")
+    response = _run([primary, secondary], lambda router, _: router.chat_completion(REQUEST, timeout=5))
+    assert _content(response) == "primary"
+    assert (primary.calls, secondary.calls) == (1, 0)
+
+
+def test_hedge_first_response_wins():
+    primary, secondary = FakeServer("primary", delay=2.0), FakeServer("secondary")
+
+    async def scenario(router, backends):
+        start = time.perf_counter()
+        response = await router.chat_completion(REQUEST, timeout=5)
+        return response, time.perf_counter() - start
+
+    response, elapsed = _run([primary, secondary], scenario, hedge_delay=0.1)
+    assert _content(response) == "secondary"
+    assert primary.calls == 1 and secondary.calls == 1
+    # 不等首选后端返回
+    assert elapsed < 1.0
+
+
+def test_no_hedge_when_disabled():
+    primary, secondary = FakeServer("primary", delay=0.3), FakeServer("secondary")
+    response = _run([primary, secondary], lambda router, _: router.chat_completion(REQUEST, timeout=5),
+                    hedge=False, hedge_delay=0.05)
+    assert _content(response) == "primary"
+    assert secondary.calls == 0
+
+
+def test_failover_on_5xx_and_429():
+    for status in (503, 429):
+        primary, secondary = FakeServer("primary", status=status), FakeServer("secondary")
+
+        async def scenario(router, backends):
+            return await router.chat_completion(REQUEST, timeout=5), backends[0].breaker.failures
+
+        response, failures = _run([primary, secondary], scenario)
+        assert _content(response) == "secondary"
+        assert (primary.calls, secondary.calls) == (1, 1)
+        assert failures == 1
+
+
+def test_other_4xx_raises_immediately():
+    primary, secondary = FakeServer("primary", status=400), FakeServer("secondary")
+
+    async def scenario(router, backends):
+        try:
+            await router.chat_completion(REQUEST, timeout=5)
+        except LLMRequestError as e:
+            return e, backends[0].breaker.failures
+
+    error, failures = _run([primary, secondary], scenario)
+    assert error.status == 400 and not error.retryable
+    assert secondary.calls == 0
+    # 请求本身有误，不计入后端熔断
+    assert failures == 0
+
+
+def test_all_failed_not_retryable():
+    primary, secondary = FakeServer("primary", status=500), FakeServer("secondary", status=502)
+
+    async def scenario(router, backends):
+        try:
+            await router.chat_completion(REQUEST, timeout=5)
+        except LLMRequestError as e:
+            return e
+
+    error = _run([primary, secondary], scenario)
+    assert "所有LLM后端请求失败" in str(error)
+    assert not error.retryable
+    assert (primary.calls, secondary.calls) == (1, 1)
+
+
+def test_all_breakers_open():
+    primary = FakeServer("primary")
+
+    async def scenario(router, backends):
+        for _ in range(backends[0].breaker.failure_threshold):
+            backends[0].breaker.record_failure()
+        try:
+            await router.chat_completion(REQUEST, timeout=5)
+        except LLMRequestError as e:
+            return e
+
+    error = _run([primary], scenario)
+    assert not error.retryable
+    assert primary.calls == 0
+
+
+if __name__ == "__main__":
+    for test in (test_from_status, test_circuit_breaker, test_primary_answers_without_hedge,
+                 test_hedge_first_response_wins, test_no_hedge_when_disabled, test_failover_on_5xx_and_429,
+                 test_other_4xx_raises_immediately, test_all_failed_not_retryable, test_all_breakers_open):
+        test()
+        print(f"✅ {test.__name__}")
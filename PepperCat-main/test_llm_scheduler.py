@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM请求调度器测试
+
+- single-flight：发起方成功/失败时，合并的等待者得到相同的结果/异常，请求只发送一次
+- 取消某个等待者不影响发起方和其他等待者
+- 发起方被取消时，等待者收到可重试的 LLMRequestError 而不是被连带取消
+- 并发上限与优先级：槽位用尽时按优先级放行
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.llm_scheduler import BackendLimits, LLMScheduler, Priority
+from openmanus_core.exceptions import LLMRequestError
+
+
+class Backend:
+    """记录调用次数的假后端：等待 release 事件后返回（或抛出）"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+        self.release = None
+
+    async def __call__(self, prompt):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return f"reply:{prompt}"
+
+
+async def _start(scheduler, backend, count):
+    """启动 count 个相同请求（第一个为发起方），等它们都进入single-flight后返回任务"""
+    backend.release = asyncio.Event()
+    key = scheduler.make_key("ollama", "hello")
+    tasks = [asyncio.create_task(scheduler.run_async("ollama", backend, "hello", dedup_key=key))
+             for _ in range(count)]
+    while scheduler.metrics().get("ollama", {}).get("coalesced", 0) < count - 1:
+        await asyncio.sleep(0.001)
+    return tasks
+
+
+def test_leader_success_shared():
+    async def scenario():
+        scheduler = LLMScheduler()
+        backend = Backend()
+        tasks = await _start(scheduler, backend, 3)
+        backend.release.set()
+        return backend, await asyncio.gather(*tasks)
+
+    backend, results = asyncio.run(scenario())
+    assert results == ["reply:hello"] * 3
+    assert backend.calls == 1
+
+
+def test_leader_failure_shared():
+    async def scenario():
+        scheduler = LLMScheduler()
+        backend = Backend(error=LLMRequestError("boom", status=500, retryable=True))
+        tasks = await _start(scheduler, backend, 3)
+        backend.release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, LLMRequestError) and str(r) == "boom" for r in results)
+
+
+def test_follower_cancel_isolated():
+    async def scenario():
+        scheduler = LLMScheduler()
+        backend = Backend()
+        leader, cancelled, other = await _start(scheduler, backend, 3)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        backend.release.set()
+        return await asyncio.gather(leader, cancelled, other, return_exceptions=True)
+
+    leader, cancelled, other = asyncio.run(scenario())
+    assert leader == "reply:hello"
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert other == "reply:hello"
+
+
+def test_leader_cancel_retryable_for_followers():
+    async def scenario():
+        scheduler = LLMScheduler()
+        backend = Backend()
+        leader, *followers = await _start(scheduler, backend, 3)
+        leader.cancel()
+        results = await asyncio.gather(leader, *followers, return_exceptions=True)
+        # 之后相同的请求重新发送，不再复用已结束的在途记录
+        backend.release.set()
+        retry = await scheduler.run_async("ollama", backend, "hello",
+                                          dedup_key=scheduler.make_key("ollama", "hello"))
+        return results, retry
+
+    (leader, *followers), retry = asyncio.run(scenario())
+    assert isinstance(leader, asyncio.CancelledError)
+    assert all(isinstance(f, LLMRequestError) and f.retryable for f in followers)
+    assert retry == "reply:hello"
+
+
+def test_sync_single_flight():
+    scheduler = LLMScheduler()
+    calls = []
+    gate = threading.Event()
+
+    def backend():
+        calls.append(1)
+        gate.wait()
+        return "done"
+
+    results = []
+    key = scheduler.make_key("sync")
+    threads = [threading.Thread(target=lambda: results.append(scheduler.run("ollama", backend, dedup_key=key)))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+    while scheduler.metrics()["ollama"]["coalesced"] < 2:
+        time.sleep(0.001)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert results == ["done"] * 3
+    assert len(calls) == 1
+
+
+def test_priority_order():
+    scheduler = LLMScheduler({"ollama": BackendLimits(max_concurrency=1)})
+    order = []
+
+    async def job(name):
+        order.append(name)
+        await asyncio.sleep(0.01)
+
+    async def scenario():
+        first = asyncio.create_task(scheduler.run_async("ollama", job, "first"))
+        await asyncio.sleep(0.001)
+        queued = [asyncio.create_task(scheduler.run_async("ollama", job, name, priority=priority))
+                  for name, priority in (("batch", Priority.BATCH), ("interactive", Priority.INTERACTIVE))]
+        await asyncio.gather(first, *queued)
+
+    asyncio.run(scenario())
+    assert order == ["first", "interactive", "batch"]
+
+
+if __name__ == "__main__":
+    for test in (test_leader_success_shared, test_leader_failure_shared, test_follower_cancel_isolated,
+                 test_leader_cancel_retryable_for_followers, test_sync_single_flight, test_priority_order):
+        test()
+        print(f"✅ {test.__name__}")
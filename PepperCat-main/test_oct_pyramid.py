@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCT多分辨率检测测试
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# 添加src目录到路径
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.tools.oct_analysis import OCTAnalyzer
+from src.tools.oct_pyramid import PROFILES, coarse_to_fine_circles, get_profile
+
+
+def ring_image(center=(300, 200), radius=60, size=(400, 640), seed=0):
+    """带噪声背景和一个亮圆环的灰度图"""
+    rng = np.random.default_rng(seed)
+    image = rng.normal(90, 10, size=size).clip(0, 255).astype(np.uint8)
+    cv2.circle(image, center, radius, 220, 3)
+    return cv2.GaussianBlur(image, (3, 3), 0)
+
+
+def test_get_profile():
+    assert get_profile(None) is None
+    assert get_profile("full") is None
+    assert get_profile("balanced") is PROFILES["balanced"]
+    try:
+        get_profile("turbo")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知档位应抛出ValueError")
+
+
+def test_coarse_to_fine_finds_circle():
+    """每个档位找到的最大圆与真实圆环一致（圆环宽3像素，内外边缘都可能被选中，允许3像素误差）"""
+    image = ring_image()
+    for profile in PROFILES.values():
+        circles = coarse_to_fine_circles(image, profile, 20, param1=50, param2=30,
+                                         min_radius=10, max_radius=100, largest=True)
+        assert circles is not None, profile.name
+        x, y, r = max(circles[0], key=lambda c: c[2])
+        assert abs(x - 300) <= 3 and abs(y - 200) <= 3 and abs(r - 60) <= 3, (profile.name, x, y, r)
+
+
+def test_small_radius_uses_full_resolution():
+    """最小半径在粗层上无法分辨时与全分辨率HoughCircles结果相同"""
+    image = ring_image(radius=5)
+    expected = cv2.HoughCircles(image, cv2.HOUGH_GRADIENT, 1, 10, param1=30, param2=20, minRadius=2, maxRadius=8)
+    actual = coarse_to_fine_circles(image, PROFILES["balanced"], 10, param1=30, param2=20,
+                                    min_radius=2, max_radius=8)
+    assert (expected is None and actual is None) or np.array_equal(expected, actual)
+
+
+def test_analyzer_profiles():
+    """多分辨率模式输出与全分辨率模式结构相同"""
+    image = ring_image()
+    full = OCTAnalyzer("full")._analyze_oct_features(image)
+    for name in PROFILES:
+        features = OCTAnalyzer(name)._analyze_oct_features(image)
+        assert features.keys() == full.keys()
+        assert features['optic_nerve'].keys() == full['optic_nerve'].keys()
+        assert features['abnormalities'] == full['abnormalities']
+
+
+if __name__ == "__main__":
+    for test in (test_get_profile, test_coarse_to_fine_finds_circle,
+                 test_small_radius_uses_full_resolution, test_analyzer_profiles):
+        test()
+        print(f"✅ {test.__name__}")
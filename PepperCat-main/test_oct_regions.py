@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCT区域统计引擎回归测试
+对比向量化区域统计与原逐轮廓循环的检测结果（位置、面积、置信度、顺序）
+"""
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# 添加src目录到路径
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.tools.oct_analysis import OCTAnalyzer, OCTFeatureGraph
+from src.tools.oct_regions import RegionStats
+
+PICTURE_DIRS = ["pictures", os.path.join("..", "pictures")]
+SAMPLE_IMAGES = ["glaucoma_classification_1.png", "E.png"]
+
+
+def contour_regions(contours, min_area, confidence):
+    """原实现：逐个轮廓计算面积和外接矩形"""
+    regions = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area > min_area:
+            x, y, w, h = cv2.boundingRect(contour)
+            regions.append({'location': (x, y), 'size': area, 'confidence': confidence(area)})
+    return regions
+
+
+def contour_irregular_regions(contours):
+    """原实现：逐个轮廓计算不规则度"""
+    regions = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area > 30:
+            perimeter = cv2.arcLength(contour, True)
+            irregularity = perimeter * perimeter / (4 * np.pi * area)
+            if irregularity > 2.0:
+                x, y, w, h = cv2.boundingRect(contour)
+                regions.append({'location': (x, y), 'size': area, 'confidence': min(irregularity / 5.0, 1.0)})
+    return regions
+
+
+def reference_regions(graph):
+    return {
+        'bright': contour_regions(graph.contours('bright'), 20, lambda a: min(a / 100.0, 1.0)),
+        'dark': contour_regions(graph.contours('dark'), 10, lambda a: min(a / 50.0, 1.0)),
+        'irregular': contour_irregular_regions(graph.contours('edges')),
+    }
+
+
+def engine_regions(analyzer, graph):
+    return {
+        'bright': analyzer._bright_regions(graph),
+        'dark': analyzer._dark_regions(graph),
+        'irregular': analyzer._irregular_regions(graph),
+    }
+
+
+def assert_same_regions(expected, actual, label):
+    assert len(expected) == len(actual), f"{label}: 区域数量 {len(expected)} != {len(actual)}"
+    for i, (e, a) in enumerate(zip(expected, actual)):
+        assert e['location'] == a['location'], f"{label}[{i}]: 位置 {e['location']} != {a['location']}"
+        assert e['size'] == a['size'], f"{label}[{i}]: 面积 {e['size']} != {a['size']}"
+        assert abs(e['confidence'] - a['confidence']) < 1e-5, f"{label}[{i}]: 置信度 {e['confidence']} != {a['confidence']}"
+
+
+def synthetic_images():
+    """带层状结构、噪声和大小斑块的合成灰度图"""
+    images = []
+    for seed in range(3):
+        rng = np.random.default_rng(seed)
+        image = rng.normal(110, 35, size=(240, 320)).clip(0, 255).astype(np.uint8)
+        for _ in range(40):
+            center = (int(rng.integers(0, 320)), int(rng.integers(0, 240)))
+            axes = (int(rng.integers(1, 25)), int(rng.integers(1, 25)))
+            color = int(rng.choice([0, 30, 220, 255]))
+            cv2.ellipse(image, center, axes, float(rng.uniform(0, 180)), 0, 360, color, -1)
+        # 环形区域：外轮廓内含孔洞和孔洞中的小区域
+        cv2.circle(image, (160, 120), 30, 255, 6)
+        cv2.circle(image, (160, 120), 5, 255, -1)
+        images.append(cv2.GaussianBlur(image, (3, 3), 0))
+    return images
+
+
+def sample_images():
+    images = []
+    for name in SAMPLE_IMAGES:
+        for directory in PICTURE_DIRS:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                images.append(cv2.imread(path, cv2.IMREAD_GRAYSCALE))
+                break
+    return images
+
+
+def test_empty_contours():
+    stats = RegionStats.from_contours(())
+    assert len(stats) == 0
+    assert stats.to_regions(stats.area > 0, stats.area) == []
+
+
+def test_region_stats_match_contours():
+    """面积、外接矩形、周长与逐轮廓计算一致"""
+    for image in synthetic_images():
+        _, mask = cv2.threshold(image, 150, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        stats = RegionStats.from_contours(contours, min_points=1)
+        assert list(stats.index) == list(range(len(contours)))
+        for i, contour in enumerate(contours):
+            assert (stats.x[i], stats.y[i], stats.w[i], stats.h[i]) == cv2.boundingRect(contour)
+            assert stats.area[i] == cv2.contourArea(contour)
+            assert abs(stats.perimeter[i] - cv2.arcLength(contour, True)) < 1e-4
+
+        # 默认跳过的轮廓面积都为0
+        skipped = set(range(len(contours))) - set(RegionStats.from_contours(contours).index)
+        assert skipped and all(cv2.contourArea(contours[i]) == 0 for i in skipped)
+
+
+def test_regions_match_contour_loop():
+    """三类异常区域检测结果与原实现逐项一致"""
+    analyzer = OCTAnalyzer()
+    images = synthetic_images() + sample_images()
+    for n, image in enumerate(images):
+        expected = reference_regions(OCTFeatureGraph(image))
+        actual = engine_regions(analyzer, OCTFeatureGraph(image))
+        for kind in expected:
+            assert_same_regions(expected[kind], actual[kind], f"图片{n}/{kind}")
+
+
+def benchmark(repeats=5):
+    analyzer = OCTAnalyzer()
+    for n, image in enumerate(synthetic_images()[:1] + sample_images()):
+        graph = OCTFeatureGraph(image)
+        for mask in ('bright', 'dark', 'edges'):
+            graph.contours(mask)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            reference_regions(graph)
+        old = (time.perf_counter() - start) / repeats
+
+        new = 0.0
+        for _ in range(repeats):
+            # 每次使用新的特征图（区域统计会被缓存），阈值、边缘与轮廓提取不计入
+            fresh = OCTFeatureGraph(image)
+            for mask in ('bright', 'dark', 'edges'):
+                fresh.contours(mask)
+            start = time.perf_counter()
+            engine_regions(analyzer, fresh)
+            new += (time.perf_counter() - start) / repeats
+        print(f"图片{n} {image.shape}: 逐轮廓循环 {old * 1000:.2f}ms  向量化统计 {new * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    for test in (test_empty_contours, test_region_stats_match_contours, test_regions_match_contour_loop):
+        test()
+        print(f"✅ {test.__name__}")
+    benchmark()
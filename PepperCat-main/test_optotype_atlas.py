@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视标图集测试（项目根目录 optotype_atlas.py）
+
+- 带alpha的视标：与原先逐帧 旋转 → 缩放 → 浮点逐通道混合 的结果只差取整误差
+- 不透明视标：与原先 旋转 → 缩放 → 直接覆盖 的结果一致
+- 超出画面的视标被裁剪而不是报错；相同变体只渲染一次
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# optotype_atlas.py 位于项目根目录（PepperCat-main 的上一级）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optotype_atlas import DIRECTIONS, OptotypeAtlas, rotate
+
+SIZES = (0.3, 0.55, 1.0)
+
+
+def _alpha_e():
+    img = np.zeros((200, 200, 4), np.uint8)
+    cv2.putText(img, "E", (40, 160), cv2.FONT_HERSHEY_SIMPLEX, 5, (0, 0, 0, 255), 20, cv2.LINE_AA)
+    return img
+
+
+def _opaque_e():
+    img = np.ones((200, 200, 3), np.uint8) * 255
+    cv2.putText(img, "E", (50, 120), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 5)
+    return img
+
+
+def _old_draw(frame, img, size, direction):
+    """原先每帧的绘制方式（vision_test.VisionTester._update_display）"""
+    rotated = rotate(img, direction, (255, 255, 255, 0) if img.shape[2] == 4 else 0)
+    resized = cv2.resize(rotated, (int(rotated.shape[1] * size), int(rotated.shape[0] * size)))
+    y = (frame.shape[0] - resized.shape[0]) // 2
+    x = (frame.shape[1] - resized.shape[1]) // 2
+    roi = frame[y:y + resized.shape[0], x:x + resized.shape[1]]
+    if resized.shape[2] == 3:
+        roi[:] = resized
+        return frame
+    for c in range(3):
+        roi[:, :, c] = resized[:, :, c] * (resized[:, :, 3] / 255.0) + roi[:, :, c] * (1.0 - resized[:, :, 3] / 255.0)
+    return frame
+
+
+def _background(seed):
+    return np.random.default_rng(seed).integers(0, 256, (240, 320, 3), np.uint8)
+
+
+def test_alpha_blend_matches_float_blend():
+    img = _alpha_e()
+    atlas = OptotypeAtlas({'E': img})
+    for i, size in enumerate(SIZES):
+        for direction in DIRECTIONS:
+            background = _background(i)
+            expected = _old_draw(background.copy(), img, size, direction)
+            frame = background.copy()
+            atlas.draw(frame, 'E', size, direction)
+            diff = np.abs(expected.astype(np.int16) - frame.astype(np.int16))
+            assert diff.max() <= 2, (size, direction, diff.max())
+            assert diff.mean() < 0.01, (size, direction, diff.mean())
+
+
+def test_opaque_copy_matches_old_draw():
+    img = _opaque_e()
+    atlas = OptotypeAtlas({'E': img}, border_value=0)
+    for i, size in enumerate(SIZES):
+        for direction in DIRECTIONS:
+            background = _background(i)
+            expected = _old_draw(background.copy(), img, size, direction)
+            frame = background.copy()
+            atlas.draw(frame, 'E', size, direction)
+            np.testing.assert_array_equal(frame, expected)
+
+
+def test_oversized_sprite_clipped_and_cached():
+    atlas = OptotypeAtlas({'E': _alpha_e()})
+    frame = _background(0)
+    x, y, w, h = atlas.draw(frame, 'E', 2.0, 90)
+    assert (x, y, w, h) == (0, 0, 320, 240)
+    for _ in range(5):
+        atlas.draw(frame, 'E', 2.0, 90)
+    assert atlas.rendered == 1
+    # 大小换算为相同的像素尺寸时共用同一个变体
+    atlas.draw(frame, 'E', 2.001, 90)
+    assert atlas.rendered == 1
+
+
+if __name__ == "__main__":
+    for test in (test_alpha_blend_matches_float_blend, test_opaque_copy_matches_old_draw,
+                 test_oversized_sprite_clipped_and_cached):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+贝叶斯自适应阶梯测试（项目根目录 staircase.py）
+
+用固定随机种子的模拟被试（按同一心理测量函数作答）检查：
+- 阈值估计收敛到被试的真实阈值附近，试次数不超过 MAX_TRIALS
+- 最小视标也能看清的被试很快结束，视力为表上最高值
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+
+# staircase.py 位于项目根目录（PepperCat-main 的上一级）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from staircase import MAX_TRIALS, QuestStaircase, vision_level
+
+SEEDS = range(20)
+
+
+def _run(true_threshold, seed, mode='e_chart'):
+    rng = np.random.default_rng(seed)
+    staircase = QuestStaircase.for_mode(mode)
+    while not staircase.finished:
+        value = staircase.next_value()
+        p = staircase.model.p_correct(math.log10(value), math.log10(true_threshold))
+        staircase.update(value, bool(rng.random() < p))
+    return staircase
+
+
+def test_converges_to_observer_threshold():
+    for true_threshold in (0.15, 0.3, 0.6):
+        errors = []
+        for seed in SEEDS:
+            staircase = _run(true_threshold, seed)
+            assert staircase.trials <= MAX_TRIALS
+            errors.append(abs(math.log10(staircase.threshold()) - math.log10(true_threshold)))
+        # 单次误差在可信区间宽度（0.3 log10）以内，平均约半行视力表
+        assert max(errors) < 0.25, (true_threshold, max(errors))
+        assert np.mean(errors) < 0.1, (true_threshold, np.mean(errors))
+
+
+def test_contrast_converges():
+    errors = [abs(math.log10(_run(0.05, seed, 'contrast').threshold()) - math.log10(0.05)) for seed in SEEDS]
+    assert np.mean(errors) < 0.15, np.mean(errors)
+
+
+def test_sharp_observer_stops_early():
+    staircase = _run(0.02, seed=0)
+    assert staircase.trials < MAX_TRIALS
+    assert vision_level(staircase.threshold(), staircase.low) == 5.8
+
+
+if __name__ == "__main__":
+    for test in (test_converges_to_observer_threshold, test_contrast_converges, test_sharp_observer_stops_early):
+        test()
+        print(f"✅ {test.__name__}")
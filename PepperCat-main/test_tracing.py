@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+执行追踪测试（openmanus_core/tracing.py）
+
+- 嵌套span组成一个trace，父子关系、异常和属性被记录
+- 未采样时不产生trace；子span继承根span的采样决定
+- 根span结束后才结束的子span（对冲请求中被取消的后端调用）附加到已完成的trace，
+  trace已被挤出缓冲区时丢弃，都不会滞留在待完成的记录中
+- JSONL导出
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+# openmanus_core 位于项目根目录（PepperCat-main 的上一级）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openmanus_core.tracing import NOOP_SPAN, JsonlTraceExporter, Tracer
+
+
+def test_nested_spans():
+    tracer = Tracer(sample_rate=1.0)
+    with tracer.span("agent.step", step=1) as root:
+        with tracer.span("llm.ask") as child:
+            tracer.current_span().set_attribute("model", "test")
+        try:
+            with tracer.span("tool.run"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+    (trace,) = tracer.get_traces()
+    assert trace["trace_id"] == root.trace_id and trace["name"] == "agent.step"
+    names = [s["name"] for s in trace["spans"]]
+    assert names == ["agent.step", "llm.ask", "tool.run"]
+    spans = {s["name"]: s for s in trace["spans"]}
+    assert spans["llm.ask"]["parent_id"] == root.span_id
+    assert spans["llm.ask"]["attributes"] == {"model": "test"}
+    assert spans["tool.run"]["error"] == "ValueError: boom"
+    assert spans["agent.step"]["attributes"] == {"step": 1}
+    assert child.duration_ms is not None
+    assert not tracer._pending
+
+
+def test_sampling():
+    tracer = Tracer(sample_rate=0.0)
+    with tracer.span("root") as root:
+        with tracer.span("child") as child:
+            pass
+    assert root is NOOP_SPAN and child is NOOP_SPAN
+    assert tracer.get_traces() == []
+
+    # 根span未被采样时子span也不采样
+    tracer = Tracer(sample_rate=1e-9)
+    with tracer.span("root"):
+        with tracer.span("child") as child:
+            assert child is NOOP_SPAN
+    assert tracer.get_traces() == [] and not tracer._pending
+
+
+def test_child_ending_after_root():
+    tracer = Tracer(sample_rate=1.0)
+    release = None
+
+    async def backend():
+        with tracer.span("llm.backend", backend="slow"):
+            await release.wait()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        with tracer.span("llm.ask"):
+            # 对冲中落败的请求：根span返回时它还在进行
+            loser = asyncio.ensure_future(backend())
+            await asyncio.sleep(0)
+        release.set()
+        await loser
+
+    asyncio.run(scenario())
+    assert not tracer._pending
+    (trace,) = tracer.get_traces()
+    late = [s for s in trace["spans"] if s.get("late")]
+    assert [s["name"] for s in late] == ["llm.backend"]
+
+
+def test_late_span_dropped_after_eviction():
+    tracer = Tracer(sample_rate=1.0, buffer_size=1)
+    release = None
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+
+        async def backend():
+            with tracer.span("llm.backend"):
+                await release.wait()
+
+        with tracer.span("first"):
+            loser = asyncio.ensure_future(backend())
+            await asyncio.sleep(0)
+        with tracer.span("second"):
+            pass
+        release.set()
+        await loser
+
+    asyncio.run(scenario())
+    assert not tracer._pending
+    (trace,) = tracer.get_traces()
+    assert trace["name"] == "second" and len(trace["spans"]) == 1
+
+
+def test_jsonl_export():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        tracer = Tracer(sample_rate=1.0, exporter=JsonlTraceExporter(path))
+        for i in range(2):
+            with tracer.span("root", index=i):
+                pass
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+    assert [line["spans"][0]["attributes"]["index"] for line in lines] == [0, 1]
+
+
+if __name__ == "__main__":
+    for test in (test_nested_spans, test_sampling, test_child_ending_after_root, test_late_span_dropped_after_eviction,
+                 test_jsonl_export):
+        test()
+        print(f"✅ {test.__name__}")
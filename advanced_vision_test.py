@@ -1,7 +1,6 @@
 # advanced_vision_test.py
 import cv2
 import numpy as np
-import mediapipe as mp
 import time
 import json
 import os
@@ -9,19 +8,27 @@ from enum import Enum
 from typing import Dict, List, Tuple, Optional
 import threading
 import queue
+import random
+from collections import deque
+
+from camera_broker import CameraStream
+from eye_state import EyeStateMonitor
+from landmark_geometry import as_points, estimate_distance_cm, pointing_direction
+from optotype_atlas import DIRECTIONS, OptotypeAtlas
+from staircase import QuestStaircase, vision_level
+
+# 眼动追踪界面显示的轨迹长度（帧）
+EYE_TRAIL_FRAMES = 90
+
+# 对比度阈值（刚好能看到的对比度）不超过该值视为对比度敏感度良好
+CONTRAST_THRESHOLD_NORMAL = 0.1
 
 class AdvancedVisionTest:
     """高级视力检测系统"""
     
     def __init__(self):
-        self.cap = cv2.VideoCapture(0)
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
-            max_num_faces=1, refine_landmarks=True,
-            min_detection_confidence=0.5, min_tracking_confidence=0.5
-        )
-        self.hands = mp.solutions.hands.Hands(
-            min_detection_confidence=0.5, min_tracking_confidence=0.5
-        )
+        # 共享摄像头订阅：帧已镜像翻转，面部/手部关键点由代理推理
+        self.camera = CameraStream()
         
         # 测试状态
         self.is_testing = False
@@ -30,15 +37,22 @@ class AdvancedVisionTest:
         
         # 初始化测试参数
         self._init_parameters()
+        
+        # E字视标只绘制一次，各方向和大小的变体由图集缓存
+        self.atlas = OptotypeAtlas({'E': self._create_e_image()})
     
     def _init_parameters(self):
         """初始化测试参数"""
         self.distance = 60  # 标准距离60cm
-        self.current_size = 0.5
+        self.staircase = QuestStaircase.for_mode('e_chart')
+        self.current_size = self.staircase.next_value()
         self.direction = 0
         self.correct_count = 0
         self.total_count = 0
         self.response_times = []
+        # 每个视标至少显示 display_duration 秒后才接受回答，每次呈现只计一次回答
+        self.display_duration = 2.0
+        self.last_change_time = time.time()
         
     def start_comprehensive_test(self) -> Dict:
         """开始综合视力测试"""
@@ -80,39 +94,32 @@ class AdvancedVisionTest:
         """基础视力测试（改进版E字表）"""
         self.is_testing = True
         test_start = time.time()
+        self.last_change_time = test_start
         
-        while self.is_testing and self.total_count < 10:
-            ret, frame = self.cap.read()
-            if not ret:
+        while self.is_testing and not self.staircase.finished:
+            snapshot = self.camera.read()
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
-            
-            # 处理帧
-            frame = cv2.flip(frame, 1)
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # 检测面部和手势
-            face_results = self.face_mesh.process(rgb_frame)
-            hand_results = self.hands.process(rgb_frame)
+            frame = snapshot.frame
             
             # 更新距离检测
-            if face_results.multi_face_landmarks:
-                self.distance = self._calculate_distance(face_results.multi_face_landmarks[0])
+            if snapshot.face is not None:
+                self.distance = self._calculate_distance(snapshot.face)
             
-            # 检测手势响应
-            if hand_results.multi_hand_landmarks:
-                hand_direction = self._detect_hand_direction(hand_results.multi_hand_landmarks[0])
+            # 检测手势响应（视标显示满 display_duration 后才计入，回答后立即换下一个视标）
+            if snapshot.hand is not None and time.time() - self.last_change_time >= self.display_duration:
+                hand_direction = self._detect_hand_direction(snapshot.hand)
                 if hand_direction is not None:
                     self._process_response(hand_direction)
             
             # 显示测试内容
             self._display_test_content(frame)
             
-            # 检查退出条件
-            if self.total_count >= 10 or self.correct_count >= 8:
-                break
-        
         test_duration = time.time() - test_start
         accuracy = self.correct_count / max(self.total_count, 1)
+        summary = self.staircase.summary()
         
         return {
             'accuracy': accuracy,
@@ -120,7 +127,9 @@ class AdvancedVisionTest:
             'total_count': self.total_count,
             'average_response_time': np.mean(self.response_times) if self.response_times else 0,
             'test_duration': test_duration,
-            'estimated_vision': self._estimate_vision_level(accuracy)
+            'threshold_size': summary['threshold'],
+            'credible_interval': summary['credible_interval'],
+            'estimated_vision': self._estimate_vision_level()
         }
     
     def _color_vision_test(self) -> Dict:
@@ -147,16 +156,18 @@ class AdvancedVisionTest:
         response_time = None
         
         while time.time() - start_time < 10:  # 10秒超时
-            ret, frame = self.cap.read()
-            if not ret:
+            snapshot = self.camera.read()
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
+            frame = snapshot.frame
             
             # 显示测试图像
             self._display_color_test(frame, test_img)
             
             # 检测手势响应
-            hand_results = self.hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            if hand_results.multi_hand_landmarks:
+            if snapshot.hand is not None:
                 response_time = time.time() - start_time
                 break
         
@@ -177,17 +188,21 @@ class AdvancedVisionTest:
         return img
     
     def _contrast_test(self) -> Dict:
-        """对比度敏感度测试"""
-        contrast_levels = [1.0, 0.8, 0.6, 0.4, 0.2]
-        contrast_results = {}
+        """对比度敏感度测试：贝叶斯阶梯逐次选择对比度，估计刚好能看到的对比度阈值"""
+        staircase = QuestStaircase.for_mode('contrast')
+        contrast_results = []
         
-        for level in contrast_levels:
-            result = self._single_contrast_test(level)
-            contrast_results[level] = result
+        while not staircase.finished and self.camera.isOpened():
+            level = staircase.next_value()
+            detected = self._single_contrast_test(level)
+            staircase.update(level, detected)
+            contrast_results.append({'contrast': level, 'detected': detected})
         
+        summary = staircase.summary()
         return {
             'contrast_results': contrast_results,
-            'threshold': self._find_contrast_threshold(contrast_results)
+            'threshold': summary['threshold'],
+            'credible_interval': summary['credible_interval']
         }
     
     def _single_contrast_test(self, contrast_level: float) -> bool:
@@ -199,16 +214,18 @@ class AdvancedVisionTest:
         detected = False
         
         while time.time() - start_time < 5:  # 5秒超时
-            ret, frame = self.cap.read()
-            if not ret:
+            snapshot = self.camera.read()
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
+            frame = snapshot.frame
             
             # 显示测试图像
             self._display_contrast_test(frame, test_img)
             
             # 检测手势响应
-            hand_results = self.hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            if hand_results.multi_hand_landmarks:
+            if snapshot.hand is not None:
                 detected = True
                 break
         
@@ -241,135 +258,65 @@ class AdvancedVisionTest:
         detected = False
         
         while time.time() - start_time < 3:  # 3秒超时
-            ret, frame = self.cap.read()
-            if not ret:
+            snapshot = self.camera.read()
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
+            frame = snapshot.frame
             
             # 在指定位置显示测试点
             self._display_peripheral_test(frame, position)
             
             # 检测手势响应
-            hand_results = self.hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            if hand_results.multi_hand_landmarks:
+            if snapshot.hand is not None:
                 detected = True
                 break
         
         return detected
     
     def _eye_tracking_analysis(self) -> Dict:
-        """眼动追踪分析"""
-        tracking_data = []
+        """眼动追踪分析：逐帧更新眼睛状态（开合度统计、眨眼检测），内存占用固定"""
+        monitor = EyeStateMonitor()
+        trail = deque(maxlen=EYE_TRAIL_FRAMES)
         start_time = time.time()
         
         while time.time() - start_time < 30:  # 30秒眼动追踪
-            ret, frame = self.cap.read()
-            if not ret:
+            snapshot = self.camera.read()
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
+            frame = snapshot.frame
             
-            # 处理帧
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_results = self.face_mesh.process(rgb_frame)
-            
-            if face_results.multi_face_landmarks:
-                eye_data = self._extract_eye_data(face_results.multi_face_landmarks[0])
-                tracking_data.append({
-                    'timestamp': time.time() - start_time,
-                    'eye_data': eye_data
-                })
+            if snapshot.face is not None:
+                _, centers, _ = monitor.update_face(snapshot.captured_at, snapshot.face)
+                trail.append(centers)
             
             # 显示眼动追踪界面
-            self._display_eye_tracking(frame, tracking_data)
-        
-        return self._analyze_eye_tracking(tracking_data)
-    
-    def _extract_eye_data(self, landmarks) -> Dict:
-        """提取眼动数据"""
-        # 左眼关键点
-        left_eye = [
-            landmarks.landmark[33],   # 左眼外角
-            landmarks.landmark[133],  # 左眼内角
-            landmarks.landmark[160],  # 左眼上眼睑
-            landmarks.landmark[159],  # 左眼下眼睑
-        ]
+            self._display_eye_tracking(frame, trail, monitor)
         
-        # 右眼关键点
-        right_eye = [
-            landmarks.landmark[362],  # 右眼外角
-            landmarks.landmark[263],  # 右眼内角
-            landmarks.landmark[386],  # 右眼上眼睑
-            landmarks.landmark[385],  # 右眼下眼睑
-        ]
-        
-        return {
-            'left_eye': {
-                'center': self._calculate_eye_center(left_eye),
-                'openness': self._calculate_eye_openness(left_eye)
-            },
-            'right_eye': {
-                'center': self._calculate_eye_center(right_eye),
-                'openness': self._calculate_eye_openness(right_eye)
-            }
-        }
+        return self._analyze_eye_tracking(monitor)
     
-    def _calculate_eye_center(self, eye_landmarks) -> Tuple[float, float]:
-        """计算眼睛中心点"""
-        x_coords = [landmark.x for landmark in eye_landmarks]
-        y_coords = [landmark.y for landmark in eye_landmarks]
-        return (np.mean(x_coords), np.mean(y_coords))
-    
-    def _calculate_eye_openness(self, eye_landmarks) -> float:
-        """计算眼睛开合度"""
-        # 计算上下眼睑之间的距离
-        upper_lid = eye_landmarks[2]
-        lower_lid = eye_landmarks[3]
-        distance = np.sqrt((upper_lid.x - lower_lid.x)**2 + (upper_lid.y - lower_lid.y)**2)
-        return distance
-    
-    def _analyze_eye_tracking(self, tracking_data: List[Dict]) -> Dict:
-        """分析眼动追踪数据"""
-        if not tracking_data:
+    def _analyze_eye_tracking(self, monitor: EyeStateMonitor) -> Dict:
+        """汇总眼动追踪结果"""
+        if monitor.openness_stats.count == 0:
             return {'error': 'No tracking data available'}
         
-        # 计算眼动统计
-        left_eye_centers = [data['eye_data']['left_eye']['center'] for data in tracking_data]
-        right_eye_centers = [data['eye_data']['right_eye']['center'] for data in tracking_data]
-        openness_values = [
-            (data['eye_data']['left_eye']['openness'] + data['eye_data']['right_eye']['openness']) / 2
-            for data in tracking_data
-        ]
-        
-        # 计算眼动范围
-        left_x_range = max([center[0] for center in left_eye_centers]) - min([center[0] for center in left_eye_centers])
-        left_y_range = max([center[1] for center in left_eye_centers]) - min([center[1] for center in left_eye_centers])
-        right_x_range = max([center[0] for center in right_eye_centers]) - min([center[0] for center in right_eye_centers])
-        right_y_range = max([center[1] for center in right_eye_centers]) - min([center[1] for center in right_eye_centers])
-        
+        metrics = monitor.metrics()
+        movement = monitor.movement_range().tolist()
         return {
-            'average_openness': np.mean(openness_values),
-            'openness_variance': np.var(openness_values),
-            'left_eye_movement_range': (left_x_range, left_y_range),
-            'right_eye_movement_range': (right_x_range, right_y_range),
-            'blink_frequency': self._calculate_blink_frequency(openness_values),
-            'eye_fatigue_score': self._calculate_eye_fatigue_score(openness_values)
+            'average_openness': metrics['average_openness'],
+            'openness_variance': metrics['openness_variance'],
+            'left_eye_movement_range': tuple(movement[0]),
+            'right_eye_movement_range': tuple(movement[1]),
+            'blink_frequency': metrics['blink_frequency'],
+            'blinks_per_minute': metrics['blinks_per_minute'],
+            'perclos': metrics['perclos'],
+            'long_closures': metrics['long_closures'],
+            'eye_fatigue_score': metrics['eye_fatigue_score']
         }
     
-    def _calculate_blink_frequency(self, openness_values: List[float]) -> float:
-        """计算眨眼频率"""
-        threshold = np.mean(openness_values) * 0.7
-        blinks = sum(1 for i in range(1, len(openness_values)) 
-                    if openness_values[i] < threshold and openness_values[i-1] >= threshold)
-        return blinks / (len(openness_values) / 30)  # 假设30fps
-    
-    def _calculate_eye_fatigue_score(self, openness_values: List[float]) -> float:
-        """计算眼疲劳评分"""
-        # 基于眼睛开合度的变化计算疲劳评分
-        variance = np.var(openness_values)
-        mean_openness = np.mean(openness_values)
-        
-        # 疲劳评分：开合度变化大且平均值较低表示疲劳
-        fatigue_score = (1 - mean_openness) * variance * 10
-        return min(1.0, fatigue_score)
-    
     def _generate_comprehensive_report(self, results: Dict) -> Dict:
         """生成综合视力报告"""
         report = {
@@ -399,9 +346,9 @@ class AdvancedVisionTest:
         assessment = []
         
         # 基础视力评估
-        if basic_vision.get('accuracy', 0) < 0.7:
+        if basic_vision.get('estimated_vision', 0) < 4.8:
             assessment.append("基础视力需要关注")
-        elif basic_vision.get('accuracy', 0) < 0.9:
+        elif basic_vision.get('estimated_vision', 0) < 5.2:
             assessment.append("基础视力良好")
         else:
             assessment.append("基础视力优秀")
@@ -414,7 +361,7 @@ class AdvancedVisionTest:
         
         # 对比度敏感度评估
         contrast_threshold = contrast_sensitivity.get('threshold', 1.0)
-        if contrast_threshold > 0.6:
+        if contrast_threshold <= CONTRAST_THRESHOLD_NORMAL:
             assessment.append("对比度敏感度良好")
         else:
             assessment.append("对比度敏感度需要关注")
@@ -444,7 +391,7 @@ class AdvancedVisionTest:
         eye_tracking = results.get('eye_tracking', {})
         
         # 基于基础视力的建议
-        if basic_vision.get('accuracy', 0) < 0.7:
+        if basic_vision.get('estimated_vision', 0) < 4.8:
             recommendations.append("建议进行专业眼科检查")
         
         # 基于色觉的建议
@@ -479,89 +426,40 @@ class AdvancedVisionTest:
     
     # 辅助方法
     def _calculate_distance(self, landmarks) -> float:
-        """计算面部距离"""
-        left_eye = landmarks.landmark[159]
-        right_eye = landmarks.landmark[386]
-        eye_distance_px = np.sqrt((right_eye.x - left_eye.x)**2 + (right_eye.y - left_eye.y)**2)
-        
-        # 使用物理模型计算距离
-        average_face_width = 0.16  # 米
-        focal_length = 600  # 相机焦距
-        distance = (average_face_width * focal_length) / (eye_distance_px * self.cap.get(3))
-        return max(30, min(100, distance * 100))  # 转换为厘米
+        """计算面部距离（厘米）"""
+        distance = float(estimate_distance_cm(as_points(landmarks), self.camera.frame_width))
+        return max(30, min(100, distance))
     
     def _detect_hand_direction(self, hand_landmarks) -> Optional[int]:
-        """检测手势方向"""
-        # 简化的手势检测逻辑
-        wrist = hand_landmarks.landmark[0]
-        index_tip = hand_landmarks.landmark[8]
-        
-        # 计算手指方向
-        dx = index_tip.x - wrist.x
-        dy = index_tip.y - wrist.y
-        angle = np.degrees(np.arctan2(dy, dx))
-        
-        # 映射到四个方向
-        direction = int((angle + 45) % 360 // 90) * 90
-        return direction
+        """检测手势方向（腕→食指尖，映射到四个方向）"""
+        return pointing_direction(as_points(hand_landmarks))
     
     def _process_response(self, detected_direction: int):
         """处理用户响应"""
         self.total_count += 1
-        if detected_direction == self.direction:
+        correct = detected_direction == self.direction
+        if correct:
             self.correct_count += 1
         
-        # 记录响应时间
-        self.response_times.append(time.time())
+        # 记录响应时间（从视标出现到回答）
+        now = time.time()
+        self.response_times.append(now - self.last_change_time)
         
-        # 更新测试参数
-        self.direction = (self.direction + 90) % 360
-        if self.correct_count < self.total_count - 2:
-            self.current_size = min(1.0, self.current_size * 1.1)
-        else:
-            self.current_size = max(0.1, self.current_size * 0.9)
+        # 更新测试参数：后验更新后由阶梯选择下一个大小，方向随机
+        self.staircase.update(self.current_size, correct)
+        self.current_size = self.staircase.next_value()
+        self.direction = random.choice(DIRECTIONS)
+        self.last_change_time = now
     
-    def _estimate_vision_level(self, accuracy: float) -> float:
-        """估算视力水平"""
-        # 基于准确率估算视力
-        if accuracy >= 0.9:
-            return 5.0
-        elif accuracy >= 0.8:
-            return 4.8
-        elif accuracy >= 0.7:
-            return 4.6
-        elif accuracy >= 0.6:
-            return 4.4
-        else:
-            return 4.0
-    
-    def _find_contrast_threshold(self, contrast_results: Dict) -> float:
-        """找到对比度阈值"""
-        for level in sorted(contrast_results.keys(), reverse=True):
-            if contrast_results[level]:
-                return float(level)
-        return 0.0
+    def _estimate_vision_level(self) -> float:
+        """估算视力水平（视标大小阈值的后验估计）"""
+        return vision_level(self.staircase.threshold(), self.staircase.low)
     
     # 显示方法
     def _display_test_content(self, frame: np.ndarray):
         """显示测试内容"""
-        # 创建测试图像
-        test_img = np.ones((200, 200, 3), dtype=np.uint8) * 255
-        cv2.putText(test_img, "E", (50, 120), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 5)
-        
-        # 旋转图像
-        rotated_img = self._rotate_image(test_img, self.direction)
-        resized_img = cv2.resize(rotated_img, 
-                                (int(rotated_img.shape[1] * self.current_size),
-                                 int(rotated_img.shape[0] * self.current_size)))
-        
-        # 合并到主画面
-        x_offset = (frame.shape[1] - resized_img.shape[1]) // 2
-        y_offset = (frame.shape[0] - resized_img.shape[0]) // 2
-        
-        if x_offset >= 0 and y_offset >= 0:
-            frame[y_offset:y_offset+resized_img.shape[0], 
-                 x_offset:x_offset+resized_img.shape[1]] = resized_img
+        # 合并到主画面中央
+        self.atlas.draw(frame, 'E', self.current_size, self.direction)
         
         # 添加信息显示
         info_text = [
@@ -620,51 +518,33 @@ class AdvancedVisionTest:
         cv2.imshow('Peripheral Vision Test', frame)
         cv2.waitKey(1)
     
-    def _display_eye_tracking(self, frame: np.ndarray, tracking_data: List[Dict]):
+    def _display_eye_tracking(self, frame: np.ndarray, trail: deque, monitor: EyeStateMonitor):
         """显示眼动追踪"""
-        # 绘制眼动轨迹
-        if len(tracking_data) > 1:
-            for i in range(1, len(tracking_data)):
-                prev_data = tracking_data[i-1]['eye_data']
-                curr_data = tracking_data[i]['eye_data']
-                
-                prev_left = prev_data['left_eye']['center']
-                curr_left = curr_data['left_eye']['center']
-                prev_right = prev_data['right_eye']['center']
-                curr_right = curr_data['right_eye']['center']
-                
-                # 绘制左眼轨迹
-                cv2.line(frame, 
-                         (int(prev_left[0] * frame.shape[1]), int(prev_left[1] * frame.shape[0])),
-                         (int(curr_left[0] * frame.shape[1]), int(curr_left[1] * frame.shape[0])),
-                         (0, 255, 0), 2)
-                
-                # 绘制右眼轨迹
-                cv2.line(frame, 
-                         (int(prev_right[0] * frame.shape[1]), int(prev_right[1] * frame.shape[0])),
-                         (int(curr_right[0] * frame.shape[1]), int(curr_right[1] * frame.shape[0])),
-                         (255, 0, 0), 2)
+        # 绘制最近的眼动轨迹
+        if len(trail) > 1:
+            points = np.array(trail) * (frame.shape[1], frame.shape[0])
+            cv2.polylines(frame, [points[:, 0].astype(np.int32)], False, (0, 255, 0), 2)  # 左眼
+            cv2.polylines(frame, [points[:, 1].astype(np.int32)], False, (255, 0, 0), 2)  # 右眼
         
         cv2.putText(frame, "眼动追踪中...", (10, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        cv2.putText(frame, f"眨眼: {monitor.blink_count}  PERCLOS: {monitor.perclos():.0%}", (10, 60),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
         cv2.imshow('Eye Tracking', frame)
         cv2.waitKey(1)
     
     @staticmethod
-    def _rotate_image(img: np.ndarray, angle: int) -> np.ndarray:
-        """旋转图像"""
-        h, w = img.shape[:2]
-        center = (w // 2, h // 2)
-        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-        return cv2.warpAffine(img, M, (w, h))
+    def _create_e_image() -> np.ndarray:
+        """创建E字视标（白底黑字）"""
+        img = np.ones((200, 200, 3), dtype=np.uint8) * 255
+        cv2.putText(img, "E", (50, 120), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 5)
+        return img
     
     def cleanup(self):
         """清理资源"""
-        self.cap.release()
+        self.camera.close()
         cv2.destroyAllWindows()
-        self.face_mesh.close()
-        self.hands.close()
 
 # 使用示例
 if __name__ == "__main__":
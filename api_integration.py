@@ -1,11 +1,14 @@
 # api_integration.py
 import requests
 
+from openmanus_core.llm_scheduler import Priority, backend_for_url, estimate_tokens, scheduler
+
 class DeepseekAPI:
     def __init__(self):
         # 设置 API 密钥和端点
         self.api_key = "sk-ckblwoobzunmdgolnyeoeuyiswsytxtoywmepoarropzelgy"
         self.url = "https://api.siliconflow.cn/v1/chat/completions"
+        self.backend = backend_for_url(self.url)
         
         # 构造请求头
         self.headers = {
@@ -13,7 +16,15 @@ class DeepseekAPI:
             "Content-Type": "application/json"
         }
 
-    def get_health_advice(self, symptoms):
+    def _post(self, data):
+        """发送请求，并把实际输出token计入调度器预算"""
+        response = requests.post(self.url, headers=self.headers, json=data)
+        if response.status_code == 200:
+            usage = response.json().get('usage', {})
+            scheduler.record_tokens(self.backend, usage.get('completion_tokens', 0))
+        return response
+
+    def get_health_advice(self, symptoms, priority=Priority.INTERACTIVE):
         """获取健康建议"""
         # 构造请求体
         data = {
@@ -33,8 +44,16 @@ class DeepseekAPI:
         }
 
         try:
-            # 发送 POST 请求
-            response = requests.post(self.url, headers=self.headers, json=data)
+            # 发送 POST 请求（经全局调度器排队，相同的在途请求只发送一次）
+            prompt_tokens = sum(estimate_tokens(m["content"]) for m in data["messages"])
+            response = scheduler.run(
+                self.backend,
+                self._post,
+                data,
+                priority=priority,
+                tokens=prompt_tokens,
+                dedup_key=scheduler.make_key(self.url, data),
+            )
             
             # 处理响应
             if response.status_code == 200:
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视力阈值估计基准测试：贝叶斯阶梯（QUEST）与原有步长规则
+
+用合成被试模拟答题：每个被试的真实阈值在刺激范围内按对数均匀抽取，按 Weibull 心理测量函数
+随机答对/答错（斜率可与 QUEST 假设的不同，检验模型失配时的稳健性）。对比：
+- quest:        staircase.QuestStaircase，可信区间足够窄时结束
+- vision_test:  原 VisionTester 规则（答对×0.9、答错×1.1，连续答错两次结束，报最终大小）
+- advanced:     原 AdvancedVisionTest 规则（答错过多时×1.1否则×0.9，答满10次或答对8次结束）
+- contrast_levels: 原对比度测试（依次呈现 1.0/0.8/0.6/0.4/0.2，报看到的最高对比度）
+
+E字表类模式对比前两种原规则，对比度模式对比最后一种。统计每种方法的试次数和估计误差
+（log10单位，偏差与RMSE，误差在±0.1即视力表一行以内的比例）。
+
+用法: python benchmark_staircase.py [--observers 500] [--modes e_chart contrast] [--true-slope 3.5]
+"""
+
+import argparse
+import math
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from staircase import MODES, PsychometricModel, QuestStaircase
+
+LEGACY_MAX_TRIALS = 200  # 原规则没有试次上限，模拟时截断
+LEGACY_START_SIZE = 0.5  # 原规则的初始视标大小
+CONTRAST_LEVELS = [1.0, 0.8, 0.6, 0.4, 0.2]
+
+
+def quest_rule(mode: str, answer: Callable[[float], bool]) -> Tuple[int, float]:
+    staircase = QuestStaircase.for_mode(mode)
+    while not staircase.finished:
+        value = staircase.next_value()
+        staircase.update(value, answer(value))
+    return staircase.trials, staircase.threshold()
+
+
+def vision_test_rule(mode: str, answer: Callable[[float], bool]) -> Tuple[int, float]:
+    low, high = MODES[mode]['low'], MODES[mode]['high']
+    size, errors, trials = LEGACY_START_SIZE, 0, 0
+    while errors < 2 and trials < LEGACY_MAX_TRIALS:
+        trials += 1
+        errors = 0 if answer(size) else errors + 1
+        if errors >= 2:
+            break
+        size = min(high, size * 1.1) if errors else max(low, size * 0.9)
+    return trials, size
+
+
+def advanced_rule(mode: str, answer: Callable[[float], bool]) -> Tuple[int, float]:
+    low, high = MODES[mode]['low'], MODES[mode]['high']
+    size, correct, trials = LEGACY_START_SIZE, 0, 0
+    while trials < 10 and correct < 8:
+        trials += 1
+        correct += answer(size)
+        size = min(high, size * 1.1) if correct < trials - 2 else max(low, size * 0.9)
+    return trials, size
+
+
+def contrast_levels_rule(mode: str, answer: Callable[[float], bool]) -> Tuple[int, float]:
+    detected = [level for level in CONTRAST_LEVELS if answer(level)]
+    return len(CONTRAST_LEVELS), max(detected) if detected else MODES[mode]['low']
+
+
+def rules_for(mode: str) -> Dict[str, Callable]:
+    if mode == 'contrast':
+        return {'quest': quest_rule, 'contrast_levels': contrast_levels_rule}
+    return {'quest': quest_rule, 'vision_test': vision_test_rule, 'advanced': advanced_rule}
+
+
+def simulate(mode: str, observers: int, true_slope: float, seed: int) -> Dict[str, Dict[str, float]]:
+    rng = np.random.default_rng(seed)
+    low, high = MODES[mode]['low'], MODES[mode]['high']
+    model = MODES[mode]['model']
+    observer_model = PsychometricModel(true_slope, model.guess, model.lapse)
+    true_thresholds = rng.uniform(math.log10(low), math.log10(high), observers)
+
+    results = {}
+    for name, rule in rules_for(mode).items():
+        trials: List[int] = []
+        errors: List[float] = []
+        answer_rng = np.random.default_rng(seed + 1)
+        for theta in true_thresholds:
+            def answer(value: float) -> bool:
+                return bool(answer_rng.random() < observer_model.p_correct(math.log10(value), theta))
+
+            count, estimate = rule(mode, answer)
+            trials.append(count)
+            errors.append(math.log10(estimate) - theta)
+        trials_arr, errors_arr = np.array(trials), np.array(errors)
+        results[name] = {
+            'mean_trials': float(trials_arr.mean()),
+            'p95_trials': float(np.percentile(trials_arr, 95)),
+            'bias': float(errors_arr.mean()),
+            'rmse': float(np.sqrt((errors_arr ** 2).mean())),
+            'within_line': float((np.abs(errors_arr) <= 0.1).mean()),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--observers', type=int, default=500)
+    parser.add_argument('--modes', nargs='+', default=['e_chart', 'contrast'], choices=sorted(MODES))
+    parser.add_argument('--true-slope', type=float, default=3.5, help='合成被试心理测量函数的斜率')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        print(f"\n模式 {mode}（{args.observers} 个合成被试，斜率 {args.true_slope}）")
+        print(f"{'方法':<14}{'平均试次':>10}{'P95试次':>10}{'偏差':>9}{'RMSE':>9}{'一行以内':>10}")
+        for name, r in simulate(mode, args.observers, args.true_slope, args.seed).items():
+            print(f"{name:<14}{r['mean_trials']:>10.1f}{r['p95_trials']:>10.0f}{r['bias']:>+9.3f}"
+                  f"{r['rmse']:>9.3f}{r['within_line']:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
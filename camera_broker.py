@@ -0,0 +1,538 @@
+# camera_broker.py
+"""
+共享摄像头与关键点代理
+
+视力检测、高级视力检测、训练游戏和PepperCat视力检测窗口以前各自打开摄像头、
+各自创建MediaPipe FaceMesh/Hands：切换模块时每次都要重新打开摄像头和加载模型，
+两个模块也无法同时运行。现在由代理统一负责：
+
+- CameraBroker：唯一打开摄像头的对象，用 VisionPipeline 采集并推理（镜像翻转后的帧），
+  把帧和关键点数组写入共享内存环形缓冲区 LandmarkRing。模型由 landmark_tracking.TrackedModel
+  包装，隔帧运行，其余帧用光流推算关键点
+- CameraStream：各模块使用的订阅接口，read() 返回最新的 LandmarkSnapshot。
+  优先连接其他进程已发布的共享内存；没有时在本进程内启动代理（按引用计数共享，
+  最后一个订阅关闭后再保留 BROKER_IDLE_SECONDS 秒，模块切换时无需重新初始化）
+- install_broker：让本进程的订阅改用指定的代理（如 camera_replay 的视频回放），
+  帧源结束后订阅方 isOpened() 返回False，各模块的循环随之结束
+
+共享内存布局：int64文件头 + 固定大小的槽位数组，每个槽位保存序号、时间戳、
+面部关键点 (478, 3)、手部关键点 (2, 21, 3) 和BGR帧。写入方先把槽位序号置为-1、
+写完数据后再写入正式序号；读取方复制前后序号一致才认为数据完整（顺序锁）。
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+CAMERA_INDEX = int(os.environ.get("EYE_CAMERA_INDEX", 0))
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+RING_SLOTS = 8
+SHM_NAME = os.environ.get("EYE_CAMERA_SHM", "eye_camera_broker")
+BROKER_IDLE_SECONDS = float(os.environ.get("EYE_CAMERA_IDLE_SECONDS", 10))
+
+FACE_POINTS = 478
+HAND_POINTS = 21
+MAX_HANDS = 2
+
+_MAGIC = 0x45594543414D  # "EYECAM"
+_HEADER = 8
+_H_MAGIC, _H_SLOTS, _H_HEIGHT, _H_WIDTH, _H_WRITE_SEQ, _H_WRITER_PID, _H_CLOSED, _H_ENDED = range(8)
+
+
+# ----------------------------------------------------------------------
+# 关键点视图
+# ----------------------------------------------------------------------
+
+class _Point(NamedTuple):
+    x: float
+    y: float
+    z: float
+
+
+class _PointList:
+    def __init__(self, points: np.ndarray):
+        self._points = points
+
+    def __getitem__(self, index: int) -> _Point:
+        x, y, z = self._points[index]
+        return _Point(float(x), float(y), float(z))
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self._points)))
+
+
+class LandmarkView:
+    """以MediaPipe NormalizedLandmarkList的接口（.landmark[i].x/.y/.z）访问关键点数组"""
+
+    __slots__ = ("points", "landmark")
+
+    def __init__(self, points: np.ndarray):
+        self.points = points
+        self.landmark = _PointList(points)
+
+
+@dataclass
+class LandmarkSnapshot:
+    """一帧的图像和关键点；frame为镜像翻转后的BGR帧（订阅方独占的副本）"""
+    seq: int
+    captured_at: float
+    frame: np.ndarray
+    face: Optional[np.ndarray] = None              # (478, 3) 归一化坐标
+    hands: List[np.ndarray] = field(default_factory=list)  # 每只手 (21, 3)
+
+    @property
+    def face_landmarks(self) -> Optional[LandmarkView]:
+        return LandmarkView(self.face) if self.face is not None else None
+
+    @property
+    def hand(self) -> Optional[np.ndarray]:
+        """第一只手的关键点数组"""
+        return self.hands[0] if self.hands else None
+
+    @property
+    def hand_landmarks(self) -> Optional[LandmarkView]:
+        """第一只手（与 multi_hand_landmarks[0] 对应）"""
+        return LandmarkView(self.hands[0]) if self.hands else None
+
+
+def landmarks_array(landmarks, count: int) -> np.ndarray:
+    """MediaPipe关键点列表转换为 (count, 3) 的float32数组（多出的点截断，不足的补0）"""
+    points = np.zeros((count, 3), np.float32)
+    if isinstance(landmarks, LandmarkView):
+        values = landmarks.points
+    else:
+        values = np.array([(p.x, p.y, p.z) for p in landmarks.landmark], np.float32)
+    points[:min(count, len(values))] = values[:count]
+    return points
+
+
+# ----------------------------------------------------------------------
+# 共享内存环形缓冲区
+# ----------------------------------------------------------------------
+
+def _slot_dtype(height: int, width: int) -> np.dtype:
+    return np.dtype([
+        ('seq', np.int64),
+        ('captured_at', np.float64),
+        ('face_valid', np.int32),
+        ('hand_count', np.int32),
+        ('face', np.float32, (FACE_POINTS, 3)),
+        ('hands', np.float32, (MAX_HANDS, HAND_POINTS, 3)),
+        ('frame', np.uint8, (height, width, 3)),
+    ], align=True)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13：连接方不应在退出时删除共享内存，取消资源跟踪
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name != "posix":
+        # Windows上共享内存随最后一个句柄关闭而释放，不会残留
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class LandmarkRing:
+    """共享内存中的帧/关键点环形缓冲区（单写多读）"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((_HEADER,), np.int64, buffer=shm.buf)
+        if self.header[_H_MAGIC] != _MAGIC and not owner:
+            raise ValueError(f"共享内存 {shm.name} 不是摄像头代理的缓冲区")
+        self.slots = int(self.header[_H_SLOTS])
+        self.height = int(self.header[_H_HEIGHT])
+        self.width = int(self.header[_H_WIDTH])
+        self._ring = np.ndarray((self.slots,), _slot_dtype(self.height, self.width),
+                                buffer=shm.buf, offset=_HEADER * 8)
+
+    @classmethod
+    def create(cls, name: Optional[str], height: int, width: int, slots: int = RING_SLOTS) -> "LandmarkRing":
+        size = _HEADER * 8 + slots * _slot_dtype(height, width).itemsize
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 崩溃的进程残留的共享内存（写入进程已不存在）可以回收
+            stale = _attach_shared_memory(name)
+            header = np.ndarray((_HEADER,), np.int64, buffer=stale.buf)
+            if header[_H_MAGIC] == _MAGIC and _process_alive(int(header[_H_WRITER_PID])) and not header[_H_CLOSED]:
+                stale.close()
+                raise
+            del header
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((_HEADER,), np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[_H_SLOTS], header[_H_HEIGHT], header[_H_WIDTH] = slots, height, width
+        header[_H_WRITE_SEQ] = -1
+        header[_H_WRITER_PID] = os.getpid()
+        header[_H_MAGIC] = _MAGIC
+        ring = cls(shm, owner=True)
+        ring._ring['seq'] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "LandmarkRing":
+        """连接已发布的缓冲区；不存在、已关闭或写入进程已退出时抛出 FileNotFoundError"""
+        shm = _attach_shared_memory(name)
+        header = np.ndarray((_HEADER,), np.int64, buffer=shm.buf)
+        usable = header[_H_MAGIC] == _MAGIC and not header[_H_CLOSED] and _process_alive(int(header[_H_WRITER_PID]))
+        del header
+        if not usable:
+            shm.close()
+            raise FileNotFoundError(name)
+        return cls(shm, owner=False)
+
+    @property
+    def closed(self) -> bool:
+        return self.header is None or bool(self.header[_H_CLOSED])
+
+    @property
+    def ended(self) -> bool:
+        """帧源已结束（视频回放完毕等），不会再有新帧"""
+        return self.header is not None and bool(self.header[_H_ENDED])
+
+    def mark_ended(self) -> None:
+        self.header[_H_ENDED] = 1
+
+    @property
+    def write_seq(self) -> int:
+        return int(self.header[_H_WRITE_SEQ])
+
+    def write(self, seq: int, captured_at: float, frame: np.ndarray,
+              face: Optional[np.ndarray], hands: List[np.ndarray]) -> None:
+        slot = self._ring[seq % self.slots]
+        slot['seq'] = -1
+        slot['captured_at'] = captured_at
+        slot['face_valid'] = face is not None
+        if face is not None:
+            slot['face'] = face
+        slot['hand_count'] = min(len(hands), MAX_HANDS)
+        for i, hand in enumerate(hands[:MAX_HANDS]):
+            slot['hands'][i] = hand
+        slot['frame'] = frame
+        slot['seq'] = seq
+        self.header[_H_WRITE_SEQ] = seq
+
+    def read(self, after_seq: int = -1) -> Optional[LandmarkSnapshot]:
+        """读取最新一帧（序号大于after_seq）；没有新帧或读取期间被覆盖时返回None"""
+        seq = self.write_seq
+        if seq <= after_seq:
+            return None
+        slot = self._ring[seq % self.slots]
+        if slot['seq'] != seq:
+            return None
+        snapshot = LandmarkSnapshot(
+            seq=seq,
+            captured_at=float(slot['captured_at']),
+            frame=slot['frame'].copy(),
+            face=slot['face'].copy() if slot['face_valid'] else None,
+            hands=[slot['hands'][i].copy() for i in range(int(slot['hand_count']))],
+        )
+        if slot['seq'] != seq:
+            return None
+        return snapshot
+
+    def close(self) -> None:
+        if self.owner:
+            self.header[_H_CLOSED] = 1
+        self.header = None
+        self._ring = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# ----------------------------------------------------------------------
+# 代理（发布方）
+# ----------------------------------------------------------------------
+
+class CameraBroker:
+    """打开摄像头、运行采集/推理流水线并把结果发布到共享内存
+
+    source / face_mesh / hands 可以传入现成的帧源和模型（如视频回放）；未传入时打开摄像头并创建MediaPipe模型。
+    stats 为流水线各阶段的耗时统计（StageStats），未传入时由流水线自行创建。
+    face_interval / hand_interval 为面部/手部模型的运行间隔（帧），未传入时使用 landmark_tracking 的默认值。
+    """
+
+    def __init__(self, camera_index: int = CAMERA_INDEX, name: Optional[str] = SHM_NAME,
+                 size=(FRAME_WIDTH, FRAME_HEIGHT), source=None, face_mesh=None, hands=None, stats=None,
+                 face_interval: Optional[int] = None, hand_interval: Optional[int] = None):
+        self.camera_index = camera_index
+        self.name = name
+        self.size = size
+        self.source = source
+        # 自己打开的摄像头断开后可以重新启动；外部传入的帧源结束即结束
+        self.restartable = source is None
+        self.ring: Optional[LandmarkRing] = None
+        self.pipeline = None
+        self._face_mesh = face_mesh
+        self._hands = hands
+        self.stats = stats
+        self.face_interval = face_interval
+        self.hand_interval = hand_interval
+        self.trackers = []
+        self._publisher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> "CameraBroker":
+        from landmark_tracking import FACE_MODEL_INTERVAL, HAND_MODEL_INTERVAL, TrackedModel
+        from vision_pipeline import VisionPipeline
+
+        if self.source is None:
+            self.source = cv2.VideoCapture(self.camera_index)
+            if not self.source.isOpened():
+                raise RuntimeError("无法打开摄像头，请检查摄像头连接和权限。")
+            self.source.set(cv2.CAP_PROP_FRAME_WIDTH, self.size[0])
+            self.source.set(cv2.CAP_PROP_FRAME_HEIGHT, self.size[1])
+
+        # 缓冲区按实际帧尺寸分配（摄像头不一定支持请求的分辨率）
+        frame = None
+        for _ in range(50):
+            success, frame = self.source.read()
+            if success and frame is not None:
+                break
+        if frame is None:
+            self._release_source()
+            raise RuntimeError("无法从摄像头读取画面")
+        self.ring = LandmarkRing.create(self.name, frame.shape[0], frame.shape[1])
+
+        if self._face_mesh is None or self._hands is None:
+            import mediapipe as mp
+            if self._face_mesh is None:
+                self._face_mesh = mp.solutions.face_mesh.FaceMesh(
+                    max_num_faces=1, refine_landmarks=True,
+                    min_detection_confidence=0.5, min_tracking_confidence=0.5
+                )
+            if self._hands is None:
+                self._hands = mp.solutions.hands.Hands(
+                    min_detection_confidence=0.5, min_tracking_confidence=0.5
+                )
+        face_interval = self.face_interval if self.face_interval is not None else FACE_MODEL_INTERVAL
+        hand_interval = self.hand_interval if self.hand_interval is not None else HAND_MODEL_INTERVAL
+        self.trackers = [TrackedModel(self._face_mesh, 'face', face_interval),
+                         TrackedModel(self._hands, 'hands', hand_interval)]
+        self.pipeline = VisionPipeline(self.source, *self.trackers, flip=True, stats=self.stats).start()
+        self._stop.clear()
+        self._publisher = threading.Thread(target=self._publish_loop, name="camera-broker", daemon=True)
+        self._publisher.start()
+        return self
+
+    def _publish_loop(self) -> None:
+        seq = 0
+        while not self._stop.is_set() and self.pipeline.running:
+            result = self.pipeline.latest(timeout=0.1)
+            if result is None:
+                continue
+            face = landmarks_array(result.face_landmarks, FACE_POINTS) if result.face_landmarks else None
+            hands = [landmarks_array(hand, HAND_POINTS) for hand in result.hands] if result.hands else []
+            self.ring.write(seq, result.captured_at, result.frame, face, hands)
+            seq += 1
+        if not self._stop.is_set():
+            # 帧源结束或流水线出错（异常见 pipeline.error）：通知订阅方
+            self.ring.mark_ended()
+
+    @property
+    def running(self) -> bool:
+        return self._publisher is not None and self._publisher.is_alive()
+
+    def report(self) -> Dict[str, Any]:
+        if not self.pipeline:
+            return {}
+        report = self.pipeline.report()
+        report['tracking'] = {tracker.kind: tracker.report() for tracker in self.trackers}
+        return report
+
+    def _release_source(self) -> None:
+        if self.source is not None and hasattr(self.source, "release"):
+            self.source.release()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        if self._publisher is not None:
+            self._publisher.join(timeout=2)
+            self._publisher = None
+        for model in (self._face_mesh, self._hands):
+            if model is not None:
+                model.close()
+        self._face_mesh = self._hands = None
+        self._release_source()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+# 进程内共享的代理（引用计数）
+_broker: Optional[CameraBroker] = None
+_broker_refs = 0
+_broker_lock = threading.Lock()
+_idle_timer: Optional[threading.Timer] = None
+
+
+def acquire_broker(name: str = SHM_NAME) -> CameraBroker:
+    """取得本进程的代理（需要时以name发布并启动），与 release_broker 成对调用"""
+    global _broker, _broker_refs, _idle_timer
+    with _broker_lock:
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+            _idle_timer = None
+        if _broker is None or (not _broker.running and _broker.restartable):
+            if _broker is not None:
+                _broker.stop()
+            _broker = CameraBroker(name=name).start()
+        _broker_refs += 1
+        return _broker
+
+
+def release_broker() -> None:
+    """归还代理；没有订阅后保留 BROKER_IDLE_SECONDS 秒再关闭摄像头"""
+    global _broker_refs, _idle_timer
+    with _broker_lock:
+        _broker_refs = max(0, _broker_refs - 1)
+        if _broker_refs == 0 and _broker is not None:
+            _idle_timer = threading.Timer(BROKER_IDLE_SECONDS, shutdown_broker, kwargs={"only_if_idle": True})
+            _idle_timer.daemon = True
+            _idle_timer.start()
+
+
+def install_broker(broker: CameraBroker) -> None:
+    """让本进程的订阅改用指定的已启动代理（替换并关闭原有代理）"""
+    global _broker, _broker_refs
+    shutdown_broker()
+    with _broker_lock:
+        _broker, _broker_refs = broker, 0
+
+
+def shutdown_broker(only_if_idle: bool = False) -> None:
+    """立即关闭本进程的代理"""
+    global _broker, _idle_timer
+    with _broker_lock:
+        if _broker is None or (only_if_idle and _broker_refs > 0):
+            return
+        broker, _broker = _broker, None
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+            _idle_timer = None
+    broker.stop()
+
+
+# ----------------------------------------------------------------------
+# 订阅（各模块使用）
+# ----------------------------------------------------------------------
+
+class CameraStream:
+    """摄像头订阅：read() 返回比上一次更新的 LandmarkSnapshot
+
+    关闭后再次 read() 会自动重新连接，模块对象可以在 cleanup 后继续使用；
+    帧源结束（ended）后 read() 直接返回None，直到 close() 后重新打开。
+    本进程已有代理时直接使用它，否则连接其他进程发布的缓冲区。
+    """
+
+    def __init__(self, name: str = SHM_NAME, poll_interval: float = 0.002):
+        self.name = name
+        self.poll_interval = poll_interval
+        self.last_seq = -1
+        self.ended = False
+        self._ring: Optional[LandmarkRing] = None
+        self._broker: Optional[CameraBroker] = None
+        self.open()
+
+    def open(self) -> None:
+        if self._ring is not None:
+            return
+        self.last_seq = -1
+        if _broker is None:
+            try:
+                self._ring = LandmarkRing.attach(self.name)
+                return
+            except FileNotFoundError:
+                pass
+        # 其他进程没有发布：在本进程中启动（或共用已启动的）代理
+        self._broker = acquire_broker(self.name)
+        self._ring = self._broker.ring
+
+    def isOpened(self) -> bool:
+        return not self.ended and self._ring is not None and not self._ring.closed
+
+    @property
+    def frame_width(self) -> int:
+        self.open()
+        return self._ring.width
+
+    @property
+    def frame_height(self) -> int:
+        self.open()
+        return self._ring.height
+
+    def read(self, timeout: float = 1.0) -> Optional[LandmarkSnapshot]:
+        """等待至多timeout秒的新帧；超时或帧源已结束时返回None"""
+        if self.ended:
+            return None
+        self.open()
+        deadline = time.perf_counter() + timeout
+        while True:
+            if self._ring.closed:
+                # 发布方已退出：下次读取时重新连接
+                self.close()
+                return None
+            ended = self._ring.ended
+            snapshot = self._ring.read(self.last_seq)
+            if snapshot is not None:
+                self.last_seq = snapshot.seq
+                return snapshot
+            if ended:
+                self.ended = True
+                return None
+            if time.perf_counter() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def report(self) -> Dict[str, Any]:
+        """本进程代理的流水线统计（连接其他进程的代理时为空）"""
+        return self._broker.report() if self._broker is not None else {}
+
+    def close(self) -> None:
+        self.ended = False
+        if self._ring is None:
+            return
+        if self._broker is not None:
+            self._broker = None
+            release_broker()
+        else:
+            self._ring.close()
+        self._ring = None
+
+    def __enter__(self) -> "CameraStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
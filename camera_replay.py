@@ -0,0 +1,572 @@
+# camera_replay.py
+"""
+摄像头模块的回放测试台（无需摄像头和显示器）
+
+VisionTester、AdvancedVisionTest 和 VisionTrainingGame 的各个循环都依赖实时摄像头和窗口，
+无法在构建机上测量帧率或做回归测试。测试台把帧源换成可重放的输入：
+
+- VideoFileSource：录制好的视频文件
+- ImageSequenceSource：图片序列（目录或文件列表）
+- SyntheticSource：按脚本绘制的合成人脸/手势画面，配合 ScriptedFaceMesh / ScriptedHands
+  直接给出脚本中的关键点（不依赖MediaPipe，画面第0行编码了帧序号）；人脸贴有随之平移的纹理，
+  模型运行之间的帧可以用光流推算（landmark_tracking）
+
+帧源可以按固定帧率（fps）回放，也可以尽快回放（fps=None）。帧源经 CameraBroker 发布，
+各模块通过 CameraStream 照常订阅，帧源结束后模块循环随之结束。
+HeadlessDisplay 在运行期间替换 cv2.imshow 等窗口函数，只统计显示次数和间隔。
+
+run_scenario 运行一个模块场景并返回帧率、各阶段耗时和最终得分。模块内部按墙钟计时
+（如E字每2秒切换），固定帧率回放时得分可复现，尽快回放主要用于测量吞吐量。
+
+需在项目根目录运行（各模块按相对路径加载图片）：
+    python camera_replay.py vision_test --synthetic 600 --fps 30
+    python camera_replay.py reaction_speed --video recordings/session.mp4
+    python camera_replay.py advanced --images recordings/frames --json report.json
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import time
+import types
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from camera_broker import FACE_POINTS, HAND_POINTS, CameraBroker, LandmarkView, install_broker, shutdown_broker
+from vision_pipeline import StageStats, format_stages
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+SYNTHETIC_SIZE = (640, 480)
+SYNTHETIC_FPS = 30.0           # 合成脚本的时间轴（帧序号 / SYNTHETIC_FPS 秒）
+
+# 手指方向：0右 90下 180左 270上（与各模块的方向约定一致）
+DIRECTIONS = (0, 90, 180, 270)
+
+# 合成画面使用的面部关键点（MediaPipe FaceMesh编号，显示坐标中33号眼在左侧）
+LEFT_EYE = {'outer': 33, 'inner': 133, 'upper': (160, 159, 158), 'lower': (144, 145, 153), 'iris': 468}
+RIGHT_EYE = {'outer': 263, 'inner': 362, 'upper': (385, 386, 387), 'lower': (380, 374, 373), 'iris': 473}
+NOSE_TIP = 1
+
+
+# ----------------------------------------------------------------------
+# 帧源
+# ----------------------------------------------------------------------
+
+class ReplaySource:
+    """可回放帧源的基类，接口与 cv2.VideoCapture 的 read()/isOpened()/release() 一致
+
+    fps 为回放帧率，None表示尽快回放；loop 为读完后从头重放，max_frames 限制总帧数。
+    """
+
+    def __init__(self, fps: Optional[float] = None, loop: bool = False, max_frames: Optional[int] = None):
+        self.fps = fps or None
+        self.loop = loop
+        self.max_frames = max_frames
+        self.frames_read = 0
+        self._finished = False
+        self._started_at: Optional[float] = None
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def _rewind(self) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        pass
+
+    def isOpened(self) -> bool:
+        return not self._finished
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._finished:
+            return False, None
+        if self.max_frames is not None and self.frames_read >= self.max_frames:
+            self._finished = True
+            return False, None
+        frame = self._next_frame()
+        if frame is None and self.loop and self.frames_read:
+            self._rewind()
+            frame = self._next_frame()
+        if frame is None:
+            self._finished = True
+            return False, None
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+        if self.fps:
+            delay = self._started_at + self.frames_read / self.fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self.frames_read += 1
+        return True, frame
+
+    def release(self) -> None:
+        self._finished = True
+        self._close()
+
+
+class VideoFileSource(ReplaySource):
+    """回放视频文件"""
+
+    def __init__(self, path: str, fps: Optional[float] = None, loop: bool = False,
+                 max_frames: Optional[int] = None):
+        super().__init__(fps, loop, max_frames)
+        self.path = path
+        self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise FileNotFoundError(f"无法打开视频文件: {path}")
+
+    @property
+    def native_fps(self) -> float:
+        return self._cap.get(cv2.CAP_PROP_FPS)
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        success, frame = self._cap.read()
+        return frame if success else None
+
+    def _rewind(self) -> None:
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _close(self) -> None:
+        self._cap.release()
+
+
+class ImageSequenceSource(ReplaySource):
+    """回放图片序列；paths为图片列表、目录或通配符，尺寸与第一张不同的图片缩放到第一张的尺寸"""
+
+    def __init__(self, paths: Union[str, Sequence[str]], fps: Optional[float] = None, loop: bool = False,
+                 max_frames: Optional[int] = None):
+        super().__init__(fps, loop, max_frames)
+        if isinstance(paths, str):
+            if os.path.isdir(paths):
+                paths = [os.path.join(paths, name) for name in os.listdir(paths)
+                         if name.lower().endswith(IMAGE_EXTENSIONS)]
+            else:
+                paths = glob.glob(paths)
+        self.paths = sorted(paths)
+        if not self.paths:
+            raise FileNotFoundError("图片序列为空")
+        self._index = 0
+        self._size: Optional[Tuple[int, int]] = None
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        while self._index < len(self.paths):
+            frame = cv2.imread(self.paths[self._index])
+            self._index += 1
+            if frame is None:
+                continue
+            if self._size is None:
+                self._size = (frame.shape[1], frame.shape[0])
+            elif (frame.shape[1], frame.shape[0]) != self._size:
+                frame = cv2.resize(frame, self._size)
+            return frame
+        return None
+
+    def _rewind(self) -> None:
+        self._index = 0
+
+
+# ----------------------------------------------------------------------
+# 合成画面
+# ----------------------------------------------------------------------
+
+@dataclass
+class SceneState:
+    """一帧合成画面的内容；坐标为镜像翻转后（各模块看到的）的归一化坐标"""
+    distance_cm: float = 60.0
+    face_center: Tuple[float, float] = (0.5, 0.42)
+    eye_openness: float = 1.0                       # 1睁开，0闭合
+    hand_direction: Optional[int] = None            # None表示画面中没有手
+    hand_position: Tuple[float, float] = (0.5, 0.75)
+
+
+Script = Callable[[int], SceneState]
+
+
+def default_script(index: int) -> SceneState:
+    """默认脚本：60cm处正对摄像头，视线缓慢左右移动，每3秒眨眼一次；
+    手指每2秒依次指向右、下、左、上，每次保持1.5秒"""
+    t = index / SYNTHETIC_FPS
+    pointing = t % 2.0 < 1.5
+    return SceneState(
+        distance_cm=60.0,
+        face_center=(0.5 + 0.05 * math.sin(2 * math.pi * t / 4), 0.42),
+        eye_openness=0.1 if t % 3.0 < 0.15 else 1.0,
+        hand_direction=DIRECTIONS[int(t // 2.0) % 4] if pointing else None,
+    )
+
+
+def face_points(state: SceneState, frame_width: int) -> np.ndarray:
+    """合成 (478, 3) 面部关键点；159与386号点的间距按 VisionTester 的距离模型对应 distance_cm"""
+    eye_distance = 0.16 * 600 / (frame_width * state.distance_cm / 100)
+    cx, cy = state.face_center
+    points = np.zeros((FACE_POINTS, 3), np.float32)
+    # 其余点分布在面部椭圆内
+    angles = np.arange(FACE_POINTS) * 2.399963        # 黄金角
+    radii = np.sqrt((np.arange(FACE_POINTS) + 0.5) / FACE_POINTS)
+    points[:, 0] = cx + np.cos(angles) * radii * eye_distance * 1.3
+    points[:, 1] = cy + 0.3 * eye_distance + np.sin(angles) * radii * eye_distance * 1.7
+
+    eye_width = eye_distance * 0.45
+    eye_height = eye_width * 0.35 * state.eye_openness
+    for eye, ex in ((LEFT_EYE, cx - eye_distance / 2), (RIGHT_EYE, cx + eye_distance / 2)):
+        outer_sign = -1 if eye is LEFT_EYE else 1
+        points[eye['outer'], :2] = (ex + outer_sign * eye_width / 2, cy)
+        points[eye['inner'], :2] = (ex - outer_sign * eye_width / 2, cy)
+        for offset, upper, lower in zip((-0.25, 0.0, 0.25), eye['upper'], eye['lower']):
+            points[upper, :2] = (ex + offset * eye_width, cy - eye_height / 2)
+            points[lower, :2] = (ex + offset * eye_width, cy + eye_height / 2)
+        points[eye['iris']:eye['iris'] + 5, :2] = (ex, cy)
+    points[NOSE_TIP, :2] = (cx, cy + 0.5 * eye_distance)
+    return points
+
+
+def hand_points(state: SceneState) -> Optional[np.ndarray]:
+    """合成 (21, 3) 手部关键点：食指和中指平行伸直指向 hand_direction"""
+    if state.hand_direction is None:
+        return None
+    angle = math.radians(state.hand_direction)
+    forward = np.array([math.cos(angle), math.sin(angle)])
+    side = np.array([-forward[1], forward[0]])
+    wrist = np.array(state.hand_position)
+    points = np.zeros((HAND_POINTS, 3), np.float32)
+    points[0, :2] = wrist
+    # 拇指、食指、中指、无名指、小指：每指4个关节
+    for finger, (spread, length) in enumerate(((-0.05, 0.06), (-0.02, 0.12), (0.0, 0.13), (0.02, 0.07), (0.04, 0.06))):
+        base = wrist + forward * 0.05 + side * spread
+        for joint in range(4):
+            points[1 + finger * 4 + joint, :2] = base + forward * length * joint / 3
+    return points
+
+
+_backgrounds: Dict[Tuple[int, int], np.ndarray] = {}
+_skin_textures: Dict[Tuple[int, int], np.ndarray] = {}
+
+
+def _skin_texture(size: Tuple[int, int]) -> np.ndarray:
+    """两倍画面大小的皮肤纹理（固定随机种子），随人脸平移取用；纯色的脸上光流找不到可跟踪的细节"""
+    if size not in _skin_textures:
+        width, height = size
+        noise = cv2.GaussianBlur(np.random.default_rng(0).normal(size=(2 * height, 2 * width)).astype(np.float32),
+                                 (0, 0), 2.0)
+        noise *= 25 / noise.std()
+        skin = np.array((150, 180, 225), np.float32) + noise[..., None]
+        _skin_textures[size] = np.clip(skin, 0, 255).astype(np.uint8)
+    return _skin_textures[size]
+
+
+def render_scene(state: SceneState, index: int, size: Tuple[int, int] = SYNTHETIC_SIZE) -> np.ndarray:
+    """按关键点绘制摄像头原始（未翻转）画面，第0行编码帧序号"""
+    width, height = size
+    if size not in _backgrounds:
+        gradient = np.linspace(60, 140, height, dtype=np.float32)[:, None, None]
+        _backgrounds[size] = np.broadcast_to(gradient, (height, width, 3)).astype(np.uint8)
+    frame = _backgrounds[size].copy()
+
+    def pixel(point) -> Tuple[int, int]:
+        # 关键点是镜像坐标，原始画面中水平翻转
+        return int((1 - point[0]) * width), int(point[1] * height)
+
+    face = face_points(state, width)
+    cx, cy = pixel(state.face_center)
+    eye_distance_px = abs(pixel(face[LEFT_EYE['upper'][1]])[0] - pixel(face[RIGHT_EYE['upper'][1]])[0])
+    # 只在人脸椭圆的外接矩形内贴纹理
+    (ex, ey), (ax, ay) = (cx, cy + int(0.3 * eye_distance_px)), (int(eye_distance_px * 1.4), int(eye_distance_px * 1.8))
+    x0, x1, y0, y1 = max(ex - ax, 0), min(ex + ax + 1, width), max(ey - ay, 0), min(ey + ay + 1, height)
+    if x0 < x1 and y0 < y1:
+        mask = np.zeros((y1 - y0, x1 - x0), np.uint8)
+        cv2.ellipse(mask, (ex - x0, ey - y0), (ax, ay), 0, 0, 360, 1, -1)
+        tx, ty = int(np.clip(cx, 0, width)), int(np.clip(cy, 0, height))
+        skin = _skin_texture(size)[height - ty + y0:height - ty + y1, width - tx + x0:width - tx + x1]
+        cv2.copyTo(skin, mask, frame[y0:y1, x0:x1])
+    for eye in (LEFT_EYE, RIGHT_EYE):
+        outer, inner = pixel(face[eye['outer']]), pixel(face[eye['inner']])
+        upper, lower = pixel(face[eye['upper'][1]]), pixel(face[eye['lower'][1]])
+        center = ((outer[0] + inner[0]) // 2, (upper[1] + lower[1]) // 2)
+        axes = (max(abs(outer[0] - inner[0]) // 2, 1), max(abs(lower[1] - upper[1]) // 2, 1))
+        cv2.ellipse(frame, center, axes, 0, 0, 360, (255, 255, 255), -1)
+        if state.eye_openness > 0.3:
+            cv2.circle(frame, center, max(axes[1] - 1, 1), (60, 40, 20), -1)
+
+    hand = hand_points(state)
+    if hand is not None:
+        for finger in range(5):
+            chain = [hand[0]] + [hand[1 + finger * 4 + joint] for joint in range(4)]
+            cv2.polylines(frame, [np.array([pixel(p) for p in chain], np.int32)], False, (140, 170, 210), 9)
+
+    frame[0, :] = (index & 0xFF, (index >> 8) & 0xFF, (index >> 16) & 0xFF)
+    return frame
+
+
+def frame_index(rgb: np.ndarray) -> int:
+    """从合成画面（已转换为RGB）的第0行解出帧序号；第0行整行同色，镜像翻转不影响"""
+    r, g, b = (int(v) for v in rgb[0, 0])
+    return (r << 16) | (g << 8) | b
+
+
+class SyntheticSource(ReplaySource):
+    """按脚本生成的合成画面"""
+
+    def __init__(self, frames: int = 300, script: Script = default_script, size: Tuple[int, int] = SYNTHETIC_SIZE,
+                 fps: Optional[float] = None, loop: bool = False, max_frames: Optional[int] = None):
+        super().__init__(fps, loop, max_frames)
+        self.frames = frames
+        self.script = script
+        self.size = size
+        self._index = 0
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        if self._index >= self.frames:
+            return None
+        frame = render_scene(self.script(self._index), self._index, self.size)
+        self._index += 1
+        return frame
+
+    def _rewind(self) -> None:
+        self._index = 0
+
+
+class ScriptedFaceMesh:
+    """按合成画面的帧序号返回脚本中的面部关键点，接口与 FaceMesh.process 一致"""
+
+    def __init__(self, script: Script = default_script):
+        self.script = script
+
+    def process(self, rgb: np.ndarray):
+        points = face_points(self.script(frame_index(rgb)), rgb.shape[1])
+        return types.SimpleNamespace(multi_face_landmarks=[LandmarkView(points)])
+
+    def close(self) -> None:
+        pass
+
+
+class ScriptedHands:
+    """按合成画面的帧序号返回脚本中的手部关键点，接口与 Hands.process 一致"""
+
+    def __init__(self, script: Script = default_script):
+        self.script = script
+
+    def process(self, rgb: np.ndarray):
+        points = hand_points(self.script(frame_index(rgb)))
+        return types.SimpleNamespace(multi_hand_landmarks=[LandmarkView(points)] if points is not None else None)
+
+    def close(self) -> None:
+        pass
+
+
+# ----------------------------------------------------------------------
+# 无窗口显示
+# ----------------------------------------------------------------------
+
+class HeadlessDisplay:
+    """运行期间替换 cv2.imshow/waitKey/destroyWindow/destroyAllWindows，只统计显示次数和间隔"""
+
+    _PATCHED = ("imshow", "waitKey", "destroyWindow", "destroyAllWindows")
+
+    def __init__(self, stats: Optional[StageStats] = None, keep_frames: bool = False):
+        self.stats = stats or StageStats()
+        self.keep_frames = keep_frames
+        self.frames: Counter = Counter()
+        self.last_frames: Dict[str, np.ndarray] = {}
+        self._originals: Dict[str, Any] = {}
+        self._last_shown: Optional[float] = None
+        self._started_at = 0.0
+        self.elapsed = 0.0
+
+    def imshow(self, window: str, frame: np.ndarray) -> None:
+        now = time.perf_counter()
+        if self._last_shown is not None:
+            self.stats.record('display_interval', now - self._last_shown)
+        self._last_shown = now
+        self.frames[window] += 1
+        if self.keep_frames:
+            self.last_frames[window] = frame.copy()
+
+    def waitKey(self, delay: int = 0) -> int:
+        return -1
+
+    def destroyWindow(self, window: str) -> None:
+        pass
+
+    def destroyAllWindows(self) -> None:
+        pass
+
+    @property
+    def fps(self) -> float:
+        return sum(self.frames.values()) / max(self.elapsed, 1e-9)
+
+    def __enter__(self) -> "HeadlessDisplay":
+        self._originals = {name: getattr(cv2, name) for name in self._PATCHED}
+        for name in self._PATCHED:
+            setattr(cv2, name, getattr(self, name))
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.elapsed = time.perf_counter() - self._started_at
+        for name, original in self._originals.items():
+            setattr(cv2, name, original)
+
+
+# ----------------------------------------------------------------------
+# 场景
+# ----------------------------------------------------------------------
+
+def _run_vision_test(duration: Optional[float]) -> Dict[str, Any]:
+    from vision_test import VisionTester
+
+    tester = VisionTester()
+    tester.calibration_seconds = 0
+    final_vision = tester.run_test()
+    return {
+        'final_vision': final_vision,
+        'correct_count': tester.correct_count,
+        'total_count': tester.total_count,
+        'module_stages': tester.latency_report.get('stages', {}),
+    }
+
+
+def _run_advanced(duration: Optional[float]) -> Dict[str, Any]:
+    from advanced_vision_test import AdvancedVisionTest
+
+    test = AdvancedVisionTest()
+    try:
+        return {
+            'basic_vision': test._basic_vision_test(),
+            'color_vision': test._color_vision_test(),
+            'contrast_sensitivity': test._contrast_test(),
+            'peripheral_vision': test._peripheral_vision_test(),
+            'eye_tracking': test._eye_tracking_analysis(),
+        }
+    finally:
+        test.cleanup()
+
+
+GAME_METHODS = {
+    'eye_tracking': '_play_eye_tracking_game',
+    'focus_training': '_play_focus_training_game',
+    'reaction_speed': '_play_reaction_speed_game',
+    'memory_game': '_play_memory_game',
+    'color_matching': '_play_color_matching_game',
+}
+
+
+def _run_game(name: str, duration: Optional[float]) -> Dict[str, Any]:
+    from vision_training_game import GameType, VisionTrainingGame
+
+    game = VisionTrainingGame()
+    try:
+        game.current_game = GameType(name)
+        game._init_game_parameters()
+        if duration:
+            game.game_duration = duration
+        game.game_start_time = time.time()
+        getattr(game, GAME_METHODS[name])()
+        return game._game_result()
+    finally:
+        game.cleanup()
+
+
+SCENARIOS = ('vision_test', 'advanced') + tuple(GAME_METHODS)
+
+
+def run_scenario(scenario: str, source: ReplaySource, face_mesh=None, hands=None,
+                 duration: Optional[float] = None, face_interval: Optional[int] = None,
+                 hand_interval: Optional[int] = None) -> Dict[str, Any]:
+    """用回放帧源运行一个模块场景，返回帧率、各阶段耗时和得分
+
+    face_mesh / hands 为None时使用MediaPipe模型；duration 限制训练游戏的时长（秒）；
+    face_interval / hand_interval 为模型运行间隔（帧），None时使用默认值。
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"未知场景: {scenario}，可选 {', '.join(SCENARIOS)}")
+    stats = StageStats()
+    broker = CameraBroker(name=None, source=source, face_mesh=face_mesh, hands=hands, stats=stats,
+                          face_interval=face_interval, hand_interval=hand_interval).start()
+    install_broker(broker)
+    started = time.perf_counter()
+    try:
+        with HeadlessDisplay(stats) as display:
+            if scenario == 'vision_test':
+                scores = _run_vision_test(duration)
+            elif scenario == 'advanced':
+                scores = _run_advanced(duration)
+            else:
+                scores = _run_game(scenario, duration)
+        elapsed = time.perf_counter() - started
+        pipeline = broker.report()
+    finally:
+        shutdown_broker()
+    return {
+        'scenario': scenario,
+        'frames': source.frames_read,
+        'elapsed_s': round(elapsed, 3),
+        'source_fps': round(source.frames_read / max(elapsed, 1e-9), 1),
+        'inferred_fps': pipeline.get('inferred_fps', 0.0),
+        'dropped_frames': pipeline.get('dropped_frames', 0),
+        'displayed_fps': round(display.fps, 1),
+        'displayed_frames': dict(display.frames),
+        'stages': stats.summary(),
+        'tracking': pipeline.get('tracking', {}),
+        'scores': scores,
+    }
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="以回放帧源无窗口运行摄像头模块并测量帧率")
+    parser.add_argument("scenario", choices=SCENARIOS)
+    source_group = parser.add_mutually_exclusive_group()
+    source_group.add_argument("--video", help="视频文件")
+    source_group.add_argument("--images", help="图片目录或通配符")
+    source_group.add_argument("--synthetic", type=int, default=300, help="合成画面帧数（默认300）")
+    parser.add_argument("--fps", type=float, default=0, help="回放帧率，0为尽快回放")
+    parser.add_argument("--loop", action="store_true", help="帧源读完后从头重放")
+    parser.add_argument("--max-frames", type=int, help="最多回放的帧数")
+    parser.add_argument("--duration", type=float, help="训练游戏时长（秒）")
+    parser.add_argument("--face-interval", type=int, help="面部模型运行间隔（帧），1为每帧运行")
+    parser.add_argument("--hand-interval", type=int, help="手部模型运行间隔（帧），1为每帧运行")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    face_mesh = hands = None
+    if args.video:
+        source = VideoFileSource(args.video, args.fps, args.loop, args.max_frames)
+    elif args.images:
+        source = ImageSequenceSource(args.images, args.fps, args.loop, args.max_frames)
+    else:
+        source = SyntheticSource(args.synthetic, fps=args.fps, loop=args.loop, max_frames=args.max_frames)
+        face_mesh, hands = ScriptedFaceMesh(), ScriptedHands()
+
+    report = run_scenario(args.scenario, source, face_mesh, hands, args.duration,
+                          args.face_interval, args.hand_interval)
+
+    print(f"\n场景 {report['scenario']}：{report['frames']} 帧，用时 {report['elapsed_s']}s")
+    print(f"帧源 {report['source_fps']} fps，推理 {report['inferred_fps']} fps，显示 {report['displayed_fps']} fps，"
+          f"丢弃旧帧 {report['dropped_frames']}")
+    print(format_stages(report['stages']))
+    for kind, tracking in report['tracking'].items():
+        print(f"{kind}: 模型运行 {tracking['model_runs']} 次，光流推算 {tracking['tracked_frames']} 帧，"
+              f"跟丢 {tracking['losses']} 次")
+    print("得分:", json.dumps(report['scores'], ensure_ascii=False, default=_json_default))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=_json_default)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# dataset_cache.py
+"""
+训练数据集缓存（预处理后的内存映射图片数组）
+
+train_model.OCTDataset 每个epoch都对每张图片重新 Image.open → convert('RGB') → Resize，
+25个epoch、4个加载进程时JPEG解码占了训练时间的大头，而这一步的结果每次都完全相同。
+
+compile_cache() 把 build_dataframe() 的全部图片一次性解码、缩放为固定尺寸，写成两个
+uint8 数组文件（.npy，通道在前，训练时按内存映射读取）：
+- train_uint8.npy (N, 3, train_size, train_size)：与原 Resize((IMG_SIZE+32, IMG_SIZE+32)) 相同，
+  之后只需逐样本做随机裁剪、翻转、旋转等增强
+- eval_uint8.npy (N, 3, eval_size, eval_size)：验证/测试用的确定性预处理结果，
+  与推理时 image_processing.test_transform 的 Resize((IMG_SIZE, IMG_SIZE)) 相同
+以及 index.csv（每张图片的 path/label/data_type/patient_id/eye 和它在数组中的下标 row）
+和 meta.json（尺寸与源文件指纹）。
+
+源文件的路径、大小、修改时间或标签有变化时 load_or_compile() 自动重建；解码失败的图片
+不进入索引。
+
+用法: python dataset_cache.py [--data-dir DIR] [--cache-dir dataset_cache] [--workers 8]
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from oct_screening import PEPPERCAT_DIR
+
+if PEPPERCAT_DIR not in sys.path:
+    sys.path.append(PEPPERCAT_DIR)
+from src.tools.image_loader import load_pil
+
+DATASET_CACHE_DIR = os.environ.get("OCT_DATASET_CACHE", "dataset_cache")
+CACHE_VERSION = 1
+INDEX_COLUMNS = ['path', 'label', 'data_type', 'patient_id', 'eye']
+
+TRAIN_IMAGES = 'train_uint8.npy'
+EVAL_IMAGES = 'eval_uint8.npy'
+INDEX_FILE = 'index.csv'
+META_FILE = 'meta.json'
+
+
+def fingerprint(df: pd.DataFrame) -> str:
+    """数据框中各源文件（路径、大小、修改时间、标签）的指纹"""
+    sha1 = hashlib.sha1()
+    for path, label in zip(df['path'], df['label']):
+        st = os.stat(path)
+        sha1.update(f"{path}|{st.st_size}|{st.st_mtime_ns}|{label}\n".encode('utf-8'))
+    return sha1.hexdigest()
+
+
+def _prepare(path: str, train_size: int, eval_size: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """解码一张图片并缩放为训练/验证两种尺寸（通道在前的uint8）；失败时返回None"""
+    try:
+        img = load_pil(path, (train_size, train_size))
+    except Exception as e:
+        print(f"跳过文件 {path}: {e}")
+        return None
+    # 与torchvision的Resize作用于PIL图片时相同（双线性插值）
+    train = np.asarray(img.resize((train_size, train_size), Image.BILINEAR)).transpose(2, 0, 1)
+    evaluation = np.asarray(img.resize((eval_size, eval_size), Image.BILINEAR)).transpose(2, 0, 1)
+    return train, evaluation
+
+
+class DatasetCache:
+    """已编译的数据集缓存：index 为图片索引，images(kind) 返回内存映射的图片数组"""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, META_FILE), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.index = pd.read_csv(os.path.join(cache_dir, INDEX_FILE),
+                                 dtype={'path': str, 'data_type': str, 'patient_id': str, 'eye': str})
+
+    def path(self, kind: str) -> str:
+        """kind 为 'train'（供增强的较大尺寸）或 'eval'（确定性预处理）"""
+        return os.path.join(self.cache_dir, TRAIN_IMAGES if kind == 'train' else EVAL_IMAGES)
+
+    def images(self, kind: str) -> np.ndarray:
+        # 写时复制映射：取出的切片可直接交给torch.from_numpy，不会改动缓存文件
+        return np.load(self.path(kind), mmap_mode='c')
+
+    @classmethod
+    def valid(cls, cache_dir: str, df: pd.DataFrame, train_size: int, eval_size: int) -> bool:
+        try:
+            with open(os.path.join(cache_dir, META_FILE), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (meta.get('version') == CACHE_VERSION and meta.get('train_size') == train_size
+                and meta.get('eval_size') == eval_size and meta.get('fingerprint') == fingerprint(df))
+
+
+def compile_cache(df: pd.DataFrame, cache_dir: str, train_size: int, eval_size: int,
+                  workers: Optional[int] = None) -> DatasetCache:
+    """把数据框中的全部图片解码、缩放后写入缓存目录"""
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, META_FILE)
+    if os.path.exists(meta_path):
+        # 先删除meta.json：编译中断时缓存视为无效
+        os.remove(meta_path)
+
+    df = df.reset_index(drop=True)
+    count = len(df)
+    train = np.lib.format.open_memmap(os.path.join(cache_dir, TRAIN_IMAGES), mode='w+', dtype=np.uint8,
+                                      shape=(count, 3, train_size, train_size))
+    evaluation = np.lib.format.open_memmap(os.path.join(cache_dir, EVAL_IMAGES), mode='w+', dtype=np.uint8,
+                                           shape=(count, 3, eval_size, eval_size))
+    ok = np.zeros(count, dtype=bool)
+
+    start = time.time()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_prepare, df['path'], [train_size] * count, [eval_size] * count, chunksize=16)
+        for row, result in enumerate(results):
+            if result is None:
+                continue
+            train[row], evaluation[row] = result
+            ok[row] = True
+    train.flush()
+    evaluation.flush()
+    del train, evaluation
+
+    index = df.loc[ok, INDEX_COLUMNS].copy()
+    index['row'] = np.flatnonzero(ok)
+    index.to_csv(os.path.join(cache_dir, INDEX_FILE), index=False)
+    meta = {
+        'version': CACHE_VERSION, 'train_size': train_size, 'eval_size': eval_size,
+        'count': count, 'skipped': int(count - ok.sum()), 'fingerprint': fingerprint(df),
+    }
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    print(f"数据集缓存已编译: {int(ok.sum())}/{count} 张图片，用时 {time.time() - start:.1f}s → {cache_dir}")
+    return DatasetCache(cache_dir)
+
+
+def load_or_compile(df: pd.DataFrame, cache_dir: str, train_size: int, eval_size: int,
+                    workers: Optional[int] = None) -> DatasetCache:
+    """缓存与源文件一致时直接打开，否则重新编译"""
+    df = df.reset_index(drop=True)
+    if DatasetCache.valid(cache_dir, df, train_size, eval_size):
+        return DatasetCache(cache_dir)
+    return compile_cache(df, cache_dir, train_size, eval_size, workers)
+
+
+def main():
+    import train_model
+
+    parser = argparse.ArgumentParser(description="编译训练数据集缓存")
+    parser.add_argument('--data-dir', default=train_model.DATA_DIR, help="数据集目录（每个类别一个子目录）")
+    parser.add_argument('--cache-dir', default=DATASET_CACHE_DIR)
+    parser.add_argument('--workers', type=int, default=None, help="解码进程数（默认全部CPU核心）")
+    parser.add_argument('--force', action='store_true', help="即使缓存有效也重新编译")
+    args = parser.parse_args()
+
+    train_model.DATA_DIR = args.data_dir
+    df = train_model.build_dataframe()
+    train_size, eval_size = train_model.IMG_SIZE + 32, train_model.IMG_SIZE
+    if args.force:
+        compile_cache(df, args.cache_dir, train_size, eval_size, args.workers)
+    else:
+        cache = load_or_compile(df, args.cache_dir, train_size, eval_size, args.workers)
+        print(f"缓存可用: {len(cache.index)} 张图片 ({args.cache_dir})")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,7 @@ from vision_training_game import VisionTrainingGame
 from vision_analytics import VisionAnalytics
 from api_integration import DeepseekAPI
 from image_processing import analyze_image
+from openmanus_core.tracing import tracer
 
 class EyeHealthTool(Tool):
     """眼部健康专用工具集"""
@@ -335,6 +336,7 @@ class EyeHealthSystem:
             logger.error(f"系统初始化失败: {e}")
             self.system_status = "error"
     
+    @tracer.traced("eye_health_system.process_request")
     async def process_request(self, request: str) -> Dict[str, Any]:
         """处理用户请求"""
         if self.system_status != "ready":
@@ -344,7 +346,9 @@ class EyeHealthSystem:
             logger.info(f"处理用户请求: {request}")
             
             # 分析请求类型
-            request_type = self._analyze_request_type(request)
+            with tracer.span("eye_health.classify") as span:
+                request_type = self._analyze_request_type(request)
+                span.set_attribute("request_type", request_type)
             
             # 根据请求类型执行相应操作
             if request_type == "vision_test":
@@ -12,6 +12,7 @@ from openmanus_core.agent.toolcall import ToolCallAgent
 from openmanus_core.tool_collection import ToolCollection
 from openmanus_core.config import config
 from openmanus_core.logger import logger
+from openmanus_core.tracing import tracer
 
 # 导入现有的眼部健康模块
 from vision_test import VisionTester
@@ -395,6 +396,7 @@ class EyeHealthSystem:
             logger.error(f"系统初始化失败: {e}")
             self.system_status = "error"
     
+    @tracer.traced("eye_health_system.process_request")
     async def process_request(self, request: str) -> Dict[str, Any]:
         """处理用户请求"""
         if self.system_status != "ready":
@@ -404,7 +406,9 @@ class EyeHealthSystem:
             logger.info(f"处理用户请求: {request}")
             
             # 分析请求类型
-            request_type = self._analyze_request_type(request)
+            with tracer.span("eye_health.classify") as span:
+                request_type = self._analyze_request_type(request)
+                span.set_attribute("request_type", request_type)
             
             # 根据请求类型执行相应操作
             if request_type == "vision_test":
@@ -14,6 +14,7 @@ from vision_training_game import VisionTrainingGame
 from vision_analytics import VisionAnalytics
 from api_integration import DeepseekAPI
 from image_processing import analyze_image
+from openmanus_core.tracing import tracer
 
 # 配置日志
 logging.basicConfig(
@@ -311,13 +312,16 @@ class EyeHealthLLM:
             "original_request": request
         }
     
+    @tracer.traced("eye_health_llm.process_request")
     async def process_request(self, request: str) -> Dict[str, Any]:
         """处理用户请求"""
         try:
             logger.info(f"处理用户请求: {request}")
             
             # 分析请求
-            analysis = self._analyze_request(request)
+            with tracer.span("eye_health.classify") as span:
+                analysis = self._analyze_request(request)
+                span.set_attribute("tools", analysis["tools"])
             
             # 记录对话历史
             self.conversation_history.append({
@@ -336,7 +340,8 @@ class EyeHealthLLM:
                 if tool_name in self.tools:
                     tool = self.tools[tool_name]
                     try:
-                        result = await tool.execute(**analysis["params"])
+                        with tracer.span("tool.execute", tool=tool_name):
+                            result = await tool.execute(**analysis["params"])
                         results.append({
                             "tool": tool_name,
                             "result": result
@@ -6,6 +6,7 @@
 """
 
 import asyncio
+import base64
 import json
 import os
 import sys
@@ -24,12 +25,15 @@ sys.path.insert(0, str(project_root))
 try:
     from eye_health_agent_integrated import EyeHealthSystem
     from openmanus_core.logger import logger
+    from openmanus_core.tracing import tracer
+    from openmanus_core.llm_scheduler import scheduler
+    from openmanus_core.llm_router import backend_stats
     from vision_test import VisionTester
     from advanced_vision_test import AdvancedVisionTest
     from vision_training_game import VisionTrainingGame, GameType
     from vision_analytics import VisionAnalytics
     from api_integration import DeepseekAPI
-    from image_processing import analyze_image
+    from image_processing import analyze_image, explain_image
 except ImportError as e:
     print(f"导入模块失败: {e}")
     print("请确保所有依赖已正确安装")
@@ -69,6 +73,7 @@ class WebEyeHealthSystem:
             logger.error(f"Web系统初始化失败: {e}")
             raise
     
+    @tracer.traced("web.process_request")
     async def process_request(self, user_message: str) -> Dict[str, Any]:
         """处理用户请求"""
         try:
@@ -76,7 +81,9 @@ class WebEyeHealthSystem:
                 await self.initialize()
             
             # 分析请求类型
-            request_type = self._analyze_request_type(user_message)
+            with tracer.span("eye_health.classify") as span:
+                request_type = self._analyze_request_type(user_message)
+                span.set_attribute("request_type", request_type)
             
             # 更新统计信息
             self._update_stats(request_type)
@@ -380,6 +387,40 @@ def system_status():
             'error': f'系统状态检查失败: {str(e)}'
         })
 
+@app.route('/api/debug/traces')
+def debug_traces():
+    """执行追踪API：返回环形缓冲区中最近的trace"""
+    try:
+        limit = request.args.get('limit', default=50, type=int)
+        return jsonify({
+            'success': True,
+            'enabled': tracer.enabled,
+            'sample_rate': tracer.sample_rate,
+            'traces': tracer.get_traces(limit)
+        })
+    except Exception as e:
+        logger.error(f"获取追踪数据错误: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'获取追踪数据失败: {str(e)}'
+        })
+
+@app.route('/api/debug/scheduler')
+def debug_scheduler():
+    """LLM调度器指标API：各后端队列深度、在途数、等待时间及熔断/延迟状态"""
+    try:
+        return jsonify({
+            'success': True,
+            'backends': scheduler.metrics(),
+            'routing': backend_stats()
+        })
+    except Exception as e:
+        logger.error(f"获取调度器指标错误: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'获取调度器指标失败: {str(e)}'
+        })
+
 @app.route('/api/vision/test', methods=['POST'])
 def start_vision_test():
     """启动视力检测API"""
@@ -435,7 +476,10 @@ def health_check():
 
 @app.route('/api/image/recognition', methods=['POST'])
 def image_recognition():
-    """眼部图片识别API，集成AI健康报告"""
+    """眼部图片识别API，集成AI健康报告
+
+    表单或查询参数 heatmap=1 时额外返回概率最高的几个类别的类激活热力图（PNG的data URL）
+    """
     try:
         if 'image' not in request.files:
             return jsonify({'success': False, 'error': '未收到图片文件'}), 400
@@ -453,7 +497,22 @@ def image_recognition():
             # 调用大模型生成健康报告
             deepseek = DeepseekAPI()
             report = deepseek.get_health_advice(f'图片识别结果: {result}')
-            return jsonify({'success': True, 'result': result, 'report': report})
+            response = {'success': True, 'result': result, 'report': report}
+            heatmap = request.values.get('heatmap', '').lower() in ('1', 'true', 'yes')
+            if heatmap:
+                # 与上面的识别共用同一次推理（预测缓存），这里只渲染或读取缓存的热力图
+                try:
+                    response['heatmaps'] = [
+                        {
+                            'label': item['name'],
+                            'probability': item['probability'],
+                            'image': 'data:image/png;base64,' + base64.b64encode(item['heatmap_png']).decode('ascii'),
+                        }
+                        for item in explain_image(file_path)
+                    ]
+                except Exception as e:
+                    response['heatmap_error'] = f'热力图生成失败: {str(e)}'
+            return jsonify(response)
         except Exception as e:
             return jsonify({'success': False, 'error': f'图片分析失败: {str(e)}'})
     except Exception as e:
@@ -502,6 +561,14 @@ def main():
         print("🌐 启动Web服务器...")
         print("📱 访问地址: http://localhost:5000")
         print("🔧 API文档: http://localhost:5000/api/health")
+
+        # 眼部游戏页面的关键点推理服务（WebSocket，独立端口）
+        try:
+            from landmark_service import LANDMARK_SERVICE_PORT, start_in_thread
+            start_in_thread()   # 端口被占用等启动错误在这里抛出
+            print(f"👁️ 关键点服务: ws://localhost:{LANDMARK_SERVICE_PORT}/ws/landmarks")
+        except Exception as e:
+            print(f"⚠️ 关键点服务未启动: {e}")
         
         # 启动Flask应用
         app.run(
@@ -0,0 +1,244 @@
+# eye_state.py
+"""
+在线眨眼与眼疲劳检测
+
+以前的眼动追踪分析把30秒内每一帧的嵌套字典存进列表，结束后才统计，眨眼频率还假设30fps。
+EyeStateMonitor 逐帧更新、内存固定，可以连续监测数小时：
+
+- 最近 WINDOW_SECONDS 秒的时间戳、开合度和闭眼状态存放在预分配的NumPy环形缓冲区中；
+  缓冲区按 MAX_FPS 预分配，实际帧率更高、装不下一个时间窗时按需扩容（至多 FPS_LIMIT 帧/秒）
+- 整个会话的开合度均值/方差用 Welford 算法增量计算，眼球位置范围只保留最小/最大值
+- 眨眼按真实时间戳检测：开合度低于基线的 CLOSE_RATIO 判为闭眼，回升到 OPEN_RATIO 以上才判为睁眼
+  （滞回，避免阈值附近抖动重复计数）；闭眼时长在 [MIN_BLINK_SECONDS, MAX_BLINK_SECONDS] 内
+  记为一次眨眼，更长的记为长时间闭眼。基线为睁眼时开合度的指数滑动平均，随距离变化自适应
+
+每帧都可以通过 metrics() 取得实时指标；is_fatigued() 供桌宠的休息提醒等长期监测使用。
+update_face 以眼睛纵横比（EAR）作为开合度；update 也接受其他开合度量，阈值均相对于基线。
+"""
+
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from landmark_geometry import as_points, eye_aspect_ratio, eye_centers
+
+WINDOW_SECONDS = 60.0          # 实时指标（PERCLOS、眨眼频率）的时间窗
+MAX_FPS = 60                   # 环形缓冲区按此帧率预分配
+FPS_LIMIT = 1000               # 扩容上限：帧率超过它时时间窗按最近 window_seconds*FPS_LIMIT 帧计算
+CLOSE_RATIO = 0.7              # 开合度低于基线的该比例判为闭眼
+OPEN_RATIO = 0.85              # 回升到基线的该比例以上判为睁眼
+MIN_BLINK_SECONDS = 0.05
+MAX_BLINK_SECONDS = 0.5
+BASELINE_SECONDS = 2.0         # 基线滑动平均的时间常数
+BLINK_CAPACITY = 512           # 保留的最近眨眼事件数
+
+# 疲劳判定：PERCLOS（时间窗内闭眼时间占比）过高，或眨眼过少（长时间盯屏幕）
+PERCLOS_THRESHOLD = 0.15
+MIN_BLINKS_PER_MINUTE = 8.0
+
+
+class RunningStats:
+    """Welford 增量均值/方差"""
+
+    __slots__ = ("count", "mean", "_m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """总体方差（与 np.var 一致）"""
+        return self._m2 / self.count if self.count else 0.0
+
+
+class EyeStateMonitor:
+    """逐帧更新的眼睛状态：开合度统计、眨眼事件、眼动范围和疲劳指标"""
+
+    def __init__(self, window_seconds: float = WINDOW_SECONDS, max_fps: int = MAX_FPS):
+        self.window_seconds = window_seconds
+        self._max_capacity = int(math.ceil(window_seconds * FPS_LIMIT))
+        capacity = min(int(math.ceil(window_seconds * max_fps)), self._max_capacity)
+        self._times = np.zeros(capacity, np.float64)
+        self._openness = np.zeros(capacity, np.float32)
+        self._closed = np.zeros(capacity, np.bool_)
+        self._head = 0
+        self._size = 0
+        self._blink_times = np.zeros(BLINK_CAPACITY, np.float64)
+        self._blink_head = 0
+        self._blink_size = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self._head = self._size = 0
+        self._blink_head = self._blink_size = 0
+        self.openness_stats = RunningStats()
+        self.blink_count = 0
+        self.long_closures = 0
+        self.started_at: Optional[float] = None
+        self.last_time: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.closed = False
+        self._closed_at = 0.0
+        self._center_min = np.full((2, 2), np.inf)
+        self._center_max = np.full((2, 2), -np.inf)
+
+    # ------------------------------------------------------------------
+    # 更新
+    # ------------------------------------------------------------------
+
+    def update(self, timestamp: float, openness: float, centers: Optional[np.ndarray] = None) -> bool:
+        """加入一帧；centers为两只眼的中心 (2, 2)。返回本帧是否结束了一次眨眼"""
+        if self.started_at is None:
+            self.started_at = timestamp
+            self.baseline = openness
+        dt = timestamp - self.last_time if self.last_time is not None else 0.0
+        self.last_time = timestamp
+        self.openness_stats.update(openness)
+        if centers is not None:
+            np.minimum(self._center_min, centers, out=self._center_min)
+            np.maximum(self._center_max, centers, out=self._center_max)
+
+        blinked = False
+        if self.closed:
+            if openness > self.baseline * OPEN_RATIO:
+                self.closed = False
+                duration = timestamp - self._closed_at
+                if MIN_BLINK_SECONDS <= duration <= MAX_BLINK_SECONDS:
+                    self._record_blink(timestamp)
+                    blinked = True
+                elif duration > MAX_BLINK_SECONDS:
+                    self.long_closures += 1
+        elif openness < self.baseline * CLOSE_RATIO:
+            self.closed = True
+            self._closed_at = timestamp
+        if not self.closed:
+            alpha = 1.0 - math.exp(-dt / BASELINE_SECONDS) if dt > 0 else 0.0
+            self.baseline += alpha * (openness - self.baseline)
+
+        if self._size == len(self._times) and self._times[self._head] > timestamp - self.window_seconds:
+            # 最旧的一帧仍在时间窗内：帧率高于预分配的帧率，扩容而不是丢掉窗内的帧
+            self._grow()
+        self._times[self._head] = timestamp
+        self._openness[self._head] = openness
+        self._closed[self._head] = self.closed
+        self._head = (self._head + 1) % len(self._times)
+        self._size = min(self._size + 1, len(self._times))
+        return blinked
+
+    def _grow(self) -> None:
+        capacity = len(self._times)
+        new_capacity = min(capacity * 2, self._max_capacity)
+        if new_capacity <= capacity:
+            return
+        # 按时间顺序搬到新缓冲区的开头
+        order = np.roll(np.arange(capacity), -self._head)
+        for name in ('_times', '_openness', '_closed'):
+            old = getattr(self, name)
+            new = np.zeros(new_capacity, old.dtype)
+            new[:capacity] = old[order]
+            setattr(self, name, new)
+        self._head = capacity
+
+    def update_face(self, timestamp: float, face) -> Tuple[bool, np.ndarray, np.ndarray]:
+        """由一帧面部关键点更新；开合度为两眼纵横比（EAR）的均值，不受人脸远近影响。
+        返回 (是否结束一次眨眼, 两眼中心 (2, 2), 两眼EAR (2,))"""
+        face = as_points(face)
+        openness = eye_aspect_ratio(face)
+        centers = eye_centers(face)
+        blinked = self.update(timestamp, float(openness.mean()), centers)
+        return blinked, centers, openness
+
+    def _record_blink(self, timestamp: float) -> None:
+        self.blink_count += 1
+        self._blink_times[self._blink_head] = timestamp
+        self._blink_head = (self._blink_head + 1) % BLINK_CAPACITY
+        self._blink_size = min(self._blink_size + 1, BLINK_CAPACITY)
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    @property
+    def duration(self) -> float:
+        return self.last_time - self.started_at if self.started_at is not None else 0.0
+
+    def _window(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """时间窗内的 (时间戳, 开合度, 闭眼状态)，按时间顺序"""
+        if self._size < len(self._times):
+            times, openness, closed = self._times[:self._size], self._openness[:self._size], self._closed[:self._size]
+        else:
+            times = np.roll(self._times, -self._head)
+            openness = np.roll(self._openness, -self._head)
+            closed = np.roll(self._closed, -self._head)
+        start = np.searchsorted(times, self.last_time - self.window_seconds)
+        return times[start:], openness[start:], closed[start:]
+
+    def recent(self) -> Tuple[np.ndarray, np.ndarray]:
+        """时间窗内的 (时间戳, 开合度)，用于绘制曲线"""
+        times, openness, _ = self._window()
+        return times, openness
+
+    def perclos(self) -> float:
+        """时间窗内闭眼时间占比（按帧间隔加权）"""
+        times, _, closed = self._window()
+        if len(times) < 2:
+            return 0.0
+        intervals = np.diff(times)
+        span = times[-1] - times[0]
+        return float(intervals[closed[:-1]].sum() / span) if span > 0 else 0.0
+
+    def blinks_per_minute(self) -> float:
+        """时间窗内的眨眼频率（次/分钟）"""
+        span = min(self.duration, self.window_seconds)
+        if span <= 0:
+            return 0.0
+        recent = self._blink_times[:self._blink_size]
+        count = int(np.count_nonzero(recent >= self.last_time - span))
+        return count * 60.0 / span
+
+    def blink_frequency(self) -> float:
+        """整个会话的眨眼频率（次/秒）"""
+        return self.blink_count / self.duration if self.duration > 0 else 0.0
+
+    def fatigue_score(self) -> float:
+        """眼疲劳评分：开合度变化大且平均值较低表示疲劳"""
+        stats = self.openness_stats
+        return min(1.0, (1 - stats.mean) * stats.variance * 10)
+
+    def movement_range(self) -> np.ndarray:
+        """两只眼中心的 (x范围, y范围)，形状 (2, 2)"""
+        if not np.isfinite(self._center_min).all():
+            return np.zeros((2, 2))
+        return self._center_max - self._center_min
+
+    def is_fatigued(self, perclos_threshold: float = PERCLOS_THRESHOLD,
+                    min_blinks_per_minute: float = MIN_BLINKS_PER_MINUTE) -> bool:
+        """监测满一个时间窗后，闭眼占比过高或眨眼过少时判为疲劳"""
+        if self.duration < self.window_seconds:
+            return False
+        return self.perclos() > perclos_threshold or self.blinks_per_minute() < min_blinks_per_minute
+
+    def metrics(self) -> Dict[str, float]:
+        stats = self.openness_stats
+        return {
+            'duration': self.duration,
+            'samples': stats.count,
+            'average_openness': stats.mean,
+            'openness_variance': stats.variance,
+            'blink_count': self.blink_count,
+            'long_closures': self.long_closures,
+            'blink_frequency': self.blink_frequency(),
+            'blinks_per_minute': self.blinks_per_minute(),
+            'perclos': self.perclos(),
+            'eye_fatigue_score': self.fatigue_score(),
+            'eyes_closed': self.closed,
+        }
@@ -1,10 +1,33 @@
 # image_processing.py
+import hashlib
 import os
+import sys
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
 import torch
 from torchvision import transforms
 from PIL import Image
 
+PEPPERCAT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'PepperCat-main')
+if PEPPERCAT_DIR not in sys.path:
+    sys.path.append(PEPPERCAT_DIR)
+from src.tools.image_loader import load_pil
+
 IMG_SIZE = 224
+# 加载时的目标尺寸提示：JPEG直接缩小解码到不小于该尺寸，再由test_transform缩放
+LOAD_TARGET_SIZE = (IMG_SIZE, IMG_SIZE)
+
+# 解释模式：每次预测同时保存概率最高的几个类别的类激活图（CAM）
+EXPLAIN_TOP_K = 3
+HEATMAP_MAX_SIDE = 512
+# 预测缓存（按图片内容的SHA1），保存概率、CAM和已渲染的热力图
+PREDICTION_CACHE_SIZE = int(os.environ.get("OCT_PREDICTION_CACHE_SIZE", 64))
+
+# ResNet-50主干在全局平均池化之前的各阶段
+RESNET_STAGES = ('conv1', 'bn1', 'relu', 'maxpool', 'layer1', 'layer2', 'layer3', 'layer4')
 
 # 定义中英文对照字典
 CLASS_LABELS = {
@@ -65,29 +88,154 @@ def load_model():
 
 load_model()  # 加载模型
 
+def _ensure_model():
+    # 若模型未加载则尝试重新加载
+    if model is None or not model_loaded:
+        load_model()
+    if model is None or not model_loaded:
+        raise Exception("模型未加载")
+
+_prediction_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cam_weights_cache = {}
+
+def _file_digest(image_path):
+    sha1 = hashlib.sha1()
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def _forward(inputs):
+    """一次前向，返回 (logits, layer4特征图)；模型不是ResNet结构时特征图为None"""
+    net = getattr(model, 'base_model', None)
+    if net is None or not all(hasattr(net, name) for name in RESNET_STAGES + ('avgpool', 'fc')):
+        return model(inputs), None
+    x = inputs
+    for name in RESNET_STAGES:
+        x = getattr(net, name)(x)
+    logits = net.fc(torch.flatten(net.avgpool(x), 1))
+    return logits, x
+
+def _cam_weights():
+    """把fc（Dropout + 两个无激活的Linear）合并为 (类别数, 通道数) 的线性映射
+
+    全局平均池化与线性映射可交换：logit_c = mean_hw(Σ_k W[c,k]·F_k) + b_c，
+    因此 Σ_k W[c,k]·F_k 就是类别c的激活图，不需要反向传播。fc中有非线性层时返回None。
+    """
+    key = id(model)
+    if key not in _cam_weights_cache:
+        fc = model.base_model.fc
+        weight = None
+        for layer in list(fc.children()) or [fc]:
+            kind = getattr(layer, 'original_name', type(layer).__name__)
+            if kind == 'Dropout':
+                continue
+            if kind != 'Linear':
+                weight = None
+                break
+            layer_weight = layer.weight.detach()
+            weight = layer_weight if weight is None else layer_weight @ weight
+        _cam_weights_cache[key] = weight
+    return _cam_weights_cache[key]
+
+def _predict(images, top_k=0):
+    """批量推理，返回 [(概率字典, CAM列表或None)]；CAM列表为概率最高的top_k个 (类别, 特征图分辨率的激活图)"""
+    _ensure_model()
+    tensors = [
+        test_transform((img if isinstance(img, Image.Image) else Image.fromarray(img)).convert('RGB'))
+        for img in images
+    ]
+    labels = list(CLASS_LABELS.keys())
+    with torch.no_grad():
+        inputs = torch.stack(tensors).to(device)
+        outputs, features = _forward(inputs)
+        probabilities = torch.nn.functional.softmax(outputs, dim=1).cpu()  # 获取概率分布
+        cams = [None] * len(images)
+        weights = _cam_weights() if features is not None and top_k > 0 else None
+        if weights is not None:
+            top = torch.topk(outputs, k=min(top_k, outputs.shape[1]), dim=1).indices
+            maps = torch.einsum('bkc,bchw->bkhw', weights[top], features).cpu().numpy()
+            cams = [
+                [(labels[c], maps[i, j]) for j, c in enumerate(top[i].tolist())]
+                for i in range(len(images))
+            ]
+    return [(dict(zip(labels, row.tolist())), cam) for row, cam in zip(probabilities, cams)]
+
+def _cached_prediction(image_path):
+    """按图片内容取缓存的预测；未命中时推理一次并同时保存CAM"""
+    key = _file_digest(image_path)
+    with _cache_lock:
+        entry = _prediction_cache.get(key)
+        if entry is not None:
+            _prediction_cache.move_to_end(key)
+            return entry
+    img = load_pil(image_path, LOAD_TARGET_SIZE)
+    probabilities, cams = _predict([img], EXPLAIN_TOP_K)[0]
+    entry = {'probabilities': probabilities, 'cams': cams, 'heatmaps': {}}
+    with _cache_lock:
+        _prediction_cache[key] = entry
+        while len(_prediction_cache) > PREDICTION_CACHE_SIZE:
+            _prediction_cache.popitem(last=False)
+    return entry
+
+def predict_probabilities(image_path):
+    """返回各类别（CLASS_LABELS的英文键）的softmax概率"""
+    _ensure_model()
+    # 确保图片路径有效
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"图片文件未找到: {image_path}")
+    return _cached_prediction(image_path)['probabilities']
+
+def predict_probabilities_batch(images):
+    """批量推理：images为PIL图像或灰度/RGB的uint8数组，返回与输入顺序一致的概率字典列表"""
+    return [probabilities for probabilities, _ in _predict(images)]
+
+def _render_heatmap(image, cam):
+    """把激活图拉伸到原图尺寸，用JET色表叠加到原图上，返回PNG字节"""
+    cam = np.maximum(cam, 0)
+    peak = cam.max()
+    if peak > 0:
+        cam = cam / peak
+    height, width = image.shape[:2]
+    heat = cv2.resize(cam.astype(np.float32), (width, height), interpolation=cv2.INTER_LINEAR)
+    color = cv2.applyColorMap(np.uint8(heat * 255), cv2.COLORMAP_JET)
+    overlay = cv2.addWeighted(image, 0.6, color, 0.4, 0)
+    return cv2.imencode('.png', overlay)[1].tobytes()
+
+def explain_image(image_path, top_k=EXPLAIN_TOP_K):
+    """返回概率最高的top_k（不超过EXPLAIN_TOP_K）个类别及其类激活热力图（PNG字节）
+
+    CAM在预测的同一次前向中得到，热力图渲染后存入预测缓存，同一图片再次查看不再计算。
+    """
+    _ensure_model()
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"图片文件未找到: {image_path}")
+    entry = _cached_prediction(image_path)
+    if entry['cams'] is None:
+        raise Exception("当前模型结构不支持类激活图")
+    cams = entry['cams'][:top_k]
+    heatmaps = entry['heatmaps']
+    if any(label not in heatmaps for label, _ in cams):
+        img = load_pil(image_path, (HEATMAP_MAX_SIDE, HEATMAP_MAX_SIDE))
+        img.thumbnail((HEATMAP_MAX_SIDE, HEATMAP_MAX_SIDE))
+        base = cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+        for label, cam in cams:
+            if label not in heatmaps:
+                heatmaps[label] = _render_heatmap(base, cam)
+    probabilities = entry['probabilities']
+    return [
+        {'label': label, 'name': CLASS_LABELS[label], 'probability': probabilities[label], 'heatmap_png': heatmaps[label]}
+        for label, _ in cams
+    ]
+
 def analyze_image(image_path):
     """分析图片并返回概率最大的标签的中文名称"""
-    global model, model_loaded
     try:
-        # 若模型未加载则尝试重新加载
-        if model is None or not model_loaded:
-            load_model()
-        if model is None or not model_loaded:
-            raise Exception("模型未加载")
-        # 确保图片路径有效
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"图片文件未找到: {image_path}")
         print(f"图片路径: {image_path}")  # 调试信息
-        img = Image.open(image_path).convert('RGB')
-        img_tensor = test_transform(img)
-        img_tensor = img_tensor.unsqueeze(0)  # 添加批处理维度
-        with torch.no_grad():
-            inputs = img_tensor.to(device)
-            outputs = model(inputs)
-            probabilities = torch.nn.functional.softmax(outputs, dim=1)  # 获取概率分布
-            _, predicted_class = torch.max(probabilities, 1)
+        probabilities = predict_probabilities(image_path)
         # 获取预测的类别名称
-        predicted_class_name = list(CLASS_LABELS.keys())[predicted_class.item()]
+        predicted_class_name = max(probabilities, key=probabilities.get)
         # 返回对应的中文名称
         return CLASS_LABELS[predicted_class_name]
     except FileNotFoundError as e:
@@ -0,0 +1,119 @@
+# landmark_geometry.py
+"""
+面部/手部关键点的几何计算
+
+每帧的面部和手部结果统一表示为 (N, 3) 的float32归一化坐标数组（CameraStream 的
+snapshot.face / snapshot.hand 就是这种数组），各模块不再逐个读取 landmark[i].x/.y。
+下列函数既接受单帧 (N, 3)，也接受多帧堆叠的 (T, N, 3)，按最后两维计算；
+返回单个方向的 quantize_direction / pointing_direction / segment_direction 只处理单帧。
+"""
+
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+# 面部关键点（MediaPipe FaceMesh编号）
+INTEROCULAR = (159, 386)            # 两眼上眼睑中点，用于估计距离
+OUTER_EYE_CORNERS = (33, 263)
+# 每只眼：外角、内角、上眼睑、下眼睑
+EYE_OUTLINE = np.array([[33, 133, 160, 159], [362, 263, 386, 385]])
+EYE_LIDS = np.array([[160, 159], [386, 385]])
+# 眼睛纵横比（EAR）：p1外角 p2/p3上眼睑 p4内角 p5/p6下眼睑
+EAR_POINTS = np.array([[33, 160, 158, 133, 153, 144], [362, 385, 387, 263, 373, 380]])
+# 虹膜中心（refine_landmarks=True 时才有）
+IRIS_CENTERS = np.array([468, 473])
+
+# 手部关键点（MediaPipe Hands编号）
+WRIST = 0
+INDEX_PIP = 6
+INDEX_TIP = 8
+MIDDLE_TIP = 12
+
+# 相机模型：平均面宽（米）与估计焦距（像素）
+AVERAGE_FACE_WIDTH = 0.16
+FOCAL_LENGTH = 600
+
+
+def as_points(landmarks) -> np.ndarray:
+    """关键点转换为 (N, 3) float32 数组；已是数组或 LandmarkView 时不复制"""
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    points = getattr(landmarks, "points", None)
+    if points is not None:
+        return points
+    return np.array([(p.x, p.y, p.z) for p in landmarks.landmark], np.float32)
+
+
+def point_distance(points: np.ndarray, a: int, b: int) -> np.ndarray:
+    """两个关键点在图像平面上的归一化距离"""
+    delta = points[..., a, :2] - points[..., b, :2]
+    return np.hypot(delta[..., 0], delta[..., 1])
+
+
+def midpoint(points: np.ndarray, a: int, b: int) -> np.ndarray:
+    """两个关键点的中点 (..., 2)"""
+    return (points[..., a, :2] + points[..., b, :2]) / 2
+
+
+def interocular_distance(face: np.ndarray, pair: Tuple[int, int] = INTEROCULAR) -> np.ndarray:
+    return point_distance(face, *pair)
+
+
+def estimate_distance_cm(face: np.ndarray, frame_width: float) -> np.ndarray:
+    """按针孔模型由眼间距估计人脸到摄像头的距离（厘米，未限幅）"""
+    return AVERAGE_FACE_WIDTH * FOCAL_LENGTH / (interocular_distance(face) * frame_width) * 100
+
+
+def eye_centers(face: np.ndarray, outline: np.ndarray = EYE_OUTLINE) -> np.ndarray:
+    """两只眼各自轮廓点的中心 (..., 2, 2)"""
+    return face[..., outline, :2].mean(axis=-2)
+
+
+def gaze_offsets(face: np.ndarray, outline: np.ndarray = EYE_OUTLINE, irises: np.ndarray = IRIS_CENTERS) -> np.ndarray:
+    """两只眼虹膜中心相对眼睛中心的偏移，以眼角间距归一化 (..., 2, 2)；正视前方时约为0"""
+    centers = eye_centers(face, outline)
+    width = np.linalg.norm(face[..., outline[:, 0], :2] - face[..., outline[:, 1], :2], axis=-1)
+    return (face[..., irises, :2] - centers) / np.maximum(width, 1e-6)[..., None]
+
+
+def lid_distances(face: np.ndarray, lids: np.ndarray = EYE_LIDS) -> np.ndarray:
+    """两只眼上下眼睑的距离 (..., 2)"""
+    delta = face[..., lids[:, 0], :2] - face[..., lids[:, 1], :2]
+    return np.hypot(delta[..., 0], delta[..., 1])
+
+
+def eye_aspect_ratio(face: np.ndarray, ear_points: np.ndarray = EAR_POINTS) -> np.ndarray:
+    """两只眼的纵横比 EAR = (|p2-p6| + |p3-p5|) / (2|p1-p4|)，闭眼时趋近0 (..., 2)"""
+    p = face[..., ear_points, :2]
+    vertical = (np.linalg.norm(p[..., 1, :] - p[..., 5, :], axis=-1)
+                + np.linalg.norm(p[..., 2, :] - p[..., 4, :], axis=-1))
+    horizontal = np.linalg.norm(p[..., 0, :] - p[..., 3, :], axis=-1)
+    return vertical / np.maximum(2 * horizontal, 1e-6)
+
+
+def finger_angles(hand: np.ndarray, tips: Tuple[int, ...] = (INDEX_TIP, MIDDLE_TIP), origin: int = WRIST) -> np.ndarray:
+    """各指尖相对origin的方向角（度，图像坐标，0为右、90为下）"""
+    vectors = hand[..., list(tips), :2] - hand[..., origin, None, :2]
+    return np.degrees(np.arctan2(vectors[..., 1], vectors[..., 0]))
+
+
+def quantize_direction(angle: float) -> int:
+    """角度归入右(0)/下(90)/左(180)/上(270)四个方向"""
+    return (int((angle + 45) % 360 // 90) * 90) % 360
+
+
+def pointing_direction(hand: np.ndarray, straight_tolerance: Optional[float] = None) -> Optional[int]:
+    """食指（腕→指尖）指向的方向；给出 straight_tolerance 时要求食指与中指夹角小于该值（手指伸直）"""
+    index_angle, middle_angle = finger_angles(hand)
+    # 夹角按 [-180, 180) 折算：指向左方时两个角度可能分别接近 180 和 -180
+    spread = (index_angle - middle_angle + 180) % 360 - 180
+    if straight_tolerance is not None and not abs(spread) < straight_tolerance:
+        return None
+    return quantize_direction(float(index_angle))
+
+
+def segment_direction(hand: np.ndarray, start: int = INDEX_PIP, end: int = INDEX_TIP) -> int:
+    """关节start→end的方向（如食指第二关节→指尖）"""
+    dx, dy = (hand[end, :2] - hand[start, :2]).tolist()
+    return quantize_direction(math.degrees(math.atan2(dy, dx)))
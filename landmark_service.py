@@ -0,0 +1,427 @@
+# landmark_service.py
+"""
+浏览器眼部游戏的关键点推理服务（WebSocket）
+
+eye_health_web_app 提供的眼动追踪、专注力、反应速度和记忆游戏页面运行在浏览器中，
+用不到 VisionTrainingGame 背后的 MediaPipe 推理。本服务让页面把摄像头画面缩小、压缩成
+JPEG/WebP 后通过 WebSocket 发来，返回紧凑的关键点和视线数组：
+
+- 每个连接（会话）只保留最新一帧：上一帧还在排队时新帧直接替换它（计入 dropped），
+  每个会话同时最多一帧在推理，浏览器发得再快也不会积压，延迟始终是一帧
+- 调度协程把各会话待处理的帧拼成批次，交给进程池（默认每个CPU核一个进程）；
+  空闲进程多时批次小、并行度高，全部繁忙时帧在排队期间累积成大批次，进程间传输的开销被摊薄。
+  吞吐量取决于核数，与在线玩家数无关：玩家多了每个会话的帧率下降，而不是排队变长
+- 工作进程各自加载一份 FaceMesh/Hands（静态图片模式，不依赖会话的前后帧，任一进程可处理
+  任一会话的帧），在进程内完成解码、推理和结果打包
+
+协议（小端）：
+- 客户端 → 服务端 二进制消息：uint32 帧号 + JPEG/WebP 图像数据（未镜像的原始画面）
+- 客户端 → 服务端 文本消息：JSON 选项 {"face": "gaze"|"full"|"none", "hands": true|false}，
+  或 {"stats": true} 查询本会话统计
+- 服务端 → 客户端 二进制消息：RESULT_HEADER（帧号, 面部点数, 手数, 状态, 视线x, 视线y, 推理毫秒）
+  + 面部点 float16 (面部点数, 2) + 每只手 float16 (21, 2)，坐标为归一化图像坐标。
+  "gaze" 模式只返回 GAZE_POINTS（两眼轮廓和虹膜中心）；没有检测到人脸时视线为 NaN
+
+单独运行：python landmark_service.py --port 5001 --workers 4
+eye_health_web_app 启动时会在后台线程中一并启动（端口 LANDMARK_SERVICE_PORT），只用 EMBEDDED_WORKERS
+个进程：spawn 出的工作进程会重新导入 __main__（Web应用的 torch、智能体和 Flask），再各自加载模型，
+玩家多时应单独运行本服务。
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from aiohttp import WSMsgType, web
+
+from camera_broker import FACE_POINTS, HAND_POINTS, MAX_HANDS, landmarks_array
+from landmark_geometry import EYE_OUTLINE, IRIS_CENTERS, gaze_offsets
+from vision_pipeline import StageStats
+
+LANDMARK_SERVICE_HOST = os.environ.get("LANDMARK_SERVICE_HOST", "0.0.0.0")
+LANDMARK_SERVICE_PORT = int(os.environ.get("LANDMARK_SERVICE_PORT", 5001))
+WORKERS = int(os.environ.get("LANDMARK_SERVICE_WORKERS", 0)) or os.cpu_count() or 1
+EMBEDDED_WORKERS = int(os.environ.get("LANDMARK_SERVICE_WORKERS", 0)) or min(2, WORKERS)   # 嵌入Web应用时
+STARTUP_TIMEOUT_SECONDS = 10.0
+BATCH_SIZE = 8                 # 每批最多帧数
+BATCH_WAIT_SECONDS = 0.003     # 有空闲进程但待处理帧不足一批时，最多等待其他会话的帧
+MAX_FRAME_BYTES = 1 << 20
+
+FRAME_ID = struct.Struct('<I')
+RESULT_HEADER = struct.Struct('<IHBBfff')
+STATUS_OK = 0
+STATUS_DECODE_ERROR = 1
+STATUS_INFERENCE_ERROR = 2
+
+GAZE_POINTS = np.concatenate([EYE_OUTLINE.ravel(), IRIS_CENTERS])
+FACE_MODES = ('gaze', 'full', 'none')
+
+ModelFactory = Callable[[], Tuple[Any, Any]]
+
+
+# ----------------------------------------------------------------------
+# 工作进程
+# ----------------------------------------------------------------------
+
+def default_models() -> Tuple[Any, Any]:
+    """工作进程中的 MediaPipe 模型（静态图片模式，不在帧之间跟踪）"""
+    import mediapipe as mp
+
+    face_mesh = mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=True, max_num_faces=1, refine_landmarks=True, min_detection_confidence=0.5
+    )
+    hands = mp.solutions.hands.Hands(
+        static_image_mode=True, max_num_hands=MAX_HANDS, min_detection_confidence=0.5
+    )
+    return face_mesh, hands
+
+
+_worker_models: Optional[Tuple[Any, Any]] = None
+
+
+def _init_worker(model_factory: ModelFactory) -> None:
+    global _worker_models
+    # 并行度由进程数决定，避免每个进程的OpenCV再各开一组线程
+    cv2.setNumThreads(1)
+    _worker_models = model_factory()
+
+
+def pack_result(frame_id: int, face: Optional[np.ndarray], hands: List[np.ndarray], face_mode: str,
+                status: int = STATUS_OK, inference_ms: float = 0.0) -> bytes:
+    """按 RESULT_HEADER + float16 坐标打包一帧结果"""
+    gaze = (float('nan'), float('nan'))
+    points = np.empty((0, 2), np.float16)
+    if face is not None:
+        gaze = tuple(float(v) for v in gaze_offsets(face).mean(axis=0))
+        if face_mode == 'full':
+            points = face[:, :2].astype(np.float16)
+        elif face_mode == 'gaze':
+            points = face[GAZE_POINTS, :2].astype(np.float16)
+    hand_points = [hand[:, :2].astype(np.float16) for hand in hands[:MAX_HANDS]]
+    header = RESULT_HEADER.pack(frame_id, len(points), len(hand_points), status, gaze[0], gaze[1], inference_ms)
+    return b''.join([header, points.tobytes(), *(hand.tobytes() for hand in hand_points)])
+
+
+def unpack_result(payload: bytes) -> Dict[str, Any]:
+    """解析 pack_result 的结果（供Python客户端和测试使用）"""
+    frame_id, face_count, hand_count, status, gaze_x, gaze_y, inference_ms = RESULT_HEADER.unpack_from(payload)
+    offset = RESULT_HEADER.size
+    face = np.frombuffer(payload, np.float16, face_count * 2, offset).reshape(face_count, 2)
+    offset += face.nbytes
+    hands = np.frombuffer(payload, np.float16, hand_count * HAND_POINTS * 2, offset).reshape(hand_count, HAND_POINTS, 2)
+    return {
+        'frame_id': frame_id, 'status': status, 'gaze': (gaze_x, gaze_y),
+        'face': face, 'hands': hands, 'inference_ms': inference_ms,
+    }
+
+
+def infer_batch(items: List[Tuple[int, int, bytes, str, bool]]) -> List[Tuple[int, bytes]]:
+    """在工作进程中处理一批 (会话, 帧号, 图像, 面部模式, 是否检测手)，返回 (会话, 打包结果)"""
+    face_mesh, hands_model = _worker_models
+    results = []
+    for session_id, frame_id, data, face_mode, want_hands in items:
+        start = time.perf_counter()
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            results.append((session_id, pack_result(frame_id, None, [], face_mode, STATUS_DECODE_ERROR)))
+            continue
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        face, hands = None, []
+        try:
+            if face_mode != 'none':
+                detected = face_mesh.process(rgb)
+                if detected.multi_face_landmarks:
+                    face = landmarks_array(detected.multi_face_landmarks[0], FACE_POINTS)
+            if want_hands:
+                detected = hands_model.process(rgb)
+                if detected.multi_hand_landmarks:
+                    hands = [landmarks_array(hand, HAND_POINTS) for hand in detected.multi_hand_landmarks]
+            status = STATUS_OK
+        except Exception:
+            status = STATUS_INFERENCE_ERROR
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        results.append((session_id, pack_result(frame_id, face, hands, face_mode, status, elapsed_ms)))
+    return results
+
+
+# ----------------------------------------------------------------------
+# 服务端
+# ----------------------------------------------------------------------
+
+class _Session:
+    """一个WebSocket连接：最多一帧待处理、一帧在推理"""
+
+    def __init__(self, session_id: int, ws: web.WebSocketResponse):
+        self.id = session_id
+        self.ws = ws
+        self.face_mode = 'gaze'
+        self.hands = True
+        self.pending: Optional[Tuple[int, bytes, float]] = None   # (帧号, 图像, 收到时间)
+        self.in_flight = False
+        self.queued = False
+        self.closed = False
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {'received': self.received, 'processed': self.processed, 'dropped': self.dropped}
+
+
+class LandmarkService:
+    """WebSocket关键点服务：按会话丢弃旧帧，跨会话批量送入进程池推理"""
+
+    def __init__(self, workers: int = WORKERS, batch_size: int = BATCH_SIZE,
+                 batch_wait: float = BATCH_WAIT_SECONDS, model_factory: ModelFactory = default_models):
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.model_factory = model_factory
+        self.stats = StageStats()
+        self.dropped = 0
+        self.processed = 0
+        self.batches = 0
+        self._sessions: Dict[int, _Session] = {}
+        self._next_id = 0
+        self._ready: Deque[_Session] = deque()
+        self._ready_event: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Semaphore] = None
+        self._busy = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/ws/landmarks', self.handle_ws)
+        app.router.add_get('/status', self.handle_status)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self._pool = self._create_pool()
+        self._ready_event = asyncio.Event()
+        self._idle = asyncio.Semaphore(self.workers)
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        # 服务可能运行在多线程进程（如Flask）中，用spawn启动工作进程
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(self.model_factory,))
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        for session in list(self._sessions.values()):
+            await session.ws.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ------------------------------------------------------------------
+    # 连接
+    # ------------------------------------------------------------------
+
+    async def handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=MAX_FRAME_BYTES, heartbeat=30)
+        await ws.prepare(request)
+        session = _Session(self._next_id, ws)
+        self._next_id += 1
+        self._sessions[session.id] = session
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.BINARY:
+                    self._receive_frame(session, msg.data)
+                elif msg.type == WSMsgType.TEXT:
+                    await self._receive_options(session, msg.data)
+        finally:
+            session.closed = True
+            self._sessions.pop(session.id, None)
+        return ws
+
+    def _receive_frame(self, session: _Session, data: bytes) -> None:
+        if len(data) <= FRAME_ID.size:
+            return
+        session.received += 1
+        if session.pending is not None:
+            # 还没来得及处理的旧帧直接丢弃
+            session.dropped += 1
+            self.dropped += 1
+        session.pending = (FRAME_ID.unpack_from(data)[0], data[FRAME_ID.size:], time.perf_counter())
+        if not session.in_flight:
+            self._mark_ready(session)
+
+    async def _receive_options(self, session: _Session, text: str) -> None:
+        try:
+            options = json.loads(text)
+        except json.JSONDecodeError:
+            options = None
+        if not isinstance(options, dict):
+            await session.ws.send_json({'error': '选项必须是JSON对象'})
+            return
+        if options.get('face') in FACE_MODES:
+            session.face_mode = options['face']
+        if 'hands' in options:
+            session.hands = bool(options['hands'])
+        if options.get('stats'):
+            await session.ws.send_json(session.stats())
+
+    def _mark_ready(self, session: _Session) -> None:
+        if not session.queued:
+            session.queued = True
+            self._ready.append(session)
+            self._ready_event.set()
+
+    # ------------------------------------------------------------------
+    # 调度
+    # ------------------------------------------------------------------
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            await self._ready_event.wait()
+            await self._idle.acquire()
+            self._busy += 1
+            if len(self._ready) < self.batch_size:
+                await asyncio.sleep(self.batch_wait)
+            # 按空闲进程数均分待处理的帧：空闲多时批次小、并行度高，全忙时批次大
+            idle = self.workers - self._busy + 1
+            size = min(self.batch_size, max(1, -(-len(self._ready) // idle)))
+            batch = []
+            while self._ready and len(batch) < size:
+                session = self._ready.popleft()
+                session.queued = False
+                if session.closed or session.pending is None:
+                    continue
+                batch.append((session, session.pending))
+                session.pending = None
+                session.in_flight = True
+            if not self._ready:
+                self._ready_event.clear()
+            if not batch:
+                self._release_worker()
+                continue
+            task = asyncio.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[_Session, Tuple[int, bytes, float]]]) -> None:
+        items = [(session.id, frame_id, data, session.face_mode, session.hands)
+                 for session, (frame_id, data, _) in batch]
+        dispatched = time.perf_counter()
+        pool = self._pool
+        for _, (_, _, received_at) in batch:
+            self.stats.record('queue_wait', dispatched - received_at)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(pool, infer_batch, items)
+        except Exception as e:
+            print(f"关键点推理失败: {e!r}")
+            if isinstance(e, BrokenProcessPool) and pool is self._pool:
+                # 工作进程异常退出（如模型崩溃）后进程池不可再用，换一个新的
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._create_pool()
+            results = [(session.id, pack_result(frame_id, None, [], session.face_mode, STATUS_INFERENCE_ERROR))
+                       for session, (frame_id, _, _) in batch]
+        finally:
+            self._release_worker()
+        self.batches += 1
+        self.stats.record('batch', time.perf_counter() - dispatched)
+
+        now = time.perf_counter()
+        for (session, (_, _, received_at)), (_, payload) in zip(batch, results):
+            session.in_flight = False
+            session.processed += 1
+            self.processed += 1
+            self.stats.record('round_trip', now - received_at)
+            if session.closed:
+                continue
+            task = asyncio.create_task(self._send(session, payload))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            if session.pending is not None:
+                self._mark_ready(session)
+
+    def _release_worker(self) -> None:
+        self._busy -= 1
+        self._idle.release()
+
+    @staticmethod
+    async def _send(session: _Session, payload: bytes) -> None:
+        try:
+            await session.ws.send_bytes(payload)
+        except ConnectionError:
+            session.closed = True
+
+    async def handle_status(self, request: web.Request) -> web.Response:
+        return web.json_response(self.status())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'sessions': len(self._sessions),
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'mean_batch': round(self.processed / self.batches, 2) if self.batches else 0.0,
+            'stages': self.stats.summary(),
+        }
+
+
+def start_in_thread(host: str = LANDMARK_SERVICE_HOST, port: int = LANDMARK_SERVICE_PORT,
+                    workers: int = EMBEDDED_WORKERS, **kwargs) -> threading.Thread:
+    """在后台线程中运行服务（供 Flask 应用使用）；等到端口绑定完成才返回，启动失败时在调用方抛出"""
+    service = LandmarkService(workers=workers, **kwargs)
+    started = threading.Event()
+    startup_error: List[BaseException] = []
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(service.app())
+        try:
+            loop.run_until_complete(runner.setup())
+            loop.run_until_complete(web.TCPSite(runner, host, port).start())
+        except Exception as e:
+            startup_error.append(e)
+        started.set()
+        try:
+            if not startup_error:
+                loop.run_forever()
+        finally:
+            loop.run_until_complete(runner.cleanup())
+            loop.close()
+
+    thread = threading.Thread(target=serve, name="landmark-service", daemon=True)
+    thread.start()
+    if not started.wait(STARTUP_TIMEOUT_SECONDS):
+        raise TimeoutError(f"关键点服务在 {STARTUP_TIMEOUT_SECONDS:.0f} 秒内未完成启动")
+    if startup_error:
+        raise startup_error[0]
+    return thread
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="浏览器眼部游戏的关键点推理服务（WebSocket）")
+    parser.add_argument("--host", default=LANDMARK_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=LANDMARK_SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="推理进程数（默认CPU核数）")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    service = LandmarkService(workers=args.workers, batch_size=args.batch_size)
+    print(f"关键点服务: ws://{args.host}:{args.port}/ws/landmarks（{service.workers} 个推理进程）")
+    web.run_app(service.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# landmark_tracking.py
+"""
+关键点跟踪：隔帧运行 FaceMesh/Hands，其余帧用光流推算关键点
+
+代理的推理线程以前对每一帧都运行 FaceMesh 和 Hands。MediaPipe 的视频模式本身只在跟丢时
+才做人脸/手掌检测，但关键点模型和整帧的预处理每帧都要跑，是全天运行桌宠时主要的CPU开销；
+而相邻两帧之间人脸几乎不动。
+
+TrackedModel 包装模型，接口与 process() 相同：
+- 每 interval 帧运行一次模型（关键帧），结果照常返回
+- 其余帧在半分辨率灰度图上用金字塔 Lucas-Kanade 光流把上一帧的关键点推到当前帧：
+  人脸取部分关键点估计相似变换（平移、旋转、缩放）后作用于全部478个点；
+  手变形较大，21个点逐点跟踪，跟踪失败的点按其余点的中位位移移动
+- 前后向光流误差超过 FB_ERROR_PX 的点视为跟踪失败；可靠的点少于 MIN_TRACKED_RATIO、
+  或关键点移出画面时视为跟丢，当前帧立即改为运行模型；之后 LOSS_COOLDOWN_FRAMES 帧内每帧都运行模型，
+  不再尝试光流（画面缺少纹理、光线太暗时不至于每帧都白算一次光流）
+- 上一个关键帧没有检测到人脸/手时，其余帧直接返回空结果，新出现的手最多延迟 interval-1 帧
+
+间隔由 EYE_FACE_MODEL_INTERVAL / EYE_HAND_MODEL_INTERVAL 配置（或传给 CameraBroker），1 表示每帧都运行模型。
+"""
+
+import os
+import types
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from camera_broker import FACE_POINTS, HAND_POINTS, LandmarkView, landmarks_array
+
+FACE_MODEL_INTERVAL = int(os.environ.get("EYE_FACE_MODEL_INTERVAL", 3))
+HAND_MODEL_INTERVAL = int(os.environ.get("EYE_HAND_MODEL_INTERVAL", 2))
+
+# 人脸用于估计相似变换的关键点（网格上均匀取的一部分）
+FACE_FLOW_POINTS = np.arange(0, 468, 12)
+FLOW_SCALE = 0.5              # 光流在缩小后的灰度图上计算
+LK_PARAMS = dict(winSize=(11, 11), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+FB_ERROR_PX = 1.5             # 原分辨率像素
+MIN_TRACKED_RATIO = 0.5
+LOSS_COOLDOWN_FRAMES = 15
+
+# kind → (结果属性名, 关键点数)
+_KINDS = {
+    'face': ('multi_face_landmarks', FACE_POINTS),
+    'hands': ('multi_hand_landmarks', HAND_POINTS),
+}
+
+
+class TrackedModel:
+    """隔帧运行模型、其余帧用光流推算关键点的包装；kind 为 'face' 或 'hands'"""
+
+    def __init__(self, model, kind: str, interval: int):
+        if kind not in _KINDS:
+            raise ValueError(f"未知的模型类型: {kind}")
+        self.model = model
+        self.kind = kind
+        self.interval = max(1, int(interval))
+        self._attr, self._count = _KINDS[kind]
+        self._points: List[np.ndarray] = []   # 上一帧各实例的关键点 (N, 3)，归一化坐标
+        self._gray: Optional[np.ndarray] = None
+        self._since_model = 0
+        self._cooldown = 0
+        self.model_runs = 0
+        self.tracked_frames = 0
+        self.losses = 0
+
+    def process(self, rgb: np.ndarray):
+        if self.interval == 1:
+            self.model_runs += 1
+            return self.model.process(rgb)
+
+        small = cv2.resize(rgb, None, fx=FLOW_SCALE, fy=FLOW_SCALE, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        if self._cooldown:
+            self._cooldown -= 1
+        elif self._gray is not None and self._since_model < self.interval - 1:
+            points = self._propagate(gray) if self._points else []
+            if points is not None:
+                self._points, self._gray = points, gray
+                self._since_model += 1
+                self.tracked_frames += 1
+                return self._result(points)
+            self.losses += 1
+            self._cooldown = LOSS_COOLDOWN_FRAMES
+
+        result = self.model.process(rgb)
+        self.model_runs += 1
+        found = getattr(result, self._attr, None) or []
+        self._points = [landmarks_array(landmarks, self._count) for landmarks in found]
+        self._gray = gray
+        self._since_model = 0
+        return result
+
+    def _result(self, points: List[np.ndarray]):
+        return types.SimpleNamespace(**{self._attr: [LandmarkView(p) for p in points] or None})
+
+    def _propagate(self, gray: np.ndarray) -> Optional[List[np.ndarray]]:
+        """把上一帧的关键点推到当前帧；跟丢时返回None"""
+        h, w = gray.shape
+        scale = np.array([w, h], np.float32)
+        propagated = []
+        for points in self._points:
+            pixels = points[:, :2] * scale
+            anchors = pixels[FACE_FLOW_POINTS] if self.kind == 'face' else pixels
+            p0 = np.ascontiguousarray(anchors, np.float32).reshape(-1, 1, 2)
+            p1, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, p0, None, **LK_PARAMS)
+            back, status_back, _ = cv2.calcOpticalFlowPyrLK(gray, self._gray, p1, None, **LK_PARAMS)
+            fb_error = np.linalg.norm((p0 - back).reshape(-1, 2), axis=1)
+            good = (status.ravel() == 1) & (status_back.ravel() == 1) & (fb_error < FB_ERROR_PX * FLOW_SCALE)
+            if good.mean() < MIN_TRACKED_RATIO:
+                return None
+            moved = p1.reshape(-1, 2)
+
+            new = points.copy()
+            if self.kind == 'face':
+                M, _ = cv2.estimateAffinePartial2D(anchors[good], moved[good], method=cv2.RANSAC,
+                                                   ransacReprojThreshold=1.0)
+                if M is None:
+                    return None
+                new[:, :2] = pixels @ M[:, :2].T + M[:, 2]
+                new[:, 2] *= np.sqrt(abs(np.linalg.det(M[:, :2])))
+            else:
+                shift = np.median(moved[good] - anchors[good], axis=0)
+                new[:, :2] = np.where(good[:, None], moved, anchors + shift)
+            new[:, :2] /= scale
+            center = new[:, :2].mean(axis=0)
+            if not ((0 <= center) & (center <= 1)).all():
+                return None
+            propagated.append(new)
+        return propagated
+
+    def report(self) -> Dict[str, float]:
+        frames = self.model_runs + self.tracked_frames
+        return {
+            'interval': self.interval,
+            'model_runs': self.model_runs,
+            'tracked_frames': self.tracked_frames,
+            'losses': self.losses,
+            'model_ratio': round(self.model_runs / frames, 3) if frames else 0.0,
+        }
+
+    def close(self) -> None:
+        self.model.close()
@@ -0,0 +1,321 @@
+# oct_screening.py
+"""
+OCT批量筛查
+
+从目录（递归）或清单文件中流式读取OCT图片路径，分发到进程池并行分析：
+- 传统特征与疾病评分：PepperCat-main/src/tools/oct_analysis.OCTAnalyzer
+- CNN各类别概率：image_processing.predict_probabilities（torch或模型不可用时跳过）
+
+每个工作进程只初始化一次OpenCV、分析器和分类模型；结果按批增量写入CSV或Parquet，
+中断后以相同参数重新运行会跳过输出中已有的文件（包括失败记录）。
+
+用法:
+    python oct_screening.py exports/ -o screening.parquet
+    python oct_screening.py --manifest files.txt -o screening.csv --workers 16
+    python oct_screening.py exports/ -o screening.parquet --profile balanced   # 大尺寸导出图
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+PEPPERCAT_DIR = os.path.join(PROJECT_ROOT, 'PepperCat-main')
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff'}
+
+DISEASES = ['glaucoma', 'macular_degeneration', 'diabetic_retinopathy', 'retinal_detachment', 'normal']
+ABNORMALITY_TYPES = ['exudate', 'hemorrhage', 'irregular_structure']
+FEATURE_COLUMNS = [
+    'layer_count', 'layer_thickness_mean', 'layer_regularity', 'layer_continuity',
+    'cup_disc_ratio', 'cup_area', 'disc_area', 'cup_depth',
+    'fovea_depth', 'macular_thickness', 'drusen_count', 'geographic_atrophy',
+    'vessel_density', 'vessel_tortuosity', 'microaneurysms', 'hemorrhages',
+] + [f'abnormal_{t}' for t in ABNORMALITY_TYPES]
+
+
+# ----------------------------------------------------------------------
+# 输入
+# ----------------------------------------------------------------------
+
+def iter_directory(root: str) -> Iterator[str]:
+    """递归遍历目录，按名称顺序产出图片路径（不预先收集整个目录）"""
+    with os.scandir(root) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_directory(entry.path)
+        elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+            yield entry.path
+
+
+def iter_manifest(path: str) -> Iterator[str]:
+    """清单文件：每行一个路径；CSV清单取path列。相对路径相对于清单所在目录"""
+    base = os.path.dirname(os.path.abspath(path))
+    if path.lower().endswith('.csv'):
+        for chunk in pd.read_csv(path, usecols=['path'], chunksize=10000):
+            for p in chunk['path'].astype(str):
+                yield os.path.join(base, p)
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield os.path.join(base, line)
+
+
+# ----------------------------------------------------------------------
+# 工作进程
+# ----------------------------------------------------------------------
+
+_analyzer = None
+_predict = None
+_labels: List[str] = []
+
+
+def _init_worker(use_cnn: bool, profile: Optional[str] = None) -> None:
+    """每个工作进程只执行一次：单线程OpenCV/torch，创建分析器并加载分类模型"""
+    global _analyzer, _predict, _labels
+    import cv2
+    cv2.setNumThreads(1)
+    if PEPPERCAT_DIR not in sys.path:
+        sys.path.append(PEPPERCAT_DIR)
+    from src.tools.oct_analysis import OCTAnalyzer
+    _analyzer = OCTAnalyzer(profile)
+    if use_cnn:
+        try:
+            import torch
+            torch.set_num_threads(1)
+            import image_processing
+            if image_processing.model_loaded:
+                _predict = image_processing.predict_probabilities
+                _labels = list(image_processing.CLASS_LABELS)
+        except Exception as e:
+            print(f"[筛查进程] 分类模型不可用，跳过CNN概率: {e}")
+
+
+def flatten_features(features: Dict[str, Any]) -> Dict[str, Any]:
+    layers = features.get('retinal_layers', {})
+    optic = features.get('optic_nerve', {})
+    macula = features.get('macula', {})
+    vessels = features.get('vessels', {})
+    abnormalities = features.get('abnormalities', [])
+    thickness = layers.get('layer_thickness', [])
+    row = {
+        'layer_count': layers.get('layer_count'),
+        'layer_thickness_mean': float(np.mean(thickness)) if len(thickness) else None,
+        'layer_regularity': layers.get('layer_regularity'),
+        'layer_continuity': layers.get('layer_continuity'),
+        'cup_disc_ratio': optic.get('cup_disc_ratio'),
+        'cup_area': optic.get('cup_area'),
+        'disc_area': optic.get('disc_area'),
+        'cup_depth': optic.get('cup_depth'),
+        'fovea_depth': macula.get('fovea_depth'),
+        'macular_thickness': macula.get('macular_thickness'),
+        'drusen_count': macula.get('drusen_count'),
+        'geographic_atrophy': macula.get('geographic_atrophy'),
+        'vessel_density': vessels.get('vessel_density'),
+        'vessel_tortuosity': vessels.get('vessel_tortuosity'),
+        'microaneurysms': vessels.get('microaneurysms'),
+        'hemorrhages': vessels.get('hemorrhages'),
+    }
+    for t in ABNORMALITY_TYPES:
+        row[f'abnormal_{t}'] = sum(1 for a in abnormalities if a.get('type') == t)
+    # numpy标量转为Python类型，保证CSV/Parquet列类型稳定
+    return {k: (v.item() if isinstance(v, np.generic) else v) for k, v in row.items()}
+
+
+def _screen_one(path: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    row: Dict[str, Any] = {'path': path, 'status': 'success', 'error': None}
+    try:
+        result = _analyzer.analyze_oct_image(path)
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        row.update(flatten_features(result['oct_features']))
+        for disease in DISEASES:
+            row[f'score_{disease}'] = result['disease_analysis'].get(disease)
+        if _predict is not None:
+            probabilities = _predict(path)
+            for label in _labels:
+                row[f'prob_{label}'] = probabilities[label]
+            row['cnn_label'] = max(probabilities, key=probabilities.get)
+    except Exception as e:
+        row['status'] = 'error'
+        row['error'] = str(e)
+    row['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return row
+
+
+# ----------------------------------------------------------------------
+# 输出
+# ----------------------------------------------------------------------
+
+class ResultWriter:
+    """增量写入结果。CSV追加到单个文件；Parquet写成目录下的多个分片文件"""
+
+    TEXT_COLUMNS = ('path', 'status', 'error', 'cnn_label')
+
+    def __init__(self, output: str, columns: List[str], flush_every: int = 64):
+        self.output = output
+        self.columns = columns
+        self.flush_every = flush_every
+        self.parquet = output.lower().endswith('.parquet')
+        self._buffer: List[Dict[str, Any]] = []
+        if self.parquet:
+            os.makedirs(output, exist_ok=True)
+            parts = [f for f in os.listdir(output) if f.startswith('part-') and f.endswith('.parquet')]
+            self._part = max((int(f[5:-8]) for f in parts), default=-1) + 1
+
+    def completed(self) -> Set[str]:
+        """输出中已有结果的文件路径（用于断点续跑）"""
+        if not os.path.exists(self.output):
+            return set()
+        if self.parquet:
+            if not any(f.endswith('.parquet') for f in os.listdir(self.output)):
+                return set()
+            return set(pd.read_parquet(self.output, columns=['path'])['path'])
+        if os.path.getsize(self.output) == 0:
+            return set()
+        return set(pd.read_csv(self.output, usecols=['path'])['path'])
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self._buffer.append(row)
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        df = pd.DataFrame(self._buffer, columns=self.columns)
+        # 固定列类型，避免某批全为空值时各分片的schema不一致
+        for column in self.columns:
+            df[column] = df[column].astype('string' if column in self.TEXT_COLUMNS else 'float64')
+        if self.parquet:
+            df.to_parquet(os.path.join(self.output, f'part-{self._part:05d}.parquet'), index=False)
+            self._part += 1
+        else:
+            header = not os.path.exists(self.output) or os.path.getsize(self.output) == 0
+            df.to_csv(self.output, mode='a', header=header, index=False, quoting=csv.QUOTE_MINIMAL)
+        self._buffer.clear()
+
+
+# ----------------------------------------------------------------------
+# 调度
+# ----------------------------------------------------------------------
+
+class ScreeningStats:
+    """吞吐统计"""
+
+    def __init__(self, skipped: int):
+        self.start = time.perf_counter()
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.busy_ms = 0.0
+
+    def record(self, row: Dict[str, Any]) -> None:
+        self.done += 1
+        self.failed += row['status'] != 'success'
+        self.busy_ms += row['elapsed_ms']
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        avg = self.busy_ms / self.done if self.done else 0.0
+        return (f"已完成 {self.done} (失败 {self.failed}, 跳过 {self.skipped}) | "
+                f"{rate:.2f} 张/秒 | 单张平均 {avg:.0f}ms | 用时 {elapsed:.1f}s")
+
+
+def screen(
+    paths: Iterator[str],
+    output: str,
+    workers: Optional[int] = None,
+    use_cnn: bool = True,
+    flush_every: int = 64,
+    report_every: int = 50,
+    profile: Optional[str] = None,
+) -> ScreeningStats:
+    """批量筛查，返回吞吐统计"""
+    workers = workers or os.cpu_count() or 1
+    columns = (['path', 'status', 'error', 'elapsed_ms'] + FEATURE_COLUMNS
+               + [f'score_{d}' for d in DISEASES])
+    if use_cnn:
+        from image_processing import CLASS_LABELS
+        columns += [f'prob_{label}' for label in CLASS_LABELS] + ['cnn_label']
+
+    writer = ResultWriter(output, columns, flush_every)
+    completed = writer.completed()
+    stats = ScreeningStats(len(completed))
+    if completed:
+        print(f"断点续跑：跳过已完成的 {len(completed)} 个文件")
+
+    # 在途任务数量有上限：路径流式读取，内存占用与目录大小无关
+    max_inflight = workers * 4
+    pending: Set[concurrent.futures.Future] = set()
+
+    def drain(return_when):
+        nonlocal pending
+        done, pending = concurrent.futures.wait(pending, return_when=return_when)
+        for future in done:
+            row = future.result()
+            writer.add(row)
+            stats.record(row)
+            if stats.done % report_every == 0:
+                print(stats.summary())
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(use_cnn, profile)
+    ) as pool:
+        try:
+            for path in paths:
+                if path in completed:
+                    continue
+                pending.add(pool.submit(_screen_one, path))
+                if len(pending) >= max_inflight:
+                    drain(concurrent.futures.FIRST_COMPLETED)
+            drain(concurrent.futures.ALL_COMPLETED)
+        finally:
+            # 中断时也写出已完成的结果，下次从这里继续
+            writer.flush()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCT批量筛查")
+    parser.add_argument('directory', nargs='?', help="OCT图片目录（递归）")
+    parser.add_argument('--manifest', help="清单文件（每行一个路径，或带path列的CSV）")
+    parser.add_argument('-o', '--output', default='oct_screening.csv', help="输出文件（.csv 或 .parquet）")
+    parser.add_argument('--workers', type=int, default=None, help="进程数（默认全部CPU核心）")
+    parser.add_argument('--no-cnn', action='store_true', help="不计算CNN分类概率")
+    parser.add_argument('--flush-every', type=int, default=64, help="每多少条结果写盘一次")
+    parser.add_argument('--profile', choices=['full', 'accurate', 'balanced', 'fast'], default=None,
+                        help="OCT特征的多分辨率档位（默认取环境变量OCT_PYRAMID_PROFILE，未设置时为full）")
+    args = parser.parse_args()
+
+    if bool(args.directory) == bool(args.manifest):
+        parser.error("需要指定目录或 --manifest 之一")
+    paths = iter_directory(args.directory) if args.directory else iter_manifest(args.manifest)
+
+    use_cnn = not args.no_cnn
+    if use_cnn:
+        try:
+            import image_processing  # noqa: F401
+        except ImportError as e:
+            print(f"分类模型依赖不可用（{e}），仅输出传统特征")
+            use_cnn = False
+
+    stats = screen(paths, args.output, args.workers, use_cnn, args.flush_every, profile=args.profile)
+    print(stats.summary())
+    print(f"结果已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
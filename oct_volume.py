@@ -0,0 +1,461 @@
+# oct_volume.py
+"""
+OCT三维体数据分析
+
+OCT设备导出的体数据是100~500张B-scan组成的栈。本模块按切片流式读取体数据，
+逐批送入二维OCT分析器（PepperCat-main/src/tools/oct_analysis.OCTAnalyzer）和
+CNN分类模型（image_processing.predict_probabilities_batch），再汇总为体数据级指标：
+- 厚度图：每张B-scan沿横向分箱的视网膜厚度（像素），形状 (切片数, 分箱数)
+- 各疾病评分和CNN各疾病类别概率的最差切片（最大值及其切片下标，不含正常类）
+- 体数据标签：最差切片中概率最高的疾病（低于 CNN_DISEASE_THRESHOLD 时为正常）
+- 异常区域总数、逐切片特征的均值
+
+读取器：
+- .npy：np.load(mmap_mode='r') 内存映射
+- .raw / .bin：按 shape/dtype/offset（命令行参数或同名 .json 描述文件）内存映射
+- .tif / .tiff 多页TIFF：未压缩页直接内存映射该页像素，压缩页逐页解码
+其他格式（如DICOM）继承 VolumeReader 并用 @register_reader 注册扩展名即可。
+
+任意时刻内存中只有在途批次的切片，逐切片结果流式写入CSV，内存占用与体数据大小无关。
+
+用法:
+    python oct_volume.py scan.tif -o summary.json --thickness-map thickness.npy
+    python oct_volume.py scan.raw --shape 256 496 512 --dtype uint16 --slices-csv slices.csv
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from oct_screening import ABNORMALITY_TYPES, DISEASES, FEATURE_COLUMNS, PEPPERCAT_DIR, flatten_features
+
+THICKNESS_BINS = 128
+# 正常类（传统评分的 normal、CNN的“普通”）不参与最差切片统计：对它们取最大值得到的是最正常的切片
+NORMAL_SCORE = 'normal'
+CNN_NORMAL_LABEL = 'putong'
+# 体数据标签：任一切片的某疾病概率达到该阈值时取概率最高的疾病，否则为正常
+CNN_DISEASE_THRESHOLD = 0.5
+
+
+# ----------------------------------------------------------------------
+# 读取器
+# ----------------------------------------------------------------------
+
+class VolumeReader:
+    """体数据读取器接口：shape为 (切片数, 高, 宽)，read(i) 返回第i张B-scan的二维数组"""
+
+    extensions: Tuple[str, ...] = ()
+
+    def __init__(self, path: str, **options: Any):
+        self.path = path
+        self.shape: Tuple[int, int, int] = (0, 0, 0)
+        self.dtype = np.dtype(np.uint8)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def read(self, index: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "VolumeReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_READERS: Dict[str, Type[VolumeReader]] = {}
+
+
+def register_reader(cls: Type[VolumeReader]) -> Type[VolumeReader]:
+    """按扩展名注册读取器（类装饰器）"""
+    for ext in cls.extensions:
+        _READERS[ext.lower()] = cls
+    return cls
+
+
+def open_volume(path: str, **options: Any) -> VolumeReader:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in _READERS:
+        raise ValueError(f"不支持的体数据格式: {ext}（支持: {', '.join(sorted(_READERS))}）")
+    return _READERS[ext](path, **options)
+
+
+def _as_stack(array: np.ndarray, path: str) -> np.ndarray:
+    if array.ndim == 2:
+        return array[None]
+    if array.ndim != 3:
+        raise ValueError(f"体数据应为 (切片数, 高, 宽) 的三维数组: {path} 形状为 {array.shape}")
+    return array
+
+
+@register_reader
+class NpyVolumeReader(VolumeReader):
+    extensions = ('.npy',)
+
+    def __init__(self, path: str, **options: Any):
+        super().__init__(path)
+        self._array = _as_stack(np.load(path, mmap_mode='r'), path)
+        self.shape = self._array.shape
+        self.dtype = self._array.dtype
+
+    def read(self, index: int) -> np.ndarray:
+        return self._array[index]
+
+
+@register_reader
+class RawVolumeReader(VolumeReader):
+    """无文件头的原始栈；shape/dtype/offset 未传入时读取同名 .json 描述文件"""
+
+    extensions = ('.raw', '.bin')
+
+    def __init__(self, path: str, shape: Optional[Sequence[int]] = None, dtype: Optional[str] = None,
+                 offset: Optional[int] = None, **options: Any):
+        super().__init__(path)
+        meta: Dict[str, Any] = {}
+        sidecar = os.path.splitext(path)[0] + '.json'
+        if os.path.exists(sidecar):
+            with open(sidecar, encoding='utf-8') as f:
+                meta = json.load(f)
+        shape = shape or meta.get('shape')
+        if not shape:
+            raise ValueError(f"原始体数据需要 shape（切片数 高 宽），可写在 {sidecar}")
+        self.dtype = np.dtype(dtype or meta.get('dtype', 'uint8'))
+        self._array = _as_stack(
+            np.memmap(path, dtype=self.dtype, mode='r', offset=offset or meta.get('offset', 0), shape=tuple(shape)),
+            path,
+        )
+        self.shape = self._array.shape
+
+    def read(self, index: int) -> np.ndarray:
+        return self._array[index]
+
+
+@register_reader
+class TiffVolumeReader(VolumeReader):
+    """多页TIFF：未压缩的页直接内存映射，其他页用PIL逐页解码"""
+
+    extensions = ('.tif', '.tiff')
+
+    # PIL原始像素模式 -> NumPy类型
+    RAW_MODES = {'L': '|u1', 'I;16': '<u2', 'I;16L': '<u2', 'I;16B': '>u2', 'F;32F': '<f4'}
+
+    def __init__(self, path: str, **options: Any):
+        super().__init__(path)
+        self._image = Image.open(path)
+        width, height = self._image.size
+        self.shape = (getattr(self._image, 'n_frames', 1), height, width)
+        first = self._page(0)
+        self.dtype = first.dtype
+
+    def _page(self, index: int) -> np.ndarray:
+        self._image.seek(index)
+        width, height = self._image.size
+        if (height, width) != self.shape[1:]:
+            raise ValueError(f"{self.path} 第{index}页尺寸 {width}x{height} 与第一页不一致")
+        tiles = self._image.tile
+        if len(tiles) == 1 and tiles[0][0] == 'raw' and tuple(tiles[0][1]) == (0, 0, width, height):
+            rawmode, stride, orientation = tiles[0][3]
+            dtype = self.RAW_MODES.get(rawmode)
+            if dtype is not None and orientation == 1 and stride in (0, width * np.dtype(dtype).itemsize):
+                return np.memmap(self.path, dtype=dtype, mode='r', offset=tiles[0][2], shape=(height, width))
+        return np.asarray(self._image)
+
+    def read(self, index: int) -> np.ndarray:
+        return self._page(index)
+
+    def close(self) -> None:
+        self._image.close()
+
+
+# ----------------------------------------------------------------------
+# 切片处理
+# ----------------------------------------------------------------------
+
+def intensity_window(reader: VolumeReader, samples: int = 16) -> Optional[Tuple[float, float]]:
+    """非8位体数据的全局灰度窗口（抽样切片的0.5%/99.5%分位数），保证各切片灰度一致"""
+    if reader.dtype == np.uint8:
+        return None
+    indices = np.linspace(0, len(reader) - 1, min(samples, len(reader))).astype(int)
+    values = np.concatenate([np.asarray(reader.read(i))[::4, ::4].ravel() for i in indices])
+    low, high = np.percentile(values, [0.5, 99.5])
+    return float(low), float(max(high, low + 1))
+
+
+def to_uint8(image: np.ndarray, window: Optional[Tuple[float, float]]) -> np.ndarray:
+    if window is None:
+        return np.ascontiguousarray(image, dtype=np.uint8)
+    low, high = window
+    scaled = (np.asarray(image, dtype=np.float32) - low) * (255.0 / (high - low))
+    return np.clip(scaled, 0, 255).astype(np.uint8)
+
+
+def thickness_profile(image: np.ndarray, bins: int = THICKNESS_BINS) -> np.ndarray:
+    """每列（A-scan）视网膜厚度：Otsu前景中第一个到最后一个像素的距离，再沿横向分箱平均"""
+    blurred = cv2.GaussianBlur(image, (5, 5), 0)
+    _, mask = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8)) > 0
+    has_tissue = mask.any(axis=0)
+    top = mask.argmax(axis=0)
+    bottom = mask.shape[0] - 1 - mask[::-1].argmax(axis=0)
+    thickness = np.where(has_tissue, bottom - top + 1, 0).astype(np.float32)
+    return cv2.resize(thickness[None, :], (bins, 1), interpolation=cv2.INTER_AREA)[0]
+
+
+# ----------------------------------------------------------------------
+# 工作进程
+# ----------------------------------------------------------------------
+
+_reader: Optional[VolumeReader] = None
+_analyzer = None
+_window: Optional[Tuple[float, float]] = None
+_bins = THICKNESS_BINS
+
+
+def _init_worker(path: str, options: Dict[str, Any], window: Optional[Tuple[float, float]],
+                 profile: Optional[str], bins: int) -> None:
+    """每个工作进程只执行一次：单线程OpenCV，打开体数据（内存映射）并创建分析器"""
+    global _reader, _analyzer, _window, _bins
+    cv2.setNumThreads(1)
+    if PEPPERCAT_DIR not in sys.path:
+        sys.path.append(PEPPERCAT_DIR)
+    from src.tools.oct_analysis import OCTAnalyzer
+    _analyzer = OCTAnalyzer(profile)
+    _reader = open_volume(path, **options)
+    _window, _bins = window, bins
+
+
+def _analyze_batch(indices: Sequence[int]) -> List[Tuple[int, Dict[str, Any], Optional[np.ndarray]]]:
+    results = []
+    for index in indices:
+        start = time.perf_counter()
+        row: Dict[str, Any] = {'slice': index, 'status': 'success', 'error': None}
+        thickness = None
+        try:
+            image = to_uint8(_reader.read(index), _window)
+            result = _analyzer.analyze_oct_array(image, with_report=False)
+            row.update(flatten_features(result['oct_features']))
+            for disease in DISEASES:
+                row[f'score_{disease}'] = result['disease_analysis'].get(disease)
+            thickness = thickness_profile(image, _bins)
+        except Exception as e:
+            row['status'] = 'error'
+            row['error'] = str(e)
+        row['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        results.append((index, row, thickness))
+    return results
+
+
+# ----------------------------------------------------------------------
+# 汇总
+# ----------------------------------------------------------------------
+
+class VolumeSummary:
+    """逐切片结果的流式汇总：只保留厚度图和各指标的累计量"""
+
+    def __init__(self, shape: Tuple[int, int, int], indices: Sequence[int], bins: int):
+        self.shape = shape
+        self.indices = list(indices)
+        self._position = {index: i for i, index in enumerate(self.indices)}
+        self.thickness_map = np.full((len(self.indices), bins), np.nan, dtype=np.float32)
+        self.analyzed = 0
+        self.failed = 0
+        self.abnormalities = 0
+        self._sums: Dict[str, float] = {}
+        self._worst: Dict[str, Tuple[float, int]] = {}
+        self._cnn_worst: Dict[str, Tuple[float, int]] = {}
+        self._cnn_sums: Dict[str, float] = {}
+        self._cnn_count = 0
+
+    @staticmethod
+    def _update_worst(worst: Dict[str, Tuple[float, int]], key: str, value: float, index: int) -> None:
+        if key not in worst or value > worst[key][0]:
+            worst[key] = (value, index)
+
+    def add_slice(self, index: int, row: Dict[str, Any], thickness: Optional[np.ndarray]) -> None:
+        if row['status'] != 'success':
+            self.failed += 1
+            return
+        self.analyzed += 1
+        self.thickness_map[self._position[index]] = thickness
+        for column in FEATURE_COLUMNS:
+            if row.get(column) is not None:
+                self._sums[column] = self._sums.get(column, 0.0) + float(row[column])
+        self.abnormalities += sum(int(row.get(f'abnormal_{t}') or 0) for t in ABNORMALITY_TYPES)
+        for disease in DISEASES:
+            if disease != NORMAL_SCORE:
+                self._update_worst(self._worst, disease, float(row[f'score_{disease}']), index)
+
+    def add_probabilities(self, index: int, probabilities: Dict[str, float]) -> None:
+        self._cnn_count += 1
+        for label, value in probabilities.items():
+            self._cnn_sums[label] = self._cnn_sums.get(label, 0.0) + value
+            if label != CNN_NORMAL_LABEL:
+                self._update_worst(self._cnn_worst, label, value, index)
+
+    def to_dict(self) -> Dict[str, Any]:
+        valid = self.thickness_map[~np.isnan(self.thickness_map).any(axis=1)]
+        summary: Dict[str, Any] = {
+            'shape': list(self.shape),
+            'slices_analyzed': self.analyzed,
+            'slices_failed': self.failed,
+            'abnormalities_total': self.abnormalities,
+            'thickness': {
+                'mean': float(valid.mean()) if valid.size else None,
+                'min_slice_mean': float(valid.mean(axis=1).min()) if valid.size else None,
+                'max_slice_mean': float(valid.mean(axis=1).max()) if valid.size else None,
+                'map_shape': list(self.thickness_map.shape),
+            },
+            'feature_means': {k: v / self.analyzed for k, v in self._sums.items()} if self.analyzed else {},
+            'worst_slice_scores': {d: {'score': s, 'slice': i} for d, (s, i) in self._worst.items()},
+        }
+        if self._cnn_count:
+            summary['cnn'] = {
+                'mean_probabilities': {k: v / self._cnn_count for k, v in self._cnn_sums.items()},
+                'worst_slice': {k: {'probability': p, 'slice': i} for k, (p, i) in self._cnn_worst.items()},
+            }
+            label = max(self._cnn_worst, key=lambda k: self._cnn_worst[k][0]) if self._cnn_worst else None
+            if label is None or self._cnn_worst[label][0] < CNN_DISEASE_THRESHOLD:
+                label = CNN_NORMAL_LABEL
+            summary['cnn']['label'] = label
+        return summary
+
+
+# ----------------------------------------------------------------------
+# 调度
+# ----------------------------------------------------------------------
+
+def _batches(indices: Sequence[int], batch_size: int) -> Iterator[List[int]]:
+    for start in range(0, len(indices), batch_size):
+        yield list(indices[start:start + batch_size])
+
+
+def analyze_volume(
+    path: str,
+    reader_options: Optional[Dict[str, Any]] = None,
+    workers: int = 1,
+    batch_size: int = 8,
+    step: int = 1,
+    use_cnn: bool = True,
+    profile: Optional[str] = None,
+    bins: int = THICKNESS_BINS,
+    on_slice: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> VolumeSummary:
+    """分析体数据；on_slice 接收每张切片的结果行（如写入CSV）"""
+    options = reader_options or {}
+    with open_volume(path, **options) as reader:
+        window = intensity_window(reader)
+        indices = list(range(0, len(reader), max(1, step)))
+        summary = VolumeSummary(reader.shape, indices, bins)
+
+        predict = None
+        if use_cnn:
+            try:
+                import image_processing
+                if image_processing.model_loaded:
+                    predict = image_processing.predict_probabilities_batch
+            except Exception as e:
+                print(f"[体数据] 分类模型不可用，跳过CNN概率: {e}")
+
+        def collect(results):
+            for index, row, thickness in results:
+                summary.add_slice(index, row, thickness)
+                if on_slice is not None:
+                    on_slice(row)
+
+        def classify(batch):
+            # CNN在主进程中按批推理，与工作进程的传统特征计算重叠
+            if predict is None:
+                return
+            images = [to_uint8(reader.read(i), window) for i in batch]
+            for index, probabilities in zip(batch, predict(images)):
+                summary.add_probabilities(index, probabilities)
+
+        initargs = (path, options, window, profile, bins)
+        if workers <= 1:
+            _init_worker(*initargs)
+            for batch in _batches(indices, batch_size):
+                collect(_analyze_batch(batch))
+                classify(batch)
+            return summary
+
+        # 在途批次数量有上限，内存中最多只有这些批次的切片
+        pending: Deque[concurrent.futures.Future] = deque()
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=initargs
+        ) as pool:
+            for batch in _batches(indices, batch_size):
+                pending.append(pool.submit(_analyze_batch, batch))
+                classify(batch)
+                while len(pending) >= workers * 2:
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCT三维体数据分析")
+    parser.add_argument('volume', help="体数据文件（.tif/.tiff 多页TIFF、.npy、.raw/.bin）")
+    parser.add_argument('-o', '--output', help="体数据级指标输出（JSON），默认打印到终端")
+    parser.add_argument('--thickness-map', help="厚度图输出（.npy，形状为 切片数 x 分箱数）")
+    parser.add_argument('--slices-csv', help="逐切片结果输出（CSV，流式写入）")
+    parser.add_argument('--shape', type=int, nargs=3, metavar=('SLICES', 'HEIGHT', 'WIDTH'), help="原始栈的形状")
+    parser.add_argument('--dtype', help="原始栈的像素类型（如 uint8、uint16）")
+    parser.add_argument('--offset', type=int, help="原始栈数据起始的字节偏移")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="传统特征的进程数")
+    parser.add_argument('--batch-size', type=int, default=8, help="每批切片数")
+    parser.add_argument('--step', type=int, default=1, help="每隔多少张切片分析一张")
+    parser.add_argument('--no-cnn', action='store_true', help="不计算CNN分类概率")
+    parser.add_argument('--profile', choices=['full', 'accurate', 'balanced', 'fast'], default=None,
+                        help="OCT特征的多分辨率档位")
+    args = parser.parse_args()
+
+    options = {k: v for k, v in (('shape', args.shape), ('dtype', args.dtype), ('offset', args.offset)) if v is not None}
+
+    writer = None
+    csv_file = None
+    if args.slices_csv:
+        csv_file = open(args.slices_csv, 'w', newline='', encoding='utf-8')
+        columns = ['slice', 'status', 'error', 'elapsed_ms'] + FEATURE_COLUMNS + [f'score_{d}' for d in DISEASES]
+        writer = csv.DictWriter(csv_file, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+
+    start = time.perf_counter()
+    try:
+        summary = analyze_volume(args.volume, options, workers=args.workers, batch_size=args.batch_size,
+                                 step=args.step, use_cnn=not args.no_cnn, profile=args.profile,
+                                 on_slice=writer.writerow if writer else None)
+    finally:
+        if csv_file is not None:
+            csv_file.close()
+
+    result = summary.to_dict()
+    result['elapsed_s'] = round(time.perf_counter() - start, 2)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"体数据指标已写入: {args.output}")
+    else:
+        print(text)
+    if args.thickness_map:
+        np.save(args.thickness_map, summary.thickness_map)
+        print(f"厚度图已写入: {args.thickness_map}")
+
+
+if __name__ == "__main__":
+    main()
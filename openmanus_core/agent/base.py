@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field, model_validator
 from openmanus_core.llm import LLM
 from openmanus_core.logger import logger
 from openmanus_core.schema import ROLE_TYPE, AgentState, Memory, Message
+from openmanus_core.tracing import tracer
 
 
 class BaseAgent(BaseModel, ABC):
@@ -112,6 +113,7 @@ class BaseAgent(BaseModel, ABC):
         kwargs = {"base64_image": base64_image, **(kwargs if role == "tool" else {})}
         self.memory.add_message(message_map[role](content, **kwargs))
 
+    @tracer.traced("agent.run")
     async def run(self, request: Optional[str] = None) -> str:
         """Execute the agent's main loop asynchronously.
 
@@ -137,7 +139,8 @@ class BaseAgent(BaseModel, ABC):
             ):
                 self.current_step += 1
                 logger.info(f"Executing step {self.current_step}/{self.max_steps}")
-                step_result = await self.step()
+                with tracer.span("agent.step", agent=self.name, step=self.current_step):
+                    step_result = await self.step()
 
                 # Check for stuck state
                 if self.is_stuck():
@@ -145,6 +148,7 @@ class BaseAgent(BaseModel, ABC):
 
                 results.append(f"Step {self.current_step}: {step_result}")
 
+            tracer.current_span().set_attributes(agent=self.name, steps=self.current_step)
             if self.current_step >= self.max_steps:
                 self.current_step = 0
                 self.state = AgentState.IDLE
@@ -6,6 +6,7 @@ from pydantic import Field
 
 from openmanus_core.agent.base import BaseAgent
 from openmanus_core.logger import logger
+from openmanus_core.tracing import tracer
 from openmanus_core.schema import (
     AgentState,
     Message,
@@ -122,6 +123,7 @@ class ToolCallAgent(BaseAgent):
             if response and isinstance(response, dict):
                 # 处理工具调用
                 if "tool_calls" in response and response["tool_calls"]:
+                    tracer.current_span().set_attribute("tool_calls", len(response["tool_calls"]))
                     return await self._handle_tool_calls(response["tool_calls"])
                 else:
                     # 普通回复
@@ -185,15 +187,17 @@ class ToolCallAgent(BaseAgent):
             return f"工具 {tool_name} 不存在"
         
         # 执行工具
-        try:
-            if "execute" in tool and callable(tool["execute"]):
-                result = await tool["execute"](**args)
-                return str(result)
-            else:
-                return f"工具 {tool_name} 没有可执行的函数"
-        except Exception as e:
-            logger.error(f"Tool {tool_name} execution failed: {e}")
-            return f"工具 {tool_name} 执行失败: {str(e)}"
+        with tracer.span("tool.execute", tool=tool_name) as span:
+            try:
+                if "execute" in tool and callable(tool["execute"]):
+                    result = await tool["execute"](**args)
+                    return str(result)
+                else:
+                    return f"工具 {tool_name} 没有可执行的函数"
+            except Exception as e:
+                logger.error(f"Tool {tool_name} execution failed: {e}")
+                span.set_attribute("failed", str(e))
+                return f"工具 {tool_name} 执行失败: {str(e)}"
 
     def get_tool_results(self) -> List[Dict[str, Any]]:
         """获取工具执行结果"""
@@ -155,6 +155,60 @@ class MCPSettings(BaseModel):
             raise ValueError(f"Failed to load MCP server config: {e}")
 
 
+class TracingSettings(BaseModel):
+    """Configuration for agent execution tracing"""
+
+    sample_rate: float = Field(
+        0.0, description="Fraction of root requests to trace (0 disables tracing)"
+    )
+    buffer_size: int = Field(
+        200, description="Number of finished traces kept in the in-process ring buffer"
+    )
+    jsonl_path: Optional[str] = Field(
+        None, description="Append finished traces to this JSONL file (relative to project root)"
+    )
+
+
+class SchedulerBackendSettings(BaseModel):
+    """Rate limits for a single LLM backend"""
+
+    max_concurrency: int = Field(4, description="Maximum concurrent in-flight requests")
+    tokens_per_minute: Optional[int] = Field(
+        None, description="Token budget per rolling minute (None for unlimited)"
+    )
+
+
+class LLMSchedulerSettings(BaseModel):
+    """Configuration for the global LLM request scheduler"""
+
+    default_max_concurrency: int = Field(
+        4, description="Concurrency cap for backends not listed in `backends`"
+    )
+    backends: Dict[str, SchedulerBackendSettings] = Field(
+        default_factory=dict, description="Per-backend rate limits"
+    )
+
+
+class LLMRouterSettings(BaseModel):
+    """Configuration for routing LLM requests across interchangeable backends"""
+
+    backends: List[str] = Field(
+        default_factory=list,
+        description="Names of additional [llm] entries used as fallback/hedge backends",
+    )
+    hedge: bool = Field(True, description="Send a hedged request when the first backend is slow")
+    hedge_min_delay: float = Field(
+        1.5, description="Lower bound (seconds) of the p95-based hedge deadline"
+    )
+    hedge_default_delay: float = Field(
+        8.0, description="Hedge deadline (seconds) before enough latency samples exist"
+    )
+    failure_threshold: int = Field(
+        3, description="Consecutive backend failures that open its circuit breaker"
+    )
+    cooldown: float = Field(30.0, description="Seconds an open circuit breaker stays open")
+
+
 class AppConfig(BaseModel):
     llm: Dict[str, LLMSettings]
     sandbox: Optional[SandboxSettings] = Field(
@@ -170,6 +224,15 @@ class AppConfig(BaseModel):
     run_flow_config: Optional[RunflowSettings] = Field(
         None, description="Run flow configuration"
     )
+    tracing_config: Optional[TracingSettings] = Field(
+        None, description="Tracing configuration"
+    )
+    llm_scheduler_config: Optional[LLMSchedulerSettings] = Field(
+        None, description="LLM scheduler configuration"
+    )
+    llm_router_config: Optional[LLMRouterSettings] = Field(
+        None, description="LLM router configuration"
+    )
 
     class Config:
         arbitrary_types_allowed = True
@@ -272,6 +335,9 @@ class Config:
             search_config=SearchSettings(**config_data.get("search_config", {})) if config_data.get("search_config") else None,
             mcp_config=MCPSettings(**config_data.get("mcp_config", {})) if config_data.get("mcp_config") else None,
             run_flow_config=RunflowSettings(**config_data.get("run_flow_config", {})) if config_data.get("run_flow_config") else None,
+            tracing_config=TracingSettings(**config_data.get("tracing", {})) if config_data.get("tracing") else None,
+            llm_scheduler_config=LLMSchedulerSettings(**config_data.get("llm_scheduler", {})) if config_data.get("llm_scheduler") else None,
+            llm_router_config=LLMRouterSettings(**config_data.get("llm_router", {})) if config_data.get("llm_router") else None,
         )
 
     @property
@@ -298,6 +364,18 @@ class Config:
     def run_flow_config(self) -> RunflowSettings:
         return self._config.run_flow_config
 
+    @property
+    def tracing_config(self) -> Optional[TracingSettings]:
+        return self._config.tracing_config
+
+    @property
+    def llm_scheduler_config(self) -> Optional[LLMSchedulerSettings]:
+        return self._config.llm_scheduler_config
+
+    @property
+    def llm_router_config(self) -> Optional[LLMRouterSettings]:
+        return self._config.llm_router_config
+
     @property
     def workspace_root(self) -> Path:
         return WORKSPACE_ROOT
@@ -0,0 +1,44 @@
+from typing import Optional
+
+
+class OpenManusError(Exception):
+    """Base exception for all OpenManus errors"""
+
+
+class TokenLimitExceeded(OpenManusError):
+    """Exception raised when the token limit is exceeded"""
+
+
+class LLMRequestError(OpenManusError):
+    """LLM后端请求失败
+
+    retryable: 换个后端或稍后重试可能成功（超时、连接错误、429、5xx）
+    backend_fault: 失败原因在后端本身（计入熔断），而不是请求内容有误
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        retryable: bool = False,
+        backend_fault: bool = False,
+    ):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.backend_fault = backend_fault
+
+    @classmethod
+    def from_status(cls, status: int, detail: str = "") -> "LLMRequestError":
+        """按HTTP状态码分类错误"""
+        if status in (408, 409, 425, 429) or status >= 500:
+            return cls(f"API request failed: {status} {detail}".strip(), status, True, True)
+        if status in (401, 403):
+            # 认证/权限问题只影响当前后端，其他后端仍可能可用
+            return cls(f"API request failed: {status} {detail}".strip(), status, False, True)
+        return cls(f"API request failed: {status} {detail}".strip(), status, False, False)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """tenacity重试判定：只重试可重试的LLM错误"""
+    return isinstance(error, LLMRequestError) and error.retryable
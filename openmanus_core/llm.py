@@ -5,13 +5,17 @@ from typing import Dict, List, Optional, Union
 import aiohttp
 from tenacity import (
     retry,
-    retry_if_exception_type,
+    retry_if_exception,
     stop_after_attempt,
     wait_random_exponential,
 )
 
 from openmanus_core.config import LLMSettings, config
+from openmanus_core.exceptions import LLMRequestError, is_retryable
+from openmanus_core.llm_router import LLMRouter
+from openmanus_core.llm_scheduler import Priority, estimate_tokens, scheduler
 from openmanus_core.logger import logger
+from openmanus_core.tracing import tracer
 from openmanus_core.schema import (
     ROLE_VALUES,
     TOOL_CHOICE_TYPE,
@@ -46,6 +50,8 @@ class LLM:
             self.api_key = llm_config.api_key
             self.api_version = llm_config.api_version
             self.base_url = llm_config.base_url
+            # 首选后端 + [llm_router]中配置的备用后端
+            self.router = LLMRouter.from_config(llm_config)
             
             # Token counting
             self.input_tokens = 0
@@ -54,11 +60,7 @@ class LLM:
 
     def count_tokens(self, text: str) -> int:
         """简单的token计数（近似）"""
-        # 对于中文，大约1个token = 1.5个字符
-        # 对于英文，大约1个token = 4个字符
-        chinese_chars = sum(1 for char in text if '\u4e00' <= char <= '\u9fff')
-        english_chars = len(text) - chinese_chars
-        return int(chinese_chars / 1.5 + english_chars / 4)
+        return estimate_tokens(text)
 
     def count_message_tokens(self, messages: List[dict]) -> int:
         """计算消息列表的token数量"""
@@ -112,17 +114,14 @@ class LLM:
         
         return formatted_messages
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(3),
-        retry=retry_if_exception_type((Exception,)),
-    )
+    @tracer.traced("llm.ask")
     async def ask(
         self,
         messages: List[Union[dict, Message]],
         system_msgs: Optional[List[Union[dict, Message]]] = None,
         stream: bool = False,
         temperature: Optional[float] = None,
+        priority: Priority = Priority.INTERACTIVE,
     ) -> str:
         """发送请求到LLM"""
         try:
@@ -148,37 +147,22 @@ class LLM:
                 "stream": stream
             }
             
-            # 发送请求
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-                
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=request_data,
-                    timeout=aiohttp.ClientTimeout(total=300)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"API request failed: {response.status} - {error_text}")
-                        raise Exception(f"API request failed: {response.status}")
-                    
-                    if stream:
-                        return await self._handle_stream_response(response)
-                    else:
-                        return await self._handle_normal_response(response, input_tokens)
+            # 发送请求：流式请求走当前最优后端（单个后端，失败时退避重试）；
+            # 非流式请求由路由器负责对冲与故障转移，不再整体重试
+            if stream:
+                return await self._stream_completion(request_data, priority, input_tokens)
+
+            response_data = await self.router.chat_completion(
+                request_data, timeout=300, priority=priority, tokens=input_tokens
+            )
+            return self._handle_normal_response(response_data, input_tokens)
                         
         except Exception as e:
             logger.error(f"LLM request failed: {e}")
             raise
 
-    async def _handle_normal_response(self, response, input_tokens: int) -> str:
+    def _handle_normal_response(self, response_data: dict, input_tokens: int) -> str:
         """处理正常响应"""
-        response_data = await response.json()
-        
         if "choices" not in response_data or not response_data["choices"]:
             raise Exception("Invalid response format")
         
@@ -187,9 +171,49 @@ class LLM:
         
         # 更新token计数
         self.update_token_count(input_tokens, completion_tokens)
+        tracer.current_span().set_attributes(
+            model=self.model, input_tokens=input_tokens, completion_tokens=completion_tokens
+        )
         
         return content
 
+    @retry(
+        wait=wait_random_exponential(min=1, max=10),
+        stop=stop_after_attempt(3),
+        retry=retry_if_exception(is_retryable),
+    )
+    async def _stream_completion(self, request_data: dict, priority: Priority, input_tokens: int) -> str:
+        """向当前最优后端发送流式请求"""
+        backend = self.router.select()
+        try:
+            async with scheduler.slot_async(backend.name, priority, input_tokens):
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(
+                        f"{backend.base_url}/chat/completions",
+                        headers=backend.headers(),
+                        json=dict(request_data, model=backend.model),
+                        timeout=aiohttp.ClientTimeout(total=300)
+                    ) as response:
+                        if response.status != 200:
+                            error_text = await response.text()
+                            logger.error(f"API request failed: {response.status} - {error_text}")
+                            raise LLMRequestError.from_status(response.status)
+                        content = await self._handle_stream_response(response)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # 与非流式请求一样：连接错误/超时可重试，并计入该后端的熔断统计
+            backend.breaker.record_failure()
+            raise LLMRequestError(
+                f"{backend.name} unreachable: {type(e).__name__}: {e}",
+                retryable=True,
+                backend_fault=True,
+            ) from e
+        except LLMRequestError as e:
+            if e.backend_fault:
+                backend.breaker.record_failure()
+            raise
+        backend.breaker.record_success()
+        return content
+
     async def _handle_stream_response(self, response) -> str:
         """处理流式响应"""
         content = ""
@@ -210,11 +234,6 @@ class LLM:
         
         return content
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(3),
-        retry=retry_if_exception_type((Exception,)),
-    )
     async def ask_with_images(
         self,
         messages: List[Union[dict, Message]],
@@ -227,11 +246,7 @@ class LLM:
         # 对于本地模型，可能不支持图片，这里简化处理
         return await self.ask(messages, system_msgs, stream, temperature)
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(3),
-        retry=retry_if_exception_type((Exception,)),
-    )
+    @tracer.traced("llm.ask_tool")
     async def ask_tool(
         self,
         messages: List[Union[dict, Message]],
@@ -240,6 +255,7 @@ class LLM:
         tools: Optional[List[dict]] = None,
         tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,
         temperature: Optional[float] = None,
+        priority: Priority = Priority.INTERACTIVE,
         **kwargs,
     ) -> Optional[dict]:
         """发送工具调用请求到LLM"""
@@ -271,36 +287,24 @@ class LLM:
                 request_data["tools"] = tools
                 request_data["tool_choice"] = tool_choice
             
-            # 发送请求
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-                
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=request_data,
-                    timeout=aiohttp.ClientTimeout(total=timeout)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Tool API request failed: {response.status} - {error_text}")
-                        raise Exception(f"Tool API request failed: {response.status}")
-                    
-                    response_data = await response.json()
-                    
-                    if "choices" not in response_data or not response_data["choices"]:
-                        raise Exception("Invalid response format")
-                    
-                    choice = response_data["choices"][0]
-                    message = choice["message"]
-                    
-                    completion_tokens = response_data.get("usage", {}).get("completion_tokens", 0)
-                    self.update_token_count(input_tokens, completion_tokens)
-                    
-                    return message
+            # 发送请求（由路由器选择后端，必要时对冲或故障转移）
+            response_data = await self.router.chat_completion(
+                request_data, timeout=timeout, priority=priority, tokens=input_tokens
+            )
+            
+            if "choices" not in response_data or not response_data["choices"]:
+                raise Exception("Invalid response format")
+            
+            choice = response_data["choices"][0]
+            message = choice["message"]
+            
+            completion_tokens = response_data.get("usage", {}).get("completion_tokens", 0)
+            self.update_token_count(input_tokens, completion_tokens)
+            tracer.current_span().set_attributes(
+                model=self.model, input_tokens=input_tokens, completion_tokens=completion_tokens
+            )
+            
+            return message
                     
         except Exception as e:
             logger.error(f"Tool LLM request failed: {e}")
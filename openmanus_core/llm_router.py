@@ -0,0 +1,320 @@
+"""
+多后端LLM路由
+
+把远程OpenAI兼容API（如SiliconFlow）和本地Ollama（/v1 OpenAI兼容接口）视为可互换的后端：
+
+- 按延迟选择：优先使用近期平均延迟最低、熔断器未打开的后端
+- 对冲请求：首选后端超过其p95延迟仍未返回时，向第二个后端并发发送同一请求，先返回者胜出
+- 熔断：每个后端独立统计连续失败，打开后在冷却期内不再接收请求
+- 错误分类：超时/连接错误/429/5xx可换后端重试，其余4xx视为请求本身有误，立即失败；
+  所有后端都失败或都已熔断时抛出不可重试的错误，调用方不再对整条对冲/故障转移链做退避重试
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from openmanus_core.config import LLMSettings, config
+from openmanus_core.exceptions import LLMRequestError
+from openmanus_core.llm_scheduler import Priority, backend_for_url, scheduler
+from openmanus_core.logger import logger
+from openmanus_core.tracing import tracer
+
+# 示例配置中的占位API密钥：这样的后端必然返回401，不参与路由
+PLACEHOLDER_API_KEYS = {"", "your-api-key-here", "sk-xxx"}
+
+
+class CircuitBreaker:
+    """连续失败计数熔断器：closed -> open -> half_open -> closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        return self.state != self.OPEN
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                # half_open下的探测失败直接重新打开
+                self.opened_at = time.monotonic()
+
+
+class LLMBackend:
+    """一个OpenAI兼容的chat/completions后端及其延迟统计"""
+
+    def __init__(self, settings: LLMSettings, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.model = settings.model
+        self.base_url = settings.base_url.rstrip("/")
+        self.api_key = settings.api_key
+        self.name = backend_for_url(self.base_url)
+        self.breaker = CircuitBreaker(failure_threshold, cooldown)
+        self.latencies: Deque[float] = deque(maxlen=50)
+        self.ewma: Optional[float] = None
+
+    def record_latency(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self.ewma = seconds if self.ewma is None else 0.8 * self.ewma + 0.2 * seconds
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 5:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+
+    async def post(self, request_data: dict, timeout: float) -> dict:
+        """发送非流式请求；非200状态码按类别抛出LLMRequestError"""
+        payload = dict(request_data, model=self.model)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=self.headers(),
+                    json=payload,
+                    timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        logger.error(f"API request failed ({self.name}): {response.status} - {error_text}")
+                        raise LLMRequestError.from_status(response.status, error_text[:200])
+                    response_data = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise LLMRequestError(
+                f"{self.name} unreachable: {type(e).__name__}: {e}",
+                retryable=True,
+                backend_fault=True,
+            ) from e
+
+        completion_tokens = response_data.get("usage", {}).get("completion_tokens", 0)
+        scheduler.record_tokens(self.name, completion_tokens)
+        return response_data
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            "name": self.name,
+            "model": self.model,
+            "base_url": self.base_url,
+            "breaker": self.breaker.state,
+            "failures": self.breaker.failures,
+            "ewma_ms": round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "samples": len(self.latencies),
+        }
+
+
+# 同一后端在所有LLM实例间共享延迟统计和熔断状态
+_backends: Dict[Tuple[str, str], LLMBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(settings: LLMSettings, failure_threshold: int = 3, cooldown: float = 30.0) -> LLMBackend:
+    key = (settings.base_url.rstrip("/"), settings.model)
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = _backends[key] = LLMBackend(settings, failure_threshold, cooldown)
+        return backend
+
+
+def backend_stats() -> List[Dict[str, Any]]:
+    """所有已注册后端的熔断状态与延迟统计"""
+    with _backends_lock:
+        backends = list(_backends.values())
+    return [backend.stats() for backend in backends]
+
+
+class LLMRouter:
+    """在多个后端间做延迟感知选择、对冲和故障转移"""
+
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        hedge: bool = True,
+        hedge_min_delay: float = 1.5,
+        hedge_default_delay: float = 8.0,
+    ):
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+
+    @classmethod
+    def from_config(cls, primary: LLMSettings) -> "LLMRouter":
+        """以primary为首选后端，按[llm_router]配置追加其他后端"""
+        settings = config.llm_router_config
+        if settings is None:
+            return cls([get_backend(primary)], hedge=False)
+
+        backends = [get_backend(primary, settings.failure_threshold, settings.cooldown)]
+        for name in settings.backends:
+            extra = config.llm.get(name)
+            if extra is None:
+                logger.warning(f"llm_router: unknown llm config '{name}', skipped")
+                continue
+            if extra.api_key.strip() in PLACEHOLDER_API_KEYS:
+                logger.warning(f"llm_router: llm config '{name}' has no api_key configured, skipped")
+                continue
+            backend = get_backend(extra, settings.failure_threshold, settings.cooldown)
+            if backend not in backends:
+                backends.append(backend)
+        return cls(
+            backends,
+            hedge=settings.hedge,
+            hedge_min_delay=settings.hedge_min_delay,
+            hedge_default_delay=settings.hedge_default_delay,
+        )
+
+    def ranked(self) -> List[LLMBackend]:
+        """可用后端按（熔断状态, 平均延迟, 配置顺序）排序；无延迟记录的后端优先探测"""
+        available = [b for b in self.backends if b.breaker.allow()]
+        return sorted(
+            available,
+            key=lambda b: (
+                b.breaker.state != CircuitBreaker.CLOSED,
+                b.ewma if b.ewma is not None else 0.0,
+                self.backends.index(b),
+            ),
+        )
+
+    def select(self) -> LLMBackend:
+        """选出当前最优后端（全部熔断时退回首选后端）"""
+        ranked = self.ranked()
+        return ranked[0] if ranked else self.backends[0]
+
+    def hedge_delay(self, backend: LLMBackend) -> float:
+        p95 = backend.p95()
+        if p95 is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p95)
+
+    async def _attempt(
+        self,
+        backend: LLMBackend,
+        request_data: dict,
+        timeout: float,
+        priority: Priority,
+        tokens: int,
+    ) -> dict:
+        with tracer.span("llm.backend", backend=backend.name, model=backend.model) as span:
+            start = time.perf_counter()
+            try:
+                response_data = await scheduler.run_async(
+                    backend.name,
+                    backend.post,
+                    request_data,
+                    timeout,
+                    priority=priority,
+                    tokens=tokens,
+                    dedup_key=scheduler.make_key(backend.base_url, backend.model, request_data),
+                )
+            except LLMRequestError as e:
+                if e.backend_fault:
+                    backend.breaker.record_failure()
+                span.set_attribute("status", e.status)
+                raise
+            backend.record_latency(time.perf_counter() - start)
+            backend.breaker.record_success()
+            return response_data
+
+    async def chat_completion(
+        self,
+        request_data: dict,
+        timeout: float = 300,
+        priority: Priority = Priority.INTERACTIVE,
+        tokens: int = 0,
+    ) -> dict:
+        """发送一次chat/completions请求，必要时对冲或故障转移到其他后端"""
+        candidates = self.ranked()
+        if not candidates:
+            # 熔断冷却期内重试也不会被放行，交给调用方决定是否稍后再试
+            raise LLMRequestError("所有LLM后端均处于熔断状态")
+
+        pending: Dict[asyncio.Task, LLMBackend] = {}
+        errors: List[str] = []
+        next_index = 0
+        hedged = False
+
+        def launch() -> None:
+            nonlocal next_index
+            backend = candidates[next_index]
+            next_index += 1
+            task = asyncio.ensure_future(
+                self._attempt(backend, request_data, timeout, priority, tokens)
+            )
+            pending[task] = backend
+
+        launch()
+        deadline = time.monotonic() + self.hedge_delay(candidates[0])
+        span = tracer.current_span()
+        try:
+            while pending:
+                wait_timeout = None
+                if self.hedge and not hedged and next_index < len(candidates):
+                    wait_timeout = max(0.0, deadline - time.monotonic())
+                done, _ = await asyncio.wait(
+                    pending, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # 首选后端超过p95仍未返回，向下一个后端发送对冲请求
+                    hedged = True
+                    span.set_attribute("hedged", True)
+                    launch()
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    try:
+                        response_data = task.result()
+                    except LLMRequestError as e:
+                        if not (e.retryable or e.backend_fault):
+                            raise
+                        errors.append(f"{backend.name}: {e}")
+                        continue
+                    span.set_attribute("backend", backend.name)
+                    return response_data
+
+                if not pending and next_index < len(candidates):
+                    # 失败后立即切换到下一个后端，而不是退避重试同一个
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # 已在各后端间对冲和故障转移过，不再整体重试（否则尾延迟由重试链决定）
+        raise LLMRequestError(f"所有LLM后端请求失败: {'; '.join(errors)}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [backend.stats() for backend in self.backends]
@@ -0,0 +1,407 @@
+"""
+全局LLM请求调度器
+
+所有LLM客户端（openmanus_core.llm.LLM、api_integration.DeepseekAPI 等）在发请求前
+通过同一个调度器排队：
+
+- 优先级：交互式对话 > 后台报告 > 批处理任务
+- 每个后端独立的并发上限和每分钟token预算
+- 相同的在途请求（single-flight）只真正发送一次，结果共享给所有等待者
+- 暴露队列深度、等待时间等指标
+
+调度器基于线程锁实现，同步调用（Flask线程、PyQt线程）和异步调用（asyncio）可以共用。
+主项目的全局实例 scheduler 按 config.toml 的 [llm_scheduler] 创建（第一次访问时）；
+桌宠端（PepperCat-main/src/llm_scheduler.py）复用本模块，只提供自己的限流配置。
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import heapq
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from openmanus_core.exceptions import LLMRequestError
+
+
+class Priority(IntEnum):
+    """请求优先级（数值越小越优先）"""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    BATCH = 2
+
+
+class BackendLimits:
+    """单个后端的限流配置"""
+
+    def __init__(self, max_concurrency: int = 4, tokens_per_minute: Optional[int] = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = tokens_per_minute
+
+
+def backend_for_url(url: str) -> str:
+    """根据API地址推断后端名称，例如 ollama / siliconflow / openai"""
+    parsed = urlparse(url)
+    if parsed.port == 11434:
+        return "ollama"
+    host = parsed.hostname or url
+    if host == "localhost" or host.replace(".", "").isdigit():
+        return f"{host}:{parsed.port}" if parsed.port else host
+    labels = host.split(".")
+    return labels[-2] if len(labels) >= 2 else labels[0]
+
+
+def estimate_tokens(text: str) -> int:
+    """近似的token数：中文约1.5个字符一个token，其他文字约4个字符一个token"""
+    chinese_chars = sum(1 for char in text if '\u4e00' <= char <= '\u9fff')
+    english_chars = len(text) - chinese_chars
+    return int(chinese_chars / 1.5 + english_chars / 4)
+
+
+class _Waiter:
+    __slots__ = ("priority", "tokens", "enqueued_at", "notify", "granted", "cancelled")
+
+    def __init__(self, priority: Priority, tokens: int, notify: Callable[[], None]):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+        self.notify = notify
+        self.granted = False
+        self.cancelled = False
+
+
+class _BackendState:
+    """单个后端的运行时状态（只在调度器锁内访问）"""
+
+    def __init__(self, limits: BackendLimits):
+        self.limits = limits
+        self.active = 0
+        self.waiters: List[Tuple[int, int, _Waiter]] = []
+        self.token_log: Deque[Tuple[float, int]] = deque()
+        self.timer: Optional[threading.Timer] = None
+        self.granted = 0
+        self.coalesced = 0
+        self.wait_times: Deque[float] = deque(maxlen=512)
+
+    def tokens_in_window(self, now: float) -> int:
+        while self.token_log and now - self.token_log[0][0] >= 60.0:
+            self.token_log.popleft()
+        return sum(tokens for _, tokens in self.token_log)
+
+    def seconds_until_budget(self, tokens: int, now: float) -> float:
+        """距离预算足够容纳tokens还需等待的秒数（0表示可立即发送）"""
+        budget = self.limits.tokens_per_minute
+        used = self.tokens_in_window(now)
+        if not budget or used == 0 or used + tokens <= budget:
+            return 0.0
+        # 按时间顺序释放窗口内的token，直到剩余预算足够
+        freed = 0
+        for ts, used_tokens in self.token_log:
+            freed += used_tokens
+            if used - freed + tokens <= budget:
+                return max(0.0, ts + 60.0 - now)
+        return max(0.0, self.token_log[-1][0] + 60.0 - now)
+
+
+class LLMScheduler:
+    """按后端限流、按优先级排队的LLM请求调度器"""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, BackendLimits]] = None,
+        default_limits: Optional[BackendLimits] = None,
+    ):
+        self.default_limits = default_limits or BackendLimits()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._backends: Dict[str, _BackendState] = {}
+        self._inflight: Dict[Tuple[str, str], concurrent.futures.Future] = {}
+        for name, backend_limits in (limits or {}).items():
+            self._backends[name] = _BackendState(backend_limits)
+
+    @classmethod
+    def from_config(cls) -> "LLMScheduler":
+        """根据config.toml中的[llm_scheduler]配置创建调度器"""
+        from openmanus_core.config import config
+
+        settings = config.llm_scheduler_config
+        if settings is None:
+            return cls()
+        limits = {
+            name: BackendLimits(b.max_concurrency, b.tokens_per_minute)
+            for name, b in settings.backends.items()
+        }
+        return cls(limits, BackendLimits(settings.default_max_concurrency))
+
+    def configure_backend(
+        self,
+        backend: str,
+        max_concurrency: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ) -> None:
+        """运行时调整某个后端的并发上限或token预算"""
+        with self._lock:
+            state = self._state(backend)
+            if max_concurrency is not None:
+                state.limits.max_concurrency = max(1, max_concurrency)
+            if tokens_per_minute is not None:
+                state.limits.tokens_per_minute = tokens_per_minute or None
+            self._dispatch(backend, state)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """根据请求内容生成single-flight去重键"""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # 并发槽位
+    # ------------------------------------------------------------------
+
+    def _state(self, backend: str) -> _BackendState:
+        state = self._backends.get(backend)
+        if state is None:
+            limits = BackendLimits(
+                self.default_limits.max_concurrency, self.default_limits.tokens_per_minute
+            )
+            state = self._backends[backend] = _BackendState(limits)
+        return state
+
+    def _enqueue(self, backend: str, waiter: _Waiter) -> _BackendState:
+        with self._lock:
+            state = self._state(backend)
+            heapq.heappush(state.waiters, (int(waiter.priority), next(self._seq), waiter))
+            self._dispatch(backend, state)
+        return state
+
+    def _dispatch(self, backend: str, state: _BackendState) -> None:
+        """在锁内按优先级放行等待者，直到并发或token预算用尽"""
+        while state.waiters and state.active < state.limits.max_concurrency:
+            _, _, waiter = state.waiters[0]
+            if waiter.cancelled:
+                heapq.heappop(state.waiters)
+                continue
+            now = time.monotonic()
+            delay = state.seconds_until_budget(waiter.tokens, now)
+            if delay > 0:
+                self._schedule_retry(backend, state, delay)
+                return
+            heapq.heappop(state.waiters)
+            state.active += 1
+            state.granted += 1
+            if waiter.tokens:
+                state.token_log.append((now, waiter.tokens))
+            state.wait_times.append(now - waiter.enqueued_at)
+            waiter.granted = True
+            waiter.notify()
+
+    def _schedule_retry(self, backend: str, state: _BackendState, delay: float) -> None:
+        if state.timer is not None and state.timer.is_alive():
+            return
+
+        def _retry():
+            with self._lock:
+                state.timer = None
+                self._dispatch(backend, state)
+
+        state.timer = threading.Timer(delay, _retry)
+        state.timer.daemon = True
+        state.timer.start()
+
+    def _release(self, backend: str, state: _BackendState) -> None:
+        with self._lock:
+            state.active -= 1
+            self._dispatch(backend, state)
+
+    def record_tokens(self, backend: str, tokens: int) -> None:
+        """请求完成后补记实际消耗的（输出）token"""
+        if tokens <= 0:
+            return
+        with self._lock:
+            self._state(backend).token_log.append((time.monotonic(), tokens))
+
+    @contextmanager
+    def slot(self, backend: str, priority: Priority = Priority.INTERACTIVE, tokens: int = 0):
+        """同步获取一个后端并发槽位（阻塞直到被放行）"""
+        event = threading.Event()
+        waiter = _Waiter(priority, tokens, event.set)
+        state = self._enqueue(backend, waiter)
+        event.wait()
+        try:
+            yield
+        finally:
+            self._release(backend, state)
+
+    @asynccontextmanager
+    async def slot_async(
+        self, backend: str, priority: Priority = Priority.INTERACTIVE, tokens: int = 0
+    ):
+        """异步获取一个后端并发槽位；等待期间可被取消"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def _notify():
+            loop.call_soon_threadsafe(
+                lambda: granted.done() or granted.set_result(None)
+            )
+
+        waiter = _Waiter(priority, tokens, _notify)
+        state = self._enqueue(backend, waiter)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.cancelled = True
+                was_granted = waiter.granted
+            if was_granted:
+                self._release(backend, state)
+            raise
+        try:
+            yield
+        finally:
+            self._release(backend, state)
+
+    # ------------------------------------------------------------------
+    # 调度入口
+    # ------------------------------------------------------------------
+
+    def _join_or_lead(
+        self, backend: str, dedup_key: str
+    ) -> Tuple[concurrent.futures.Future, bool]:
+        with self._lock:
+            future = self._inflight.get((backend, dedup_key))
+            if future is not None:
+                self._state(backend).coalesced += 1
+                return future, False
+            future = concurrent.futures.Future()
+            self._inflight[(backend, dedup_key)] = future
+            return future, True
+
+    def _finish_lead(self, backend: str, dedup_key: str) -> None:
+        with self._lock:
+            self._inflight.pop((backend, dedup_key), None)
+
+    def run(
+        self,
+        backend: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: Priority = Priority.INTERACTIVE,
+        tokens: int = 0,
+        dedup_key: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """同步执行一次LLM调用"""
+        if dedup_key is None:
+            with self.slot(backend, priority, tokens):
+                return fn(*args, **kwargs)
+
+        future, leader = self._join_or_lead(backend, dedup_key)
+        if not leader:
+            return future.result()
+        try:
+            with self.slot(backend, priority, tokens):
+                result = fn(*args, **kwargs)
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        else:
+            if not future.done():
+                future.set_result(result)
+            return result
+        finally:
+            self._finish_lead(backend, dedup_key)
+
+    async def run_async(
+        self,
+        backend: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+        priority: Priority = Priority.INTERACTIVE,
+        tokens: int = 0,
+        dedup_key: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """异步执行一次LLM调用"""
+        if dedup_key is None:
+            async with self.slot_async(backend, priority, tokens):
+                return await fn(*args, **kwargs)
+
+        future, leader = self._join_or_lead(backend, dedup_key)
+        if not leader:
+            # shield：取消某个等待者时不能连带取消共享的future（否则其他等待者全部被取消）
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            async with self.slot_async(backend, priority, tokens):
+                result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            # 发起方被取消（如对冲请求中落败的一方）不代表等待者也要放弃，交给它们按可重试错误处理
+            if not future.done():
+                future.set_exception(LLMRequestError("合并的LLM请求已被发起方取消", retryable=True))
+            raise
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        else:
+            if not future.done():
+                future.set_result(result)
+            return result
+        finally:
+            self._finish_lead(backend, dedup_key)
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """各后端的队列深度、在途数、token用量和等待时间统计"""
+        now = time.monotonic()
+        result: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for name, state in self._backends.items():
+                by_priority = {p.name.lower(): 0 for p in Priority}
+                for _, _, waiter in state.waiters:
+                    if not waiter.cancelled:
+                        by_priority[Priority(waiter.priority).name.lower()] += 1
+                waits = sorted(state.wait_times)
+                result[name] = {
+                    "max_concurrency": state.limits.max_concurrency,
+                    "tokens_per_minute": state.limits.tokens_per_minute,
+                    "active": state.active,
+                    "queue_depth": sum(by_priority.values()),
+                    "queue_depth_by_priority": by_priority,
+                    "tokens_last_minute": state.tokens_in_window(now),
+                    "granted": state.granted,
+                    "coalesced": state.coalesced,
+                    "wait_ms": {
+                        "avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                        "p95": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 2) if waits else 0.0,
+                        "max": round(waits[-1] * 1000, 2) if waits else 0.0,
+                    },
+                }
+        return result
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def __getattr__(name: str) -> Any:
+    # 全局调度器实例：第一次访问时才读取配置，只导入类的模块（如桌宠端）不依赖config.toml
+    global _scheduler
+    if name == "scheduler":
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler.from_config()
+        return _scheduler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
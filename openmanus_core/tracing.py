@@ -0,0 +1,292 @@
+"""
+轻量级执行追踪
+
+为代理步骤、LLM调用、工具执行和请求分类记录嵌套span（墙钟耗时 + 属性），
+完成的trace保存在进程内环形缓冲区中，并可选追加写入JSONL文件。
+
+采样在根span处决定，子span继承该决定；未被采样的请求只多一次contextvar查找，
+关闭追踪时开销可以忽略。根span结束时整个trace即完成，之后才结束的子span
+（例如被取消的对冲请求）标记为 late 附加到缓冲区中的trace上，不会滞留在内存里。
+"""
+
+import asyncio
+import functools
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Union
+
+from openmanus_core.config import PROJECT_ROOT, config
+
+
+class Span:
+    """一次带耗时的操作"""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "start_time",
+        "_start_perf",
+        "duration_ms",
+        "error",
+    )
+
+    sampled = True
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """设置单个属性"""
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        """批量设置属性"""
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        """结束span并记录耗时"""
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self._start_perf) * 1000.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """未采样时使用的空span，所有操作均为空操作"""
+
+    __slots__ = ()
+
+    sampled = False
+    name = ""
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+SpanLike = Union[Span, _NoopSpan]
+
+_current_span: ContextVar[Optional[SpanLike]] = ContextVar(
+    "openmanus_current_span", default=None
+)
+
+
+class JsonlTraceExporter:
+    """将完成的trace逐行追加写入JSONL文件"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        if not self.path.is_absolute():
+            self.path = PROJECT_ROOT / self.path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        line = json.dumps(trace, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """span的创建、采样和收集"""
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        buffer_size: int = 200,
+        exporter: Optional[JsonlTraceExporter] = None,
+    ):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._pending: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "Tracer":
+        """根据config.toml中的[tracing]配置创建追踪器"""
+        settings = config.tracing_config
+        if settings is None:
+            return cls()
+        exporter = JsonlTraceExporter(settings.jsonl_path) if settings.jsonl_path else None
+        return cls(
+            sample_rate=settings.sample_rate,
+            buffer_size=settings.buffer_size,
+            exporter=exporter,
+        )
+
+    def configure(
+        self,
+        sample_rate: Optional[float] = None,
+        buffer_size: Optional[int] = None,
+        jsonl_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        """运行时调整采样率、缓冲区大小或导出路径"""
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if buffer_size is not None:
+            with self._lock:
+                self._traces = deque(self._traces, maxlen=buffer_size)
+        if jsonl_path is not None:
+            self.exporter = JsonlTraceExporter(jsonl_path)
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def current_span(self) -> SpanLike:
+        """获取当前上下文中的span（无则返回空span）"""
+        return _current_span.get() or NOOP_SPAN
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[SpanLike]:
+        """创建一个span；在根位置时进行采样决定"""
+        parent = _current_span.get()
+
+        if parent is None:
+            if self.sample_rate <= 0:
+                yield NOOP_SPAN
+                return
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                token = _current_span.set(NOOP_SPAN)
+                try:
+                    yield NOOP_SPAN
+                finally:
+                    _current_span.reset(token)
+                return
+            span = Span(name, uuid.uuid4().hex, None, attributes)
+            with self._lock:
+                self._pending[span.trace_id] = []
+        elif not parent.sampled:
+            yield NOOP_SPAN
+            return
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, attributes)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+            self._finish(span)
+
+    def traced(self, name: Optional[str] = None, **attributes: Any) -> Callable:
+        """装饰器：为同步或异步函数的每次调用创建一个span"""
+
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+
+            if asyncio.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name, **attributes):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, **attributes):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            spans = self._pending.get(span.trace_id)
+            if spans is None:
+                # 根span已结束后才结束的子span（如对冲请求中被取消的后端调用）：
+                # 附加到缓冲区中已完成的trace（JSONL中已导出的记录不再更新），已被挤出时丢弃
+                self._attach_late(span)
+                return
+            spans.append(span)
+            if span.parent_id is not None:
+                return
+            del self._pending[span.trace_id]
+
+        spans.sort(key=lambda s: s._start_perf)
+        trace = {
+            "trace_id": span.trace_id,
+            "name": span.name,
+            "start_time": span.start_time,
+            "duration_ms": round(span.duration_ms, 3),
+            "error": span.error,
+            "spans": [s.to_dict() for s in spans],
+        }
+        with self._lock:
+            self._traces.append(trace)
+        if self.exporter is not None:
+            try:
+                self.exporter.export(trace)
+            except OSError:
+                pass
+
+    def _attach_late(self, span: Span) -> None:
+        for trace in reversed(self._traces):
+            if trace["trace_id"] == span.trace_id:
+                trace["spans"].append(dict(span.to_dict(), late=True))
+                return
+
+    def get_traces(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取最近完成的trace（最新的在前）"""
+        with self._lock:
+            traces = list(self._traces)
+        traces.reverse()
+        return traces[:limit] if limit else traces
+
+    def clear(self) -> None:
+        """清空环形缓冲区"""
+        with self._lock:
+            self._traces.clear()
+
+
+# 全局追踪器实例
+tracer = Tracer.from_config()
@@ -0,0 +1,131 @@
+# optotype_atlas.py
+"""
+视标（E字、兰道尔C环、斯内伦字母等）的预渲染图集
+
+视力检测以前每帧都要对视标图片做 getRotationMatrix2D/warpAffine 旋转、缩放，再逐通道
+用浮点运算做alpha混合（高级检测还会每帧用 putText 重新画一遍E字）。可是一个视标在画面上
+要保持约2秒才换，这几十帧显示的是完全相同的 (模式, 大小, 方向)。
+
+OptotypeAtlas 把每个 (模式, 像素尺寸, 方向) 变体只渲染一次：旋转 → 转为预乘alpha → 缩放，
+以 uint8 的预乘颜色和 255-alpha 两个数组缓存。之后每帧只需切出画面中央区域做一次整数混合：
+
+    dst = color + dst * (255 - alpha) / 255
+
+不透明的视标（没有alpha通道或alpha全为255）直接拷贝。大小在测试中按×0.9/×1.1连续变化，
+无法事先枚举，变体在第一次显示时渲染，最近使用的 SPRITE_CAPACITY 个保留在缓存中；
+prerender() 可以在测试开始前预先渲染给定大小的全部方向。
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+DIRECTIONS = (0, 90, 180, 270)  # 右、下、左、上
+SPRITE_CAPACITY = 64           # 缓存的变体数上限
+
+
+@dataclass
+class Sprite:
+    """一个预渲染的视标变体"""
+    color: np.ndarray              # 预乘alpha后的BGR (h, w, 3) uint8
+    inverse: Optional[np.ndarray]  # 255 - alpha，(h, w, 3) uint8；不透明视标为None
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.color.shape[:2]
+
+
+def rotate(img: np.ndarray, angle: int, border_value=(255, 255, 255, 0)) -> np.ndarray:
+    """绕图片中心旋转（与原先各模块的 warpAffine 旋转相同，输出尺寸不变）"""
+    h, w = img.shape[:2]
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    return cv2.warpAffine(img, M, (w, h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=border_value)
+
+
+def premultiply(img: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """BGR或BGRA图片转换为 (预乘颜色, 255-alpha)；不透明时后者为None"""
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    if img.shape[2] == 3 or (img[..., 3] == 255).all():
+        return np.ascontiguousarray(img[..., :3]), None
+    alpha = img[..., 3:4].astype(np.uint16)
+    color = ((img[..., :3] * alpha + 127) // 255).astype(np.uint8)
+    inverse = np.repeat(255 - img[..., 3:4], 3, axis=2)
+    return color, inverse
+
+
+class OptotypeAtlas:
+    """按 (模式, 大小, 方向) 缓存视标变体，并把它混合到画面上
+
+    images 为 {模式: 视标图片}（BGR或BGRA，方向0即开口朝右）；size 为相对原图的缩放比例。
+    border_value 为旋转时露出区域的填充值（默认透明）。
+    """
+
+    def __init__(self, images: Dict[Hashable, np.ndarray], capacity: int = SPRITE_CAPACITY,
+                 border_value=(255, 255, 255, 0)):
+        self.images = {mode: img for mode, img in images.items() if img is not None}
+        self.capacity = capacity
+        self.border_value = border_value
+        self._sprites: "OrderedDict[Tuple[Any, ...], Sprite]" = OrderedDict()
+        self.rendered = 0
+
+    @staticmethod
+    def pixel_size(img: np.ndarray, size: float) -> Tuple[int, int]:
+        """缩放后的 (宽, 高)，与 cv2.resize 前按 int(边长 * size) 取整一致"""
+        return max(1, int(img.shape[1] * size)), max(1, int(img.shape[0] * size))
+
+    def sprite(self, mode: Hashable, size: float, direction: int) -> Sprite:
+        img = self.images[mode]
+        key = (mode, direction % 360, *self.pixel_size(img, size))
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            return sprite
+        sprite = self._render(img, key[1], key[2:])
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.capacity:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def _render(self, img: np.ndarray, direction: int, dsize: Tuple[int, int]) -> Sprite:
+        rotated = rotate(img, direction, self.border_value) if direction else img
+        # 先预乘再缩放，透明边缘插值时不会混入透明像素的颜色
+        color, inverse = premultiply(rotated)
+        if (color.shape[1], color.shape[0]) != dsize:
+            color = cv2.resize(color, dsize)
+            if inverse is not None:
+                inverse = cv2.resize(inverse, dsize)
+        self.rendered += 1
+        return Sprite(color, inverse)
+
+    def prerender(self, mode: Hashable, sizes: Iterable[float], directions: Iterable[int] = DIRECTIONS) -> None:
+        """预先渲染给定大小的各方向变体"""
+        for size in sizes:
+            for direction in directions:
+                self.sprite(mode, size, direction)
+
+    def draw(self, frame: np.ndarray, mode: Hashable, size: float, direction: int,
+             center: Optional[Tuple[int, int]] = None) -> Tuple[int, int, int, int]:
+        """把视标混合到frame上（默认居中，超出画面的部分裁掉），返回绘制区域 (x, y, w, h)"""
+        sprite = self.sprite(mode, size, direction)
+        h, w = sprite.shape
+        fh, fw = frame.shape[:2]
+        if center is None:
+            x, y = (fw - w) // 2, (fh - h) // 2
+        else:
+            x, y = center[0] - w // 2, center[1] - h // 2
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, fw), min(y + h, fh)
+        if x0 >= x1 or y0 >= y1:
+            return x0, y0, 0, 0
+        src = np.s_[y0 - y:y1 - y, x0 - x:x1 - x]
+        roi = frame[y0:y1, x0:x1]
+        if sprite.inverse is None:
+            roi[:] = sprite.color[src]
+        else:
+            cv2.add(sprite.color[src], cv2.multiply(roi, sprite.inverse[src], scale=1 / 255), dst=roi)
+        return x0, y0, x1 - x0, y1 - y0
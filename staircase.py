@@ -0,0 +1,202 @@
+# staircase.py
+"""
+贝叶斯自适应阶梯法（QUEST）：视标大小、对比度等刺激阈值的估计
+
+以前的视力检测按固定步长调整视标大小（答对×0.9、答错×1.1），连续答错两次就结束，
+最终视标有多大就报多少视力：试次数没有上限（偶尔要二三十次），结果又取决于最后几次回答的运气。
+
+QuestStaircase 在对数刺激强度上维护阈值的后验分布：
+- 被试模型为 Weibull 心理测量函数 p = γ + (1-γ-λ)(1 - exp(-10^(β(x-θ))))，
+  x、θ 为 log10 刺激强度，γ 为猜对率（4个方向的E字/C环为0.25），λ 为失误率
+- 每次回答后按贝叶斯公式更新后验；下一次刺激从候选强度中选出使回答后后验熵期望最小、
+  即信息量最大的一个（Kontsevich & Tyler 的阈值版 Ψ 方法）
+- 后验 CREDIBLE_MASS 可信区间的宽度不超过 CI_WIDTH（log10单位）时结束；阈值明显超出
+  可测范围（如最小视标也能看清）或达到 MAX_TRIALS 次时也结束
+
+for_mode() 按测试模式（E字表、兰道尔C环、斯内伦、对比度）给出刺激范围和猜对率。
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+THRESHOLD_GRID = 201      # 阈值后验的网格点数
+STIMULUS_LEVELS = 40      # 候选刺激强度数（在 [low, high] 上按对数均匀分布）
+GRID_MARGIN = 0.3         # 阈值网格向刺激范围外延伸的宽度（log10单位）
+PRIOR_SD = 0.5            # 先验标准差（log10单位）
+CREDIBLE_MASS = 0.9
+CI_WIDTH = 0.3            # 可信区间宽度（log10），约为五分记录视力表上下各一行半
+MIN_TRIALS = 5
+MAX_TRIALS = 40
+
+# 国际标准视力对照表（查表值 → 五分记录）
+VISION_STANDARD = {
+    0.1: 4.0, 0.15: 4.2, 0.2: 4.4,
+    0.25: 4.6, 0.3: 4.8, 0.4: 5.0,
+    0.5: 5.2, 0.6: 5.4, 0.8: 5.6,
+    1.0: 5.8
+}
+
+
+def vision_level(threshold_size: float, smallest_size: float = 0.1) -> float:
+    """视标大小阈值对应的视力：阈值越小视力越好，按 smallest_size/阈值 取对照表中最接近的值
+    （能看清最小视标为5.8，最大视标1.0才看清为4.0）"""
+    key = smallest_size / max(threshold_size, 1e-6)
+    closest = min(VISION_STANDARD, key=lambda x: abs(x - key))
+    return VISION_STANDARD[closest]
+
+
+@dataclass(frozen=True)
+class PsychometricModel:
+    """Weibull 心理测量函数（对数刺激强度）"""
+    slope: float = 3.5    # β
+    guess: float = 0.25   # γ
+    lapse: float = 0.02   # λ
+
+    def p_correct(self, x, threshold) -> np.ndarray:
+        """log10强度x下答对的概率；x与threshold可广播"""
+        x = np.asarray(x, np.float64)
+        return self.guess + (1 - self.guess - self.lapse) * -np.expm1(-np.power(10.0, self.slope * (x - threshold)))
+
+
+# 各测试模式：刺激范围（线性）和心理测量函数
+MODES: Dict[str, Dict] = {
+    'e_chart': dict(low=0.1, high=1.0, model=PsychometricModel(guess=0.25)),
+    'landolt_c': dict(low=0.1, high=1.0, model=PsychometricModel(guess=0.25)),
+    'snellen': dict(low=0.1, high=1.0, model=PsychometricModel(guess=0.25)),
+    # 对比度为是/否检测，γ 为无刺激时误报的概率
+    'contrast': dict(low=0.01, high=1.0, model=PsychometricModel(guess=0.02)),
+}
+
+
+class QuestStaircase:
+    """贝叶斯自适应阶梯：next_value() 给出下一次的刺激强度，update() 记录回答"""
+
+    def __init__(self, low: float, high: float, model: Optional[PsychometricModel] = None,
+                 prior_mean: Optional[float] = None, prior_sd: float = PRIOR_SD,
+                 levels: Optional[Sequence[float]] = None, credible_mass: float = CREDIBLE_MASS,
+                 ci_width: float = CI_WIDTH, min_trials: int = MIN_TRIALS, max_trials: int = MAX_TRIALS):
+        if not 0 < low < high:
+            raise ValueError(f"刺激范围无效: [{low}, {high}]")
+        self.low, self.high = low, high
+        self.model = model or PsychometricModel()
+        self.credible_mass = credible_mass
+        self.ci_width = ci_width
+        self.min_trials = min_trials
+        self.max_trials = max_trials
+
+        log_low, log_high = math.log10(low), math.log10(high)
+        self.thresholds = np.linspace(log_low - GRID_MARGIN, log_high + GRID_MARGIN, THRESHOLD_GRID)
+        if levels is None:
+            self.levels = np.linspace(log_low, log_high, STIMULUS_LEVELS)
+        else:
+            self.levels = np.log10(np.clip(np.asarray(levels, np.float64), low, high))
+        # 各候选强度 × 各阈值下答对的概率 (S, Θ)
+        self._table = self.model.p_correct(self.levels[:, None], self.thresholds[None, :])
+
+        center = math.log10(prior_mean) if prior_mean else (log_low + log_high) / 2
+        self._log_prior = -0.5 * ((self.thresholds - center) / prior_sd) ** 2
+        self.history: List[Tuple[float, bool]] = []
+        self._log_posterior = self._log_prior.copy()
+
+    @classmethod
+    def for_mode(cls, mode: str, **overrides) -> "QuestStaircase":
+        """按测试模式（TestMode.value 或 'contrast'）创建；未知模式按E字表处理"""
+        params = dict(MODES.get(mode, MODES['e_chart']))
+        params.update(overrides)
+        return cls(**params)
+
+    def reset(self) -> None:
+        self.history = []
+        self._log_posterior = self._log_prior.copy()
+
+    # ------------------------------------------------------------------
+    # 更新与选择
+    # ------------------------------------------------------------------
+
+    def update(self, value: float, correct: bool) -> None:
+        """记录一次回答；value 为实际呈现的刺激强度（线性）"""
+        p = self.model.p_correct(math.log10(value), self.thresholds)
+        self._log_posterior += np.log(p if correct else 1 - p)
+        self._log_posterior -= self._log_posterior.max()
+        self.history.append((float(value), bool(correct)))
+
+    @property
+    def posterior(self) -> np.ndarray:
+        weights = np.exp(self._log_posterior)
+        return weights / weights.sum()
+
+    def next_value(self) -> float:
+        """使回答后后验熵期望最小的候选强度（线性）"""
+        posterior = self.posterior
+        joint = self._table * posterior                   # 答对且阈值为θ (S, Θ)
+        p_correct = joint.sum(axis=1)
+        expected = (self._entropy(joint, p_correct)
+                    + self._entropy(posterior - joint, 1 - p_correct))
+        return float(10 ** self.levels[int(np.argmin(expected))])
+
+    @staticmethod
+    def _entropy(joint: np.ndarray, marginal: np.ndarray) -> np.ndarray:
+        """Σ_θ joint·log(marginal/joint)，即 marginal × 条件后验的熵"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = joint * np.log(marginal[:, None] / joint)
+        return np.nansum(terms, axis=1)
+
+    # ------------------------------------------------------------------
+    # 估计
+    # ------------------------------------------------------------------
+
+    @property
+    def trials(self) -> int:
+        return len(self.history)
+
+    @property
+    def log_mean(self) -> float:
+        return float(self.posterior @ self.thresholds)
+
+    @property
+    def log_sd(self) -> float:
+        posterior = self.posterior
+        mean = posterior @ self.thresholds
+        return float(math.sqrt(max(posterior @ (self.thresholds - mean) ** 2, 0.0)))
+
+    def threshold(self) -> float:
+        """阈值的后验均值（线性强度）"""
+        return float(10 ** self.log_mean)
+
+    def credible_interval(self) -> Tuple[float, float]:
+        """后验中间 credible_mass 的可信区间（log10单位）"""
+        cdf = np.cumsum(self.posterior)
+        tail = (1 - self.credible_mass) / 2
+        lower, upper = np.searchsorted(cdf, [tail, 1 - tail])
+        upper = min(upper, len(self.thresholds) - 1)
+        return float(self.thresholds[lower]), float(self.thresholds[upper])
+
+    @property
+    def out_of_range(self) -> bool:
+        """阈值整体落在可测范围之外（最小刺激也能看清，或最大刺激也看不清）"""
+        lower, upper = self.credible_interval()
+        return upper < math.log10(self.low) or lower > math.log10(self.high)
+
+    @property
+    def finished(self) -> bool:
+        if self.trials >= self.max_trials:
+            return True
+        if self.trials < self.min_trials:
+            return False
+        lower, upper = self.credible_interval()
+        return upper - lower <= self.ci_width or self.out_of_range
+
+    def summary(self) -> Dict:
+        lower, upper = self.credible_interval()
+        return {
+            'threshold': self.threshold(),
+            'log_threshold': self.log_mean,
+            'log_sd': self.log_sd,
+            'credible_interval': (float(10 ** lower), float(10 ** upper)),
+            'trials': self.trials,
+            'correct': sum(correct for _, correct in self.history),
+            'finished': self.finished,
+        }
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCT分类模型的数据并行训练启动器（torch.distributed，gloo后端，适用于无GPU的多核CPU节点）
+
+在本节点上启动 --nproc 个 `train_model.py --distributed` 进程，并设置进程组所需的
+RANK / LOCAL_RANK / WORLD_SIZE / LOCAL_WORLD_SIZE / MASTER_ADDR / MASTER_PORT 环境变量。
+每个进程训练约 1/总进程数 的样本（每进程批次仍为 BATCH_SIZE），梯度在反向传播时用 allreduce 平均。
+
+CPU上多个进程各自默认会占满全部核心的线程，互相争抢反而更慢；启动器按 核数/nproc 给每个进程
+设置 OMP_NUM_THREADS（可用 --threads 指定）。
+
+用法:
+    单机4进程（测试）:  python train_distributed.py --nproc 4 -- --epochs 5 --fast
+    两个节点各8进程:    python train_distributed.py --nproc 8 --nnodes 2 --node-rank 0 --master-addr 10.0.0.1 -- --fast
+                        python train_distributed.py --nproc 8 --nnodes 2 --node-rank 1 --master-addr 10.0.0.1 -- --fast
+"--" 之后的参数原样传给 train_model.py。也可以直接用 torchrun 运行 `train_model.py --distributed`。
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+TRAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'train_model.py')
+DEFAULT_MASTER_PORT = 29500
+
+
+def launch(nproc, nnodes=1, node_rank=0, master_addr='127.0.0.1', master_port=DEFAULT_MASTER_PORT,
+           threads=None, train_args=()):
+    """启动本节点的训练进程并等待结束；任一进程失败时终止其余进程，返回退出码"""
+    world_size = nproc * nnodes
+    threads = threads or max(1, (os.cpu_count() or 1) // nproc)
+    procs = []
+    for local_rank in range(nproc):
+        env = dict(os.environ)
+        env.update({
+            'RANK': str(node_rank * nproc + local_rank),
+            'LOCAL_RANK': str(local_rank),
+            'WORLD_SIZE': str(world_size),
+            'LOCAL_WORLD_SIZE': str(nproc),
+            'MASTER_ADDR': master_addr,
+            'MASTER_PORT': str(master_port),
+            'OMP_NUM_THREADS': str(threads),
+        })
+        cmd = [sys.executable, TRAIN_SCRIPT, '--distributed', *train_args]
+        procs.append(subprocess.Popen(cmd, env=env))
+    print(f"已启动 {nproc} 个训练进程（节点 {node_rank}/{nnodes}，共 {world_size} 个，每进程 {threads} 线程）")
+
+    try:
+        while True:
+            codes = [p.poll() for p in procs]
+            failed = [c for c in codes if c not in (None, 0)]
+            if failed:
+                print(f"训练进程异常退出（退出码 {failed[0]}），终止其余进程")
+                for p in procs:
+                    if p.poll() is None:
+                        p.terminate()
+                return failed[0]
+            if all(c == 0 for c in codes):
+                return 0
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        return 130
+    finally:
+        for p in procs:
+            p.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCT分类模型的数据并行训练启动器（gloo）")
+    parser.add_argument('--nproc', type=int, default=2, help="本节点的训练进程数")
+    parser.add_argument('--nnodes', type=int, default=1, help="节点数")
+    parser.add_argument('--node-rank', type=int, default=0, help="本节点序号（0为主节点）")
+    parser.add_argument('--master-addr', default='127.0.0.1', help="主节点地址")
+    parser.add_argument('--master-port', type=int, default=DEFAULT_MASTER_PORT)
+    parser.add_argument('--threads', type=int, default=None, help="每个进程的计算线程数（默认 核数/nproc）")
+    parser.add_argument('train_args', nargs=argparse.REMAINDER, help="传给 train_model.py 的参数（写在 -- 之后）")
+    args = parser.parse_args()
+
+    train_args = args.train_args[1:] if args.train_args[:1] == ['--'] else args.train_args
+    sys.exit(launch(args.nproc, args.nnodes, args.node_rank, args.master_addr, args.master_port,
+                    args.threads, train_args))
+
+
+if __name__ == "__main__":
+    main()
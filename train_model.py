@@ -1,14 +1,22 @@
+import argparse
+import contextlib
+import datetime
+import math
 import os
 import re
+import time
 import numpy as np
 import pandas as pd
 import torch
-from torch.utils.data import Dataset, DataLoader, WeightedRandomSampler
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import Dataset, DataLoader, Sampler, WeightedRandomSampler
 from torchvision import transforms, models
 from PIL import Image
 from sklearn.model_selection import train_test_split
 import torch.multiprocessing
 from tqdm import tqdm  # 新增导入
+from dataset_cache import DATASET_CACHE_DIR, load_or_compile
 
 # --------------------
 # 0. 全局配置（新增特殊数据集标识）
@@ -22,6 +30,11 @@ CLASSES = [
 DATA_DIR = r"C:\Users\91144\Desktop\eyes_model\dataset"
 IMG_SIZE = 224
 BATCH_SIZE = 32
+LOG_EVERY = 20  # 进度条每隔多少个批次更新一次损失
+# torch.profiler：每个epoch跳过 WAIT 个批次、预热 WARMUP 个批次后记录 ACTIVE 个批次
+PROFILE_WAIT, PROFILE_WARMUP, PROFILE_ACTIVE = 2, 2, 5
+# 分布式训练：进程组集合通信的超时（rank 0 编译数据集缓存时其他进程在屏障处等待）
+DIST_TIMEOUT = datetime.timedelta(minutes=120)
 
 # --------------------
 # 1. 智能数据加载模块（核心改进）
@@ -62,7 +75,8 @@ def build_dataframe():
         if not os.path.exists(class_path):
             continue
             
-        for img_name in os.listdir(class_path):
+        # 排序：分布式训练时各进程（各节点）得到相同的行顺序
+        for img_name in sorted(os.listdir(class_path)):
             if not img_name.lower().endswith(('.png','.jpg','.jpeg')):
                 continue
                 
@@ -103,6 +117,28 @@ train_transform = transforms.Compose([
     transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
 ])
 
+# 验证集：确定性预处理（与推理时 image_processing.test_transform 相同），不做随机增强
+val_transform = transforms.Compose([
+    transforms.Resize((IMG_SIZE, IMG_SIZE)),
+    transforms.ToTensor(),
+    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+])
+
+# 使用数据集缓存时：图片已按上面的Resize缩放为uint8张量，只需做随机增强和归一化
+cached_train_transform = transforms.Compose([
+    transforms.RandomCrop(IMG_SIZE),
+    transforms.RandomHorizontalFlip(p=0.3),
+    transforms.RandomRotation(10),
+    ElasticDeform(),
+    transforms.ConvertImageDtype(torch.float),
+    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+])
+
+cached_val_transform = transforms.Compose([
+    transforms.ConvertImageDtype(torch.float),
+    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+])
+
 # --------------------
 # 3. 数据集类改进（支持动态增强）
 # --------------------
@@ -120,7 +156,7 @@ class OCTDataset(Dataset):
         return len(self.df)
     def __getitem__(self, idx):
         row = self.df.iloc[idx]
-        img = Image.open(row['path']).convert('RGB')
+        img = self._load_image(row)
         
         # 确保标签是标量而不是数组
         label = row['label']
@@ -136,14 +172,76 @@ class OCTDataset(Dataset):
             img = self.transform(img)
             
         return img, label  # 确保返回的是标量标签
+
+    def _load_image(self, row):
+        return Image.open(row['path']).convert('RGB')
     
-    def get_sampler(self):
-        """加权采样解决类别不平衡[9](@ref)"""
+    def get_sampler(self, distributed=False):
+        """加权采样解决类别不平衡[9](@ref)；distributed=True 时各进程各取互不重叠的一份"""
         weights = self.df['label'].map(self.class_weights)
         # 修改为将weights转换为numpy数组后再转换为torch张量
         weights_tensor = torch.as_tensor(weights.values, dtype=torch.double)
+        if distributed:
+            return DistributedWeightedSampler(weights_tensor, len(weights))
         return WeightedRandomSampler(weights_tensor, len(weights), replacement=True)
 
+
+def _dist_info():
+    """(rank, world_size)；未初始化进程组时为 (0, 1)"""
+    if dist.is_available() and dist.is_initialized():
+        return dist.get_rank(), dist.get_world_size()
+    return 0, 1
+
+
+class DistributedWeightedSampler(Sampler):
+    """WeightedRandomSampler 的分布式版本（可替代 DistributedSampler）
+
+    各进程用相同的种子（seed + epoch）抽取同一组共 num_samples 个加权样本，再按进程号间隔切分，
+    每个进程得到互不重叠的约 num_samples / world_size 个。每个epoch开始前需调用 set_epoch()。
+    """
+    def __init__(self, weights, num_samples, num_replicas=None, rank=None, replacement=True, seed=0):
+        if num_replicas is None or rank is None:
+            rank, num_replicas = _dist_info()
+        self.weights = torch.as_tensor(weights, dtype=torch.double)
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.num_samples = math.ceil(num_samples / num_replicas)
+        self.total_size = self.num_samples * num_replicas
+        self.replacement = replacement
+        self.seed = seed
+        self.epoch = 0
+
+    def __iter__(self):
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        indices = torch.multinomial(self.weights, self.total_size, self.replacement, generator=generator)
+        return iter(indices[self.rank::self.num_replicas].tolist())
+
+    def __len__(self):
+        return self.num_samples
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+
+class CachedOCTDataset(OCTDataset):
+    """从 dataset_cache 的内存映射数组读取已解码、缩放的图片（uint8张量），不再逐次解码"""
+    def __init__(self, df, images_path, transform=None):
+        super().__init__(df, transform)
+        self.images_path = images_path
+        self._images = None
+
+    def __getstate__(self):
+        # 传给加载进程时不序列化数组，各进程自己打开内存映射
+        state = self.__dict__.copy()
+        state['_images'] = None
+        return state
+
+    def _load_image(self, row):
+        if self._images is None:
+            self._images = np.load(self.images_path, mmap_mode='c')
+        return torch.from_numpy(self._images[row['row']])
+
 # --------------------
 # 4. 模型定义（兼容预训练权重）
 # --------------------
@@ -168,117 +266,250 @@ class OCTClassifier(torch.nn.Module):
 # --------------------
 # 6. 训练流程实现
 # --------------------
-def train_model(model, train_loader, val_loader, num_epochs=25):
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model = model.to(device)
-    
-    # 调试1: 检查数据加载器
-    print("\n=== 数据加载调试 ===")
-    print(f"训练集大小: {len(train_loader.dataset)}")
-    print(f"验证集大小: {len(val_loader.dataset)}")
-    sample_batch = next(iter(train_loader))
-    print(f"输入形状: {sample_batch[0].shape}, 标签形状: {sample_batch[1].shape}")
-    
-    # 调试2: 检查模型结构
-    print("\n=== 模型结构调试 ===")
-    print(model)
-    test_input = torch.randn(1, 3, IMG_SIZE, IMG_SIZE).to(device)
-    test_output = model(test_input)
-    print(f"测试输出形状: {test_output.shape}")
-    print(f"预期输出形状: [1, {len(CLASSES)}]")
+def _bf16_supported(device):
+    """当前设备能否用bf16自动混合精度（CPU需支持AVX512-BF16/AMX等指令）"""
+    if device.type == 'cuda':
+        return torch.cuda.is_bf16_supported()
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+def _make_optimizer(model, lr, fast):
+    """快速模式优先用融合（fused）Adam，不支持时退回foreach实现"""
+    params = model.parameters()
+    if not fast:
+        return torch.optim.Adam(params, lr=lr)
+    params = list(params)
+    try:
+        return torch.optim.Adam(params, lr=lr, fused=True)
+    except (RuntimeError, TypeError, ValueError):
+        return torch.optim.Adam(params, lr=lr, foreach=True)
+
+def _profiler(profile_dir, epoch):
+    """在 profile_dir/epochN 下保存本epoch前几个批次的torch.profiler跟踪（可用TensorBoard查看）"""
+    if not profile_dir:
+        return contextlib.nullcontext()
+    from torch.profiler import ProfilerActivity, profile, schedule, tensorboard_trace_handler
+    activities = [ProfilerActivity.CPU] + ([ProfilerActivity.CUDA] if torch.cuda.is_available() else [])
+    return profile(
+        activities=activities,
+        schedule=schedule(wait=PROFILE_WAIT, warmup=PROFILE_WARMUP, active=PROFILE_ACTIVE, repeat=1),
+        on_trace_ready=tensorboard_trace_handler(os.path.join(profile_dir, f'epoch{epoch + 1}')),
+        record_shapes=True,
+    )
+
+def _reduce_sum(*values, device):
+    """把各进程的标量（张量或数字）求和后取回；单进程时只取回，不做通信"""
+    totals = torch.stack([torch.as_tensor(v, device=device).double() for v in values])
+    if dist.is_available() and dist.is_initialized():
+        dist.all_reduce(totals)
+    return totals.tolist()
+
+def _broadcast_buffers(model):
+    """把rank 0的缓冲区（BN的running_mean/running_var等）广播到所有进程"""
+    for buf in model.buffers():
+        dist.broadcast(buf, 0)
+
+def train_model(model, train_loader, val_loader, num_epochs=25, fast=False, accumulation_steps=1,
+                compile_model=False, profile_dir=None, interactive=True):
+    """训练并按验证集准确率保存最佳权重
+
+    fast=True 为吞吐量优先的模式：channels_last内存布局、设备支持时bf16自动混合精度、
+    融合/foreach Adam。accumulation_steps>1 时累积多个批次的梯度再更新一次参数（等效批次更大）；
+    compile_model 用 torch.compile 编译模型；profile_dir 非空时每个epoch保存一段profiler跟踪。
+    interactive=False 时不打印调试信息、不等待回车，可在服务器上直接运行。
+    损失和正确数在设备上累加，每个epoch结束时才取回，训练循环中不会每批次同步一次。
+
+    已初始化 torch.distributed 进程组时按数据并行训练：模型用 DistributedDataParallel 包装，
+    各进程的加载器应使用 get_sampler(distributed=True) 和互不重叠的验证集分片；
+    指标在每个epoch结束时汇总一次，只有 rank 0 打印进度和保存 best_model.pth。
+    """
+    rank, world_size = _dist_info()
+    main_process = rank == 0
+    if torch.cuda.is_available():
+        device = torch.device("cuda", int(os.environ.get("LOCAL_RANK", 0)))
+    else:
+        device = torch.device("cpu")
+    memory_format = torch.channels_last if fast else torch.contiguous_format
+    model = model.to(device, memory_format=memory_format)
+    amp_dtype = torch.bfloat16 if fast and _bf16_supported(device) else None
     
-    # 调试3: 确认设备
-    print("\n=== 设备调试 ===")
-    print(f"使用设备: {device}")
-    print(f"模型设备: {next(model.parameters()).device}")
+    if interactive:
+        # 调试1: 检查数据加载器
+        print("\n=== 数据加载调试 ===")
+        print(f"训练集大小: {len(train_loader.dataset)}")
+        print(f"验证集大小: {len(val_loader.dataset)}")
+        sample_batch = next(iter(train_loader))
+        print(f"输入形状: {sample_batch[0].shape}, 标签形状: {sample_batch[1].shape}")
+        
+        # 调试2: 检查模型结构
+        print("\n=== 模型结构调试 ===")
+        print(model)
+        test_input = torch.randn(1, 3, IMG_SIZE, IMG_SIZE).to(device)
+        test_output = model(test_input)
+        print(f"测试输出形状: {test_output.shape}")
+        print(f"预期输出形状: [1, {len(CLASSES)}]")
+        
+        # 调试3: 确认设备
+        print("\n=== 设备调试 ===")
+        print(f"使用设备: {device}")
+        print(f"模型设备: {next(model.parameters()).device}")
     
     criterion = torch.nn.CrossEntropyLoss()
-    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    optimizer = _make_optimizer(model, 0.001, fast)
     scheduler = torch.optim.lr_scheduler.StepLR(optimizer, step_size=7, gamma=0.1)
+    # 保存权重和返回时用未包装、未编译的模型
+    base_model = model
+    ddp_model = None
+    if world_size > 1:
+        ddp_model = model = DistributedDataParallel(model, device_ids=[device] if device.type == 'cuda' else None)
+    if compile_model:
+        model = torch.compile(model)
+    # 验证集分片在各进程间可能相差一个批次，验证时直接用内层模型，避免DDP的集合通信互相等待
+    # （DDP只在每次训练前向之前广播BN统计量，最后一批前向后各进程又各自更新了一次，
+    # 所以验证前由 _broadcast_buffers 再从rank 0广播一次，各进程的内层模型才一致）
+    eval_model = base_model if ddp_model is not None else model
+    accumulation_steps = max(1, accumulation_steps)
+    
+    if main_process:
+        print(f"训练模式: {'快速' if fast else '标准'}，设备 {device}，进程数 {world_size}，"
+              f"混合精度 {amp_dtype or '无'}，梯度累积 {accumulation_steps}，编译 {'是' if compile_model else '否'}")
     
     best_acc = 0.0
     
     # 等待用户确认
-    input("\n调试信息已显示，按Enter键开始训练...")
+    if interactive:
+        input("\n调试信息已显示，按Enter键开始训练...")
     
     for epoch in range(num_epochs):
-        print(f'\nEpoch {epoch+1}/{num_epochs}')
-        print('-' * 10)
+        if main_process:
+            print(f'\nEpoch {epoch+1}/{num_epochs}')
+            print('-' * 10)
+        if hasattr(train_loader.sampler, 'set_epoch'):
+            train_loader.sampler.set_epoch(epoch)
         
         # 训练阶段
         model.train()
-        running_loss = 0.0
-        running_corrects = 0
+        running_loss = torch.zeros((), device=device)
+        running_corrects = torch.zeros((), dtype=torch.long, device=device)
+        seen = 0
+        epoch_start = time.perf_counter()
+        optimizer.zero_grad(set_to_none=True)
         
         # 使用tqdm添加进度条
-        train_loop = tqdm(train_loader, desc=f'Train Epoch {epoch+1}', leave=False)
-        for inputs, labels in train_loop:
-            inputs = inputs.to(device)
-            labels = labels.to(device)
-            
-            optimizer.zero_grad()
-            
-            with torch.set_grad_enabled(True):
-                outputs = model(inputs)
-                _, preds = torch.max(outputs, 1)
-                loss = criterion(outputs, labels)
+        train_loop = tqdm(train_loader, desc=f'Train Epoch {epoch+1}', leave=False, disable=not main_process)
+        with _profiler(profile_dir if main_process else None, epoch) as prof:
+            for step, (inputs, labels) in enumerate(train_loop, 1):
+                inputs = inputs.to(device, memory_format=memory_format, non_blocking=True)
+                labels = labels.to(device, non_blocking=True)
                 
-                loss.backward()
-                optimizer.step()
-            
-            running_loss += loss.item() * inputs.size(0)
-            running_corrects += torch.sum(preds == labels.data)
-            
-            # 更新进度条信息
-            train_loop.set_postfix(loss=loss.item())
+                update = step % accumulation_steps == 0 or step == len(train_loader)
+                # 梯度累积期间不做跨进程的梯度同步，只在更新参数的那一批同步
+                sync = ddp_model.no_sync() if ddp_model is not None and not update else contextlib.nullcontext()
+                with sync:
+                    with torch.autocast(device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+                        outputs = model(inputs)
+                        loss = criterion(outputs, labels)
+                    (loss / accumulation_steps).backward()
+                if update:
+                    optimizer.step()
+                    optimizer.zero_grad(set_to_none=True)
+                
+                running_loss += loss.detach() * inputs.size(0)
+                running_corrects += (outputs.detach().argmax(1) == labels).sum()
+                seen += inputs.size(0)
+                
+                # 更新进度条信息（取回损失会同步设备，每隔几个批次才做一次）
+                if step % LOG_EVERY == 0:
+                    train_loop.set_postfix(loss=loss.item())
+                if prof is not None:
+                    prof.step()
         
         scheduler.step()
         
-        epoch_loss = running_loss / len(train_loader.dataset)
-        epoch_acc = running_corrects.double() / len(train_loader.dataset)
+        loss_sum, corrects, seen = _reduce_sum(running_loss, running_corrects, seen, device=device)
+        epoch_loss = loss_sum / seen
+        epoch_acc = corrects / seen
+        elapsed = time.perf_counter() - epoch_start
         
-        print(f'Train Loss: {epoch_loss:.4f} Acc: {epoch_acc:.4f}')
+        if main_process:
+            print(f'Train Loss: {epoch_loss:.4f} Acc: {epoch_acc:.4f} '
+                  f'({seen / elapsed:.1f} images/s, {elapsed:.1f}s)')
         
         # 验证阶段
-        model.eval()
-        val_loss = 0.0
-        val_corrects = 0
+        if ddp_model is not None:
+            _broadcast_buffers(base_model)
+        eval_model.eval()
+        val_loss = torch.zeros((), device=device)
+        val_corrects = torch.zeros((), dtype=torch.long, device=device)
+        val_seen = 0
         
-        val_loop = tqdm(val_loader, desc=f'Val Epoch {epoch+1}', leave=False)
+        val_loop = tqdm(val_loader, desc=f'Val Epoch {epoch+1}', leave=False, disable=not main_process)
         with torch.no_grad():
             for inputs, labels in val_loop:
-                inputs = inputs.to(device)
-                labels = labels.to(device)
-                
-                outputs = model(inputs)
-                _, preds = torch.max(outputs, 1)
-                loss = criterion(outputs, labels)
+                inputs = inputs.to(device, memory_format=memory_format, non_blocking=True)
+                labels = labels.to(device, non_blocking=True)
                 
-                val_loss += loss.item() * inputs.size(0)
-                val_corrects += torch.sum(preds == labels.data)
+                with torch.autocast(device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+                    outputs = eval_model(inputs)
+                    loss = criterion(outputs, labels)
                 
-                # 更新进度条信息
-                val_loop.set_postfix(loss=loss.item())
-        
-        val_loss = val_loss / len(val_loader.dataset)
-        val_acc = val_corrects.double() / len(val_loader.dataset)
+                val_loss += loss * inputs.size(0)
+                val_corrects += (outputs.argmax(1) == labels).sum()
+                val_seen += inputs.size(0)
         
-        print(f'Val Loss: {val_loss:.4f} Acc: {val_acc:.4f}')
+        val_loss, val_corrects, val_seen = _reduce_sum(val_loss, val_corrects, val_seen, device=device)
+        val_loss = val_loss / max(val_seen, 1)
+        val_acc = val_corrects / max(val_seen, 1)
         
-        # 保存最佳模型
+        # 保存最佳模型（汇总后各进程的val_acc相同，只由rank 0写文件）
         if val_acc > best_acc:
             best_acc = val_acc
-            torch.save(model.state_dict(), 'best_model.pth')
+            if main_process:
+                torch.save(base_model.state_dict(), 'best_model.pth')
+        if main_process:
+            print(f'Val Loss: {val_loss:.4f} Acc: {val_acc:.4f}')
     
-    print(f'\nBest val Acc: {best_acc:.4f}')
-    return model
+    if main_process:
+        print(f'\nBest val Acc: {best_acc:.4f}')
+    return base_model
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="OCT分类模型训练")
+    parser.add_argument('--epochs', type=int, default=25)
+    parser.add_argument('--fast', action='store_true',
+                        help="吞吐量优先：channels_last、bf16自动混合精度（设备支持时）、融合Adam")
+    parser.add_argument('--accumulate', type=int, default=1, help="梯度累积的批次数（等效批次 = BATCH_SIZE × N）")
+    parser.add_argument('--compile', action='store_true', help="用torch.compile编译模型")
+    parser.add_argument('--profile-dir', default=None, help="每个epoch保存一段torch.profiler跟踪的目录")
+    parser.add_argument('--workers', type=int, default=0 if os.name == 'nt' else 4, help="数据加载进程数")
+    parser.add_argument('--yes', action='store_true', help="不显示调试信息、不等待回车，直接开始训练")
+    parser.add_argument('--distributed', action='store_true',
+                        help="数据并行训练（gloo后端，进程组信息取自RANK/WORLD_SIZE/MASTER_ADDR等环境变量，"
+                             "由 train_distributed.py 或 torchrun 设置）")
+    args = parser.parse_args()
+    
     # Windows多进程配置[8](@ref)
     torch.multiprocessing.freeze_support()
     torch.multiprocessing.set_start_method('spawn', force=True)
     
-    # 数据准备
+    if args.distributed:
+        dist.init_process_group('gloo', timeout=DIST_TIMEOUT)
+        args.yes = True
+    rank, world_size = _dist_info()
+    local_rank = int(os.environ.get("LOCAL_RANK", 0))
+    
+    # 数据准备（OCT_DATASET_CACHE 设为空时不使用缓存，每次读取原图）
     df = build_dataframe()
+    cache = None
+    if DATASET_CACHE_DIR:
+        # 每个节点只由local rank 0编译缓存，其他进程等它完成后直接打开
+        if args.distributed and local_rank != 0:
+            dist.barrier()
+        cache = load_or_compile(df, DATASET_CACHE_DIR, IMG_SIZE + 32, IMG_SIZE)
+        if args.distributed and local_rank == 0:
+            dist.barrier()
+        df = cache.index
     
     # 按患者划分数据集（保持左右眼一致）[2](@ref)
     patients = df['patient_id'].unique()
@@ -293,29 +524,45 @@ if __name__ == '__main__':
     ])
     
     # 创建数据加载器
-    train_dataset = OCTDataset(train_df, transform=train_transform)
+    if cache:
+        train_dataset = CachedOCTDataset(train_df, cache.path('train'), transform=cached_train_transform)
+    else:
+        train_dataset = OCTDataset(train_df, transform=train_transform)
     train_loader = DataLoader(
         train_dataset,
         batch_size=BATCH_SIZE,
-        sampler=train_dataset.get_sampler(),
-        num_workers=0 if os.name == 'nt' else 4,  # Windows兼容[8](@ref)
-        pin_memory=True
+        sampler=train_dataset.get_sampler(distributed=args.distributed),
+        num_workers=args.workers,  # Windows默认0[8](@ref)
+        pin_memory=torch.cuda.is_available(),
+        persistent_workers=args.workers > 0
     )
     
     # 创建验证集数据加载器
     val_df = df[df['patient_id'].isin(val_patients)]
-    val_dataset = OCTDataset(val_df, transform=train_transform)  # 使用相同的transform
+    if cache:
+        val_dataset = CachedOCTDataset(val_df, cache.path('eval'), transform=cached_val_transform)
+    else:
+        val_dataset = OCTDataset(val_df, transform=val_transform)
     val_loader = DataLoader(
         val_dataset,
         batch_size=BATCH_SIZE,
-        shuffle=False,
-        num_workers=0 if os.name == 'nt' else 4,
-        pin_memory=True
+        # 各进程验证互不重叠的一份，结果在train_model中汇总
+        sampler=range(rank, len(val_dataset), world_size),
+        num_workers=args.workers,
+        pin_memory=torch.cuda.is_available(),
+        persistent_workers=args.workers > 0
     )
     
     # 初始化模型并训练
     model = OCTClassifier(num_classes=len(CLASSES))
-    trained_model = train_model(model, train_loader, val_loader, num_epochs=25)
+    trained_model = train_model(
+        model, train_loader, val_loader, num_epochs=args.epochs, fast=args.fast,
+        accumulation_steps=args.accumulate, compile_model=args.compile,
+        profile_dir=args.profile_dir, interactive=not args.yes
+    )
     
     # 保存完整模型（可选）
-    torch.save(trained_model, 'full_model.pth')
\ No newline at end of file
+    if rank == 0:
+        torch.save(trained_model, 'full_model.pth')
+    if args.distributed:
+        dist.destroy_process_group()
\ No newline at end of file
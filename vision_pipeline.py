@@ -0,0 +1,301 @@
+# vision_pipeline.py
+"""
+视力检测的采集/推理/渲染流水线
+
+串行循环中每一帧依次经过 读帧 → 翻转/颜色转换 → 面部网格 → 手部关键点 → 渲染显示，
+帧率等于各阶段耗时之和。流水线把它拆成三个并发阶段：
+
+- 采集线程：持续 cap.read()，只保留最新一帧，推理来不及处理的旧帧直接丢弃
+- 推理线程：取最新帧，翻转并转换一次颜色，面部网格和手部模型在两个线程中同时推理
+- 渲染（调用线程）：读取最新的推理结果，绘制并显示；OpenCV窗口只能在调用线程中操作
+
+各阶段耗时、帧的端到端延迟（采集→显示）和手势到反馈的延迟由 StageStats 统计。
+采集或推理线程出错（帧源读取失败、模型抛出异常）时流水线结束，running 变为False，
+异常保存在 error 中。
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+
+class StageStats:
+    """各阶段最近若干次耗时（毫秒）的统计"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.window)
+                self._counts[stage] = 0
+            self._samples[stage].append(seconds * 1000)
+            self._counts[stage] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items() if values}
+            counts = dict(self._counts)
+        return {
+            stage: {
+                'count': counts[stage],
+                'mean_ms': round(float(values.mean()), 2),
+                'p50_ms': round(float(np.percentile(values, 50)), 2),
+                'p95_ms': round(float(np.percentile(values, 95)), 2),
+                'max_ms': round(float(values.max()), 2),
+            }
+            for stage, values in samples.items()
+        }
+
+    def format(self) -> str:
+        return format_stages(self.summary())
+
+
+def format_stages(summary: Dict[str, Dict[str, float]]) -> str:
+    """把 StageStats.summary() 的结果格式化为表格"""
+    lines = [f"{'阶段':<20}{'次数':>6}{'平均':>9}{'P50':>9}{'P95':>9}{'最大':>9}"]
+    for stage, s in summary.items():
+        lines.append(f"{stage:<20}{s['count']:>6}{s['mean_ms']:>7.1f}ms{s['p50_ms']:>7.1f}ms"
+                     f"{s['p95_ms']:>7.1f}ms{s['max_ms']:>7.1f}ms")
+    return "\n".join(lines)
+
+
+@dataclass
+class FramePacket:
+    """采集线程产出的一帧"""
+    seq: int
+    frame: np.ndarray
+    captured_at: float
+
+
+@dataclass
+class InferenceResult:
+    """推理线程产出的一帧结果；frame为已翻转的BGR帧，渲染阶段可直接在上面绘制"""
+    seq: int
+    frame: np.ndarray
+    captured_at: float
+    face_landmarks: Any = None
+    hand_landmarks: Any = None                     # 第一只手
+    hands: List[Any] = field(default_factory=list)  # 检测到的全部手
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class _LatestSlot:
+    """只保存最新值的单槽缓冲；写入覆盖未被取走的旧值"""
+
+    def __init__(self):
+        self._value = None
+        self._cond = threading.Condition()
+        self.overwritten = 0
+
+    def put(self, value) -> None:
+        with self._cond:
+            if self._value is not None:
+                self.overwritten += 1
+            self._value = value
+            self._cond.notify_all()
+
+    def take(self, timeout: Optional[float] = None):
+        """取走最新值（等待至多timeout秒），超时返回None"""
+        with self._cond:
+            if self._value is None:
+                self._cond.wait(timeout)
+            value, self._value = self._value, None
+            return value
+
+    @property
+    def pending(self) -> bool:
+        return self._value is not None
+
+    def wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+
+class VisionPipeline:
+    """采集/推理/渲染流水线
+
+    source 需提供 read() 和 isOpened()（cv2.VideoCapture 或回放帧源）；
+    face_mesh / hands 为MediaPipe模型（任一可为None），各自只在固定的一个线程中调用。
+    """
+
+    def __init__(self, source, face_mesh=None, hands=None, flip: bool = True,
+                 stats: Optional[StageStats] = None):
+        self.source = source
+        self.face_mesh = face_mesh
+        self.hands = hands
+        self.flip = flip
+        self.stats = stats or StageStats()
+        self.captured = 0
+        self.inferred = 0
+        self._frames = _LatestSlot()
+        self._results = _LatestSlot()
+        self._stop = threading.Event()
+        self._capture_done = threading.Event()
+        self._inference_done = threading.Event()
+        self._threads = []
+        self._hands_executor: Optional[ThreadPoolExecutor] = None
+        self._started_at = 0.0
+        self.error: Optional[BaseException] = None
+
+    @property
+    def running(self) -> bool:
+        """未被停止，且帧源未结束或还有未取走的结果"""
+        if self._stop.is_set():
+            return False
+        return not self._inference_done.is_set() or self._results.pending
+
+    @property
+    def dropped(self) -> int:
+        """采集后未经推理就被更新的帧覆盖的帧数"""
+        return self._frames.overwritten
+
+    def start(self) -> "VisionPipeline":
+        self._stop.clear()
+        self._capture_done.clear()
+        self._inference_done.clear()
+        self.error = None
+        self._started_at = time.perf_counter()
+        if self.face_mesh is not None and self.hands is not None:
+            self._hands_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vision-hands")
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="vision-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="vision-inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._frames.wake()
+        self._results.wake()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        if self._hands_executor is not None:
+            self._hands_executor.shutdown(wait=True)
+            self._hands_executor = None
+
+    def __enter__(self) -> "VisionPipeline":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def latest(self, timeout: Optional[float] = None) -> Optional[InferenceResult]:
+        """取走最新的推理结果（渲染阶段调用）；timeout内没有新结果时返回None"""
+        return self._results.take(timeout)
+
+    # ------------------------------------------------------------------
+    # 采集
+    # ------------------------------------------------------------------
+
+    def _capture_loop(self) -> None:
+        seq = 0
+        try:
+            while (not self._stop.is_set() and not self._inference_done.is_set()
+                   and self.source.isOpened()):
+                start = time.perf_counter()
+                success, frame = self.source.read()
+                now = time.perf_counter()
+                if not success or frame is None:
+                    time.sleep(0.005)
+                    continue
+                self.stats.record('capture', now - start)
+                self._frames.put(FramePacket(seq, frame, now))
+                self.captured += 1
+                seq += 1
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            # 帧源结束（如视频回放完毕）或出错：推理线程处理完剩余的帧后结束
+            self._capture_done.set()
+            self._frames.wake()
+
+    def _fail(self, error: BaseException) -> None:
+        if self.error is None:
+            self.error = error
+        print(f"视觉流水线出错，已停止: {error!r}")
+
+    # ------------------------------------------------------------------
+    # 推理
+    # ------------------------------------------------------------------
+
+    def _inference_loop(self) -> None:
+        try:
+            while not self._stop.is_set():
+                packet = self._frames.take(timeout=0.1)
+                if packet is None:
+                    if not self._capture_done.is_set():
+                        continue
+                    # 采集线程先放入最后一帧再标记结束，标记后再取一次不会漏帧
+                    packet = self._frames.take(timeout=0)
+                    if packet is None:
+                        break
+                self._results.put(self._infer(packet))
+                self.inferred += 1
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            # 采集线程随之结束
+            self._inference_done.set()
+            self._results.wake()
+
+    def _infer(self, packet: FramePacket) -> InferenceResult:
+        start = time.perf_counter()
+        frame = cv2.flip(packet.frame, 1) if self.flip else packet.frame
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb.flags.writeable = False
+        prepared = time.perf_counter()
+        result = InferenceResult(packet.seq, frame, packet.captured_at,
+                                 timings={'prepare': prepared - start})
+
+        def run_hands():
+            t = time.perf_counter()
+            hands = self.hands.process(rgb)
+            return hands, time.perf_counter() - t
+
+        # 手部模型在另一个线程中与面部网格同时推理（MediaPipe推理时释放GIL）
+        hands_future = self._hands_executor.submit(run_hands) if self._hands_executor else None
+        if self.face_mesh is not None:
+            t = time.perf_counter()
+            face = self.face_mesh.process(rgb)
+            result.timings['face_mesh'] = time.perf_counter() - t
+            if face.multi_face_landmarks:
+                result.face_landmarks = face.multi_face_landmarks[0]
+        if self.hands is not None:
+            hands, elapsed = hands_future.result() if hands_future else run_hands()
+            result.timings['hands'] = elapsed
+            if hands.multi_hand_landmarks:
+                result.hands = list(hands.multi_hand_landmarks)
+                result.hand_landmarks = result.hands[0]
+
+        result.timings['inference'] = time.perf_counter() - start
+        for stage, seconds in result.timings.items():
+            self.stats.record(stage, seconds)
+        return result
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = max(time.perf_counter() - self._started_at, 1e-9)
+        return {
+            'captured_fps': round(self.captured / elapsed, 1),
+            'inferred_fps': round(self.inferred / elapsed, 1),
+            'dropped_frames': self.dropped,
+            'error': repr(self.error) if self.error is not None else None,
+            'stages': self.stats.summary(),
+        }
@@ -1,13 +1,18 @@
 # vision_test.py
 import cv2
-import mediapipe as mp
 import numpy as np
-import math
 import time
 import os
 import json
+import random
 from enum import Enum
 
+from camera_broker import CameraStream
+from landmark_geometry import as_points, estimate_distance_cm, pointing_direction
+from optotype_atlas import DIRECTIONS, OptotypeAtlas, rotate
+from staircase import VISION_STANDARD, QuestStaircase, vision_level
+from vision_pipeline import StageStats
+
 class TestMode(Enum):
     E_CHART = "e_chart"           # 传统E字表
     LANDOLT_C = "landolt_c"       # 兰道尔C环
@@ -18,26 +23,9 @@ class TestMode(Enum):
 
 class VisionTester:
     def __init__(self, test_mode=TestMode.E_CHART):
-        # 初始化摄像头和MediaPipe组件
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
-            raise RuntimeError("无法打开摄像头，请检查摄像头连接和权限。")
-        
-        # 设置摄像头参数
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        
-        # 初始化检测模型
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        self.hands = mp.solutions.hands.Hands(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # 订阅共享摄像头（摄像头和MediaPipe模型由代理统一打开，帧已镜像翻转）
+        self.camera = CameraStream()
+        self.frame_width = self.camera.frame_width
         
         # 测试模式设置
         self.test_mode = test_mode
@@ -47,11 +35,22 @@ class VisionTester:
         self.current_image = self._load_current_test_image()
         self._init_test_parameters()
         
+        # 视标变体（模式、大小、方向）只渲染一次，每帧只做切片混合
+        self.atlas = OptotypeAtlas(self.test_images)
+        self.atlas.prerender(self._atlas_mode(), [self.current_size])
+        
         # 新增：自适应算法参数
         self.adaptive_threshold = 0.7  # 自适应阈值
         self.confidence_history = []   # 置信度历史
         self.difficulty_level = 1.0   # 难度等级
         
+        # 距离校准时长（秒）
+        self.calibration_seconds = 5
+        
+        # 渲染及端到端耗时统计（run_test结束后可查看）
+        self.stats = StageStats()
+        self.latency_report = {}
+        
     def _load_test_images(self):
         """加载不同测试模式的图片"""
         images = {}
@@ -114,6 +113,10 @@ class VisionTester:
         """加载当前测试模式的图片"""
         return self.test_images.get(self.test_mode, self.test_images[TestMode.E_CHART])
 
+    def _atlas_mode(self):
+        """当前模式在图集中的键（该模式没有图片时用E字表）"""
+        return self.test_mode if self.test_mode in self.atlas.images else TestMode.E_CHART
+
     def _load_e_image(self, path):
         """加载并验证E字图片"""
         if not os.path.exists(path):
@@ -125,7 +128,6 @@ class VisionTester:
 
     def _init_test_parameters(self):
         """初始化测试参数"""
-        self.current_size = 0.5  # 初始大小
         self.current_direction = 0  # 0:右, 90:下, 180:左, 270:上
         self.min_size = 0.1
         self.max_size = 1.0
@@ -140,12 +142,13 @@ class VisionTester:
         self.start_time = time.time()  # 开始测试时间
         
         # 国际标准视力对照表
-        self.VISION_STANDARD = {
-            0.1: 4.0, 0.15: 4.2, 0.2: 4.4,
-            0.25: 4.6, 0.3: 4.8, 0.4: 5.0,
-            0.5: 5.2, 0.6: 5.4, 0.8: 5.6,
-            1.0: 5.8
-        }
+        self.VISION_STANDARD = VISION_STANDARD
+        
+        # 贝叶斯自适应阶梯：选择信息量最大的视标大小，阈值足够确定时结束测试
+        staircase_mode = self.test_mode.value if self.test_mode in (TestMode.LANDOLT_C, TestMode.SNELLEN) \
+            else TestMode.E_CHART.value
+        self.staircase = QuestStaircase.for_mode(staircase_mode, low=self.min_size, high=self.max_size)
+        self.current_size = self.staircase.next_value()
         
         # 新增：测试结果存储
         self.test_results = {
@@ -166,18 +169,9 @@ class VisionTester:
         print(f"已切换到{new_mode.value}测试模式")
 
     def adaptive_difficulty(self):
-        """自适应难度调整算法"""
-        if len(self.confidence_history) < 3:
-            return
-        
-        recent_accuracy = sum(self.confidence_history[-3:]) / 3
-        
-        if recent_accuracy > 0.8:  # 准确率很高，增加难度
-            self.difficulty_level = min(2.0, self.difficulty_level * 1.1)
-            self.current_size = max(self.min_size, self.current_size * 0.9)
-        elif recent_accuracy < 0.6:  # 准确率较低，降低难度
-            self.difficulty_level = max(0.5, self.difficulty_level * 0.9)
-            self.current_size = min(self.max_size, self.current_size * 1.1)
+        """自适应难度调整：由贝叶斯阶梯按当前后验选择下一个视标大小"""
+        self.current_size = self.staircase.next_value()
+        self.difficulty_level = self.max_size / self.current_size
 
     def get_comprehensive_vision_report(self):
         """获取综合视力报告"""
@@ -187,6 +181,7 @@ class VisionTester:
             'accuracy_rate': self.correct_count / max(self.total_count, 1),
             'average_response_time': np.mean(self.test_results['timing']) if self.test_results['timing'] else 0,
             'difficulty_progression': self.difficulty_level,
+            'staircase': self.staircase.summary(),
             'recommendations': self._generate_recommendations()
         }
         return report
@@ -214,55 +209,25 @@ class VisionTester:
     @staticmethod
     def rotate_image(img, angle):
         """旋转E字图片"""
-        h, w = img.shape[:2]
-        center = (w // 2, h // 2)
-        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-        return cv2.warpAffine(img, M, (w, h), 
-                           flags=cv2.INTER_LINEAR,
-                           borderMode=cv2.BORDER_CONSTANT,
-                           borderValue=(255, 255, 255, 0))
+        return rotate(img, angle)
 
     def _detect_hand_direction(self, hand_landmarks):
-        """改进后的手势方向检测"""
-        # 获取关键点
-        wrist = hand_landmarks.landmark[0]
-        index_tip = hand_landmarks.landmark[8]
-        middle_tip = hand_landmarks.landmark[12]
-        
-        # 计算向量和角度差
-        vec_index = (index_tip.x - wrist.x, index_tip.y - wrist.y)
-        vec_middle = (middle_tip.x - wrist.x, middle_tip.y - wrist.y)
-        angle_diff = abs(math.degrees(math.atan2(vec_index[1], vec_index[0])) - math.degrees(math.atan2(vec_middle[1], vec_middle[0])))
-        
-        # 判断手指伸直状态
-        if angle_diff < 20:
-            angle = math.degrees(math.atan2(vec_index[1], vec_index[0]))
-            return (int((angle + 45) % 360 // 90) * 90) % 360
-        return None
+        """改进后的手势方向检测：食指与中指夹角小于20度（手指伸直）时返回食指方向"""
+        return pointing_direction(as_points(hand_landmarks), straight_tolerance=20)
 
     def _calculate_face_distance(self, face_landmarks):
-        """基于面部特征计算距离"""
-        left_eye = face_landmarks.landmark[159]
-        right_eye = face_landmarks.landmark[386]
-        eye_distance_px = math.hypot(right_eye.x - left_eye.x, right_eye.y - left_eye.y)
-        
-        # 使用更精确的物理模型计算距离
-        average_face_width = 0.16  # 米
-        focal_length = 600  # 相机焦距（估计值）
-        distance = (average_face_width * focal_length) / (eye_distance_px * self.cap.get(3))
-        return max(30, min(100, int(distance * 100)))  # 转换为厘米
+        """基于面部特征计算距离（厘米）"""
+        distance = estimate_distance_cm(as_points(face_landmarks), self.frame_width)
+        return max(30, min(100, int(distance)))
 
     def _update_e_parameters(self):
         """根据检测结果更新E字参数"""
         # 调整大小
-        if self.consecutive_errors > 0:
-            self.current_size = min(self.max_size, self.current_size * 1.1)
-        else:
-            self.current_size = max(self.min_size, self.current_size * 0.9)
-            self.min_size_reached = self.current_size == self.min_size
+        self.adaptive_difficulty()
+        self.min_size_reached = self.current_size <= self.min_size
         
-        # 改变方向
-        self.current_direction = (self.current_direction + 90) % 360
+        # 随机改变方向（方向可预测时猜对率不再是1/4）
+        self.current_direction = random.choice(DIRECTIONS)
         self.last_change_time = time.time()
 
     def run_test(self):
@@ -273,45 +238,53 @@ class VisionTester:
             print("\n开始视力检测，请保持正对摄像头...")
             print("手势说明：")
             print(" - 伸直手指指向方向回答E字方向")
-            print(" - 连续两次错误回答将结束测试\n")
+            print(" - 结果足够确定后测试自动结束\n")
             
-            while self.testing and self.cap.isOpened():
-                success, frame = self.cap.read()
-                if not success:
+            # 采集和推理在代理中并发执行，这里只渲染最新的一帧结果
+            while self.testing:
+                snapshot = self.camera.read(timeout=0.1)
+                if snapshot is None:
+                    if not self.camera.isOpened():
+                        break
+                    cv2.waitKey(1)
                     continue
                 
-                # 处理帧数据
-                frame = cv2.flip(frame, 1)
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
                 # 面部距离检测
-                face_results = self.face_mesh.process(rgb_frame)
-                if face_results.multi_face_landmarks:
-                    self.distance = self._calculate_face_distance(
-                        face_results.multi_face_landmarks[0]
-                    )
+                if snapshot.face is not None:
+                    self.distance = self._calculate_face_distance(snapshot.face)
                 
                 # 手势方向检测
                 hand_direction = None
-                hand_results = self.hands.process(rgb_frame)
-                if hand_results.multi_hand_landmarks:
-                    hand_direction = self._detect_hand_direction(
-                        hand_results.multi_hand_landmarks[0]
-                    )
+                if snapshot.hand is not None:
+                    hand_direction = self._detect_hand_direction(snapshot.hand)
                 
-                # 更新显示内容
-                self._update_display(frame)
-                
-                # 检查是否需要检测手势
-                if time.time() - self.last_change_time >= self.display_duration:
-                    if hand_direction is not None:
-                        self._process_direction_match(hand_direction)
-                    
+                # 视标显示满 display_duration 后等待回答，每次呈现只计一次回答，回答后才换下一个视标
+                # （先判定再渲染，判定结果在本帧即显示）
+                answered = False
+                if hand_direction is not None and time.time() - self.last_change_time >= self.display_duration:
+                    self._process_direction_match(hand_direction)
                     self._update_e_parameters()
+                    answered = True
+                
+                # 更新显示内容
+                render_start = time.perf_counter()
+                self._update_display(snapshot.frame)
+                shown = time.perf_counter()
+                self.stats.record('render', shown - render_start)
+                self.stats.record('end_to_end', shown - snapshot.captured_at)
+                if answered:
+                    self.stats.record('gesture_to_feedback', shown - snapshot.captured_at)
                 
                 # 检查退出条件
                 if self._check_exit_condition():
                     break
+            self.latency_report = dict(self.camera.report())
+            self.latency_report.setdefault('stages', {}).update(self.stats.summary())
+            print("\n各阶段耗时:")
+            print(self.stats.format())
+            if 'captured_fps' in self.latency_report:
+                print(f"采集 {self.latency_report['captured_fps']} fps，推理 {self.latency_report['inferred_fps']} fps，"
+                      f"丢弃旧帧 {self.latency_report['dropped_frames']}")
             
             final_vision = self._calculate_final_vision()
             print(f"\n最终视力结果: {final_vision:.1f}")
@@ -326,29 +299,18 @@ class VisionTester:
     def _process_direction_match(self, detected_direction):
         """处理方向匹配逻辑"""
         self.total_count += 1
-        if detected_direction == self.current_direction:
+        correct = detected_direction == self.current_direction
+        if correct:
             self.correct_count += 1
             self.consecutive_errors = 0
         else:
             self.consecutive_errors += 1
+        self.staircase.update(self.current_size, correct)
 
     def _update_display(self, frame):
         """更新显示内容"""
-        # 生成旋转后的E字
-        rotated_e = self.rotate_image(self.current_image, self.current_direction)
-        resized_e = cv2.resize(rotated_e, 
-                              (int(rotated_e.shape[1] * self.current_size),
-                               int(rotated_e.shape[0] * self.current_size)))
-        
-        # 合并到画面中央
-        x_offset = (frame.shape[1] - resized_e.shape[1]) // 2
-        y_offset = (frame.shape[0] - resized_e.shape[0]) // 2
-        for c in range(3):
-            frame[y_offset:y_offset+resized_e.shape[0], 
-                 x_offset:x_offset+resized_e.shape[1], c] = \
-                resized_e[:, :, c] * (resized_e[:, :, 3]/255.0) + \
-                frame[y_offset:y_offset+resized_e.shape[0],
-                     x_offset:x_offset+resized_e.shape[1], c] * (1.0 - resized_e[:, :, 3]/255.0)
+        # 从图集取出当前大小和方向的视标，混合到画面中央
+        self.atlas.draw(frame, self._atlas_mode(), self.current_size, self.current_direction)
         
         # 添加叠加信息
         info_lines = [
@@ -364,13 +326,11 @@ class VisionTester:
                        (0, 0, 255) if i == 0 else (255, 255, 255), 2)
         
         cv2.imshow('Vision Test', frame)
-        cv2.waitKey(5)
+        cv2.waitKey(1)
 
     def _calculate_vision_level(self):
-        """计算当前视力水平"""
-        closest_size = min(self.VISION_STANDARD.keys(),
-                          key=lambda x: abs(x - self.current_size))
-        return self.VISION_STANDARD[closest_size]
+        """计算当前视力水平（视标大小阈值的后验估计）"""
+        return vision_level(self.staircase.threshold(), self.min_size)
 
     def _calculate_final_vision(self):
         """计算最终视力结果"""
@@ -378,19 +338,23 @@ class VisionTester:
 
     def _check_exit_condition(self):
         """检查测试结束条件"""
-        if self.consecutive_errors >= 2:
-            print("\n测试结束 - 连续两次回答错误")
+        if self.staircase.finished:
+            low, high = self.staircase.summary()['credible_interval']
+            print(f"\n测试结束 - 共{self.staircase.trials}次作答，视标大小阈值 {self.staircase.threshold():.2f}"
+                  f"（{self.staircase.credible_mass:.0%}可信区间 {low:.2f}~{high:.2f}）")
             self.testing = False
             cv2.destroyAllWindows()  # 关闭测试窗口
             return True
         return False
 
+    def cleanup(self):
+        """释放资源（摄像头由代理在空闲后关闭）"""
+        self.camera.close()
+        cv2.destroyAllWindows()
+
     def _cleanup(self):
         """释放资源"""
-        self.cap.release()
-        cv2.destroyAllWindows()
-        self.face_mesh.close()
-        self.hands.close()
+        self.cleanup()
         print("资源已释放")
     
     def _calibrate_distance(self):
@@ -398,14 +362,16 @@ class VisionTester:
         start_time = time.time()
         valid_samples = []
         
-        while time.time() - start_time < 5:  # 5秒校准时间
-            success, frame = self.cap.read()
-            if not success:
+        while time.time() - start_time < self.calibration_seconds:
+            snapshot = self.camera.read(timeout=0.1)
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
+            frame = snapshot.frame
             
-            face_results = self.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            if face_results.multi_face_landmarks:
-                distance = self._calculate_face_distance(face_results.multi_face_landmarks[0])
+            if snapshot.face is not None:
+                distance = self._calculate_face_distance(snapshot.face)
                 valid_samples.append(distance)
                 
             cv2.putText(frame, "正在校准距离...", (50, 50),
@@ -1,7 +1,6 @@
 # vision_training_game.py
 import cv2
 import numpy as np
-import mediapipe as mp
 import time
 import random
 import json
@@ -9,6 +8,9 @@ import os
 from typing import Dict, List, Tuple, Optional
 from enum import Enum
 
+from camera_broker import CameraStream
+from landmark_geometry import INDEX_TIP, INTEROCULAR, as_points, midpoint
+
 class GameType(Enum):
     EYE_TRACKING = "eye_tracking"      # 眼动追踪游戏
     FOCUS_TRAINING = "focus_training"  # 专注力训练
@@ -20,14 +22,8 @@ class VisionTrainingGame:
     """视力训练游戏系统"""
     
     def __init__(self):
-        self.cap = cv2.VideoCapture(0)
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
-            max_num_faces=1, refine_landmarks=True,
-            min_detection_confidence=0.5, min_tracking_confidence=0.5
-        )
-        self.hands = mp.solutions.hands.Hands(
-            min_detection_confidence=0.5, min_tracking_confidence=0.5
-        )
+        # 共享摄像头订阅：帧已镜像翻转，面部/手部关键点由代理推理
+        self.camera = CameraStream()
         
         # 游戏状态
         self.current_game = None
@@ -137,11 +133,12 @@ class VisionTrainingGame:
         move_speed = 2
         
         while time.time() - self.game_start_time < self.game_duration:
-            ret, frame = self.cap.read()
-            if not ret:
+            snapshot = self.camera.read()
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
-            
-            frame = cv2.flip(frame, 1)
+            frame = snapshot.frame
             
             # 更新目标位置（随机移动）
             if random.random() < 0.02:  # 2%概率改变方向
@@ -155,11 +152,8 @@ class VisionTrainingGame:
             cv2.circle(frame, target_pos, target_radius + 5, (255, 255, 255), 2)
             
             # 检测眼动
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_results = self.face_mesh.process(rgb_frame)
-            
-            if face_results.multi_face_landmarks:
-                eye_center = self._get_eye_center(face_results.multi_face_landmarks[0])
+            if snapshot.face is not None:
+                eye_center = self._get_eye_center(snapshot.face)
                 eye_pos = (int(eye_center[0] * frame.shape[1]), int(eye_center[1] * frame.shape[0]))
                 
                 # 计算眼动距离
@@ -192,11 +186,12 @@ class VisionTrainingGame:
         cell_size = 100
         
         while time.time() - self.game_start_time < self.game_duration:
-            ret, frame = self.cap.read()
-            if not ret:
+            snapshot = self.camera.read()
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
-            
-            frame = cv2.flip(frame, 1)
+            frame = snapshot.frame
             
             # 创建数字网格
             grid_frame = np.ones((300, 300, 3), dtype=np.uint8) * 255
@@ -228,11 +223,8 @@ class VisionTrainingGame:
                  x_offset:x_offset+grid_frame.shape[1]] = grid_frame
             
             # 检测手势点击
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            hand_results = self.hands.process(rgb_frame)
-            
-            if hand_results.multi_hand_landmarks:
-                hand_pos = self._get_hand_position(hand_results.multi_hand_landmarks[0])
+            if snapshot.hand is not None:
+                hand_pos = self._get_hand_position(snapshot.hand)
                 
                 # 检查是否点击了目标数字
                 if self._check_grid_click(hand_pos, x_offset, y_offset, grid_size, cell_size, numbers, current_target):
@@ -263,11 +255,12 @@ class VisionTrainingGame:
         color_start_time = time.time()
         
         while time.time() - self.game_start_time < self.game_duration:
-            ret, frame = self.cap.read()
-            if not ret:
+            snapshot = self.camera.read()
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
-            
-            frame = cv2.flip(frame, 1)
+            frame = snapshot.frame
             
             # 显示当前颜色
             color_circle = np.ones((200, 200, 3), dtype=np.uint8) * 255
@@ -280,10 +273,7 @@ class VisionTrainingGame:
                  x_offset:x_offset+color_circle.shape[1]] = color_circle
             
             # 检测手势响应
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            hand_results = self.hands.process(rgb_frame)
-            
-            if hand_results.multi_hand_landmarks:
+            if snapshot.hand is not None:
                 self.hits += 1
                 reaction_time = time.time() - color_start_time
                 self.reaction_times.append(reaction_time)
@@ -316,11 +306,12 @@ class VisionTrainingGame:
         sequence_start_time = time.time()
         
         while time.time() - self.game_start_time < self.game_duration:
-            ret, frame = self.cap.read()
-            if not ret:
+            snapshot = self.camera.read()
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
-            
-            frame = cv2.flip(frame, 1)
+            frame = snapshot.frame
             
             if showing_sequence:
                 # 显示序列
@@ -339,10 +330,7 @@ class VisionTrainingGame:
                     expected_color = sequence[current_step]
                     
                     # 检测手势响应
-                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    hand_results = self.hands.process(rgb_frame)
-                    
-                    if hand_results.multi_hand_landmarks:
+                    if snapshot.hand is not None:
                         # 简化的颜色检测（实际应用中需要更复杂的检测）
                         if random.random() < 0.8:  # 80%正确率模拟
                             self.hits += 1
@@ -402,11 +390,12 @@ class VisionTrainingGame:
         selected = None
         
         while time.time() - self.game_start_time < self.game_duration:
-            ret, frame = self.cap.read()
-            if not ret:
+            snapshot = self.camera.read()
+            if snapshot is None:
+                if not self.camera.isOpened():
+                    break
                 continue
-            
-            frame = cv2.flip(frame, 1)
+            frame = snapshot.frame
             
             # 创建颜色网格
             grid_frame = np.ones((grid_size * cell_size, grid_size * cell_size, 3), dtype=np.uint8) * 255
@@ -434,11 +423,8 @@ class VisionTrainingGame:
                  x_offset:x_offset+grid_frame.shape[1]] = grid_frame
             
             # 检测手势点击
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            hand_results = self.hands.process(rgb_frame)
-            
-            if hand_results.multi_hand_landmarks:
-                hand_pos = self._get_hand_position(hand_results.multi_hand_landmarks[0])
+            if snapshot.hand is not None:
+                hand_pos = self._get_hand_position(snapshot.hand)
                 clicked_index = self._get_grid_index(hand_pos, x_offset, y_offset, grid_size, cell_size)
                 
                 if clicked_index is not None and not revealed[clicked_index]:
@@ -464,8 +450,8 @@ class VisionTrainingGame:
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
     
-    def _end_game(self):
-        """结束游戏"""
+    def _game_result(self) -> Dict:
+        """本局游戏的成绩"""
         game_duration = time.time() - self.game_start_time
         accuracy = self.hits / max(self.hits + self.misses, 1)
         avg_reaction_time = np.mean(self.reaction_times) if self.reaction_times else 0
@@ -473,8 +459,7 @@ class VisionTrainingGame:
         # 计算游戏分数
         score = int(self.hits * 100 * accuracy)
         
-        # 保存游戏结果
-        game_result = {
+        return {
             'game_type': self.current_game.value,
             'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
             'duration': game_duration,
@@ -484,7 +469,16 @@ class VisionTrainingGame:
             'score': score,
             'avg_reaction_time': avg_reaction_time
         }
+    
+    def _end_game(self):
+        """结束游戏"""
+        game_result = self._game_result()
+        game_duration = game_result['duration']
+        accuracy = game_result['accuracy']
+        avg_reaction_time = game_result['avg_reaction_time']
+        score = game_result['score']
         
+        # 保存游戏结果
         self.game_history.append(game_result)
         self._save_game_history()
         
@@ -527,15 +521,14 @@ class VisionTrainingGame:
     
     # 辅助方法
     def _get_eye_center(self, landmarks) -> Tuple[float, float]:
-        """获取眼睛中心点"""
-        left_eye = landmarks.landmark[159]
-        right_eye = landmarks.landmark[386]
-        return ((left_eye.x + right_eye.x) / 2, (left_eye.y + right_eye.y) / 2)
+        """获取眼睛中心点（两眼上眼睑中点的中点）"""
+        x, y = midpoint(as_points(landmarks), *INTEROCULAR).tolist()
+        return (x, y)
     
     def _get_hand_position(self, hand_landmarks) -> Tuple[int, int]:
-        """获取手势位置"""
-        index_tip = hand_landmarks.landmark[8]
-        return (int(index_tip.x * 640), int(index_tip.y * 480))
+        """获取手势位置（食指尖的像素坐标）"""
+        x, y = as_points(hand_landmarks)[INDEX_TIP, :2].tolist()
+        return (int(x * 640), int(y * 480))
     
     def _check_grid_click(self, hand_pos: Tuple[int, int], x_offset: int, y_offset: int, 
                           grid_size: int, cell_size: int, numbers: List[int], target: int) -> bool:
@@ -574,10 +567,8 @@ class VisionTrainingGame:
     
     def cleanup(self):
         """清理资源"""
-        self.cap.release()
+        self.camera.close()
         cv2.destroyAllWindows()
-        self.face_mesh.close()
-        self.hands.close()
 
 # 使用示例
 if __name__ == "__main__":